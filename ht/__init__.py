@@ -40,6 +40,7 @@ from . import conv_supercritical
 from . import conv_two_phase
 from . import conv_plate
 from . import boiling_plate
+from . import shell_and_tube
 
 
 
@@ -62,12 +63,13 @@ from .conv_external import *
 from .conv_supercritical import *
 from .conv_two_phase import *
 from .boiling_plate import *
+from .shell_and_tube import *
 
 __all__ = ['core', 'hx', 'conv_internal', 'boiling_nucleic', 'air_cooler',
 'radiation', 'condensation', 'conduction', 'conv_jacket', 'conv_free_immersed',
 'conv_tube_bank', 'insulation', 'conv_packed_bed', 'conv_external', 
 'conv_supercritical', 'conv_two_phase', 'boiling_flow', 'boiling_plate',
-'conv_plate']
+'conv_plate', 'shell_and_tube']
 
 
 __all__.extend(core.__all__)
@@ -89,7 +91,15 @@ __all__.extend(conv_supercritical.__all__)
 __all__.extend(conv_two_phase.__all__)
 __all__.extend(boiling_plate.__all__)
 __all__.extend(conv_plate.__all__)
+__all__.extend(shell_and_tube.__all__)
 
 
 __version__ = '0.1.52'
 
+
+import os
+if os.environ.get('HT_INSTRUMENT', '0') not in ('', '0'):
+    from . import instrumentation
+    instrumentation.enable()
+# Not part of the namespace of ht, which ht.vectorized re-exports
+del os
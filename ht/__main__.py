@@ -0,0 +1,109 @@
+# -*- coding: utf-8 -*-
+'''Chemical Engineering Design Library (ChEDL). Utilities for process modeling.
+Copyright (C) 2018, Caleb Bell <Caleb.Andrew.Bell@gmail.com>
+
+Permission is hereby granted, free of charge, to any person obtaining a copy
+of this software and associated documentation files (the "Software"), to deal
+in the Software without restriction, including without limitation the rights
+to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+copies of the Software, and to permit persons to whom the Software is
+furnished to do so, subject to the following conditions:
+
+The above copyright notice and this permission notice shall be included in all
+copies or substantial portions of the Software.
+
+THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+SOFTWARE.'''
+
+from __future__ import division, print_function
+import sys
+import ast
+import argparse
+from ht.batch import evaluate_csv
+
+'''Command line evaluation of an ht function over the rows of a CSV file:
+
+    python -m ht LMTD temperatures.csv results.csv --set counterflow=False
+    python -m ht Nu_conv_internal data.csv --method Dittus-Boelter --column Re=Re_tube
+
+Columns named like an argument of the function are used for it; other
+columns can be mapped with `--column`, and fixed arguments given with `--set`.
+The file is processed in chunks of `--chunk-size` rows, and the rate is
+printed to stderr at the end.
+'''
+
+
+def _parse_value(text):
+    try:
+        return ast.literal_eval(text)
+    except (ValueError, SyntaxError):
+        return text
+
+
+def _pairs(values, option):
+    pairs = {}
+    for value in values or ():
+        if '=' not in value:
+            raise SystemExit('%s expects name=value, not %r' %(option, value))
+        key, value = value.split('=', 1)
+        pairs[key.strip()] = value.strip()
+    return pairs
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(prog='python -m ht',
+        description='Evaluate an ht function for each row of a CSV file.')
+    parser.add_argument('function', help='name of the function in ht')
+    parser.add_argument('input', help="CSV file with a header row, or - for stdin")
+    parser.add_argument('output', nargs='?', default='-',
+                        help='CSV file to write, or - for stdout (default)')
+    parser.add_argument('--column', action='append', metavar='ARG=COLUMN',
+                        help='use COLUMN of the input for argument ARG')
+    parser.add_argument('--set', action='append', metavar='ARG=VALUE',
+                        help='pass VALUE for argument ARG on every row')
+    parser.add_argument('--method', help='correlation for dispatchers')
+    parser.add_argument('--output-column', help='name of the result column')
+    parser.add_argument('--chunk-size', type=int, default=100000,
+                        help='rows evaluated at a time (default 100000)')
+    parser.add_argument('--processes', type=int, default=None,
+                        help='worker processes for functions without an '
+                        'array implementation (default: one per CPU)')
+    parser.add_argument('--path', default='auto',
+                        choices=('auto', 'array', 'vectorized', 'batch'),
+                        help='how chunks are evaluated (default auto)')
+    parser.add_argument('--quiet', action='store_true',
+                        help='do not print the rate')
+    args = parser.parse_args(argv)
+
+    constants = dict((k, _parse_value(v)) for k, v in _pairs(args.set, '--set').items())
+    columns = _pairs(args.column, '--column')
+    source = sys.stdin if args.input == '-' else open(args.input, newline='')
+    destination = sys.stdout if args.output == '-' else open(args.output, 'w', newline='')
+    stats = {}
+    try:
+        evaluate_csv(args.function, source, destination, columns=columns,
+                     method=args.method, constants=constants,
+                     output_column=args.output_column,
+                     chunksize=args.chunk_size, processes=args.processes,
+                     path=args.path, stats=stats)
+    except (ValueError, AttributeError) as e:
+        parser.exit(2, 'error: %s\n' %(e))
+    finally:
+        if source is not sys.stdin:
+            source.close()
+        if destination is not sys.stdout:
+            destination.close()
+    if not args.quiet:
+        print('%d rows (%d errors) in %.3f s, %.0f rows/s, %s path'
+              %(stats['rows'], stats['errors'], stats['seconds'],
+                stats['rows_per_second'], stats['path']), file=sys.stderr)
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
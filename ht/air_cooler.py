@@ -22,7 +22,8 @@ SOFTWARE.'''
 
 from __future__ import division
 from math import atan, sin
-from ht.core import LMTD
+import numpy as np
+from ht.core import LMTD, _LMTD_vectorized
 
 __all__ = ['Ft_aircooler']
 
@@ -92,6 +93,34 @@ _crossflow_4_rows_2_pass = [[-6.05E-1, 2.31E-2, 2.94E-1, 1.98E-2],
 
 
 
+def _Ft_aircooler_coefs(Ntp, rows):
+    if Ntp == 1 and rows == 1:
+        return _crossflow_1_row_1_pass
+    elif Ntp == 1 and rows == 2:
+        return _crossflow_2_rows_1_pass
+    elif Ntp == 1 and rows == 3:
+        return _crossflow_3_rows_1_pass
+    elif Ntp == 1 and rows == 4:
+        return _crossflow_4_rows_1_pass
+    elif Ntp == 1 and rows > 4:
+        # A reasonable assumption
+        return _crossflow_4_rows_1_pass
+    elif Ntp == 2 and rows == 2:
+        return _crossflow_2_rows_2_pass
+    elif Ntp == 3 and rows == 3:
+        return _crossflow_3_rows_3_pass
+    elif Ntp == 4 and rows == 4:
+        return _crossflow_4_rows_4_pass
+    elif Ntp > 4 and rows > 4 and Ntp == rows:
+        # A reasonable assumption
+        return _crossflow_4_rows_4_pass
+    elif Ntp  == 2 and rows == 4:
+        return _crossflow_4_rows_2_pass
+    else:
+        # A bad assumption, but hey, gotta pick something.
+        return _crossflow_4_rows_2_pass
+
+
 def Ft_aircooler(Thi, Tho, Tci, Tco, Ntp=1, rows=1):
     r'''Calculates log-mean temperature difference correction factor for
     a crossflow heat exchanger, as in an Air Cooler. Method presented in [1]_,
@@ -162,31 +191,7 @@ def Ft_aircooler(Thi, Tho, Tci, Tco, Ntp=1, rows=1):
     R = (Thi-Tho)/(Tco-Tci)
 #    P = (Tco-Tci)/(Thi-Tci)
 
-    if Ntp == 1 and rows == 1:
-        coefs = _crossflow_1_row_1_pass
-    elif Ntp == 1 and rows == 2:
-        coefs = _crossflow_2_rows_1_pass
-    elif Ntp == 1 and rows == 3:
-        coefs = _crossflow_3_rows_1_pass
-    elif Ntp == 1 and rows == 4:
-        coefs = _crossflow_4_rows_1_pass
-    elif Ntp == 1 and rows > 4:
-        # A reasonable assumption
-        coefs = _crossflow_4_rows_1_pass
-    elif Ntp == 2 and rows == 2:
-        coefs = _crossflow_2_rows_2_pass
-    elif Ntp == 3 and rows == 3:
-        coefs = _crossflow_3_rows_3_pass
-    elif Ntp == 4 and rows == 4:
-        coefs = _crossflow_4_rows_4_pass
-    elif Ntp > 4 and rows > 4 and Ntp == rows:
-        # A reasonable assumption
-        coefs = _crossflow_4_rows_4_pass
-    elif Ntp  == 2 and rows == 4:
-        coefs = _crossflow_4_rows_2_pass
-    else:
-        # A bad assumption, but hey, gotta pick something.
-        coefs = _crossflow_4_rows_2_pass
+    coefs = _Ft_aircooler_coefs(Ntp, rows)
     tot = 0
     atanR = atan(R)
     cmps = range(len(coefs))
@@ -195,3 +200,40 @@ def Ft_aircooler(Thi, Tho, Tci, Tco, Ntp=1, rows=1):
         for i in cmps:
             tot += coefs[k][i]*x0*sin(2.*(i + 1.)*atanR)
     return 1. - tot
+
+
+def _Ft_sine_basis(R, n):
+    # sin(2*(i+1)*atan(R)) for i in range(n), stacked on the last axis. With
+    # phi = 2*atan(R), sin(phi) and cos(phi) are rational in R, and the
+    # multiples follow the Chebyshev recurrence
+    # sin((i+1)*phi) = 2*cos(phi)*sin(i*phi) - sin((i-1)*phi)
+    R2 = R*R
+    sin_phi = 2.*R/(1. + R2)
+    two_cos_phi = 2.*(1. - R2)/(1. + R2)
+    basis = [sin_phi, two_cos_phi*sin_phi]
+    for i in range(2, n):
+        basis.append(two_cos_phi*basis[-1] - basis[-2])
+    return np.stack(basis[:n], axis=-1)
+
+
+def _Ft_aircooler_vectorized(Thi, Tho, Tci, Tco, Ntp=1, rows=1):
+    Thi, Tho, Tci, Tco, Ntp, rows = np.broadcast_arrays(
+            np.asarray(Thi, dtype=float), np.asarray(Tho, dtype=float),
+            np.asarray(Tci, dtype=float), np.asarray(Tco, dtype=float),
+            Ntp, rows)
+    dTlm = _LMTD_vectorized(Thi=Thi, Tho=Tho, Tci=Tci, Tco=Tco)
+    x = 1. - dTlm/(Thi - Tci)
+    R = (Thi - Tho)/(Tco - Tci)
+    n = len(_crossflow_1_row_1_pass)
+    # (1 - rlm)**(k+1) and the sine basis, each on the last axis; the double
+    # sum is then the product basis_x . coefs . basis_sin
+    powers = x[..., None]**np.arange(1, n + 1)
+    sines = _Ft_sine_basis(R, n)
+    tot = np.empty(x.shape)
+    # One matrix product per distinct coefficient table in the inputs
+    for Ntp_i, rows_i in set(zip(Ntp.ravel().tolist(), rows.ravel().tolist())):
+        coefs = np.array(_Ft_aircooler_coefs(Ntp_i, rows_i))
+        mask = (Ntp == Ntp_i) & (rows == rows_i)
+        tot[mask] = np.einsum('...k,ki,...i->...', powers[mask], coefs,
+                              sines[mask])
+    return 1. - tot
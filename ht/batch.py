@@ -0,0 +1,374 @@
+# -*- coding: utf-8 -*-
+'''Chemical Engineering Design Library (ChEDL). Utilities for process modeling.
+Copyright (C) 2018, Caleb Bell <Caleb.Andrew.Bell@gmail.com>
+
+Permission is hereby granted, free of charge, to any person obtaining a copy
+of this software and associated documentation files (the "Software"), to deal
+in the Software without restriction, including without limitation the rights
+to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+copies of the Software, and to permit persons to whom the Software is
+furnished to do so, subject to the following conditions:
+
+The above copyright notice and this permission notice shall be included in all
+copies or substantial portions of the Software.
+
+THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+SOFTWARE.'''
+
+from __future__ import division
+import os
+import csv
+import inspect
+from itertools import islice
+import numpy as np
+from multiprocessing import RawArray
+import ht
+
+try:
+    from concurrent.futures import ProcessPoolExecutor
+except ImportError: # pragma: no cover
+    ProcessPoolExecutor = None
+
+__all__ = ['evaluate', 'evaluate_csv', 'ERROR_CODES', 'ERROR_NONNUMERIC']
+
+'''Evaluation of any scalar ht function over columns of inputs, on all cores.
+
+Functions which have an array implementation are faster through
+:obj:`ht.vectorized`; this is for the rest. The numeric input columns and the
+result columns are placed in shared memory, which the worker processes of a
+`concurrent.futures` process pool read and write directly, so only the
+bounds of each chunk are sent to the workers.
+
+:obj:`evaluate_csv` streams a CSV file through a function in chunks of a
+fixed number of rows; it is also available from the command line as
+`python -m ht`.
+'''
+
+# Codes recorded for elements whose evaluation raised an exception; 0 means
+# the element was evaluated successfully.
+ERROR_CODES = {ValueError: 1, ZeroDivisionError: 2, ArithmeticError: 3,
+               TypeError: 4, Exception: 5}
+# Code for elements whose result could not be converted to a float
+ERROR_NONNUMERIC = 6
+
+_ctypes = {'f': 'd', 'i': 'q', 'u': 'Q', 'b': 'b'}
+_state = {}
+
+
+def _error_code(e):
+    for cls in type(e).__mro__:
+        if cls in ERROR_CODES:
+            return ERROR_CODES[cls]
+    return ERROR_CODES[Exception] # pragma: no cover
+
+
+def _share(array):
+    kind = array.dtype.kind
+    if kind == 'b':
+        array = array.astype(np.int8)
+    elif kind == 'i' or kind == 'u':
+        array = array.astype(np.int64 if kind == 'i' else np.uint64)
+    else:
+        array = array.astype(np.float64)
+    raw = RawArray(_ctypes[kind], array.size)
+    view = np.frombuffer(raw, dtype=array.dtype)
+    view[:] = array
+    return raw, array.dtype.str, kind == 'b'
+
+
+def _attach(shared):
+    arrays = {}
+    for name, (raw, dtype, boolean) in shared.items():
+        view = np.frombuffer(raw, dtype=np.dtype(dtype))
+        arrays[name] = view.astype(bool) if boolean else view
+    return arrays
+
+
+def _init_worker(function, shared, results, errors, constants):
+    _state['function'] = function
+    _state['arrays'] = _attach(shared)
+    _state['results'] = np.frombuffer(results, dtype=np.float64)
+    _state['errors'] = np.frombuffer(errors, dtype=np.int8)
+    _state['constants'] = constants
+
+
+def _run_chunk(task):
+    start, stop, others = task
+    function = _state['function']
+    arrays = _state['arrays']
+    results = _state['results']
+    errors = _state['errors']
+    kwargs = dict(_state['constants'])
+    columns = [(name, array[start:stop].tolist()) for name, array in arrays.items()]
+    columns.extend((name, values) for name, values in others.items())
+    for j in range(stop - start):
+        for name, values in columns:
+            kwargs[name] = values[j]
+        i = start + j
+        try:
+            value = function(**kwargs)
+        except Exception as e:
+            results[i] = np.nan
+            errors[i] = _error_code(e)
+            continue
+        try:
+            results[i] = float(value)
+        except (TypeError, ValueError):
+            results[i] = np.nan
+            errors[i] = ERROR_NONNUMERIC
+    return stop - start
+
+
+def evaluate(function, inputs, method=None, constants=None, processes=None,
+             chunksize=None):
+    r'''Evaluates a scalar function of ht once for each row of a set of input
+    columns, splitting the rows into chunks run on a process pool. An
+    exception raised for one row does not stop the others; its result is set
+    to NaN and the type of the exception recorded as an error code.
+
+    Parameters
+    ----------
+    function : callable or str
+        Function to evaluate, or the name of a function in `ht`; it must be
+        defined at the top level of a module so the workers can import it,
+        and must return a number, [-]
+    inputs : dict[str, array-like]
+        Columns of equal length, keyed by the name of the argument of
+        `function` they are passed as, [various]
+    method : str, optional
+        Correlation to use, passed as `Method` to dispatchers such as
+        `Nu_conv_internal` and `h_nucleic`, [-]
+    constants : dict, optional
+        Keyword arguments passed unchanged to every call, [various]
+    processes : int, optional
+        Number of worker processes; defaults to the number of CPUs. With 1,
+        the rows are evaluated in this process, [-]
+    chunksize : int, optional
+        Number of rows in each chunk sent to a worker; defaults to dividing
+        the rows into four chunks per process, [-]
+
+    Returns
+    -------
+    results : ndarray
+        Result of each row, NaN for rows which failed, [various]
+    errors : ndarray
+        Error code of each row (int8) - 0 for success, otherwise the value in
+        :obj:`ERROR_CODES` of the exception raised, or
+        :obj:`ERROR_NONNUMERIC` if the result was not a number, [-]
+
+    Notes
+    -----
+    Numeric columns are copied once into shared memory; columns of any other
+    type (such as strings) are sent to the workers with each chunk.
+
+    Examples
+    --------
+    >>> results, errors = evaluate('effectiveness_from_NTU', {'NTU': [1., 2., 5.],
+    ...     'Cr': [0.5, 0.5, 2.]}, constants={'subtype': 'crossflow'}, processes=1)
+    >>> results
+    array([0.54748983, 0.73240925,        nan])
+    >>> errors
+    array([0, 0, 5], dtype=int8)
+    '''
+    if isinstance(function, str):
+        function = getattr(ht, function)
+    constants = dict(constants) if constants else {}
+    if method is not None:
+        constants['Method'] = method
+
+    columns = dict((name, np.asarray(values)) for name, values in inputs.items())
+    lengths = set(array.size for array in columns.values())
+    if len(lengths) > 1:
+        raise ValueError('All input columns must have the same length')
+    N = lengths.pop() if lengths else 0
+
+    shared, others = {}, {}
+    for name, array in columns.items():
+        array = array.ravel()
+        if array.dtype.kind in _ctypes:
+            shared[name] = _share(array)
+        else:
+            others[name] = array.tolist()
+    results = RawArray('d', N)
+    errors = RawArray('b', N)
+    initargs = (function, shared, results, errors, constants)
+
+    if processes is None:
+        processes = os.cpu_count() or 1
+    if chunksize is None:
+        chunksize = max(1, -(-N//(4*processes)))
+    tasks = []
+    for start in range(0, N, chunksize):
+        stop = min(start + chunksize, N)
+        tasks.append((start, stop, dict((name, values[start:stop])
+                                        for name, values in others.items())))
+
+    if processes == 1 or ProcessPoolExecutor is None or len(tasks) < 2:
+        _init_worker(*initargs)
+        try:
+            for task in tasks:
+                _run_chunk(task)
+        finally:
+            _state.clear()
+    else:
+        with ProcessPoolExecutor(max_workers=min(processes, len(tasks)),
+                                 initializer=_init_worker,
+                                 initargs=initargs) as executor:
+            for _ in executor.map(_run_chunk, tasks):
+                pass
+    return (np.frombuffer(results, dtype=np.float64).copy(),
+            np.frombuffer(errors, dtype=np.int8).copy())
+
+
+def _parameters(function):
+    try:
+        return list(inspect.signature(function).parameters)
+    except AttributeError: # pragma: no cover
+        return inspect.getargspec(function).args
+
+
+def _column(values):
+    # Numbers where the text is one, so a bad value only fails its own row
+    parsed = []
+    numeric = True
+    for v in values:
+        try:
+            parsed.append(float(v) if v != '' else np.nan)
+        except ValueError:
+            parsed.append(v)
+            numeric = False
+    return np.array(parsed, dtype=np.float64 if numeric else object)
+
+
+def _choose_path(name, path):
+    import ht.vectorized
+    array_funcs = ht.vectorized.__dict__['__array_funcs']
+    if path == 'auto':
+        if name in array_funcs:
+            return 'array'
+        return 'batch'
+    if path == 'array' and name not in array_funcs:
+        raise ValueError('%s has no array implementation' %(name))
+    if path not in ('array', 'vectorized', 'batch'):
+        raise ValueError("path must be one of 'auto', 'array', 'vectorized' "
+                         "or 'batch'")
+    return path
+
+
+def evaluate_csv(function, source, destination, columns=None, method=None,
+                 constants=None, output_column=None, chunksize=100000,
+                 processes=None, path='auto', stats=None):
+    r'''Evaluates a function of ht for each row of a CSV file, reading,
+    evaluating and writing `chunksize` rows at a time so the memory used does
+    not depend on the size of the file. The output has the columns of the
+    input followed by the result, and the error code of each row (see
+    :obj:`evaluate`) when evaluated by `ht.batch`.
+
+    Parameters
+    ----------
+    function : str
+        Name of the function in `ht` to evaluate, [-]
+    source : file
+        Open CSV file with a header row, [-]
+    destination : file
+        Open file to write the CSV results to, [-]
+    columns : dict[str, str], optional
+        Column of the input to use for each argument of `function`, keyed by
+        argument; columns with the same name as an argument are used for it
+        unless given here, [-]
+    method : str, optional
+        Correlation to use, passed as `Method` to dispatchers, [-]
+    constants : dict, optional
+        Keyword arguments passed unchanged to every call, [various]
+    output_column : str, optional
+        Name of the column of results; defaults to the name of `function`,
+        [-]
+    chunksize : int, optional
+        Number of rows read and evaluated at a time, [-]
+    processes : int, optional
+        Number of processes used by the `batch` path; defaults to the number
+        of CPUs, as in :obj:`evaluate`, [-]
+    path : str, optional
+        How each chunk is evaluated - 'array' for an array implementation
+        from :obj:`ht.vectorized` (no error codes; a chunk the array
+        implementation fails on is evaluated again by `batch`),
+        'vectorized' for `np.vectorize`, 'batch' for :obj:`evaluate`, or
+        'auto' for 'array' when there is one and 'batch' otherwise, [-]
+    stats : dict, optional
+        If given, updated with 'rows', 'errors', 'seconds', 'rows_per_second'
+        and 'path', [-]
+
+    Returns
+    -------
+    rows : int
+        Number of rows evaluated, [-]
+    '''
+    from time import time
+    import ht.vectorized
+    name = function
+    function = getattr(ht, name)
+    path = _choose_path(name, path)
+    vectorized = getattr(ht.vectorized, name)
+    constants = dict(constants) if constants else {}
+    if method is not None:
+        constants['Method'] = method
+    output_column = output_column or name
+
+    reader = csv.reader(source)
+    writer = csv.writer(destination, lineterminator='\n')
+    header = next(reader)
+    mapping = dict((p, p) for p in _parameters(function)
+                   if p in header and p not in constants)
+    if columns:
+        for arg, column in columns.items():
+            if column not in header:
+                raise ValueError('Column %s is not in the input' %(column))
+            mapping[arg] = column
+    indexes = dict((arg, header.index(column)) for arg, column in mapping.items())
+    with_errors = path != 'array'
+    writer.writerow(header + [output_column] + (['error'] if with_errors else []))
+
+    start = time()
+    rows = errors_total = 0
+    while True:
+        chunk = list(islice(reader, chunksize))
+        if not chunk:
+            break
+        inputs = dict((arg, _column([row[i] for row in chunk]))
+                      for arg, i in indexes.items())
+        errors = None
+        if path == 'batch':
+            results, errors = evaluate(function, inputs, constants=constants,
+                                       processes=processes)
+        else:
+            kwargs = dict(constants)
+            kwargs.update(inputs)
+            try:
+                results = np.broadcast_to(vectorized(**kwargs), (len(chunk),))
+            except Exception:
+                if path == 'vectorized':
+                    raise
+                results, errors = evaluate(function, inputs, constants=constants,
+                                           processes=processes)
+            else:
+                if with_errors:
+                    errors = np.zeros(len(chunk), dtype=np.int8)
+        if errors is not None:
+            errors_total += int(np.count_nonzero(errors))
+        for j, row in enumerate(chunk):
+            row.append(repr(float(results[j])))
+            if with_errors:
+                row.append(int(errors[j]) if errors is not None else 0)
+        writer.writerows(chunk)
+        rows += len(chunk)
+    elapsed = time() - start
+    if stats is not None:
+        stats.update({'rows': rows, 'errors': errors_total, 'seconds': elapsed,
+                      'rows_per_second': rows/elapsed if elapsed else float('inf'),
+                      'path': path})
+    return rows
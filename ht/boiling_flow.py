@@ -24,6 +24,7 @@ from __future__ import division
 from math import pi, log10, atan, exp
 from scipy.constants import g
 from scipy.optimize import newton, fsolve
+from ht.diagnostics import solve
 from fluids.core import Prandtl, Boiling, Bond, Weber, nu_mu_converter
 from fluids.two_phase_voidage import Lockhart_Martinelli_Xtt
 from ht.conv_internal import turbulent_Gnielinski, turbulent_Dittus_Boelter
@@ -436,7 +437,11 @@ def Thome(m, x, D, rhol, rhog, mul, mug, kl, kg, Cpl, Cpg, Hvap, sigma, Psat,
     '''
     if q is None and Te:
         to_solve = lambda q : q/Thome(m=m, x=x, D=D, rhol=rhol, rhog=rhog, kl=kl, kg=kg, mul=mul, mug=mug, Cpl=Cpl, Cpg=Cpg, sigma=sigma, Hvap=Hvap, Psat=Psat, Pc=Pc, q=q) - Te
-        q = newton(to_solve, 1E4)
+        inputs = {'m': m, 'x': x, 'D': D, 'rhol': rhol, 'rhog': rhog,
+                  'kl': kl, 'kg': kg, 'mul': mul, 'mug': mug, 'Cpl': Cpl,
+                  'Cpg': Cpg, 'sigma': sigma, 'Hvap': Hvap, 'Psat': Psat,
+                  'Pc': Pc, 'Te': Te}
+        q = solve('Thome', newton, to_solve, inputs, 1E4)
         return Thome(m=m, x=x, D=D, rhol=rhol, rhog=rhog, kl=kl, kg=kg, mul=mul, mug=mug, Cpl=Cpl, Cpg=Cpg, sigma=sigma, Hvap=Hvap, Psat=Psat, Pc=Pc, q=q)
     elif q is None and Te is None:
         raise Exception('Either q or Te is needed for this correlation')
@@ -0,0 +1,270 @@
+# -*- coding: utf-8 -*-
+'''Chemical Engineering Design Library (ChEDL). Utilities for process modeling.
+Copyright (C) 2018, Caleb Bell <Caleb.Andrew.Bell@gmail.com>
+
+Permission is hereby granted, free of charge, to any person obtaining a copy
+of this software and associated documentation files (the "Software"), to deal
+in the Software without restriction, including without limitation the rights
+to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+copies of the Software, and to permit persons to whom the Software is
+furnished to do so, subject to the following conditions:
+
+The above copyright notice and this permission notice shall be included in all
+copies or substantial portions of the Software.
+
+THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+SOFTWARE.'''
+
+from __future__ import division
+import types
+import weakref
+import functools
+import threading
+from collections import OrderedDict
+import ht
+from ht.instrumentation import _replace
+
+__all__ = ['memoize', 'install', 'uninstall', 'enable', 'disable',
+           'is_enabled', 'clear', 'stats', 'CACHED_FUNCTIONS']
+
+'''Bounded, thread-safe LRU caches for the pure functions of ht which are
+expensive to evaluate - those which integrate or solve numerically, or search
+tables.
+
+A cache can be applied to any function with :obj:`memoize`, or to all of
+:obj:`CACHED_FUNCTIONS` at once with :obj:`install`, which replaces them in
+`ht` and in every ht submodule which refers to them:
+
+>>> import ht, ht.caching
+>>> ht.caching.install(maxsize=256, digits=10)
+>>> NTU = ht.NTU_from_P_G(P1=.573, R1=1/3., Ntp=2)
+>>> NTU = ht.NTU_from_P_G(P1=.573, R1=1/3., Ntp=2)
+>>> ht.caching.stats()['NTU_from_P_G']
+{'hits': 1, 'misses': 1, 'size': 1, 'maxsize': 256}
+>>> ht.caching.uninstall()
+
+If `digits` is given, float arguments are rounded to that many significant
+digits to form the key, so calls with nearly identical arguments share the
+result of the first of them. Arguments which cannot be hashed, such as
+arrays, are never cached.
+
+:obj:`disable` switches off every cache in the process and empties them;
+:obj:`clear` empties them while leaving them on. Note that a solve answered
+from a cache is not reported to the callbacks of :obj:`ht.diagnostics`.
+'''
+
+CACHED_FUNCTIONS = ['effectiveness_from_NTU', 'NTU_from_effectiveness',
+                    'temperature_effectiveness_basic', 'NTU_from_P_basic',
+                    'NTU_from_P_E', 'NTU_from_P_G', 'NTU_from_P_H',
+                    'NTU_from_P_J', 'NTU_from_P_plate', 'Thome',
+                    'Ntubes_Phadkeb', 'DBundle_for_Ntubes_Phadkeb',
+                    'nearest_material']
+
+_caches = weakref.WeakSet()
+_installed = {}
+_enabled = [True]
+_lock = threading.Lock()
+
+
+class _LRUCache(object):
+    __slots__ = ('name', 'maxsize', 'digits', 'data', 'hits', 'misses',
+                 'lock', '__weakref__')
+
+    def __init__(self, name, maxsize, digits):
+        self.name = name
+        self.maxsize = maxsize
+        self.digits = digits
+        self.data = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+        self.lock = threading.Lock()
+
+    def key(self, args, kwargs):
+        digits = self.digits
+        if digits is not None:
+            args = tuple(_quantize(v, digits) for v in args)
+            kwargs = dict((k, _quantize(v, digits)) for k, v in kwargs.items())
+        if kwargs:
+            return args + (_kwd_mark,) + tuple(sorted(kwargs.items()))
+        return args
+
+    def clear(self):
+        with self.lock:
+            self.data.clear()
+            self.hits = self.misses = 0
+
+
+_kwd_mark = object()
+
+
+def _quantize(value, digits):
+    if type(value) is float:
+        return float('%.*g' %(digits, value))
+    return value
+
+
+def memoize(func=None, maxsize=1024, digits=None, name=None):
+    r'''Wraps a function with a bounded least-recently-used cache of its
+    results. May be used as a decorator, with or without arguments.
+
+    Parameters
+    ----------
+    func : callable
+        Pure function to cache the results of, [-]
+    maxsize : int, optional
+        Maximum number of results kept; the least recently used result is
+        dropped when it is exceeded, [-]
+    digits : int, optional
+        If given, float arguments are rounded to this many significant digits
+        to form the key of the cache, [-]
+    name : str, optional
+        Name the cache is reported under by :obj:`stats`; defaults to the
+        name of the function, [-]
+
+    Returns
+    -------
+    wrapper : callable
+        Function with the cache; it has the methods `cache_info` and
+        `cache_clear`, [-]
+
+    Examples
+    --------
+    >>> from ht import Ntubes_Phadkeb
+    >>> Ntubes = memoize(Ntubes_Phadkeb, maxsize=16)
+    >>> Ntubes(DBundle=1.200-.008*2, Do=.028, pitch=.036, Ntp=2, angle=45.)
+    782
+    >>> Ntubes.cache_info()
+    {'hits': 0, 'misses': 1, 'size': 1, 'maxsize': 16}
+    '''
+    if func is None:
+        return lambda func: memoize(func, maxsize=maxsize, digits=digits,
+                                    name=name)
+    if maxsize < 1:
+        raise ValueError('maxsize must be at least 1')
+    cache = _LRUCache(name or func.__name__, maxsize, digits)
+    data = cache.data
+
+    @functools.wraps(func)
+    def wrapper(*args, **kwargs):
+        if not _enabled[0]:
+            return func(*args, **kwargs)
+        try:
+            key = cache.key(args, kwargs)
+            hash(key)
+        except TypeError:
+            return func(*args, **kwargs)
+        with cache.lock:
+            try:
+                result = data[key]
+            except KeyError:
+                cache.misses += 1
+            else:
+                cache.hits += 1
+                # Move to the most recently used end
+                del data[key]
+                data[key] = result
+                return result
+        result = func(*args, **kwargs)
+        with cache.lock:
+            data[key] = result
+            while len(data) > cache.maxsize:
+                data.popitem(last=False)
+        return result
+
+    wrapper.cache_info = lambda: _info(cache)
+    wrapper.cache_clear = cache.clear
+    wrapper._cache = cache
+    _caches.add(cache)
+    return wrapper
+
+
+def _info(cache):
+    with cache.lock:
+        return {'hits': cache.hits, 'misses': cache.misses,
+                'size': len(cache.data), 'maxsize': cache.maxsize}
+
+
+def install(functions=None, maxsize=1024, digits=None):
+    r'''Applies a cache to each of the named functions of ht, replacing it in
+    `ht` and in every ht submodule which refers to it. Functions already
+    cached are left as they are.
+
+    Parameters
+    ----------
+    functions : list[str], optional
+        Names of the functions in `ht` to cache; defaults to
+        :obj:`CACHED_FUNCTIONS`, [-]
+    maxsize : int, optional
+        Maximum number of results kept per function, [-]
+    digits : int, optional
+        If given, float arguments are rounded to this many significant digits
+        to form the keys of the caches, [-]
+    '''
+    if functions is None:
+        functions = CACHED_FUNCTIONS
+    mapping = {}
+    with _lock:
+        for name in functions:
+            if name in _installed:
+                continue
+            func = getattr(ht, name)
+            if not isinstance(func, types.FunctionType):
+                raise ValueError('%s is not a function of ht' %(name))
+            wrapper = memoize(func, maxsize=maxsize, digits=digits)
+            _installed[name] = (func, wrapper)
+            mapping[func] = wrapper
+        _replace(mapping)
+
+
+def uninstall():
+    '''Removes the caches applied by :obj:`install`, restoring the original
+    functions.
+    '''
+    with _lock:
+        mapping = dict((wrapper, func) for func, wrapper in _installed.values())
+        _installed.clear()
+        _replace(mapping)
+
+
+def enable():
+    '''Switches on every cache in the process; they are on by default.'''
+    _enabled[0] = True
+
+
+def disable():
+    '''Switches off every cache in the process, so the wrapped functions are
+    called directly, and empties them.
+    '''
+    _enabled[0] = False
+    clear()
+
+
+def is_enabled():
+    return _enabled[0]
+
+
+def clear():
+    '''Empties every cache in the process and resets their statistics.'''
+    for cache in list(_caches):
+        cache.clear()
+
+
+def stats():
+    '''Returns the statistics of every cache in the process, as a dict of
+    dicts keyed by the cache's name with the keys 'hits', 'misses', 'size'
+    and 'maxsize'. Caches with the same name are summed.
+    '''
+    ans = {}
+    for cache in list(_caches):
+        info = _info(cache)
+        if cache.name in ans:
+            previous = ans[cache.name]
+            for k in info:
+                info[k] += previous[k]
+        ans[cache.name] = info
+    return ans
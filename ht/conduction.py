@@ -23,6 +23,9 @@ SOFTWARE.'''
 from __future__ import division
 from math import log, pi, acosh, cosh
 from scipy.constants import inch, foot, hour, Btu, degree_Fahrenheit
+import numpy as np
+from scipy.sparse import csr_matrix
+from scipy.sparse.linalg import splu
 
 
 __all__ = ['R_to_k', 'k_to_R', 'k_to_thermal_resistivity',
@@ -30,7 +33,7 @@ __all__ = ['R_to_k', 'k_to_R', 'k_to_thermal_resistivity',
 'S_isothermal_sphere_to_plane', 'S_isothermal_pipe_to_plane',
 'S_isothermal_pipe_normal_to_plane',
 'S_isothermal_pipe_to_isothermal_pipe', 'S_isothermal_pipe_to_two_planes',
-'S_isothermal_pipe_eccentric_to_isothermal_pipe']
+'S_isothermal_pipe_eccentric_to_isothermal_pipe', 'ThermalNetwork']
 
 
 def R_to_k(R, t, A=1.):
@@ -585,3 +588,207 @@ def S_isothermal_pipe_eccentric_to_isothermal_pipe(D1, D2, Z, L=1.):
        Wiley, 2011.
     '''
     return 2.*pi*L/acosh((D2**2 + D1**2 - 4.*Z**2)/(2.*D1*D2))
+
+
+### Networks of resistances
+
+class ThermalNetwork(object):
+    r'''Steady-state network of thermal resistances between nodes, such as
+    the pipes of a buried bundle or a district heating trench, the ground
+    surface and the far field. Some nodes have a fixed temperature; the
+    temperatures of the others are solved for, along with the heat flow
+    through each resistance.
+
+    Each resistance `R` between nodes `i` and `j` contributes a conductance
+    :math:`G = 1/R` to a sparse conductance matrix :math:`K`, so that for the
+    nodes of unknown temperature:
+
+    .. math::
+        \sum_j G_{ij}(T_i - T_j) = Q_i
+
+    where :math:`Q_i` is the heat added to node `i`. Resistances are
+    typically calculated from shape factors, as :math:`R = 1/(Sk)`, or with
+    :obj:`R_cylinder` for pipe walls and insulation.
+
+    The matrix is assembled once, on the first solve after nodes or
+    resistances are added. Changing the value of a resistance
+    (:obj:`set_resistance`), a fixed temperature or a heat input only
+    updates the affected entries before the next solve.
+
+    Examples
+    --------
+    Two pipes 1 m deep and 0.5 m apart, in soil of k = 1.5 W/m/K; the first
+    is at 80 degrees Celsius and the second neither gains nor loses heat; per
+    meter of length:
+
+    >>> net = ThermalNetwork()
+    >>> net.add_node('ground', T=283.15)
+    >>> net.add_node('supply', T=353.15)
+    >>> net.add_node('return')
+    >>> k = 1.5
+    >>> a = net.add_resistance('supply', 'ground', 1/(k*S_isothermal_pipe_to_plane(D=0.2, Z=1.)))
+    >>> b = net.add_resistance('return', 'ground', 1/(k*S_isothermal_pipe_to_plane(D=0.2, Z=1.)))
+    >>> c = net.add_resistance('supply', 'return', 1/(k*S_isothermal_pipe_to_isothermal_pipe(D1=0.2, D2=0.2, W=0.5)))
+    >>> net.solve()['return']
+    317.348092009...
+    >>> net.heat_flow(a)
+    220.409401895...
+    '''
+    def __init__(self):
+        self.nodes = []
+        self.index = {}
+        self.T_fixed = []
+        self.Q = []
+        self.elements = []
+        self.G = []
+        self._assembled = False
+        self._factor = None
+
+    def add_node(self, name, T=None, Q=0.0):
+        '''Adds a node, of fixed temperature `T` [K] if given, and to which
+        heat `Q` [W] is added (only used if its temperature is not fixed).
+        '''
+        if name in self.index:
+            raise ValueError('Node %r already exists' %(name,))
+        self.index[name] = len(self.nodes)
+        self.nodes.append(name)
+        self.T_fixed.append(np.nan if T is None else float(T))
+        self.Q.append(float(Q))
+        self._assembled = False
+
+    def add_resistance(self, node1, node2, R):
+        '''Adds a thermal resistance `R` [K/W] between two nodes, and returns
+        the index of the new element.'''
+        return self.add_conductance(node1, node2, 1.0/R)
+
+    def add_conductance(self, node1, node2, G):
+        '''Adds a thermal conductance `G` [W/K] between two nodes, and returns
+        the index of the new element.'''
+        i, j = self.index[node1], self.index[node2]
+        if i == j:
+            raise ValueError('An element must connect two different nodes')
+        self.elements.append((i, j))
+        self.G.append(float(G))
+        self._assembled = False
+        return len(self.elements) - 1
+
+    def set_resistance(self, element, R):
+        '''Changes the resistance [K/W] of an element.'''
+        self.set_conductance(element, 1.0/R)
+
+    def set_conductance(self, element, G):
+        '''Changes the conductance [W/K] of an element.'''
+        G = float(G)
+        if self._assembled:
+            dG = G - self.G[element]
+            A_pos, A_sign, B_pos, B_sign = self._positions[element]
+            self._A.data[A_pos] += A_sign*dG
+            self._B.data[B_pos] += B_sign*dG
+            self._factor = None
+        self.G[element] = G
+
+    def set_temperature(self, node, T):
+        '''Changes the temperature [K] of a node of fixed temperature.'''
+        i = self.index[node]
+        if np.isnan(self.T_fixed[i]):
+            raise ValueError('Node %r does not have a fixed temperature' %(node,))
+        self.T_fixed[i] = float(T)
+
+    def set_heat(self, node, Q):
+        '''Changes the heat [W] added to a node.'''
+        self.Q[self.index[node]] = float(Q)
+
+    def _assemble(self):
+        T_fixed = np.array(self.T_fixed)
+        fixed = ~np.isnan(T_fixed)
+        # Position of each node among the unknown or among the fixed nodes
+        position = np.empty(len(self.nodes), dtype=np.int64)
+        position[~fixed] = np.arange(int((~fixed).sum()))
+        position[fixed] = np.arange(int(fixed.sum()))
+        n_u, n_f = int((~fixed).sum()), int(fixed.sum())
+
+        # Entries (row, column, element, sign) of the matrix of unknown nodes
+        # A and of the coupling to the fixed nodes B
+        A_entries, B_entries = [], []
+        for e, (i, j) in enumerate(self.elements):
+            for a, b in ((i, j), (j, i)):
+                if fixed[a]:
+                    continue
+                A_entries.append((position[a], position[a], e, 1.0))
+                if fixed[b]:
+                    B_entries.append((position[a], position[b], e, -1.0))
+                else:
+                    A_entries.append((position[a], position[b], e, -1.0))
+
+        def build(entries, shape):
+            entries = np.array(entries, dtype=np.float64).reshape(-1, 4)
+            rows = entries[:, 0].astype(np.int64)
+            cols = entries[:, 1].astype(np.int64)
+            elements = entries[:, 2].astype(np.int64)
+            signs = entries[:, 3]
+            keys, pos = np.unique(rows*shape[1] + cols, return_inverse=True)
+            data = np.bincount(pos, weights=signs*np.array(self.G)[elements],
+                               minlength=keys.size)
+            indptr = np.concatenate(([0], np.cumsum(np.bincount(keys//shape[1],
+                                                                minlength=shape[0]))))
+            matrix = csr_matrix((data, keys % shape[1], indptr), shape=shape)
+            return matrix, elements, pos, signs
+
+        def by_element(elements, pos, signs):
+            # Entries of each element, grouped in one sort
+            order = np.argsort(elements, kind='stable')
+            bounds = np.searchsorted(elements[order],
+                                     np.arange(len(self.elements) + 1))
+            pos, signs = pos[order], signs[order]
+            return [(pos[start:end], signs[start:end]) for start, end
+                    in zip(bounds[:-1].tolist(), bounds[1:].tolist())]
+
+        self._A, A_el, A_pos, A_sign = build(A_entries, (n_u, n_u))
+        self._B, B_el, B_pos, B_sign = build(B_entries, (n_u, max(n_f, 1)))
+        self._positions = [a + b for a, b in
+                           zip(by_element(A_el, A_pos, A_sign),
+                               by_element(B_el, B_pos, B_sign))]
+        self._fixed = fixed
+        self._assembled = True
+        self._factor = None
+
+    def solve(self):
+        '''Solves for the temperatures of the nodes without a fixed
+        temperature.
+
+        Returns
+        -------
+        T : dict
+            Temperatures of all nodes, keyed by node name, [K]
+        '''
+        if not self._assembled:
+            self._assemble()
+        fixed = self._fixed
+        T = np.array(self.T_fixed)
+        if (~fixed).any():
+            if self._factor is None:
+                try:
+                    self._factor = splu(self._A.tocsc())
+                except RuntimeError:
+                    raise ValueError('Every node must be connected to a node '
+                                     'of fixed temperature')
+            rhs = np.array(self.Q)[~fixed]
+            if fixed.any():
+                rhs -= self._B.dot(T[fixed])
+            T[~fixed] = self._factor.solve(rhs)
+        self.T = T
+        return dict(zip(self.nodes, T.tolist()))
+
+    def heat_flow(self, element):
+        '''Returns the heat flow [W] through an element from its first node
+        to its second, as of the last solve.'''
+        i, j = self.elements[element]
+        return self.G[element]*(self.T[i] - self.T[j])
+
+    def heat_flows(self):
+        '''Returns the heat flows [W] through all elements from their first
+        node to their second, as of the last solve, as an array.'''
+        if not self.elements:
+            return np.zeros(0)
+        i, j = np.array(self.elements).T
+        return np.array(self.G)*(self.T[i] - self.T[j])
@@ -23,6 +23,8 @@ SOFTWARE.'''
 from __future__ import division
 from math import exp, log
 import numpy as np
+from scipy.constants import g, sigma
+from ht.kernels import array_kernel
 
 __all__ = ['Nu_vertical_plate_Churchill',
            'Nu_sphere_Churchill', 'Nu_vertical_cylinder_Griffiths_Davis_Morgan',
@@ -39,7 +41,8 @@ __all__ = ['Nu_vertical_plate_Churchill',
            'Nu_horizontal_cylinder_Churchill_Chu',
            'Nu_horizontal_cylinder_Kuehn_Goldstein',
            'Nu_horizontal_cylinder_Morgan',
-           'Nu_horizontal_cylinder', 'Nu_vertical_helical_coil_Ali']
+           'Nu_horizontal_cylinder', 'Nu_vertical_helical_coil_Ali',
+           'Ts_free_convection_radiation']
 
 
 def Nu_vertical_plate_Churchill(Pr, Gr):
@@ -771,6 +774,22 @@ vertical_cylinder_correlations = {
 }
 
 
+def _vertical_cylinder_methods(geometry):
+    # Correlations in order of preference; those needing L and D only if
+    # `geometry` is True
+    methods = []
+    for key, values in vertical_cylinder_correlations.items():
+        if values[4] or geometry:
+            methods.append(key)
+    if 'Popiel & Churchill' in methods:
+        methods.remove('Popiel & Churchill')
+        methods.insert(0, 'Popiel & Churchill')
+    elif 'McAdams, Weiss & Saunders' in methods:
+        methods.remove('McAdams, Weiss & Saunders')
+        methods.insert(0, 'McAdams, Weiss & Saunders')
+    return methods
+
+
 def Nu_vertical_cylinder(Pr, Gr, L=None, D=None, Method=None,
                          AvailableMethods=False):
     r'''This function handles choosing which vertical cylinder free convection
@@ -814,17 +833,7 @@ def Nu_vertical_cylinder(Pr, Gr, L=None, D=None, Method=None,
         calculate Nu with the given inputs
     '''
     def list_methods():
-        methods = []
-        for key, values in vertical_cylinder_correlations.items():
-            if values[4] or all((L, D)):
-                methods.append(key)
-        if 'Popiel & Churchill' in methods:
-            methods.remove('Popiel & Churchill')
-            methods.insert(0, 'Popiel & Churchill')
-        elif 'McAdams, Weiss & Saunders' in methods:
-            methods.remove('McAdams, Weiss & Saunders')
-            methods.insert(0, 'McAdams, Weiss & Saunders')
-        return methods
+        return _vertical_cylinder_methods(all((L, D)))
 
     if AvailableMethods:
         return list_methods()
@@ -840,6 +849,60 @@ def Nu_vertical_cylinder(Pr, Gr, L=None, D=None, Method=None,
         raise Exception("Correlation name not recognized; see the "
                         "documentation for the available options.")
 
+def _Nu_vertical_cylinder_vectorized(Pr, Gr, L=None, D=None, Method=None,
+                                     AvailableMethods=False):
+    # Array version of Nu_vertical_cylinder. Without a Method, each element
+    # uses the first correlation in order of preference whose range covers
+    # its Rayleigh number (and which has L and D, if it needs them), so the
+    # laminar-only Popiel & Churchill correlation is not used above its
+    # transition Ra; McAdams, Weiss & Saunders is used instead, as for
+    # elements without L and D. Each correlation is evaluated once on the
+    # elements which selected it.
+    if AvailableMethods:
+        return _vertical_cylinder_methods(L is not None and D is not None)
+    if Method is not None and Method not in vertical_cylinder_correlations:
+        raise Exception("Correlation name not recognized; see the "
+                        "documentation for the available options.")
+    if L is None or D is None:
+        L = D = np.nan
+    Pr, Gr, L, D = np.broadcast_arrays(*[np.asarray(v, dtype=np.float64)
+                                         for v in (Pr, Gr, L, D)])
+    geometry = np.isfinite(L) & np.isfinite(D)
+    Ra = Pr*Gr
+    Nu = np.full(Pr.shape, np.nan)
+    todo = np.ones(Pr.shape, dtype=bool)
+    if Method:
+        methods = [Method]
+    else:
+        # Popiel & Churchill where it applies, otherwise as without L and D
+        methods = _vertical_cylinder_methods(False)
+        methods = (['Popiel & Churchill'] + methods
+                   + [m for m in _vertical_cylinder_methods(True)
+                      if m not in methods and m != 'Popiel & Churchill'])
+    for method in methods:
+        func, turbulent, laminar, Ra_transition, only_Pr_Gr = vertical_cylinder_correlations[method]
+        covered = todo.copy()
+        if not only_Pr_Gr:
+            covered &= geometry
+        if Ra_transition is not None and not Method:
+            if not turbulent:
+                covered &= Ra <= Ra_transition
+            if not laminar:
+                covered &= Ra > Ra_transition
+        if not covered.any():
+            continue
+        kernel = array_kernel(func)
+        if only_Pr_Gr:
+            Nu[covered] = kernel(Pr=Pr[covered], Gr=Gr[covered])
+        else:
+            Nu[covered] = kernel(Pr=Pr[covered], Gr=Gr[covered],
+                                 L=L[covered], D=D[covered])
+        todo &= ~covered
+        if not todo.any():
+            break
+    return Nu
+
+
 #import matplotlib.pyplot as plt
 #import numpy as np
 ##L, D = 1.5, 0.1
@@ -1090,6 +1153,22 @@ def Nu_horizontal_cylinder(Pr, Gr, Method=None, AvailableMethods=False):
                         "documentation for the available options.")
 
 
+def _Nu_horizontal_cylinder_vectorized(Pr, Gr, Method=None,
+                                       AvailableMethods=False):
+    # Array version of Nu_horizontal_cylinder; every correlation covers the
+    # whole range of Ra, so the preferred one is evaluated for all elements
+    if AvailableMethods:
+        return Nu_horizontal_cylinder(Pr=0.7, Gr=1E7, AvailableMethods=True)
+    if not Method:
+        Method = Nu_horizontal_cylinder(Pr=0.7, Gr=1E7, AvailableMethods=True)[0]
+    if Method not in horizontal_cylinder_correlations:
+        raise Exception("Correlation name not recognized; see the "
+                        "documentation for the available options.")
+    Pr, Gr = np.broadcast_arrays(np.asarray(Pr, dtype=np.float64),
+                                 np.asarray(Gr, dtype=np.float64))
+    return array_kernel(horizontal_cylinder_correlations[Method])(Pr=Pr, Gr=Gr)
+
+
 #import matplotlib.pyplot as plt
 #import numpy as np
 #Pr, Gr = 0.72, 1E8
@@ -1153,3 +1232,212 @@ def Nu_vertical_helical_coil_Ali(Pr, Gr):
        2006): 79-85.
     '''
     return 0.555*Gr**0.301*Pr**0.314
+
+
+def _dNu_dRa_vertical_plate_Churchill(Pr, Ra):
+    a = 0.387/(1 + (0.492/Pr)**(9/16.))**(8/27.)
+    return 2.0*(0.825 + a*Ra**(1/6.))*a/6.*Ra**(-5/6.)
+
+
+def _dNu_dRa_horizontal_cylinder_Churchill_Chu(Pr, Ra):
+    a = 0.387/(1.0 + (0.559/Pr)**(9/16.))**(8/27.)
+    return 2.0*(0.6 + a*Ra**(1/6.))*a/6.*Ra**(-5/6.)
+
+
+def _dNu_dRa_sphere_Churchill(Pr, Ra):
+    psi = 1 + (0.469/Pr)**(9/16.)
+    A = 0.589/psi**(4/9.)
+    B = 7.44E-8/psi**(16/9.)
+    x = 1 + B*Ra
+    return A*(0.25*Ra**-0.75*x**(1/12.) + Ra**0.25*B/12.*x**(-11/12.))
+
+
+_Nu_free_derivatives = {
+    Nu_vertical_plate_Churchill: _dNu_dRa_vertical_plate_Churchill,
+    Nu_horizontal_cylinder_Churchill_Chu: _dNu_dRa_horizontal_cylinder_Churchill_Chu,
+    Nu_sphere_Churchill: _dNu_dRa_sphere_Churchill}
+
+# geometry : (correlations, default correlation)
+_free_convection_surfaces = {
+    'vertical plate': ({'Churchill': Nu_vertical_plate_Churchill}, 'Churchill'),
+    'horizontal cylinder': (horizontal_cylinder_correlations, 'Churchill-Chu'),
+    'sphere': ({'Churchill': Nu_sphere_Churchill}, 'Churchill')}
+
+
+def Ts_free_convection_radiation(T_process, R, T_inf, L, k, nu, Pr,
+                                 emissivity=0.9, geometry='vertical plate',
+                                 T_surroundings=None, beta=None, Ts0=None,
+                                 Method=None, xtol=1E-9, maxiter=50):
+    r'''Solves for the outer surface temperatures of many surfaces losing
+    heat by free convection and radiation at once. The heat conducted to each
+    surface from a process at `T_process`, through a wall and insulation of
+    resistance `R`, equals the heat lost from it:
+
+    .. math::
+        \frac{T_{process} - T_s}{R} = h(T_s)(T_s - T_\infty)
+        + \epsilon\sigma(T_s^4 - T_{sur}^4)
+
+    .. math::
+        h = \frac{k}{L} Nu(Pr, Gr), \quad Gr = \frac{g\beta|T_s - T_\infty|
+        L^3}{\nu^2}
+
+    All inputs may be arrays, which are broadcast together; each surface is
+    solved with Newton's method, using the analytical derivative of the
+    Nusselt number correlation where it is implemented (the Churchill
+    correlations) and a finite difference otherwise. Each step is kept within
+    a bracket of the solution, which is narrowed every iteration, so every
+    surface converges.
+
+    Parameters
+    ----------
+    T_process : float or array
+        Temperature of the process inside the surface, [K]
+    R : float or array
+        Thermal resistance between the process and the surface, per unit
+        area of the surface, [m^2*K/W]
+    T_inf : float or array
+        Temperature of the surrounding fluid, [K]
+    L : float or array
+        Characteristic length - height of a vertical plate, or diameter of a
+        horizontal cylinder or sphere, [m]
+    k : float or array
+        Thermal conductivity of the surrounding fluid, [W/m/K]
+    nu : float or array
+        Kinematic viscosity of the surrounding fluid, [m^2/s]
+    Pr : float or array
+        Prandtl number of the surrounding fluid, [-]
+    emissivity : float or array, optional
+        Emissivity of the surface, [-]
+    geometry : str, optional
+        One of 'vertical plate', 'horizontal cylinder' or 'sphere', [-]
+    T_surroundings : float or array, optional
+        Temperature of the surroundings the surface radiates to; defaults to
+        `T_inf`, [K]
+    beta : float or array, optional
+        Volumetric thermal expansion coefficient of the fluid; if not given,
+        that of an ideal gas at the film temperature, :math:`2/(T_s + T_\infty)`,
+        [1/K]
+    Ts0 : float or array, optional
+        Initial guesses of the surface temperatures, such as the solution of a
+        previous time step; defaults to halfway between `T_process` and
+        `T_inf`, [K]
+    Method : str, optional
+        Correlation to use for horizontal cylinders, as in
+        `horizontal_cylinder_correlations`; defaults to 'Churchill-Chu', [-]
+    xtol : float, optional
+        Change in the surface temperature below which a surface is converged,
+        [K]
+    maxiter : int, optional
+        Maximum number of iterations, [-]
+
+    Returns
+    -------
+    results : dict
+        Ts : Surface temperatures, [K];
+        q : Heat flux lost from each surface, [W/m^2];
+        h : Free convection heat transfer coefficients, [W/m^2/K];
+        q_rad : Radiant heat fluxes, [W/m^2];
+        converged : Whether each surface converged, [-];
+        iterations : Number of iterations each surface took, [-]
+
+    Notes
+    -----
+    Fluid properties are taken as constant; to evaluate them at the film
+    temperature, call this again with updated properties, starting from the
+    previous `Ts`.
+
+    Examples
+    --------
+    >>> res = Ts_free_convection_radiation(T_process=[400., 500.], R=0.1,
+    ... T_inf=300., L=2., k=0.028, nu=1.7E-5, Pr=0.7)
+    >>> res['Ts']
+    array([345.98351891, 383.32557457])
+    >>> res['converged']
+    array([ True,  True])
+    '''
+    try:
+        correlations, default = _free_convection_surfaces[geometry]
+    except KeyError:
+        raise ValueError("geometry must be one of 'vertical plate', "
+                         "'horizontal cylinder' or 'sphere'")
+    Method = Method or default
+    if Method not in correlations:
+        raise Exception("Correlation name not recognized; see the "
+                        "documentation for the available options.")
+    correlation = correlations[Method]
+    Nu_func = array_kernel(correlation)
+    dNu_dRa = _Nu_free_derivatives.get(correlation)
+    if T_surroundings is None:
+        T_surroundings = T_inf
+    arrays = np.broadcast_arrays(*[np.asarray(v, dtype=np.float64) for v in
+            (T_process, R, T_inf, L, k, nu, Pr, emissivity, T_surroundings,
+             np.nan if beta is None else beta, np.nan if Ts0 is None else Ts0)])
+    T_process, R, T_inf, L, k, nu, Pr, emissivity, T_sur, beta, Ts = [a.ravel().copy() for a in arrays]
+    shape = arrays[0].shape
+    ideal_gas = np.isnan(beta)
+
+    # The residual falls monotonically with Ts, so the solution lies between
+    # the lowest and highest of the temperatures
+    low = np.minimum(np.minimum(T_process, T_inf), T_sur)
+    high = np.maximum(np.maximum(T_process, T_inf), T_sur)
+    guess = np.isnan(Ts)
+    Ts[guess] = 0.5*(T_process[guess] + T_inf[guess])
+    Ts = np.clip(Ts, low, high)
+
+    def heat_loss(i, Ts):
+        dT = Ts - T_inf[i]
+        b = np.where(ideal_gas[i], 2.0/(Ts + T_inf[i]), beta[i])
+        coeff = Pr[i]*g*L[i]**3/nu[i]**2
+        Ra = coeff*b*np.abs(dT)
+        Nu = Nu_func(Pr=Pr[i], Gr=Ra/Pr[i])
+        h = Nu*k[i]/L[i]
+        q_rad = emissivity[i]*sigma*(Ts**4 - T_sur[i]**4)
+        f = (T_process[i] - Ts)/R[i] - h*dT - q_rad
+        # Derivative of the residual
+        if dNu_dRa is not None:
+            dNu = dNu_dRa(Pr[i], Ra)
+        else:
+            step = 1E-6*Ra + 1E-12
+            dNu = (Nu_func(Pr=Pr[i], Gr=(Ra + step)/Pr[i]) - Nu)/step
+        db = np.where(ideal_gas[i], -0.5*b*b, 0.0)
+        dRa = coeff*(b*np.sign(dT) + np.abs(dT)*db)
+        dh = k[i]/L[i]*dNu*dRa
+        df = -1.0/R[i] - dh*dT - h - 4.0*emissivity[i]*sigma*Ts**3
+        return f, df, h, q_rad
+
+    N = Ts.size
+    converged = np.zeros(N, dtype=bool)
+    iterations = np.zeros(N, dtype=np.int64)
+    # No resistance - the surface is at the process temperature
+    direct = R <= 0.0
+    Ts[direct] = T_process[direct]
+    converged[direct] = True
+    active = np.flatnonzero(~converged)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        for _ in range(maxiter):
+            if not active.size:
+                break
+            x = Ts[active]
+            f, df, _, _ = heat_loss(active, x)
+            lo, hi = low[active], high[active]
+            lo = np.where(f > 0.0, x, lo)
+            hi = np.where(f < 0.0, x, hi)
+            step = f/df
+            x_new = x - step
+            done = (np.abs(step) <= xtol) | (f == 0.0) | (hi - lo <= xtol)
+            # Bisect where Newton's method would leave the bracket
+            bad = ~done & ~((x_new > lo) & (x_new < hi))
+            x_new[bad] = 0.5*(lo[bad] + hi[bad])
+            low[active], high[active] = lo, hi
+            Ts[active] = x_new
+            iterations[active] += 1
+            converged[active[done]] = True
+            active = active[~done]
+
+        f, df, h, q_rad = heat_loss(np.arange(N), Ts)
+    q_rad = emissivity*sigma*(Ts**4 - T_sur**4)
+    q = h*(Ts - T_inf) + q_rad
+    return {'Ts': Ts.reshape(shape), 'q': q.reshape(shape),
+            'h': h.reshape(shape), 'q_rad': q_rad.reshape(shape),
+            'converged': converged.reshape(shape),
+            'iterations': iterations.reshape(shape)}
@@ -22,10 +22,13 @@ SOFTWARE.'''
 
 from __future__ import division
 from math import pi, log
+import numpy as np
 from scipy.constants import g
-from fluids.friction import friction_factor
+from fluids.friction import friction_factor, LAMINAR_TRANSITION_PIPE
+from ht.kernels import array_kernel
 
-__all__ =['Lehrer', 'Stein_Schmidt']
+__all__ =['Lehrer', 'Stein_Schmidt', 'Stein_Schmidt_friction_factor',
+          'jacket_transient']
 
 def Lehrer(m, Dtank, Djacket, H, Dinlet, rho, Cp, k, mu, muw=None,
            isobaric_expansion=None, dT=None, inlettype='tangential',
@@ -98,6 +101,11 @@ def Lehrer(m, Dtank, Djacket, H, Dinlet, rho, Cp, k, mu, muw=None,
     from the top, it would be subtracted. The situation is reversed if entry
     is from the top.
 
+    For tangential inlets, the velocity in the jacket depends on the friction
+    factor, which is solved for by direct iteration. By default 5 iterations
+    are performed, which is not converged at low flows; for the converged
+    friction factor, see :obj:`Stein_Schmidt_friction_factor`.
+
     Examples
     --------
     Example as in [2]_, matches completely.
@@ -151,7 +159,8 @@ def Lehrer(m, Dtank, Djacket, H, Dinlet, rho, Cp, k, mu, muw=None,
 
 def Stein_Schmidt(m, Dtank, Djacket, H, Dinlet,
                   rho, Cp, k, mu, muw=None, rhow=None,
-                  inlettype='tangential', inletlocation='auto', roughness=0):
+                  inlettype='tangential', inletlocation='auto', roughness=0,
+                  fd=None, xtol=None, maxiter=5):
     r'''Calculates average heat transfer coefficient for a jacket around a
     vessel according to [1]_ as described in [2]_.
 
@@ -221,7 +230,7 @@ def Stein_Schmidt(m, Dtank, Djacket, H, Dinlet,
     Parameters
     ----------
     m : float
-        Mass flow rate of fluid, [kg/m^3]
+        Mass flow rate of fluid, [kg/s]
     Dtank : float
         Outer diameter of tank or vessel surrounded by jacket, [m]
     Djacket : float
@@ -248,6 +257,16 @@ def Stein_Schmidt(m, Dtank, Djacket, H, Dinlet,
         Either 'top' or 'bottom' or 'auto'
     roughness : float, optional
         Roughness of the tank walls [m]
+    fd : float, optional
+        Initial guess of the Darcy friction factor in the jacket, for
+        tangential inlets; defaults to that at Re = 1E5 [-]
+    xtol : float, optional
+        Relative change in the friction factor at which its iteration is
+        stopped, for tangential inlets; if not given, `maxiter` iterations
+        are always performed [-]
+    maxiter : int, optional
+        Maximum number of iterations of the friction factor, for tangential
+        inlets [-]
 
     Returns
     -------
@@ -264,6 +283,11 @@ def Stein_Schmidt(m, Dtank, Djacket, H, Dinlet,
     from the top, it would be subtracted. The situation is reversed if entry
     is from the top.
 
+    For tangential inlets, the velocity in the jacket depends on the friction
+    factor, which is solved for by direct iteration. By default 5 iterations
+    are performed, which is not converged at low flows; for the converged
+    friction factor, see :obj:`Stein_Schmidt_friction_factor`.
+
     Examples
     --------
     Example as in [2]_, matches in all but friction factor:
@@ -293,17 +317,19 @@ def Stein_Schmidt(m, Dtank, Djacket, H, Dinlet,
         vch = vMit*log(bMit/bEin)/(1 - bEin/bMit)
         ReJ = vch*dch*rho/mu
     elif inlettype == 'tangential':
-        f = friction_factor(1E5, roughness/dch)
-        for run in range(5):
-            vinlet = Q/(pi/4*Dinlet**2)
-            vz = Q/(pi*Dtank*delta)
+        f = friction_factor(1E5, roughness/dch) if fd is None else fd
+        vinlet = Q/(pi/4*Dinlet**2)
+        vz = Q/(pi*Dtank*delta)
+        for run in range(maxiter):
             K4 = Dinlet**2*vinlet**2/(2*f*Dtank*H)
             K3 = vinlet/4. - Dinlet**2*vinlet/(4*f*Dtank*H)
             vx0 = K3 + (K3**2 + K4)**0.5
             vx = vinlet*log(1 + f*Dtank*H/Dinlet**2*vx0/vinlet)/(f*Dtank*H/Dinlet**2)
             vch = (vx**2 + vz**2)**0.5
             ReJ = vch*dch*rho/mu
-            f = friction_factor(ReJ, roughness/dch)
+            f_old, f = f, friction_factor(ReJ, roughness/dch)
+            if xtol is not None and abs(f - f_old) <= xtol*f:
+                break
     if inletlocation and rhow:
         GrJ = g*rho*(rho-rhow)*dch**3/mu**2
         if rhow < rho: # Heating jacket fluid
@@ -330,3 +356,396 @@ def Stein_Schmidt(m, Dtank, Djacket, H, Dinlet,
     else:
         NuJ = (NuA**3 + NuB**3 + NuC**3 + NuD**3)**(1/3.)
     return NuJ*k/dch
+
+
+_Lehrer_vectorized = array_kernel(Lehrer)
+
+
+def _friction_factor_vectorized(Re, eD):
+    # Darcy friction factor as fluids.friction_factor's default - laminar,
+    # or Clamond's solution of Colebrook
+    Re = np.asarray(Re, dtype=np.float64)
+    X1 = eD*Re*0.1239681863354175460160858261654858382699
+    X2 = np.log(Re) - 0.7793974884556819406441139701653776731705
+    F = X2 - 0.2
+    X1F = X1 + F
+    X1F1 = 1. + X1F
+    E = (np.log(X1F) - 0.2)/X1F1
+    F = F - (X1F1 + 0.5*E)*E*X1F/(X1F1 + E*(1. + 1.0/3.0*E))
+    X1F = X1 + F
+    X1F1 = 1. + X1F
+    E = (np.log(X1F) + F - X2)/X1F1
+    F = F - (X1F1 + 0.5*E)*E*X1F/(X1F1 + E*(1. + 1.0/3.0*E))
+    turbulent = 1.325474527619599502640416597148504422899/(F*F)
+    return np.where(Re < LAMINAR_TRANSITION_PIPE, 64./Re, turbulent)
+
+
+def _Stein_Schmidt_tangential(m, Dtank, H, Dinlet, delta, rho, mu, eD,
+                              fd=None, xtol=None, maxiter=5):
+    # Solves for the friction factor and Reynolds number in the jacket with a
+    # tangential inlet, for 1d arrays. Without `xtol`, `maxiter` direct
+    # iterations are made as in Stein_Schmidt; otherwise Steffensen's method
+    # is applied to the elements which have not yet converged.
+    N = m.size
+    dch = 2*delta
+    Q = m/rho
+    vinlet = Q/(pi/4*Dinlet**2)
+    vz = Q/(pi*Dtank*delta)
+    c = Dtank*H/Dinlet**2
+
+    def iterate(i, f):
+        fc = f*c[i]
+        K4 = vinlet[i]**2/(2*fc)
+        K3 = vinlet[i]/4. - vinlet[i]/(4*fc)
+        vx0 = K3 + (K3**2 + K4)**0.5
+        vx = vinlet[i]*np.log(1 + fc*vx0/vinlet[i])/fc
+        ReJ = (vx**2 + vz[i]**2)**0.5*dch[i]*rho[i]/mu[i]
+        return ReJ, _friction_factor_vectorized(ReJ, eD[i])
+
+    if fd is None:
+        f = _friction_factor_vectorized(np.full(N, 1E5), eD)
+    else:
+        f = np.array(np.broadcast_to(fd, (N,)), dtype=np.float64)
+    everything = np.arange(N)
+    converged = np.zeros(N, dtype=bool)
+    iterations = np.zeros(N, dtype=np.int64)
+    if xtol is None:
+        for run in range(maxiter):
+            ReJ, f = iterate(everything, f)
+        iterations[:] = maxiter
+        return ReJ, f, converged, iterations
+
+    active = everything
+    for run in range(maxiter):
+        if not active.size:
+            break
+        x0 = f[active]
+        x1 = iterate(active, x0)[1]
+        x2 = iterate(active, x1)[1]
+        denominator = x2 - 2.0*x1 + x0
+        x = x0 - (x1 - x0)**2/denominator
+        # Keep the direct iteration where the extrapolation is unusable
+        bad = ~(x > 0.0) | ~np.isfinite(x)
+        x[bad] = x2[bad]
+        f[active] = x
+        iterations[active] += 1
+        done = np.abs(x - x0) <= xtol*x
+        converged[active[done]] = True
+        active = active[~done & np.isfinite(x)]
+    ReJ, f = iterate(everything, f)
+    return ReJ, f, converged, iterations
+
+
+def _Stein_Schmidt_array(m, Dtank, Djacket, H, Dinlet, rho, Cp, k, mu,
+                         muw=None, rhow=None, inlettype='tangential',
+                         inletlocation='auto', roughness=0, fd=None,
+                         xtol=None, maxiter=5):
+    # Array version of Stein_Schmidt, which also returns the friction factor
+    # of the tangential inlet iteration; `fd` is the initial friction factor,
+    # such as the one returned for a previous, similar state
+    m, Dtank, Djacket, H, Dinlet, rho, Cp, k, mu = np.broadcast_arrays(
+        *[np.asarray(v, dtype=np.float64) for v in
+          (m, Dtank, Djacket, H, Dinlet, rho, Cp, k, mu)])
+    delta = (Djacket - Dtank)/2.
+    Q = m/rho
+    Pr = Cp*mu/k
+    lch = (pi**2/4*Dtank**2 + H**2)**0.5
+    dch = 2*delta
+    if inlettype == 'radial':
+        bEin = pi/8*Dinlet**2/delta
+        bMit = pi/2*Dtank*(1 + pi**2/4*Dtank**2/H**2)**0.5
+        vMit = Q/(2*delta*bMit)
+        vch = vMit*np.log(bMit/bEin)/(1 - bEin/bMit)
+        ReJ = vch*dch*rho/mu
+        f = np.full(m.shape, np.nan)
+    elif inlettype == 'tangential':
+        eD = np.broadcast_to(roughness/dch, m.shape)
+        ReJ, f = _Stein_Schmidt_tangential(
+            m.ravel(), Dtank.ravel(), H.ravel(), Dinlet.ravel(),
+            delta.ravel(), rho.ravel(), mu.ravel(), eD.ravel(),
+            None if fd is None else np.broadcast_to(fd, m.shape).ravel(),
+            xtol, maxiter)[:2]
+        ReJ, f = ReJ.reshape(m.shape), f.reshape(m.shape)
+    else:
+        raise ValueError("inlettype must be 'radial' or 'tangential'")
+    if inletlocation and rhow is not None:
+        GrJ = g*rho*(rho - rhow)*dch**3/mu**2
+        heating = rhow < rho
+        if inletlocation == 'auto':
+            sign = 1.0
+        elif inletlocation == 'bottom':
+            sign = np.where(heating, 1.0, -1.0)
+        else:
+            sign = np.where(heating, -1.0, 1.0)
+        ReJeq = (ReJ**2 + sign*GrJ*H/dch/50.)**0.5
+    else:
+        ReJeq = np.abs(ReJ)
+    NuA = 3.66
+    NuB = 1.62*Pr**(1/3.)*ReJeq**(1/3.)*(dch/lch)**(1/3.)
+    NuC = 0.664*Pr**(1/3.)*(ReJeq*dch/lch)**0.5
+    NuD = np.where(ReJeq < 2300, 0.0, 0.0115*Pr**(1/3.)*ReJeq**0.9
+                   *(1 - (2300./ReJeq)**2.5)*(1 + (dch/lch)**(2/3.)))
+    NuJ = (NuA**3 + NuB**3 + NuC**3 + NuD**3)**(1/3.)
+    if muw is not None:
+        NuJ = NuJ*(mu/muw)**0.14
+    return NuJ*k/dch, f
+
+
+def _Stein_Schmidt_vectorized(m, Dtank, Djacket, H, Dinlet, rho, Cp, k, mu,
+                              muw=None, rhow=None, inlettype='tangential',
+                              inletlocation='auto', roughness=0):
+    with np.errstate(invalid='ignore', divide='ignore'):
+        return _Stein_Schmidt_array(m, Dtank, Djacket, H, Dinlet, rho, Cp, k,
+                                    mu, muw, rhow, inlettype, inletlocation,
+                                    roughness)[0]
+
+
+def Stein_Schmidt_friction_factor(m, Dtank, Djacket, H, Dinlet, rho, mu,
+                                  roughness=0.0, fd=None, xtol=1E-12,
+                                  maxiter=50):
+    r'''Solves for the Darcy friction factor and Reynolds number of the flow
+    in a jacket around a vessel with a tangential inlet, as in
+    :obj:`Stein_Schmidt`, for arrays of inputs. The coupled velocity and
+    friction factor are iterated with Steffensen's method on each element
+    until the relative change in its friction factor is below `xtol`.
+
+    The converged friction factors can be passed back as `fd` when solving
+    for nearby conditions, or to :obj:`Stein_Schmidt`.
+
+    Parameters
+    ----------
+    m : float or array
+        Mass flow rate of fluid, [kg/s]
+    Dtank : float or array
+        Outer diameter of tank or vessel surrounded by jacket, [m]
+    Djacket : float or array
+        Inner diameter of jacket surrounding a vessel or tank, [m]
+    H : float or array
+        Height of the vessel or tank, [m]
+    Dinlet : float or array
+        Inner diameter of inlet into the jacket, [m]
+    rho : float or array
+        Density of the fluid at Tm [kg/m^3]
+    mu : float or array
+        Viscosity of fluid at Tm [Pa*s]
+    roughness : float or array, optional
+        Roughness of the tank walls [m]
+    fd : float or array, optional
+        Initial guesses of the friction factors; defaults to those at
+        Re = 1E5 [-]
+    xtol : float, optional
+        Relative change in the friction factor at which an element is
+        converged [-]
+    maxiter : int, optional
+        Maximum number of iterations [-]
+
+    Returns
+    -------
+    results : dict
+        fd : Darcy friction factors in the jacket, [-];
+        Re : Reynolds numbers in the jacket, [-];
+        converged : Whether each element converged, [-];
+        iterations : Number of iterations each element took, [-]
+
+    Notes
+    -----
+    The friction factor is discontinuous at the laminar-turbulent transition,
+    Re = 2040; close to it there may be no solution, in which case the
+    iteration stops at `maxiter` without converging.
+
+    Examples
+    --------
+    >>> res = Stein_Schmidt_friction_factor(m=[0.1, 2.5], Dtank=0.6,
+    ... Djacket=0.65, H=0.6, Dinlet=0.025, rho=995.7, mu=798E-6)
+    >>> res['fd']
+    array([0.05603312, 0.02054697])
+    >>> res['iterations']
+    array([5, 4])
+    '''
+    arrays = np.broadcast_arrays(*[np.asarray(v, dtype=np.float64) for v in
+            (m, Dtank, Djacket, H, Dinlet, rho, mu, roughness,
+             np.nan if fd is None else fd)])
+    shape = arrays[0].shape
+    m, Dtank, Djacket, H, Dinlet, rho, mu, roughness, fd = [a.ravel() for a in arrays]
+    delta = (Djacket - Dtank)/2.
+    fd = np.where(np.isnan(fd), _friction_factor_vectorized(
+            np.full(m.size, 1E5), roughness/(2*delta)), fd)
+    with np.errstate(invalid='ignore', divide='ignore'):
+        Re, fd, converged, iterations = _Stein_Schmidt_tangential(
+            m, Dtank, H, Dinlet, delta, rho, mu, roughness/(2*delta), fd,
+            xtol, maxiter)
+    return {'fd': fd.reshape(shape), 'Re': Re.reshape(shape),
+            'converged': converged.reshape(shape),
+            'iterations': iterations.reshape(shape)}
+
+
+def jacket_transient(t, T0, mass, Cp_contents, m, T_in, Dtank, Djacket, H,
+                     Dinlet, rho, Cp, k, mu, A=None, h_contents=None,
+                     R_wall=0.0, method='Lehrer', inlettype='tangential',
+                     inletlocation='auto', roughness=0.0,
+                     isobaric_expansion=None, xtol=1E-10, maxiter=50):
+    r"""Simulates the heating or cooling of the contents of many jacketed
+    vessels at once, each with a jacket fluid flowing at `m` and entering at
+    `T_in`. At each time step, the jacket-side heat transfer coefficient of
+    every vessel is calculated with :obj:`Lehrer` or :obj:`Stein_Schmidt`
+    (evaluated as array kernels across the vessels), and the temperature of
+    the well-mixed contents advanced assuming it constant over the step:
+
+    .. math::
+        \frac{1}{UA} = \frac{1}{h_{jacket}A} + \frac{R_{wall}}{A}
+        + \frac{1}{h_{contents}A}
+
+    .. math::
+        \epsilon = 1 - \exp\left(-\frac{UA}{\dot m C_p}\right)
+
+    .. math::
+        T_{n+1} = T_{in} - (T_{in} - T_n)\exp\left(-\frac{\epsilon \dot m C_p
+        \Delta t}{M C_{p,contents}}\right)
+
+    The jacket fluid properties may be given as functions of temperature, in
+    which case they are evaluated at the mean jacket fluid temperature of
+    the previous step, and the viscosity (and density, for
+    :obj:`Stein_Schmidt`) also at the wall temperature for the wall
+    corrections. For :obj:`Stein_Schmidt` with a tangential inlet, the
+    friction factor of each vessel is converged as in
+    :obj:`Stein_Schmidt_friction_factor`, starting from its value at the
+    previous step.
+
+    Parameters
+    ----------
+    t : array
+        Times of the trajectory, starting with the initial state, [s]
+    T0 : float or array
+        Initial temperatures of the vessel contents, [K]
+    mass : float or array
+        Masses of the vessel contents, [kg]
+    Cp_contents : float or array
+        Heat capacities of the vessel contents, [J/kg/K]
+    m : float or array
+        Mass flow rates of the jacket fluid, [kg/s]
+    T_in : float or array
+        Inlet temperatures of the jacket fluid, [K]
+    Dtank : float or array
+        Outer diameters of the vessels, [m]
+    Djacket : float or array
+        Inner diameters of the jackets, [m]
+    H : float or array
+        Heights of the jackets, [m]
+    Dinlet : float or array
+        Inner diameters of the jacket inlets, [m]
+    rho : float, array or callable
+        Density of the jacket fluid, [kg/m^3]
+    Cp : float, array or callable
+        Heat capacity of the jacket fluid, [J/kg/K]
+    k : float, array or callable
+        Thermal conductivity of the jacket fluid, [W/m/K]
+    mu : float, array or callable
+        Viscosity of the jacket fluid, [Pa*s]
+    A : float or array, optional
+        Heat transfer areas; defaults to the sides of the vessels,
+        :math:`\pi D_{tank} H`, [m^2]
+    h_contents : float or array, optional
+        Heat transfer coefficients on the side of the contents; if not
+        given, their resistance is neglected, [W/m^2/K]
+    R_wall : float or array, optional
+        Resistance of the vessel walls per unit area, [m^2*K/W]
+    method : str, optional
+        'Lehrer' or 'Stein_Schmidt', [-]
+    inlettype : str, optional
+        'tangential' or 'radial', [-]
+    inletlocation : str, optional
+        'auto', 'top' or 'bottom', [-]
+    roughness : float, optional
+        Roughness of the jacket, for :obj:`Stein_Schmidt`, [m]
+    isobaric_expansion : float or array, optional
+        Isobaric expansion coefficient of the jacket fluid, for the natural
+        convection term of :obj:`Lehrer` with a radial inlet, [1/K]
+    xtol : float, optional
+        Relative tolerance of the friction factor iteration of
+        :obj:`Stein_Schmidt` with a tangential inlet, [-]
+    maxiter : int, optional
+        Maximum number of iterations of the friction factor, [-]
+
+    Returns
+    -------
+    results : dict
+        T : Temperatures of the contents at each time, shape (len(t), N), [K];
+        T_out : Jacket fluid outlet temperatures over each step, [K];
+        Q : Heat transferred to the contents over each step, [W];
+        h : Jacket side heat transfer coefficients over each step,
+        [W/m^2/K]; the last three have shape (len(t) - 1, N)
+
+    Examples
+    --------
+    Two 3 m3 vessels of water heated by water entering at 80 degrees Celsius:
+
+    >>> res = jacket_transient(t=[0, 600, 1200], T0=293.15, mass=3000.,
+    ... Cp_contents=4180., m=[2.5, 5.], T_in=353.15, Dtank=1.6, Djacket=1.7,
+    ... H=1.5, Dinlet=0.05, rho=975., Cp=4190., k=0.66, mu=3.5E-4)
+    >>> res['T'][-1]
+    array([318.769..., 331.336...])
+    """
+    if method not in ('Lehrer', 'Stein_Schmidt'):
+        raise ValueError("method must be 'Lehrer' or 'Stein_Schmidt'")
+    t = np.asarray(t, dtype=np.float64)
+    properties = (rho, Cp, k, mu)
+    variable = [callable(p) for p in properties]
+    constants = [np.nan if c else p for c, p in zip(variable, properties)]
+    (T, mass, Cp_contents, m, T_in, Dtank, Djacket, H, Dinlet, rho_c, Cp_c,
+     k_c, mu_c) = [np.array(a) for a in np.broadcast_arrays(*[np.asarray(v, dtype=np.float64)
+            for v in [T0, mass, Cp_contents, m, T_in, Dtank, Djacket, H,
+                      Dinlet] + constants])]
+    if A is None:
+        A = pi*Dtank*H
+    R_contents = 0.0 if h_contents is None else 1.0/np.asarray(h_contents)
+
+    N = T.size
+    steps = t.size - 1
+    T_hist = np.empty((steps + 1, N))
+    T_hist[0] = T
+    T_out_hist = np.empty((steps, N))
+    Q_hist = np.empty((steps, N))
+    h_hist = np.empty((steps, N))
+    # Previous state - jacket fluid mean and wall temperatures, friction factor
+    T_jacket = T_in.copy()
+    T_wall = 0.5*(T_in + T)
+    fd = None
+    for i in range(steps):
+        dt = t[i+1] - t[i]
+        values = []
+        for prop, is_variable, value in zip(properties, variable,
+                                             (rho_c, Cp_c, k_c, mu_c)):
+            values.append(prop(T_jacket) if is_variable else value)
+        rho_i, Cp_i, k_i, mu_i = values
+        muw = mu(T_wall) if variable[3] else None
+        if method == 'Lehrer':
+            dT = None if isobaric_expansion is None else T_in - T
+            h = _Lehrer_vectorized(m=m, Dtank=Dtank, Djacket=Djacket, H=H,
+                                   Dinlet=Dinlet, rho=rho_i, Cp=Cp_i, k=k_i,
+                                   mu=mu_i, muw=muw,
+                                   isobaric_expansion=isobaric_expansion,
+                                   dT=dT, inlettype=inlettype,
+                                   inletlocation=inletlocation)
+        else:
+            rhow = rho(T_wall) if variable[0] else None
+            with np.errstate(invalid='ignore', divide='ignore'):
+                h, fd = _Stein_Schmidt_array(m, Dtank, Djacket, H, Dinlet, rho_i,
+                                             Cp_i, k_i, mu_i, muw=muw, rhow=rhow,
+                                             inlettype=inlettype,
+                                             inletlocation=inletlocation,
+                                             roughness=roughness, fd=fd,
+                                             xtol=xtol, maxiter=maxiter)
+        UA = A/(1.0/h + R_wall + R_contents)
+        C = m*Cp_i
+        effectiveness = 1.0 - np.exp(-UA/C)
+        Q = effectiveness*C*(T_in - T)
+        T_out = T_in - effectiveness*(T_in - T)
+        T_new = T_in - (T_in - T)*np.exp(-effectiveness*C*dt/(mass*Cp_contents))
+
+        T_jacket = 0.5*(T_in + T_out)
+        # Wall temperature on the jacket side
+        T_wall = T_jacket - Q/(h*A)
+        T_out_hist[i], Q_hist[i], h_hist[i] = T_out, Q, h
+        T = T_new
+        T_hist[i+1] = T
+    return {'T': T_hist, 'T_out': T_out_hist, 'Q': Q_hist, 'h': h_hist}
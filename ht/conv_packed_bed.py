@@ -21,9 +21,11 @@ OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
 SOFTWARE.'''
 
 from __future__ import division
+from math import pi
+import numpy as np
 
 __all__ = ['Nu_packed_bed_Gnielinski', 'Nu_Wakao_Kagei', 'Nu_Achenbach',
-           'Nu_KTA']
+           'Nu_KTA', 'packed_bed_methods', 'PackedBedColumn']
 
 def Nu_packed_bed_Gnielinski(dp, voidage, vs, rho, mu, Pr, fa=None):
     r'''Calculates Nusselt number of a fluid passing over a bed of particles
@@ -234,3 +236,216 @@ def Nu_KTA(Re, Pr, voidage):
     '''
     return (1.27*Pr**(1/3.)*Re**0.36/voidage**1.18 
             + 0.033*Pr**0.5/voidage**1.07*Re**0.86)
+
+
+packed_bed_methods = ['Gnielinski', 'Wakao-Kagei', 'Achenbach', 'KTA']
+
+
+class PackedBedColumn(object):
+    r'''Transient model of the heat transfer between a fluid flowing through
+    a packed bed and its particles, as in a regenerator or a thermal storage
+    column (Schumann's model). The bed is divided into `N` cells along its
+    length, each with a fluid and a solid temperature:
+
+    .. math::
+        \epsilon\rho_f C_{p,f}\left(\frac{\partial T_f}{\partial t}
+        + u\frac{\partial T_f}{\partial x}\right) = h a (T_s - T_f)
+
+    .. math::
+        (1-\epsilon)\rho_s C_{p,s}\frac{\partial T_s}{\partial t}
+        = h a (T_f - T_s)
+
+    .. math::
+        a = \frac{6(1-\epsilon)}{d_p}
+
+    Axial conduction and heat losses through the wall are neglected. The
+    fluid-particle heat transfer coefficient `h` is calculated with one of
+    :obj:`Nu_packed_bed_Gnielinski`, :obj:`Nu_Wakao_Kagei`,
+    :obj:`Nu_Achenbach` or :obj:`Nu_KTA`, with properties constant over each
+    call to :obj:`run`.
+
+    Each time step is implicit and upwind. Eliminating the new solid
+    temperature of a cell leaves a linear recurrence of the fluid
+    temperatures from one cell to the next with the same coefficient in
+    every cell, which is evaluated for all the cells with
+    `scipy.signal.lfilter`. The step is stable for any `dt`, and energy is
+    conserved exactly; the error is first order in the cell length and the
+    time step. The temperatures are updated in place, in buffers allocated
+    once.
+
+    Parameters
+    ----------
+    L : float
+        Length of the bed, [m]
+    D : float
+        Diameter of the bed, [m]
+    dp : float
+        Equivalent spherical particle diameter of packing, [m]
+    voidage : float
+        Void fraction of bed packing, [-]
+    rho_s : float
+        Density of the particles, [kg/m^3]
+    Cp_s : float
+        Heat capacity of the particles, [J/kg/K]
+    T0 : float or array
+        Initial temperature of the bed, uniform or of each cell, [K]
+    N : int, optional
+        Number of cells, [-]
+    Method : str, optional
+        Nusselt number correlation, one of `packed_bed_methods`, [-]
+    fa : float, optional
+        Shape factor for :obj:`Nu_packed_bed_Gnielinski`, [-]
+
+    Attributes
+    ----------
+    x : array
+        Positions of the cell centers from the inlet for forward flow, [m]
+    T_fluid : array
+        Fluid temperatures of the cells, [K]
+    T_solid : array
+        Solid temperatures of the cells, [K]
+    h : float
+        Heat transfer coefficient of the last call to :obj:`run`, [W/m^2/K]
+
+    Examples
+    --------
+    Heating a bed of 5 mm alumina spheres with air at 600 K, then blowing
+    cold air back through it:
+
+    >>> bed = PackedBedColumn(L=1., D=0.3, dp=5E-3, voidage=0.4, rho_s=3900.,
+    ...                       Cp_s=880., T0=300., N=200)
+    >>> res = bed.run(m=0.05, T_in=600., rho=0.6, Cp=1050., k=0.045,
+    ...               mu=2.9E-5, dt=1., steps=1800)
+    >>> round(float(res['T_out'][-1]), 2)
+    300.23
+    >>> res = bed.run(m=0.05, T_in=300., rho=1.1, Cp=1007., k=0.026,
+    ...               mu=1.85E-5, dt=1., steps=600, reverse=True)
+    >>> round(float(res['T_out'][-1]), 2)
+    599.98
+    '''
+    def __init__(self, L, D, dp, voidage, rho_s, Cp_s, T0, N=100,
+                 Method='Gnielinski', fa=None):
+        if Method not in packed_bed_methods:
+            raise ValueError('Method must be one of %s' %(packed_bed_methods,))
+        from scipy.signal import lfilter
+        self._lfilter = lfilter
+        self.L, self.D, self.dp, self.voidage = L, D, dp, voidage
+        self.rho_s, self.Cp_s, self.N = rho_s, Cp_s, N
+        self.Method, self.fa = Method, fa
+        self.A = pi/4*D*D
+        self.dx = L/N
+        self.x = (np.arange(N) + 0.5)*self.dx
+        self.T_solid = np.empty(N)
+        self.T_solid[:] = T0
+        self.T_fluid = self.T_solid.copy()
+        self.h = None
+        self._rhs = np.empty(N)
+        self._tmp = np.empty(N)
+
+    def heat_transfer_coefficient(self, m, rho, Cp, k, mu):
+        r'''Returns the fluid-particle heat transfer coefficient of the bed
+        for a flow `m` [kg/s] of a fluid with density `rho` [kg/m^3], heat
+        capacity `Cp` [J/kg/K], thermal conductivity `k` [W/m/K] and
+        viscosity `mu` [Pa*s]. Without flow, Nu = 2 is used.
+        '''
+        if m == 0:
+            return 2.0*k/self.dp
+        vs = abs(m)/(rho*self.A)
+        Pr = Cp*mu/k
+        Re = rho*vs*self.dp/mu
+        if self.Method == 'Gnielinski':
+            Nu = Nu_packed_bed_Gnielinski(self.dp, self.voidage, vs, rho, mu,
+                                          Pr, self.fa)
+        elif self.Method == 'Wakao-Kagei':
+            Nu = Nu_Wakao_Kagei(Re, Pr)
+        elif self.Method == 'Achenbach':
+            Nu = Nu_Achenbach(Re, Pr, self.voidage)
+        else:
+            Nu = Nu_KTA(Re, Pr, self.voidage)
+        return Nu*k/self.dp
+
+    def run(self, m, T_in, rho, Cp, k, mu, dt, steps=1, reverse=False,
+            record=0):
+        r'''Advances the bed by `steps` time steps of `dt` with a constant
+        flow of fluid.
+
+        Parameters
+        ----------
+        m : float
+            Mass flow rate of the fluid, [kg/s]
+        T_in : float or array
+            Inlet temperature of the fluid, constant or for each step, [K]
+        rho : float
+            Density of the fluid, [kg/m^3]
+        Cp : float
+            Heat capacity of the fluid, [J/kg/K]
+        k : float
+            Thermal conductivity of the fluid, [W/m/K]
+        mu : float
+            Viscosity of the fluid, [Pa*s]
+        dt : float
+            Time step, [s]
+        steps : int, optional
+            Number of time steps, [-]
+        reverse : bool, optional
+            Whether the fluid flows from the end of the bed at `L` to the
+            start at 0, [-]
+        record : int, optional
+            If nonzero, the temperature profiles are stored every `record`
+            steps, [-]
+
+        Returns
+        -------
+        results : dict
+            T_out : Outlet temperatures of the fluid at the end of each step,
+            [K];
+            T_fluid : Fluid temperature profiles, shape
+            (steps//record, N), if `record` is given, [K];
+            T_solid : Solid temperature profiles, shape (steps//record, N),
+            if `record` is given, [K]
+        '''
+        lfilter = self._lfilter
+        volume = self.A*self.dx
+        h = self.h = self.heat_transfer_coefficient(m, rho, Cp, k, mu)
+        Cf = self.voidage*rho*Cp*volume/dt
+        Cs = (1.0 - self.voidage)*self.rho_s*self.Cp_s*volume/dt
+        H = h*6.0*(1.0 - self.voidage)/self.dp*volume
+        W = abs(m)*Cp
+        # New solid temperature of a cell: alpha*Ts + beta*Tf_new
+        alpha = Cs/(Cs + H)
+        beta = H/(Cs + H)
+        # Fluid temperature of a cell: c*(that of the one upstream) + rhs
+        denominator = Cf + W + H*alpha
+        c = W/denominator
+        a_fluid = Cf/denominator
+        a_solid = H*alpha/denominator
+        filter_b, filter_a = [1.0], [1.0, -c]
+
+        if reverse:
+            Tf, Ts = self.T_fluid[::-1], self.T_solid[::-1]
+        else:
+            Tf, Ts = self.T_fluid, self.T_solid
+        rhs, tmp = self._rhs, self._tmp
+        T_in = np.broadcast_to(np.asarray(T_in, dtype=np.float64), (steps,))
+        T_out = np.empty(steps)
+        ans = {'T_out': T_out}
+        if record:
+            records = steps//record
+            ans['T_fluid'] = T_fluid = np.empty((records, self.N))
+            ans['T_solid'] = T_solid = np.empty((records, self.N))
+        zi = np.empty(1)
+        for i in range(steps):
+            np.multiply(Tf, a_fluid, out=rhs)
+            np.multiply(Ts, a_solid, out=tmp)
+            rhs += tmp
+            zi[0] = c*T_in[i]
+            Tf[:] = lfilter(filter_b, filter_a, rhs, zi=zi)[0]
+            Ts *= alpha
+            np.multiply(Tf, beta, out=tmp)
+            Ts += tmp
+            T_out[i] = Tf[-1]
+            if record and (i + 1) % record == 0:
+                j = (i + 1)//record - 1
+                T_fluid[j] = self.T_fluid
+                T_solid[j] = self.T_solid
+        return ans
@@ -22,6 +22,7 @@ SOFTWARE.'''
 
 from __future__ import division
 from math import log
+import numpy as np
 
 __all__ =['LMTD', 'wall_factor', 'is_heating_property', 
 'is_heating_temperature', 'wall_factor_fd', 'wall_factor_Nu',
@@ -95,6 +96,14 @@ def LMTD(Thi, Tho, Tci, Tco, counterflow=True):
     return (dTF2 - dTF1)/log(dTF2/dTF1)
 
 
+def _LMTD_vectorized(Thi, Tho, Tci, Tco, counterflow=True):
+    Thi, Tho, Tci, Tco = (np.asarray(Thi), np.asarray(Tho), np.asarray(Tci),
+                          np.asarray(Tco))
+    dTF1 = np.where(counterflow, Thi - Tco, Thi - Tci)
+    dTF2 = np.where(counterflow, Tho - Tci, Tho - Tco)
+    return (dTF2 - dTF1)/np.log(dTF2/dTF1)
+
+
 def is_heating_temperature(T, T_wall):
     r'''Checks whether or not a fluid side is being heated or cooled, from
     the temperature of the wall and the bulk temperature. Returns True for
@@ -0,0 +1,532 @@
+# -*- coding: utf-8 -*-
+'''Chemical Engineering Design Library (ChEDL). Utilities for process modeling.
+Copyright (C) 2018, Caleb Bell <Caleb.Andrew.Bell@gmail.com>
+
+Permission is hereby granted, free of charge, to any person obtaining a copy
+of this software and associated documentation files (the "Software"), to deal
+in the Software without restriction, including without limitation the rights
+to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+copies of the Software, and to permit persons to whom the Software is
+furnished to do so, subject to the following conditions:
+
+The above copyright notice and this permission notice shall be included in all
+copies or substantial portions of the Software.
+
+THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+SOFTWARE.'''
+
+from __future__ import division
+import threading
+import numpy as np
+from scipy.special import pdtr, pdtrc, bdtrc, gammaln, xlogy, xlog1py
+from ht import hx
+from ht.kernels import array_kernel
+
+try:
+    from inspect import signature
+except ImportError: # pragma: no cover
+    from funcsigs import signature
+
+__all__ = ['derivatives', 'Dual']
+
+'''Exact partial derivatives of the effectiveness functions of :obj:`ht.hx`,
+for gradient-based optimization and Newton's method.
+
+The derivatives are found by forward-mode automatic differentiation: the
+inputs are replaced by :obj:`Dual` numbers, arrays which carry the
+derivatives of their values with respect to each input alongside them, and
+every numpy operation applied to them applies the chain rule as well. The
+formulas themselves are the array kernels of the scalar functions (see
+:obj:`ht.kernels`), so there is nothing to keep in step with them. The
+crossflow configuration with both fluids unmixed, which the scalar functions
+evaluate with a numerical integral, is evaluated with its exact series
+instead.
+
+>>> import ht
+>>> from ht.derivatives import derivatives
+>>> P1, dP1_dR1, dP1_dNTU1 = derivatives(ht.temperature_effectiveness_TEMA_E,
+...                                      R1=[0.5, 2.], NTU1=1.5, Ntp=2)
+>>> P1
+array([0.6206366 , 0.38311426])
+>>> dP1_dR1, dP1_dNTU1
+(array([-0.23154442, -0.13004436]), array([0.16947007, 0.06053728]))
+'''
+
+_local = threading.local()
+
+# Relative step of the differences used at removable singularities
+_SINGULAR_STEP = 1E-3
+# Bound on the number of terms of the crossflow series
+_SERIES_MAX = 100000
+
+
+def _value(x):
+    return x.value if isinstance(x, Dual) else x
+
+
+def _partials(x, n):
+    return x.partials if isinstance(x, Dual) else (0.0,)*n
+
+
+def _poisson_pmf(k, m):
+    return np.exp(xlogy(k, m) - m - gammaln(k + 1.))
+
+
+def _binomial_pmf(k, n, p):
+    return np.exp(gammaln(n + 1.) - gammaln(k + 1.) - gammaln(n - k + 1.)
+                  + xlogy(k, p) + xlog1py(n - k, -p))
+
+
+# Derivative of each unary function, given its argument and its value
+_unary = {np.negative: lambda a, v: -1.0,
+          np.positive: lambda a, v: 1.0,
+          np.exp: lambda a, v: v,
+          np.expm1: lambda a, v: v + 1.,
+          np.log: lambda a, v: 1./a,
+          np.log1p: lambda a, v: 1./(1. + a),
+          np.log10: lambda a, v: 1./(a*np.log(10.)),
+          np.sqrt: lambda a, v: 0.5/v,
+          np.cbrt: lambda a, v: 1./(3.*v*v),
+          np.square: lambda a, v: 2.*a,
+          np.reciprocal: lambda a, v: -v*v,
+          np.sin: lambda a, v: np.cos(a),
+          np.cos: lambda a, v: -np.sin(a),
+          np.tan: lambda a, v: 1. + v*v,
+          np.arctan: lambda a, v: 1./(1. + a*a),
+          np.sinh: lambda a, v: np.cosh(a),
+          np.cosh: lambda a, v: np.sinh(a),
+          np.tanh: lambda a, v: 1. - v*v,
+          np.absolute: lambda a, v: np.sign(a)}
+
+# Derivative of each distribution function with respect to its last, continuous
+# argument; the others are counts
+_distributions = {pdtr: lambda k, m: -_poisson_pmf(k, m),
+                  pdtrc: lambda k, m: _poisson_pmf(k, m),
+                  bdtrc: lambda k, n, p: n*_binomial_pmf(k, n - 1., p)}
+
+# Functions with a derivative of zero or none; evaluated on the values
+_constant = set([np.less, np.less_equal, np.greater, np.greater_equal,
+                 np.equal, np.not_equal, np.logical_and, np.logical_or,
+                 np.logical_not, np.isfinite, np.isnan, np.isinf, np.sign,
+                 np.floor, np.ceil])
+
+
+class Dual(object):
+    r'''Array of values and of their partial derivatives with respect to a
+    fixed set of variables, which numpy functions propagate through the
+    chain rule.
+
+    Parameters
+    ----------
+    value : array-like
+        Values, [-]
+    partials : tuple[array-like]
+        Derivative of the values with respect to each variable, broadcastable
+        to the shape of `value`, [-]
+    '''
+    __slots__ = ('value', 'partials')
+    __hash__ = None
+
+    def __init__(self, value, partials):
+        self.value = value
+        self.partials = tuple(partials)
+
+    def __repr__(self):
+        return 'Dual(%r, %r)' %(self.value, self.partials)
+
+    @property
+    def shape(self):
+        return np.shape(self.value)
+
+    @property
+    def ndim(self):
+        return np.ndim(self.value)
+
+    def __len__(self):
+        return len(self.value)
+
+    def __bool__(self):
+        return bool(self.value)
+    __nonzero__ = __bool__
+
+    def __getitem__(self, index):
+        shape = self.shape
+        return Dual(self.value[index], [np.broadcast_to(p, shape)[index]
+                                        for p in self.partials])
+
+    def sum(self, axis=None):
+        shape = self.shape
+        return Dual(np.sum(self.value, axis=axis),
+                    [np.sum(np.broadcast_to(p, shape), axis=axis)
+                     for p in self.partials])
+
+    def __array_ufunc__(self, ufunc, method, *inputs, **kwargs):
+        if method != '__call__' or kwargs.get('out') is not None:
+            return NotImplemented
+        values = [_value(x) for x in inputs]
+        value = ufunc(*values, **kwargs)
+        if ufunc in _constant:
+            if ufunc is np.equal or ufunc is np.not_equal:
+                _note_equal(inputs, values)
+            return value
+        n = len(self.partials)
+        if ufunc in _unary:
+            factor = _unary[ufunc](values[0], value)
+            return Dual(value, [factor*d for d in self.partials])
+        elif ufunc in _distributions:
+            if any(isinstance(x, Dual) for x in inputs[:-1]):
+                raise TypeError('%s is only differentiable in its last argument'
+                                %(ufunc.__name__))
+            factor = _distributions[ufunc](*values)
+            return Dual(value, [factor*d for d in inputs[-1].partials])
+        if len(values) != 2:
+            raise TypeError('%s is not supported for Dual numbers' %(ufunc.__name__))
+        a, b = values
+        da, db = _partials(inputs[0], n), _partials(inputs[1], n)
+        if ufunc is np.add:
+            partials = [x + y for x, y in zip(da, db)]
+        elif ufunc is np.subtract:
+            partials = [x - y for x, y in zip(da, db)]
+        elif ufunc is np.multiply:
+            partials = [x*b + a*y for x, y in zip(da, db)]
+        elif ufunc is np.true_divide:
+            partials = [(x - value*y)/b for x, y in zip(da, db)]
+        elif ufunc is np.power:
+            dx = b*np.power(a, b - 1.)
+            if isinstance(inputs[1], Dual):
+                dy = np.where(value == 0., 0., value*np.log(np.where(a > 0., a, 1.)))
+                partials = [x*dx + y*dy for x, y in zip(da, db)]
+            else:
+                partials = [x*dx for x in da]
+        elif ufunc is np.maximum or ufunc is np.minimum:
+            first = (a >= b) if ufunc is np.maximum else (a <= b)
+            partials = [np.where(first, x, y) for x, y in zip(da, db)]
+        else:
+            raise TypeError('%s is not supported for Dual numbers' %(ufunc.__name__))
+        return Dual(value, partials)
+
+    def __array_function__(self, func, types, args, kwargs):
+        if func is np.where:
+            condition, a, b = args
+            n = len(self.partials)
+            return Dual(np.where(condition, _value(a), _value(b)),
+                        [np.where(condition, x, y) for x, y in
+                         zip(_partials(a, n), _partials(b, n))])
+        elif func is np.broadcast_arrays:
+            shape = np.broadcast(*[_value(x) for x in args]).shape
+            return [_broadcast(x, shape) for x in args]
+        elif func is np.sum:
+            return args[0].sum(**kwargs)
+        elif func is np.shape:
+            return args[0].shape
+        elif func is np.ndim:
+            return args[0].ndim
+        return NotImplemented
+
+    def __neg__(self):
+        return np.negative(self)
+
+    def __pos__(self):
+        return self
+
+    def __abs__(self):
+        return np.absolute(self)
+
+    def __add__(self, other):
+        return np.add(self, other)
+
+    def __radd__(self, other):
+        return np.add(other, self)
+
+    def __sub__(self, other):
+        return np.subtract(self, other)
+
+    def __rsub__(self, other):
+        return np.subtract(other, self)
+
+    def __mul__(self, other):
+        return np.multiply(self, other)
+
+    def __rmul__(self, other):
+        return np.multiply(other, self)
+
+    def __truediv__(self, other):
+        return np.true_divide(self, other)
+
+    def __rtruediv__(self, other):
+        return np.true_divide(other, self)
+    __div__, __rdiv__ = __truediv__, __rtruediv__
+
+    def __pow__(self, other):
+        return np.power(self, other)
+
+    def __rpow__(self, other):
+        return np.power(other, self)
+
+    def __lt__(self, other):
+        return np.less(self, other)
+
+    def __le__(self, other):
+        return np.less_equal(self, other)
+
+    def __gt__(self, other):
+        return np.greater(self, other)
+
+    def __ge__(self, other):
+        return np.greater_equal(self, other)
+
+    def __eq__(self, other):
+        return np.equal(self, other)
+
+    def __ne__(self, other):
+        return np.not_equal(self, other)
+
+
+def _broadcast(x, shape):
+    if isinstance(x, Dual):
+        return Dual(np.broadcast_to(x.value, shape),
+                    [np.broadcast_to(p, shape) for p in x.partials])
+    return np.broadcast_to(x, shape)
+
+
+def _note_equal(inputs, values):
+    # Equality tests of the inputs select the limiting expression used at a
+    # removable singularity, which may not depend on the variables tested;
+    # record which elements were equal and which variables they depend on
+    records = getattr(_local, 'singular', None)
+    if records is None:
+        return
+    equal = np.equal(*values)
+    if not np.any(equal):
+        return
+    n = max(len(x.partials) for x in inputs if isinstance(x, Dual))
+    da, db = _partials(inputs[0], n), _partials(inputs[1], n)
+    records.append([equal & (np.asarray(x - y) != 0.) for x, y in zip(da, db)])
+
+
+def _kernel(func, static=()):
+    kernel = array_kernel(func, static=static)
+    if not kernel.translated:
+        raise Exception('%s cannot be differentiated: %s' %(func.__name__,
+                                                          kernel.reason))
+    return kernel
+
+
+def _crossflow(R1, NTU1):
+    # Exact series for crossflow with both fluids unmixed, in terms of the
+    # Poisson distribution function:
+    # P1 = 1/(R1*NTU1) sum_n pdtrc(n, NTU1)*pdtrc(n, R1*NTU1)
+    RNTU1 = R1*NTU1
+    total = 0.0
+    for n in range(_SERIES_MAX):
+        term = pdtrc(n, NTU1)*pdtrc(n, RNTU1)
+        total = total + term
+        if not np.any(_value(term) > 1E-17*_value(total)):
+            break
+    return total/RNTU1
+
+
+def _basic(R1, NTU1, subtype='crossflow'):
+    func = hx._subtype_dispatch(hx._temperature_effectiveness_basic_funcs,
+                                {}, subtype)[0]
+    if func is None:
+        raise Exception('Subtype not recognized.')
+    if func is hx._P1_crossflow:
+        return _crossflow(R1, NTU1)
+    return _kernel(func)(R1, NTU1)
+
+
+def _effectiveness(NTU, Cr, subtype='counterflow'):
+    func, config = hx._subtype_dispatch(hx._effectiveness_from_NTU_funcs, {},
+                                        subtype)
+    if func is None:
+        raise Exception('Input heat exchanger type not recognized')
+    if func is hx._effectiveness_crossflow:
+        return _crossflow(Cr, NTU)
+    elif func is hx._effectiveness_counterflow:
+        return _TEMA_E(Cr, NTU, 1)
+    return _kernel(func)(NTU, Cr, config)
+
+
+def _check_effectiveness(NTU, Cr, subtype='counterflow'):
+    if np.any(Cr > 1):
+        raise Exception('Heat capacity rate must be less than 1 by definition.')
+
+
+def _TEMA_E(R1, NTU1, Ntp=1, optimal=True):
+    return _kernel(hx.temperature_effectiveness_TEMA_E, ('Ntp',))(R1, NTU1, Ntp, optimal)
+
+
+def _TEMA_G(R1, NTU1, Ntp, optimal=True):
+    return _kernel(hx.temperature_effectiveness_TEMA_G, ('Ntp',))(R1, NTU1, Ntp, optimal)
+
+
+def _TEMA_H(R1, NTU1, Ntp, optimal=True):
+    return _kernel(hx.temperature_effectiveness_TEMA_H, ('Ntp',))(R1, NTU1, Ntp, optimal)
+
+
+def _TEMA_J(R1, NTU1, Ntp):
+    return _kernel(hx.temperature_effectiveness_TEMA_J, ('Ntp',))(R1, NTU1, Ntp)
+
+
+def _plate(R1, NTU1, Np1, Np2, counterflow=True, passes_counterflow=True,
+           reverse=False):
+    return hx._plate_P1(R1, NTU1, (Np1, Np2, counterflow, passes_counterflow),
+                        reverse)
+
+
+def _air_cooler(R1, NTU1, rows, passes):
+    if passes == 1:
+        return hx._air_cooler_1_pass(R1, NTU1, rows)
+    kernel = _kernel(hx._air_cooler_multiple_passes, ('rows', 'passes'))
+    return kernel(R1, NTU1, rows, passes)
+
+
+_implementations = {
+    hx.temperature_effectiveness_basic: _basic,
+    hx.effectiveness_from_NTU: _effectiveness,
+    hx.temperature_effectiveness_TEMA_E: _TEMA_E,
+    hx.temperature_effectiveness_TEMA_G: _TEMA_G,
+    hx.temperature_effectiveness_TEMA_H: _TEMA_H,
+    hx.temperature_effectiveness_TEMA_J: _TEMA_J,
+    hx.temperature_effectiveness_plate: _plate,
+    hx.temperature_effectiveness_air_cooler: _air_cooler}
+# Checks of the inputs, made before evaluating
+_checks = {hx.effectiveness_from_NTU: _check_effectiveness}
+
+
+def _evaluate(implementation, names, values, others):
+    # Value and derivatives with respect to `names` on the broadcast arrays
+    # `values`, and the elements at which a removable singularity was met
+    n = len(names)
+    inputs = dict((name, Dual(v, [float(i == j) for j in range(n)]))
+                  for i, (name, v) in enumerate(zip(names, values)))
+    inputs.update(others)
+    shape = values[0].shape
+    previous = getattr(_local, 'singular', None)
+    _local.singular = records = []
+    try:
+        with np.errstate(all='ignore'):
+            ans = implementation(**inputs)
+    finally:
+        _local.singular = previous
+    if not isinstance(ans, Dual):
+        ans = Dual(ans, (0.0,)*n)
+    value = np.array(np.broadcast_to(ans.value, shape), dtype=float)
+    partials = [np.array(np.broadcast_to(p, shape), dtype=float)
+                for p in ans.partials]
+    singular = [np.zeros(shape, dtype=bool) for _ in range(n)]
+    for record in records:
+        for k in range(n):
+            try:
+                singular[k] |= np.broadcast_to(record[k], shape)
+            except ValueError:
+                pass
+    return value, partials, singular
+
+
+def _difference(implementation, names, values, others, k, mask):
+    # Derivative with respect to variable `k` at the elements `mask`, by
+    # Richardson extrapolation of central differences of the values
+    x = values[k][mask]
+    h = _SINGULAR_STEP*np.where(x != 0., np.abs(x), 1.)
+    def f(step):
+        shifted = [v[mask] for v in values]
+        shifted[k] = x + step
+        return _evaluate(implementation, names, shifted, others)[0]
+    D1 = (f(h) - f(-h))/(2.*h)
+    D2 = (f(2.*h) - f(-2.*h))/(4.*h)
+    return (4.*D1 - D2)/3.
+
+
+def derivatives(function, *args, **kwargs):
+    r'''Returns the value of one of the effectiveness functions of
+    :obj:`ht.hx` and its exact partial derivatives with respect to its first
+    two arguments, evaluated element by element on arrays. The supported
+    functions and the derivatives returned are:
+
+    * :obj:`ht.hx.temperature_effectiveness_basic`,
+      :obj:`ht.hx.temperature_effectiveness_TEMA_E`,
+      :obj:`ht.hx.temperature_effectiveness_TEMA_G`,
+      :obj:`ht.hx.temperature_effectiveness_TEMA_H`,
+      :obj:`ht.hx.temperature_effectiveness_TEMA_J`,
+      :obj:`ht.hx.temperature_effectiveness_plate` and
+      :obj:`ht.hx.temperature_effectiveness_air_cooler`: `P1`,
+      :math:`\partial P_1/\partial R_1` and
+      :math:`\partial P_1/\partial NTU_1`
+    * :obj:`ht.hx.effectiveness_from_NTU`: `effectiveness`,
+      :math:`\partial \epsilon/\partial NTU` and
+      :math:`\partial \epsilon/\partial C_r`
+
+    Parameters
+    ----------
+    function : callable
+        One of the functions above, [-]
+    args : various
+        Positional arguments of `function`, [-]
+    kwargs : various
+        Keyword arguments of `function`; the first two arguments may be
+        arrays and are broadcast together, the others select the
+        configuration and must be scalars, [-]
+
+    Returns
+    -------
+    value : float or array
+        Value of `function`, [-]
+    d1 : float or array
+        Derivative of `value` with respect to the first argument, [-]
+    d2 : float or array
+        Derivative of `value` with respect to the second argument, [-]
+
+    Notes
+    -----
+    For crossflow with both fluids unmixed, the value is evaluated with the
+    exact series [1]_ rather than the integral used by
+    :obj:`ht.hx.temperature_effectiveness_basic`; the two agree to about
+    1E-12.
+
+    Some formulas have removable singularities, such as `R1` = 1 for
+    counterflow, where a separate limiting expression is used which does not
+    depend on `R1`. At those points only, the derivatives with respect to the
+    variables of the singularity are found by Richardson extrapolation of
+    central differences of the neighbouring values, to a relative accuracy of
+    about 1E-9.
+
+    Examples
+    --------
+    >>> import ht
+    >>> derivatives(ht.effectiveness_from_NTU, NTU=[1., 5.], Cr=[0.5, 1.],
+    ...             subtype='counterflow')
+    (array([0.5647334 , 0.83333333]), array([0.31236181, 0.02777778]), array([-0.13310444, -0.34722222]))
+
+    References
+    ----------
+    .. [1] Triboix, Alain. "Exact and Approximate Formulas for Cross Flow Heat
+       Exchangers with Unmixed Fluids." International Communications in Heat
+       and Mass Transfer 36, no. 2 (February 1, 2009): 121-24.
+       doi:10.1016/j.icheatmasstransfer.2008.10.012.
+    '''
+    try:
+        implementation = _implementations[function]
+    except (KeyError, TypeError):
+        raise ValueError('Derivatives of %r are not available' %(function,))
+    bound = signature(function).bind(*args, **kwargs)
+    bound.apply_defaults()
+    arguments = dict(bound.arguments)
+    names = list(arguments)[:2]
+    values = np.broadcast_arrays(*[np.asarray(arguments.pop(name), dtype=float)
+                                   for name in names])
+    if function in _checks:
+        _checks[function](*values, **arguments)
+    value, partials, singular = _evaluate(implementation, names, values,
+                                          arguments)
+    for k, mask in enumerate(singular):
+        if mask.any():
+            partials[k][mask] = _difference(implementation, names, values,
+                                            arguments, k, mask)
+    return tuple(x[()] for x in [value] + partials)
@@ -0,0 +1,139 @@
+# -*- coding: utf-8 -*-
+'''Chemical Engineering Design Library (ChEDL). Utilities for process modeling.
+Copyright (C) 2018, Caleb Bell <Caleb.Andrew.Bell@gmail.com>
+
+Permission is hereby granted, free of charge, to any person obtaining a copy
+of this software and associated documentation files (the "Software"), to deal
+in the Software without restriction, including without limitation the rights
+to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+copies of the Software, and to permit persons to whom the Software is
+furnished to do so, subject to the following conditions:
+
+The above copyright notice and this permission notice shall be included in all
+copies or substantial portions of the Software.
+
+THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+SOFTWARE.'''
+
+from __future__ import division
+
+__all__ = ['record_solves', 'add_callback', 'remove_callback']
+
+'''Reports on the numerical solves hidden inside ht functions - the inverse
+P-NTU functions (`NTU_from_P_*`, `NTU_from_effectiveness`), `Thome` with a
+specified `Te`, and the bundle diameter for a tube count
+(`DBundle_for_Ntubes_Phadkeb`, `size_bundle_from_tubecount`).
+
+Nothing is reported, and the solvers run as they otherwise would, unless a
+callback has been registered. Each callback is called after every solve with
+a dict with the following keys:
+
+* function : Name of the ht function whose output was solved for, [-]
+* solver : Name of the solver; one in `scipy.optimize`, or 'newton_bracketed'
+  (:obj:`ht.hx.newton_bracketed`), [-]
+* inputs : Dict of the inputs of the problem, [-]
+* root : Solution found, or None if the solver failed, [various]
+* converged : Whether the solver converged, [-]
+* iterations : Number of iterations, [-]
+* function_calls : Number of evaluations of the objective function, [-]
+* residual : Value of the objective function at the solution, [various]
+* bracket : Interval searched, for bracketing solvers, [various]
+* x0 : Initial guess, for Newton's methods, [various]
+* mpmath : Whether the objective had to be evaluated with mpmath because
+  it could not be evaluated with floats, [-]
+* error : Message of the exception raised by the solver, if any, [-]
+
+>>> import ht
+>>> from ht.diagnostics import record_solves
+>>> with record_solves() as solves:
+...     NTU = ht.NTU_from_P_G(P1=.573, R1=1/3., Ntp=2)
+>>> solves[0]['solver'], solves[0]['converged'], solves[0]['bracket']
+('newton_bracketed', True, (1e-11, 10000.0))
+'''
+
+_callbacks = []
+_mpmath_fallbacks = [0]
+
+
+def add_callback(callback):
+    '''Registers a function to be called with the report of every solve.'''
+    _callbacks.append(callback)
+
+
+def remove_callback(callback):
+    '''Removes a function registered with :obj:`add_callback`.'''
+    _callbacks.remove(callback)
+
+
+class record_solves(object):
+    '''Context manager which collects the report of every solve made while
+    it is active in a list, which is returned on entering.
+    '''
+    def __enter__(self):
+        self.solves = []
+        add_callback(self.solves.append)
+        return self.solves
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        remove_callback(self.solves.append)
+        return False
+
+
+def note_mpmath_fallback():
+    # Called by objective functions which fall back to mpmath
+    _mpmath_fallbacks[0] += 1
+
+
+def solve(function, solver, f, inputs, *args, **kwargs):
+    '''Calls `solver` (a root finder from `scipy.optimize`, or one with the
+    same interface) as `solver(f, *args, **kwargs)`, and if any callbacks are
+    registered reports on the solve to them. `function` is the name of the ht function being
+    solved and `inputs` a dict of the inputs of the problem.
+    '''
+    if not _callbacks:
+        return solver(f, *args, **kwargs)
+
+    calls = [0]
+    def counted(x, *f_args):
+        calls[0] += 1
+        return f(x, *f_args)
+
+    name = solver.__name__
+    report = {'function': function, 'solver': name, 'inputs': inputs,
+              'root': None, 'converged': False, 'iterations': None,
+              'function_calls': None, 'residual': None, 'bracket': None,
+              'x0': None, 'mpmath': False, 'error': None}
+    if name == 'newton':
+        report['x0'] = args[0] if args else kwargs.get('x0')
+    else:
+        report['bracket'] = (args[0], args[1])
+        report['x0'] = kwargs.get('x0')
+    fallbacks = _mpmath_fallbacks[0]
+    try:
+        root, results = solver(counted, *args, full_output=True, **kwargs)
+    except Exception as e:
+        report['error'] = str(e)
+        report['function_calls'] = calls[0]
+        report['mpmath'] = _mpmath_fallbacks[0] != fallbacks
+        _report(report)
+        raise
+    report['root'] = root
+    report['converged'] = bool(results.converged)
+    report['iterations'] = results.iterations
+    report['function_calls'] = calls[0]
+    report['mpmath'] = _mpmath_fallbacks[0] != fallbacks
+    residual = f(root, *kwargs.get('args', ()))
+    # Solvers using derivatives are given a function returning both
+    report['residual'] = residual[0] if isinstance(residual, tuple) else residual
+    _report(report)
+    return root
+
+
+def _report(report):
+    for callback in list(_callbacks):
+        callback(report)
@@ -21,16 +21,22 @@ OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
 SOFTWARE.'''
 
 from __future__ import division
-from math import exp, log, floor, sqrt, factorial, tanh  # tanh= 1/coth
+from math import exp, log, floor, sqrt, tanh  # tanh= 1/coth
 import math
 from bisect import bisect, bisect_left, bisect_right
 import numpy as np
-from scipy.optimize import ridder, newton
+from scipy.optimize import ridder, newton, RootResults
 from scipy.optimize import bisect as sp_bisect
 from scipy.integrate import quad
-from scipy.special import iv
+from scipy.linalg import expm
+from scipy.linalg.lapack import dgbtrf, dgbtrs
+from scipy.special import iv, bdtrc, pdtr, pdtrc, gammaln, xlogy
+from scipy.sparse import csr_matrix, identity
+from scipy.sparse.linalg import splu
 from scipy.constants import inch, foot, degree_Fahrenheit, hour, Btu
 from fluids.piping import BWG_integers, BWG_inch, BWG_SI
+from ht.diagnostics import solve, note_mpmath_fallback
+from ht.kernels import derivative_kernel, array_kernel
 from pprint import pprint
 
 __all__ = ['effectiveness_from_NTU', 'NTU_from_effectiveness', 'calc_Cmin',
@@ -50,11 +56,193 @@ __all__ = ['effectiveness_from_NTU', 'NTU_from_effectiveness', 'calc_Cmin',
 'Ntubes_HEDH', 'DBundle_for_Ntubes_HEDH',  'D_for_Ntubes_VDI', 
 'TEMA_heads', 'TEMA_shells', 
 'TEMA_rears', 'TEMA_services', 'baffle_types', 'triangular_Ns', 
-'triangular_C1s', 'square_Ns', 'square_C1s', 'R_value']
+'triangular_C1s', 'square_Ns', 'square_C1s', 'R_value', 'HXSubtype',
+'hx_subtype', 'effectiveness_NTU_method_batch', 'P_NTU_method_batch',
+'EffectivenessNTUResult', 'PNTUResult', 'effectiveness_NTU_method_dtype',
+'P_NTU_method_dtype', 'ExchangerNetwork', 'temperature_effectiveness_shells',
+'NTU_from_P_shells', 'DynamicExchanger']
 
 R_value = foot*foot*degree_Fahrenheit*hour/Btu
 
 
+class HXSubtype(object):
+    r'''Parsed heat exchanger configuration, as accepted by the `subtype`
+    argument of :obj:`effectiveness_from_NTU`, :obj:`NTU_from_effectiveness`,
+    :obj:`effectiveness_NTU_method`, :obj:`temperature_effectiveness_basic`,
+    :obj:`NTU_from_P_basic` and :obj:`P_NTU_method`. Those functions accept
+    the configuration as a string, which is parsed on its first use and then
+    looked up; as an object of this class, created with :obj:`hx_subtype`;
+    or, for configurations without parameters, as one of the integer codes
+    below.
+
+    Attributes
+    ----------
+    name : str
+        Configuration as a string, [-]
+    code : int
+        One of the integer codes of the configurations below, [-]
+    shells : int
+        Number of shells in series, for 'S&T' configurations, [-]
+    Np1 : int
+        Number of passes of side 1, for plate exchangers, [-]
+    Np2 : int
+        Number of passes of side 2, for plate exchangers, [-]
+    passes_counterflow : bool
+        Whether the passes of a plate exchanger are arranged in
+        counterflow, [-]
+    '''
+    __slots__ = ('name', 'code', 'shells', 'Np1', 'Np2', 'passes_counterflow')
+
+    UNKNOWN = 0
+    COUNTERFLOW = 1
+    PARALLEL = 2
+    CROSSFLOW = 3
+    CROSSFLOW_APPROXIMATE = 4
+    CROSSFLOW_MIXED_CMIN = 5
+    CROSSFLOW_MIXED_CMAX = 6
+    CROSSFLOW_MIXED_1 = 7
+    CROSSFLOW_MIXED_2 = 8
+    CROSSFLOW_MIXED_12 = 9
+    BOILER = 10
+    CONDENSER = 11
+    SHELL_AND_TUBE = 12
+    TEMA_E = 13
+    TEMA_G = 14
+    TEMA_H = 15
+    TEMA_J = 16
+    PLATE = 17
+
+    def __init__(self, name, code, shells=1, Np1=None, Np2=None,
+                 passes_counterflow=True):
+        self.name = name
+        self.code = code
+        self.shells = shells
+        self.Np1 = Np1
+        self.Np2 = Np2
+        self.passes_counterflow = passes_counterflow
+
+    def __repr__(self):
+        return 'hx_subtype(%r)' %(self.name)
+
+
+_subtype_codes = {'counterflow': HXSubtype.COUNTERFLOW,
+                  'parallel': HXSubtype.PARALLEL,
+                  'crossflow': HXSubtype.CROSSFLOW,
+                  'crossflow approximate': HXSubtype.CROSSFLOW_APPROXIMATE,
+                  'crossflow, mixed Cmin': HXSubtype.CROSSFLOW_MIXED_CMIN,
+                  'crossflow, mixed Cmax': HXSubtype.CROSSFLOW_MIXED_CMAX,
+                  'crossflow, mixed 1': HXSubtype.CROSSFLOW_MIXED_1,
+                  'crossflow, mixed 2': HXSubtype.CROSSFLOW_MIXED_2,
+                  'crossflow, mixed 1&2': HXSubtype.CROSSFLOW_MIXED_12,
+                  'boiler': HXSubtype.BOILER,
+                  'condenser': HXSubtype.CONDENSER,
+                  'S&T': HXSubtype.SHELL_AND_TUBE,
+                  'E': HXSubtype.TEMA_E, 'G': HXSubtype.TEMA_G,
+                  'H': HXSubtype.TEMA_H, 'J': HXSubtype.TEMA_J}
+_subtype_names = dict((code, name) for name, code in _subtype_codes.items())
+_subtype_unknown = HXSubtype(None, HXSubtype.UNKNOWN)
+# Parsed configurations by string and integer code; limited in size so
+# arbitrary inputs cannot grow it without bound
+_subtypes = {}
+_SUBTYPES_MAX = 1024
+
+
+def _parse_subtype(subtype):
+    # Returns the HXSubtype of `subtype`, which is `_subtype_unknown` if it is
+    # not a recognized configuration
+    if type(subtype) is HXSubtype:
+        return subtype
+    try:
+        config = _subtypes.get(subtype)
+    except TypeError:
+        return _subtype_unknown
+    if config is not None:
+        return config
+    if type(subtype) is int:
+        if subtype not in _subtype_names:
+            return _subtype_unknown
+        config = HXSubtype(_subtype_names[subtype], subtype)
+    elif isinstance(subtype, str):
+        if subtype in _subtype_codes:
+            config = HXSubtype(subtype, _subtype_codes[subtype])
+        elif 'S&T' in subtype:
+            str_shells = subtype.split('S&T')[0]
+            try:
+                shells = int(str_shells) if str_shells else 1
+            except ValueError:
+                return _subtype_unknown
+            config = HXSubtype(subtype, HXSubtype.SHELL_AND_TUBE, shells=shells)
+        elif '/' in subtype:
+            passes_counterflow = True
+            # Malformed plate strings such as '2/x' are not recognized
+            try:
+                Np1, end = subtype.split('/')
+                if end[-1] in ['c','p']:
+                    passes_counterflow = True if end[-1] == 'c' else False
+                    end = end[0:-1]
+                Np1, Np2 = int(Np1), int(end)
+            except (ValueError, IndexError):
+                return _subtype_unknown
+            config = HXSubtype(subtype, HXSubtype.PLATE, Np1=Np1, Np2=Np2,
+                               passes_counterflow=passes_counterflow)
+        else:
+            return _subtype_unknown
+    else:
+        return _subtype_unknown
+    if len(_subtypes) < _SUBTYPES_MAX:
+        _subtypes[subtype] = config
+    return config
+
+
+def _subtype_dispatch(table, cache, subtype):
+    # Returns the function in `table` for the configuration `subtype` and its
+    # HXSubtype, or None and the HXSubtype if there is none; found ones are
+    # stored in `cache` by `subtype` so later calls take a single lookup
+    config = _parse_subtype(subtype)
+    func = table.get(config.code)
+    if func is not None and len(cache) < _SUBTYPES_MAX:
+        try:
+            cache[subtype] = (func, config)
+        except TypeError:
+            pass
+    return func, config
+
+
+def hx_subtype(subtype):
+    r'''Parses and validates a heat exchanger configuration once, for use as
+    the `subtype` of the P-NTU and effectiveness-NTU functions in a loop.
+
+    Parameters
+    ----------
+    subtype : str or int
+        Configuration, such as 'counterflow', '2S&T', 'E' or '2/3c', or one
+        of the integer codes of :obj:`HXSubtype`, [-]
+
+    Returns
+    -------
+    config : HXSubtype
+        Parsed configuration, [-]
+
+    Notes
+    -----
+    Whether a configuration is supported by a particular function is checked
+    by that function; 'E' is not an option for :obj:`effectiveness_from_NTU`,
+    for instance.
+
+    Examples
+    --------
+    >>> config = hx_subtype('2/3p')
+    >>> config.code == HXSubtype.PLATE, config.Np1, config.Np2, config.passes_counterflow
+    (True, 2, 3, False)
+    >>> effectiveness_from_NTU(NTU=5, Cr=0.7, subtype=hx_subtype('2S&T'))
+    0.8317934722321358
+    '''
+    config = _parse_subtype(subtype)
+    if config.code == HXSubtype.UNKNOWN:
+        raise ValueError('Heat exchanger subtype %r not recognized' %(subtype,))
+    return config
+
+
 def effectiveness_from_NTU(NTU, Cr, subtype='counterflow'):
     r'''Returns the effectiveness of a heat exchanger at a specified heat 
     capacity rate, number of transfer units, and configuration. The following
@@ -278,41 +466,75 @@ def effectiveness_from_NTU(NTU, Cr, subtype='counterflow'):
     if Cr > 1:
         raise Exception('Heat capacity rate must be less than 1 by definition.')
         
-    if subtype == 'counterflow':
-        if Cr < 1:
-            return (1. - exp(-NTU*(1. - Cr)))/(1. - Cr*exp(-NTU*(1. - Cr)))
-        elif Cr == 1:
-            return NTU/(1. + NTU)
-    elif subtype == 'parallel':
-            return (1. - exp(-NTU*(1. + Cr)))/(1. + Cr)
-    elif 'S&T' in subtype:
-        str_shells = subtype.split('S&T')[0]
-        shells = int(str_shells) if str_shells else 1
-        NTU = NTU/shells
-        
-        top = 1. + exp(-NTU*(1. + Cr**2)**.5)
-        bottom = 1. - exp(-NTU*(1. + Cr**2)**.5)
-        effectiveness = 2./(1. + Cr + (1. + Cr**2)**.5*top/bottom)
-        if shells > 1:
-            term = ((1. - effectiveness*Cr)/(1. - effectiveness))**shells
-            effectiveness = (term - 1.)/(term - Cr)
-        return effectiveness
-    elif subtype == 'crossflow':
-        def to_int(v, NTU, Cr):
-            return (1. + NTU - v*v/(4.*Cr*NTU))*exp(-v*v/(4.*Cr*NTU))*v*iv(0, v)
-        int_term = quad(to_int, 0, 2.*NTU*Cr**0.5, args=(NTU, Cr))[0]
-        return 1./Cr - exp(-Cr*NTU)/(2.*(Cr*NTU)**2)*int_term
-    elif subtype == 'crossflow approximate':
-        return 1. - exp(1./Cr*NTU**0.22*(exp(-Cr*NTU**0.78) - 1.))
-    elif subtype == 'crossflow, mixed Cmin':
-        return 1. -exp(-Cr**-1*(1. - exp(-Cr*NTU)))
-    elif subtype ==  'crossflow, mixed Cmax':
-        return (1./Cr)*(1. - exp(-Cr*(1. - exp(-NTU))))
-    elif subtype in ['boiler', 'condenser']:
-        return  1. - exp(-NTU)
-    else:
-        raise Exception('Input heat exchanger type not recognized')
-        
+    try:
+        func, config = _effectiveness_from_NTU_cache[subtype]
+    except (KeyError, TypeError):
+        func, config = _subtype_dispatch(_effectiveness_from_NTU_funcs,
+                                         _effectiveness_from_NTU_cache, subtype)
+        if func is None:
+            raise Exception('Input heat exchanger type not recognized')
+    return func(NTU, Cr, config)
+
+
+def _effectiveness_counterflow(NTU, Cr, config):
+    if Cr < 1:
+        return (1. - exp(-NTU*(1. - Cr)))/(1. - Cr*exp(-NTU*(1. - Cr)))
+    elif Cr == 1:
+        return NTU/(1. + NTU)
+
+
+def _effectiveness_parallel(NTU, Cr, config):
+    return (1. - exp(-NTU*(1. + Cr)))/(1. + Cr)
+
+
+def _effectiveness_shell_and_tube(NTU, Cr, config):
+    shells = config.shells
+    NTU = NTU/shells
+
+    top = 1. + exp(-NTU*(1. + Cr**2)**.5)
+    bottom = 1. - exp(-NTU*(1. + Cr**2)**.5)
+    effectiveness = 2./(1. + Cr + (1. + Cr**2)**.5*top/bottom)
+    if shells > 1:
+        term = ((1. - effectiveness*Cr)/(1. - effectiveness))**shells
+        effectiveness = (term - 1.)/(term - Cr)
+    return effectiveness
+
+
+def _effectiveness_crossflow(NTU, Cr, config):
+    def to_int(v, NTU, Cr):
+        return (1. + NTU - v*v/(4.*Cr*NTU))*exp(-v*v/(4.*Cr*NTU))*v*iv(0, v)
+    int_term = quad(to_int, 0, 2.*NTU*Cr**0.5, args=(NTU, Cr))[0]
+    return 1./Cr - exp(-Cr*NTU)/(2.*(Cr*NTU)**2)*int_term
+
+
+def _effectiveness_crossflow_approximate(NTU, Cr, config):
+    return 1. - exp(1./Cr*NTU**0.22*(exp(-Cr*NTU**0.78) - 1.))
+
+
+def _effectiveness_crossflow_mixed_Cmin(NTU, Cr, config):
+    return 1. -exp(-Cr**-1*(1. - exp(-Cr*NTU)))
+
+
+def _effectiveness_crossflow_mixed_Cmax(NTU, Cr, config):
+    return (1./Cr)*(1. - exp(-Cr*(1. - exp(-NTU))))
+
+
+def _effectiveness_boiler(NTU, Cr, config):
+    return  1. - exp(-NTU)
+
+
+_effectiveness_from_NTU_funcs = {
+    HXSubtype.COUNTERFLOW: _effectiveness_counterflow,
+    HXSubtype.PARALLEL: _effectiveness_parallel,
+    HXSubtype.SHELL_AND_TUBE: _effectiveness_shell_and_tube,
+    HXSubtype.CROSSFLOW: _effectiveness_crossflow,
+    HXSubtype.CROSSFLOW_APPROXIMATE: _effectiveness_crossflow_approximate,
+    HXSubtype.CROSSFLOW_MIXED_CMIN: _effectiveness_crossflow_mixed_Cmin,
+    HXSubtype.CROSSFLOW_MIXED_CMAX: _effectiveness_crossflow_mixed_Cmax,
+    HXSubtype.BOILER: _effectiveness_boiler,
+    HXSubtype.CONDENSER: _effectiveness_boiler}
+_effectiveness_from_NTU_cache = {}
+
 
 def NTU_from_effectiveness(effectiveness, Cr, subtype='counterflow'):
     r'''Returns the Number of Transfer Units of a heat exchanger at a specified 
@@ -429,7 +651,7 @@ def NTU_from_effectiveness(effectiveness, Cr, subtype='counterflow'):
     Crossflow, somewhat higher effectiveness:
         
     >>> NTU_from_effectiveness(effectiveness=0.8444821799748551, Cr=0.7, subtype='crossflow')
-    5.000000000000859
+    5.0000000000000036
 
     Counterflow, better than either crossflow or parallel flow:
 
@@ -485,73 +707,123 @@ def NTU_from_effectiveness(effectiveness, Cr, subtype='counterflow'):
     if Cr > 1:
         raise Exception('Heat capacity rate must be less than 1 by definition.')
 
-    if subtype == 'counterflow':
-        # [2]_ gives the expression 1./(1-Cr)*log((1-Cr*eff)/(1-eff)), but
-        # this is just the same equation rearranged differently.
-        if Cr < 1:
-            return 1./(Cr - 1.)*log((effectiveness - 1.)/(effectiveness*Cr - 1.))
-        elif Cr == 1:
-            return effectiveness/(1. - effectiveness)
-    elif subtype == 'parallel':
-        if effectiveness*(1. + Cr) > 1:
-            raise Exception('The specified effectiveness is not physically \
+    try:
+        func, config = _NTU_from_effectiveness_cache[subtype]
+    except (KeyError, TypeError):
+        func, config = _subtype_dispatch(_NTU_from_effectiveness_funcs,
+                                         _NTU_from_effectiveness_cache, subtype)
+        if func is None:
+            raise Exception('Input heat exchanger type not recognized')
+    return func(effectiveness, Cr, config)
+
+
+def _NTU_counterflow(effectiveness, Cr, config):
+    # [2]_ gives the expression 1./(1-Cr)*log((1-Cr*eff)/(1-eff)), but
+    # this is just the same equation rearranged differently.
+    if Cr < 1:
+        return 1./(Cr - 1.)*log((effectiveness - 1.)/(effectiveness*Cr - 1.))
+    elif Cr == 1:
+        return effectiveness/(1. - effectiveness)
+
+
+def _NTU_parallel(effectiveness, Cr, config):
+    if effectiveness*(1. + Cr) > 1:
+        raise Exception('The specified effectiveness is not physically \
 possible for this configuration; the maximum effectiveness possible is %s.' % (1./(Cr + 1.)))
-        return -log(1. - effectiveness*(1. + Cr))/(1. + Cr)
-    elif 'S&T' in subtype:
-        # [2]_ gives the expression
-        # D = (1+Cr**2)**0.5
-        # 1/D*log((2-eff*(1+Cr-D))/(2-eff*(1+Cr + D)))
-        # This is confirmed numerically to be the same equation rearranged
-        # differently
-        str_shells = subtype.split('S&T')[0]
-        shells = int(str_shells) if str_shells else 1
-        
-        F = ((effectiveness*Cr - 1.)/(effectiveness - 1.))**(1./shells)
-        e1 = (F - 1.)/(F - Cr)
-        E = (2./e1 - (1. + Cr))/(1. + Cr**2)**0.5
-        
-        if (E - 1.)/(E + 1.) <= 0:
-            # Derived with SymPy
-            max_effectiveness = (-((-Cr + sqrt(Cr**2 + 1) + 1)/(Cr + sqrt(Cr**2 + 1) - 1))**shells + 1)/(Cr - ((-Cr + sqrt(Cr**2 + 1) + 1)/(Cr + sqrt(Cr**2 + 1) - 1))**shells)
-            raise Exception('The specified effectiveness is not physically \
+    return -log(1. - effectiveness*(1. + Cr))/(1. + Cr)
+
+
+def _NTU_shell_and_tube(effectiveness, Cr, config):
+    # [2]_ gives the expression
+    # D = (1+Cr**2)**0.5
+    # 1/D*log((2-eff*(1+Cr-D))/(2-eff*(1+Cr + D)))
+    # This is confirmed numerically to be the same equation rearranged
+    # differently
+    shells = config.shells
+
+    F = ((effectiveness*Cr - 1.)/(effectiveness - 1.))**(1./shells)
+    e1 = (F - 1.)/(F - Cr)
+    E = (2./e1 - (1. + Cr))/(1. + Cr**2)**0.5
+
+    if (E - 1.)/(E + 1.) <= 0:
+        # Derived with SymPy
+        max_effectiveness = (-((-Cr + sqrt(Cr**2 + 1) + 1)/(Cr + sqrt(Cr**2 + 1) - 1))**shells + 1)/(Cr - ((-Cr + sqrt(Cr**2 + 1) + 1)/(Cr + sqrt(Cr**2 + 1) - 1))**shells)
+        raise Exception('The specified effectiveness is not physically \
 possible for this configuration; the maximum effectiveness possible is %s.' % (max_effectiveness))
-        
-        NTU = -(1. + Cr*Cr)**-0.5*log((E - 1.)/(E + 1.))
-        return shells*NTU
-    elif subtype == 'crossflow':
-        # Can't use a bisect solver here because at high NTU there's a derivative of 0
-        # due to the integral term not changing when it's very near one
-        guess = NTU_from_effectiveness(effectiveness, Cr, 'crossflow approximate')
-        def to_solve(NTU, Cr, effectiveness):
-            return effectiveness_from_NTU(NTU, Cr, subtype='crossflow') - effectiveness
-        return newton(to_solve, guess, args=(Cr, effectiveness))
-    elif subtype == 'crossflow approximate':
-        # This will fail if NTU is more than 10,000 or less than 1E-7, but
-        # this is extremely unlikely to occur in normal usage.
-        # Maple and SymPy and Wolfram Alpha all failed to obtain an exact
-        # analytical expression even with coefficients for 0.22 and 0.78 or 
-        # with an explicit value for Cr. The function has been plotted,
-        # and appears to be monotonic - there is only one solution.
-        def to_solve(NTU, Cr, effectiveness):
-            return (1. - exp(1./Cr*NTU**0.22*(exp(-Cr*NTU**0.78) - 1.))) - effectiveness
-        return ridder(to_solve, a=1E-7, b=1E5, args=(Cr, effectiveness))
-    
-    elif subtype == 'crossflow, mixed Cmin':
-        if Cr*log(1. - effectiveness) < -1:
-            raise Exception('The specified effectiveness is not physically \
+
+    NTU = -(1. + Cr*Cr)**-0.5*log((E - 1.)/(E + 1.))
+    return shells*NTU
+
+
+def _NTU_crossflow(effectiveness, Cr, config):
+    inputs = {'effectiveness': effectiveness, 'Cr': Cr, 'subtype': config.name}
+    try:
+        return _NTU_from_P_crossflow(effectiveness, Cr, 'effectiveness_from_NTU',
+                                     inputs)
+    except Exception:
+        pass
+    # Can't use a bisect solver here because at high NTU there's a derivative of 0
+    # due to the integral term not changing when it's very near one
+    guess = NTU_from_effectiveness(effectiveness, Cr, 'crossflow approximate')
+    def to_solve(NTU, Cr, effectiveness):
+        return _effectiveness_crossflow(NTU, Cr, config) - effectiveness
+    return solve('effectiveness_from_NTU', newton, to_solve, inputs, guess,
+                 args=(Cr, effectiveness))
+
+
+def _NTU_crossflow_approximate(effectiveness, Cr, config):
+    # This will fail if NTU is more than 10,000 or less than 1E-7, but
+    # this is extremely unlikely to occur in normal usage.
+    # Maple and SymPy and Wolfram Alpha all failed to obtain an exact
+    # analytical expression even with coefficients for 0.22 and 0.78 or
+    # with an explicit value for Cr. The function has been plotted,
+    # and appears to be monotonic - there is only one solution.
+    inputs = {'effectiveness': effectiveness, 'Cr': Cr, 'subtype': config.name}
+    kernel = derivative_kernel(_effectiveness_crossflow_approximate, 'NTU')
+    def to_solve_newton(NTU):
+        value, derivative = kernel(NTU, Cr, config)
+        return value - effectiveness, derivative
+    try:
+        return solve('effectiveness_from_NTU', newton_bracketed, to_solve_newton,
+                     inputs, 1E-7, 1E5,
+                     x0=_NTU_from_P_guess(effectiveness, Cr, 1E5))
+    except Exception:
+        pass
+    def to_solve(NTU, Cr, effectiveness):
+        return (1. - exp(1./Cr*NTU**0.22*(exp(-Cr*NTU**0.78) - 1.))) - effectiveness
+    return solve('effectiveness_from_NTU', ridder, to_solve, inputs, 1E-7, 1E5,
+                 args=(Cr, effectiveness))
+
+
+def _NTU_crossflow_mixed_Cmin(effectiveness, Cr, config):
+    if Cr*log(1. - effectiveness) < -1:
+        raise Exception('The specified effectiveness is not physically \
 possible for this configuration; the maximum effectiveness possible is %s.' % (1. - exp(-1./Cr)))
-        return -1./Cr*log(Cr*log(1. - effectiveness) + 1.)
-    
-    elif subtype ==  'crossflow, mixed Cmax':
-        if 1./Cr*log(1. - effectiveness*Cr) < -1:
-            raise Exception('The specified effectiveness is not physically \
+    return -1./Cr*log(Cr*log(1. - effectiveness) + 1.)
+
+
+def _NTU_crossflow_mixed_Cmax(effectiveness, Cr, config):
+    if 1./Cr*log(1. - effectiveness*Cr) < -1:
+        raise Exception('The specified effectiveness is not physically \
 possible for this configuration; the maximum effectiveness possible is %s.' % (((exp(Cr) - 1.0)*exp(-Cr)/Cr)))
-        return -log(1. + 1./Cr*log(1. - effectiveness*Cr))
-    
-    elif subtype in ['boiler', 'condenser']:
-        return -log(1. - effectiveness)
-    else:
-        raise Exception('Input heat exchanger type not recognized')
+    return -log(1. + 1./Cr*log(1. - effectiveness*Cr))
+
+
+def _NTU_boiler(effectiveness, Cr, config):
+    return -log(1. - effectiveness)
+
+
+_NTU_from_effectiveness_funcs = {
+    HXSubtype.COUNTERFLOW: _NTU_counterflow,
+    HXSubtype.PARALLEL: _NTU_parallel,
+    HXSubtype.SHELL_AND_TUBE: _NTU_shell_and_tube,
+    HXSubtype.CROSSFLOW: _NTU_crossflow,
+    HXSubtype.CROSSFLOW_APPROXIMATE: _NTU_crossflow_approximate,
+    HXSubtype.CROSSFLOW_MIXED_CMIN: _NTU_crossflow_mixed_Cmin,
+    HXSubtype.CROSSFLOW_MIXED_CMAX: _NTU_crossflow_mixed_Cmax,
+    HXSubtype.BOILER: _NTU_boiler,
+    HXSubtype.CONDENSER: _NTU_boiler}
+_NTU_from_effectiveness_cache = {}
 
 
 def calc_Cmin(mh, mc, Cph, Cpc):
@@ -873,7 +1145,8 @@ def Pc(x, y):
 
 
 def effectiveness_NTU_method(mh, mc, Cph, Cpc, subtype='counterflow', Thi=None, 
-                             Tho=None, Tci=None, Tco=None, UA=None):
+                             Tho=None, Tci=None, Tco=None, UA=None,
+                             output='dict'):
     r'''Wrapper for the various effectiveness-NTU method function calls,
     which can solve a heat exchanger. The heat capacities and mass flows
     of each stream and the type of the heat exchanger are always required.
@@ -910,6 +1183,10 @@ def effectiveness_NTU_method(mh, mc, Cph, Cpc, subtype='counterflow', Thi=None,
         Outlet temperature of cold fluid, [K]
     UA : float, optional
         Combined Area-heat transfer coefficient term, [W/K]
+    output : str, optional
+        'dict' to return the results as a dict, or 'record' to return them as
+        an :obj:`EffectivenessNTUResult`, which has an attribute for each key
+        and is cheaper to create, [-]
 
     Returns
     -------
@@ -931,6 +1208,7 @@ def effectiveness_NTU_method(mh, mc, Cph, Cpc, subtype='counterflow', Thi=None,
     --------
     effectiveness_from_NTU
     NTU_from_effectiveness
+    effectiveness_NTU_method_batch
 
     Examples
     --------
@@ -968,7 +1246,28 @@ def effectiveness_NTU_method(mh, mc, Cph, Cpc, subtype='counterflow', Thi=None,
      'Tho': 110.06100464203861,
      'UA': 3041.75,
      'effectiveness': 0.6086955357127832}
+
+    The results as a record:
+
+    >>> res = effectiveness_NTU_method(mh=5.2, mc=1.45, Cph=1860., Cpc=1900, 
+    ... subtype='crossflow, mixed Cmax', Tci=15, Thi=130, UA=3041.75,
+    ... output='record')
+    >>> res.Q, res['Tco']
+    (192849.96310220254, 84.99998660697007)
     '''
+    values = _effectiveness_NTU_method(mh, mc, Cph, Cpc, Thi, Tho, Tci, Tco,
+                                       UA, subtype)
+    if output == 'dict':
+        return dict(zip(_effectiveness_NTU_method_fields, values))
+    elif output == 'record':
+        return EffectivenessNTUResult(*values)
+    raise ValueError("output must be 'dict' or 'record'")
+
+
+def _effectiveness_NTU_method(mh, mc, Cph, Cpc, Thi, Tho, Tci, Tco, UA,
+                              subtype):
+    # Results of effectiveness_NTU_method, in the order of
+    # _effectiveness_NTU_method_fields
     Cmin = calc_Cmin(mh=mh, mc=mc, Cph=Cph, Cpc=Cpc)
     Cmax = calc_Cmax(mh=mh, mc=mc, Cph=Cph, Cpc=Cpc)
     Cr = calc_Cr(mh=mh, mc=mc, Cph=Cph, Cpc=Cpc)
@@ -1037,10 +1336,181 @@ def effectiveness_NTU_method(mh, mc, Cph, Cpc, subtype='counterflow', Thi=None,
         effectiveness = Q/Cmin/(Thi-Tci)
         NTU = NTU_from_effectiveness(effectiveness, Cr, subtype=subtype)
         UA = UA_from_NTU(NTU, Cmin)    
-    return {'Q': Q, 'UA': UA, 'Cr':Cr, 'Cmin': Cmin, 'Cmax':Cmax, 
-            'effectiveness': effectiveness, 'NTU': NTU, 'Thi': Thi, 'Tho': Tho,
-            'Tci': Tci, 'Tco': Tco} 
-        
+    return (Q, UA, Cr, Cmin, Cmax, effectiveness, NTU, Thi, Tho, Tci, Tco)
+
+
+_effectiveness_NTU_method_fields = ('Q', 'UA', 'Cr', 'Cmin', 'Cmax',
+                                    'effectiveness', 'NTU', 'Thi', 'Tho',
+                                    'Tci', 'Tco')
+effectiveness_NTU_method_dtype = np.dtype([(name, float) for name in
+                                           _effectiveness_NTU_method_fields])
+
+
+class _MethodResult(object):
+    __slots__ = ()
+
+    def __getitem__(self, key):
+        if key not in self.__slots__:
+            raise KeyError(key)
+        return getattr(self, key)
+
+    def keys(self):
+        return list(self.__slots__)
+
+    def as_dict(self):
+        '''Returns the results as the dict the function returns by default.'''
+        return dict((name, getattr(self, name)) for name in self.__slots__)
+
+    def __repr__(self):
+        return '%s(%s)' %(type(self).__name__, ', '.join('%s=%r' %(name, getattr(self, name))
+                                                         for name in self.__slots__))
+
+
+class EffectivenessNTUResult(_MethodResult):
+    r'''Results of :obj:`effectiveness_NTU_method` with `output='record'`; it
+    has an attribute for each key of the dict returned by default, which may
+    also be read by indexing with the key.
+    '''
+    __slots__ = _effectiveness_NTU_method_fields
+
+    def __init__(self, Q, UA, Cr, Cmin, Cmax, effectiveness, NTU, Thi, Tho,
+                 Tci, Tco):
+        self.Q = Q
+        self.UA = UA
+        self.Cr = Cr
+        self.Cmin = Cmin
+        self.Cmax = Cmax
+        self.effectiveness = effectiveness
+        self.NTU = NTU
+        self.Thi = Thi
+        self.Tho = Tho
+        self.Tci = Tci
+        self.Tco = Tco
+
+
+def _method_batch(method, fields, dtype, inputs, options, out, output):
+    # Calls `method` for each element of the broadcast numeric `inputs`
+    # (None where not given), writing each tuple of results into `out`
+    given = [i for i, value in enumerate(inputs) if value is not None]
+    arrays = np.broadcast_arrays(*[np.asarray(inputs[i], dtype=float) for i in given])
+    shape = arrays[0].shape
+    columns = [array.ravel().tolist() for array in arrays]
+    if out is None:
+        if output == 'structured':
+            out = np.empty(shape, dtype=dtype)
+        elif output == 'columns':
+            out = dict((name, np.empty(shape)) for name in fields)
+        else:
+            raise ValueError("output must be 'structured' or 'columns'")
+    if isinstance(out, dict):
+        targets = [out[name] for name in fields]
+    else:
+        if out.dtype != dtype:
+            raise ValueError('out must be a structured array with dtype %s'
+                             %(dtype))
+        targets = [out]
+    for target in targets:
+        if target.shape != shape or not target.flags.c_contiguous:
+            raise ValueError('out must be C-contiguous, with the shape %s of the '
+                             'inputs' %(shape,))
+    flat = [target.reshape(-1) for target in targets]
+    args = list(inputs)
+    for k in range(len(columns[0]) if columns else 0):
+        for i, column in zip(given, columns):
+            args[i] = column[k]
+        values = method(*(args + options))
+        if len(flat) == 1:
+            flat[0][k] = values
+        else:
+            for target, value in zip(flat, values):
+                target[k] = value
+    return out
+
+
+def effectiveness_NTU_method_batch(mh, mc, Cph, Cpc, subtype='counterflow',
+                                   Thi=None, Tho=None, Tci=None, Tco=None,
+                                   UA=None, out=None, output='structured'):
+    r'''Solves many heat exchangers with :obj:`effectiveness_NTU_method`,
+    writing the results into columns instead of returning a dict for each.
+    The numeric inputs may be arrays, which are broadcast together; the same
+    inputs must be given (not None) for every exchanger.
+
+    Parameters
+    ----------
+    mh : float or array
+        Mass flow rate of hot stream, [kg/s]
+    mc : float or array
+        Mass flow rate of cold stream, [kg/s]
+    Cph : float or array
+        Averaged heat capacity of hot stream, [J/kg/K]
+    Cpc : float or array
+        Averaged heat capacity of cold stream, [J/kg/K]
+    subtype : str, optional
+        The subtype of exchanger, as for :obj:`effectiveness_NTU_method`, [-]
+    Thi : float or array, optional
+        Inlet temperature of hot fluid, [K]
+    Tho : float or array, optional
+        Outlet temperature of hot fluid, [K]
+    Tci : float or array, optional
+        Inlet temperature of cold fluid, [K]
+    Tco : float or array, optional
+        Outlet temperature of cold fluid, [K]
+    UA : float or array, optional
+        Combined Area-heat transfer coefficient term, [W/K]
+    out : ndarray or dict, optional
+        Where to write the results: a C-contiguous structured array with the
+        dtype :obj:`effectiveness_NTU_method_dtype`, or a dict of C-contiguous
+        float arrays with the keys of the results; either with the shape of
+        the broadcast inputs, [-]
+    output : str, optional
+        If `out` is not given, 'structured' to return a structured array or
+        'columns' to return a dict of arrays, [-]
+
+    Returns
+    -------
+    results : ndarray or dict
+        Results with the keys of those of :obj:`effectiveness_NTU_method`;
+        `out` if it was given, [-]
+
+    Notes
+    -----
+    Exceptions are raised as :obj:`effectiveness_NTU_method` raises them;
+    when one is, the results of the exchangers before it have been written.
+
+    Examples
+    --------
+    >>> res = effectiveness_NTU_method_batch(mh=5.2, mc=1.45, Cph=1860.,
+    ... Cpc=1900, subtype='crossflow, mixed Cmax', Tci=15, Thi=130,
+    ... UA=[3000., 3041.75])
+    >>> res['Tco']
+    array([84.51842937, 84.99998661])
+    '''
+    subtype = _parse_subtype(subtype)
+    return _method_batch(_effectiveness_NTU_method,
+                         _effectiveness_NTU_method_fields,
+                         effectiveness_NTU_method_dtype,
+                         [mh, mc, Cph, Cpc, Thi, Tho, Tci, Tco, UA], [subtype],
+                         out, output)
+
+
+
+def _air_cooler_1_pass(R1, NTU1, N):
+    # Effectiveness of N rows 1 pass, on arrays of R1 and NTU1; the last
+    # axis is used for the sum over the rows
+    K = -np.expm1(-NTU1/N)
+    R1, K = np.broadcast_arrays(R1, K)
+    j = np.arange(N)
+    terms = bdtrc(j, N, K[..., None])*pdtr(j, (N*K*R1)[..., None])
+    return (1. - terms.sum(axis=-1)/(N*K))/R1
+
+
+def _temperature_effectiveness_air_cooler_vectorized(R1, NTU1, rows, passes):
+    if np.ndim(rows) == 0 and np.ndim(passes) == 0 and passes == 1:
+        return _air_cooler_1_pass(np.asarray(R1, dtype=float),
+                                  np.asarray(NTU1, dtype=float), int(rows))
+    return np.vectorize(temperature_effectiveness_air_cooler)(R1, NTU1, rows,
+                                                              passes)
+
 
 def temperature_effectiveness_air_cooler(R1, NTU1, rows, passes):
     r'''Returns temperature effectiveness `P1` of an air cooler with 
@@ -1129,6 +1599,19 @@ def temperature_effectiveness_air_cooler(R1, NTU1, rows, passes):
 
     Notes
     -----
+    The N rows 1 pass double sum is evaluated in an equivalent form with
+    one sum of N terms, all of them between 0 and 1. With
+    :math:`\exp(-NTU/N) = 1-K`, the inner terms are binomial probabilities
+    and the sums over `k` are Poisson cumulative probabilities, and the sum
+    over `i` collapses to a binomial survival function:
+
+    .. math::
+        P = \frac{1}{R}\left[1 - \frac{1}{NK}\sum_{j=0}^{N-1}
+        \Pr(B_{N, K} > j) \Pr(\Pi_{NKR} \le j)\right]
+
+    Where :math:`B_{N, K}` is binomially distributed with `N` trials of
+    probability `K` and :math:`\Pi_{NKR}` is Poisson distributed with mean
+    `NKR`. This is O(N) and does not overflow; hundreds of rows may be used.
 
     Examples
     --------
@@ -1147,37 +1630,12 @@ def temperature_effectiveness_air_cooler(R1, NTU1, rows, passes):
        Chem. 223, Pretoria, South Africa (1972).
     '''
     if passes == 1:
-        N = rows
-        K = 1. - exp(-NTU1/N)
-        NKR1 = N*K*R1
-        NTU1_N = NTU1/N
-        top = N*exp(N*K*R1)
-        # Precalculate integer factorials up to N
-        factorials = [factorial(i) for i in range(N)]
-        K_powers = [K**j for j in range(0, N+1)]
-        NKR1_powers = [NKR1**k for k in range(0, N+1)]
-        exp_terms = [exp(i*NTU1_N) for i in range(-N+1, 1)]
-        NKR1_powers_over_factorials = [NKR1_powers[k]/factorials[k] 
-                                       for k in range(N)]
-        
-        # Precompute even more...
-        NKR1_pows_div_factorials = [0]
-        for k in NKR1_powers_over_factorials:
-            NKR1_pows_div_factorials.append(NKR1_pows_div_factorials[-1]+k)
-        NKR1_pows_div_factorials.pop(0)
-        
-        final_speed = [i*j for i, j in zip(K_powers, NKR1_pows_div_factorials)]
-        
-        tot = 0.
-        for i in range(1, N):
-            for j in range(0, i+1):
-                # can't optimize the factorial
-                prod = factorials[i]/(factorials[i-j]*factorials[j])
-                tot1 = prod*exp_terms[j-i-1]
-                tot += tot1*final_speed[j]
-    
-        return 1./R1*(1. - 1./(top/(1.+tot)))
-    elif rows == passes == 2:
+        return float(_air_cooler_1_pass(R1, NTU1, rows))
+    return _air_cooler_multiple_passes(R1, NTU1, rows, passes)
+
+
+def _air_cooler_multiple_passes(R1, NTU1, rows, passes):
+    if rows == passes == 2:
         K = 1. - exp(-0.5*NTU1)
         xi = 0.5*K + (1. - 0.5*K)*exp(2.*K*R1)
         return 1./R1*(1. - 1./xi)
@@ -1318,36 +1776,82 @@ def temperature_effectiveness_basic(R1, NTU1, subtype='crossflow'):
        and Mass Transfer 36, no. 2 (February 1, 2009): 121-24. 
        doi:10.1016/j.icheatmasstransfer.2008.10.012.
     '''
-    if subtype == 'counterflow':
-        # Same as TEMA 1 pass
-        P1 = (1 - exp(-NTU1*(1 - R1)))/(1 - R1*exp(-NTU1*(1-R1)))
-    elif subtype == 'parallel':
-        P1 = (1 - exp(-NTU1*(1 + R1)))/(1 + R1)
-    elif subtype == 'crossflow approximate':
-        # This isn't technically accurate, an infinite sum is required
-        # It has been computed from two different sources
-        # but is found not to be within the 1% claimed of this equation
-        P1 = 1 - exp(NTU1**0.22/R1*(exp(-R1*NTU1**0.78) - 1.))
-    elif subtype == 'crossflow':
-        def to_int(v, NTU1, R1):
-            return (1. + NTU1 - v*v/(4.*R1*NTU1))*exp(-v*v/(4.*R1*NTU1))*v*iv(0, v)
-        int_term = quad(to_int, 0, 2.*NTU1*R1**0.5, args=(NTU1, R1))[0]
-        P1 = 1./R1 - exp(-R1*NTU1)/(2.*(R1*NTU1)**2)*int_term
-    elif subtype == 'crossflow, mixed 1':
-        # Not symmetric
-        K = 1 - exp(-R1*NTU1)
-        P1 = 1 - exp(-K/R1)
-    elif subtype == 'crossflow, mixed 2':
-        # Not symmetric
-        K = 1 - exp(-NTU1)
-        P1 = (1 - exp(-K*R1))/R1
-    elif subtype == 'crossflow, mixed 1&2':
-        K1 = 1. - exp(-NTU1)
-        K2 = 1. - exp(-R1*NTU1)
-        P1 = (1./K1 + R1/K2 - 1./NTU1)**-1
-    else:
-        raise Exception('Subtype not recognized.')
-    return P1
+    try:
+        func = _temperature_effectiveness_basic_cache[subtype][0]
+    except (KeyError, TypeError):
+        func = _subtype_dispatch(_temperature_effectiveness_basic_funcs,
+                                 _temperature_effectiveness_basic_cache, subtype)[0]
+        if func is None:
+            raise Exception('Subtype not recognized.')
+    return func(R1, NTU1)
+
+
+def _P1_counterflow(R1, NTU1):
+    # Same as TEMA 1 pass
+    return (1 - exp(-NTU1*(1 - R1)))/(1 - R1*exp(-NTU1*(1-R1)))
+
+
+def _P1_parallel(R1, NTU1):
+    return (1 - exp(-NTU1*(1 + R1)))/(1 + R1)
+
+
+def _P1_crossflow_approximate(R1, NTU1):
+    # This isn't technically accurate, an infinite sum is required
+    # It has been computed from two different sources
+    # but is found not to be within the 1% claimed of this equation
+    return 1 - exp(NTU1**0.22/R1*(exp(-R1*NTU1**0.78) - 1.))
+
+
+def _P1_crossflow(R1, NTU1):
+    def to_int(v, NTU1, R1):
+        return (1. + NTU1 - v*v/(4.*R1*NTU1))*exp(-v*v/(4.*R1*NTU1))*v*iv(0, v)
+    int_term = quad(to_int, 0, 2.*NTU1*R1**0.5, args=(NTU1, R1))[0]
+    return 1./R1 - exp(-R1*NTU1)/(2.*(R1*NTU1)**2)*int_term
+
+
+def _P1_crossflow_series(R1, NTU1):
+    # Exact series for P1 of crossflow with both fluids unmixed [4]_, and its
+    # derivative with respect to NTU1; in terms of the Poisson distribution,
+    # P1 = 1/(R1*NTU1) sum_n pdtrc(n, NTU1)*pdtrc(n, R1*NTU1), summed until
+    # the terms are negligible
+    RNTU1 = R1*NTU1
+    x = max(NTU1, RNTU1)
+    n = np.arange(int(x + 12.*sqrt(x) + 40.))
+    a, b = pdtrc(n, NTU1), pdtrc(n, RNTU1)
+    da = np.exp(xlogy(n, NTU1) - NTU1 - gammaln(n + 1.))
+    db = R1*np.exp(xlogy(n, RNTU1) - RNTU1 - gammaln(n + 1.))
+    S = float(np.dot(a, b))
+    dS = float(np.dot(da, b) + np.dot(a, db))
+    return S/RNTU1, (dS - S/NTU1)/RNTU1
+
+
+def _P1_crossflow_mixed_1(R1, NTU1):
+    # Not symmetric
+    K = 1 - exp(-R1*NTU1)
+    return 1 - exp(-K/R1)
+
+
+def _P1_crossflow_mixed_2(R1, NTU1):
+    # Not symmetric
+    K = 1 - exp(-NTU1)
+    return (1 - exp(-K*R1))/R1
+
+
+def _P1_crossflow_mixed_12(R1, NTU1):
+    K1 = 1. - exp(-NTU1)
+    K2 = 1. - exp(-R1*NTU1)
+    return (1./K1 + R1/K2 - 1./NTU1)**-1
+
+
+_temperature_effectiveness_basic_funcs = {
+    HXSubtype.COUNTERFLOW: _P1_counterflow,
+    HXSubtype.PARALLEL: _P1_parallel,
+    HXSubtype.CROSSFLOW_APPROXIMATE: _P1_crossflow_approximate,
+    HXSubtype.CROSSFLOW: _P1_crossflow,
+    HXSubtype.CROSSFLOW_MIXED_1: _P1_crossflow_mixed_1,
+    HXSubtype.CROSSFLOW_MIXED_2: _P1_crossflow_mixed_2,
+    HXSubtype.CROSSFLOW_MIXED_12: _P1_crossflow_mixed_12}
+_temperature_effectiveness_basic_cache = {}
 
 
 def temperature_effectiveness_TEMA_J(R1, NTU1, Ntp):
@@ -2955,6 +3459,7 @@ def _NTU_from_P_objective(NTU1, R1, P1, function, **kwargs):
             raise Exception('For some reverse P-NTU numerical solutions, the \
 intermediary results are ill-conditioned and do not fit in a float; mpmath must \
 be installed for this calculation to proceed.')
+        note_mpmath_fallback()
         globals()['exp'] = mpmath.exp
         P1_calc = float(function(R1, NTU1, **kwargs))
         globals()['exp'] = math.exp
@@ -2972,9 +3477,170 @@ def _NTU_from_P_solver(P1, R1, NTU_min, NTU_max, function, **kwargs):
         raise ValueError('No solution possible gives such a high P1; maximum P1=%f at NTU1=%f' %(P1_max, NTU_max))
     if P1 < P1_min:
         raise ValueError('No solution possible gives such a low P1; minimum P1=%f at NTU1=%f' %(P1_min, NTU_min))
+    inputs = {'P1': P1, 'R1': R1}
+    inputs.update(kwargs)
+    # Newton's method with the exact derivative first; the bracketing solver
+    # if it cannot be used or fails
+    try:
+        kernel = _P1_NTU1_derivative(function, kwargs)
+    except ValueError:
+        kernel = None
+    if kernel is not None:
+        def to_solve_newton(NTU1):
+            value, derivative = kernel(R1, NTU1)
+            return value - P1, derivative
+        try:
+            return solve(function.__name__, newton_bracketed, to_solve_newton,
+                         inputs, NTU_min, NTU_max,
+                         x0=_NTU_from_P_guess(P1, R1, NTU_max),
+                         fa=P1_min - P1, fb=P1_max - P1)
+        except Exception:
+            pass
     # Construct the function as a lambda expression as solvers don't support kwargs
     to_solve = lambda NTU1: _NTU_from_P_objective(NTU1, R1, P1, function, **kwargs)
-    return ridder(to_solve, NTU_min, NTU_max)
+    return solve(function.__name__, ridder, to_solve, inputs, NTU_min, NTU_max)
+
+
+def _P1_NTU1_derivative(function, kwargs):
+    # Returns a function of R1 and NTU1 returning P1 and dP1/dNTU1
+    if function is temperature_effectiveness_basic:
+        function = _subtype_dispatch(_temperature_effectiveness_basic_funcs,
+                                     _temperature_effectiveness_basic_cache,
+                                     kwargs['subtype'])[0]
+        kwargs = {}
+    kernel = derivative_kernel(function, 'NTU1')
+    return lambda R1, NTU1: kernel(R1, NTU1, **kwargs)
+
+
+def _NTU_from_P_guess(P1, R1, NTU_max):
+    # NTU1 of a counterflow exchanger, the most effective arrangement, and so
+    # a lower bound on the NTU1 of any other; or None
+    try:
+        if R1 == 1.:
+            NTU1 = P1/(1. - P1)
+        else:
+            NTU1 = log((1. - R1*P1)/(1. - P1))/(1. - R1)
+    except (ValueError, ZeroDivisionError):
+        return None
+    return NTU1 if 0. < NTU1 < NTU_max else None
+
+
+def _NTU_from_P_crossflow(P1, R1, function, inputs):
+    # Crossflow with both fluids unmixed, solved with the exact series; P1
+    # rises towards its limit as NTU1 increases, from the counterflow NTU1
+    if P1 <= 0. or P1 >= min(1., 1./R1):
+        raise ValueError('No solution possible gives such a P1; P1 must be '
+                         'between 0 and %f' %(min(1., 1./R1)))
+    def to_solve(NTU1):
+        value, derivative = _P1_crossflow_series(R1, NTU1)
+        return value - P1, derivative
+    return solve(function, newton_bracketed, to_solve, inputs, 0., 1E5,
+                 x0=_NTU_from_P_guess(P1, R1, 1E5), fa=-P1, fb=1.)
+
+
+def _bisection_point(a, b):
+    # Midpoint of a bracket; geometric when it spans orders of magnitude
+    if a > 0. and b > 4.*a:
+        return sqrt(a*b)
+    return 0.5*(a + b)
+
+
+def newton_bracketed(f, a, b, x0=None, fa=None, fb=None, xtol=2E-12,
+                     rtol=8.881784197001252e-16, maxiter=100,
+                     full_output=False, disp=True):
+    r'''Finds a root of a function in the interval [`a`, `b`] with Newton's
+    method, safeguarded so the root stays bracketed: a step which would leave
+    the bracket, or would not shrink faster than bisection, is replaced by a
+    bisection step (geometric, when the bracket spans orders of magnitude).
+    This is the method `rtsafe` of [1]_.
+
+    Parameters
+    ----------
+    f : callable
+        Function returning its value and its derivative at `x`, [-]
+    a : float
+        One end of the bracket, [-]
+    b : float
+        The other end of the bracket, [-]
+    x0 : float, optional
+        Initial guess, the middle of the bracket if not given, [-]
+    fa : float, optional
+        Value of `f` at `a`, or a number of the same sign, [-]
+    fb : float, optional
+        Value of `f` at `b`, or a number of the same sign, [-]
+    xtol : float, optional
+        Absolute tolerance on the root, [-]
+    rtol : float, optional
+        Relative tolerance on the root, [-]
+    maxiter : int, optional
+        Maximum number of iterations, [-]
+    full_output : bool, optional
+        Whether to return a :obj:`scipy.optimize.RootResults` as well, [-]
+    disp : bool, optional
+        Whether to raise a RuntimeError if the method does not converge, [-]
+
+    Returns
+    -------
+    x : float
+        Root of `f`, [-]
+
+    References
+    ----------
+    .. [1] Press, William H., Saul A. Teukolsky, William T. Vetterling, and
+       Brian P. Flannery. Numerical Recipes 3rd Edition: The Art of
+       Scientific Computing. Cambridge University Press, 2007.
+    '''
+    calls = 0
+    if fa is None:
+        fa, calls = f(a)[0], calls + 1
+    if fb is None:
+        fb, calls = f(b)[0], calls + 1
+    if fa*fb > 0.:
+        raise ValueError('f(a) and f(b) must have different signs')
+    # f(lo) < 0 < f(hi)
+    lo, hi = (a, b) if fa < 0. else (b, a)
+    low, high = min(a, b), max(a, b)
+    x = x0 if x0 is not None and low < x0 < high else _bisection_point(low, high)
+    if fa == 0. or fb == 0.:
+        x, iterations, converged = (a if fa == 0. else b), 0, True
+    else:
+        dx = dx_old = high - low
+        converged = False
+        for iterations in range(1, maxiter + 1):
+            fx, dfx = f(x)
+            calls += 1
+            if fx != fx:
+                raise ValueError('f(x) is not finite at x=%r' %(x))
+            if fx == 0.:
+                converged = True
+                break
+            if fx < 0.:
+                lo = x
+            else:
+                hi = x
+            low, high = min(lo, hi), max(lo, hi)
+            newton = dfx != 0. and abs(2.*fx) <= abs(dx_old*dfx)
+            if newton:
+                x_new = x - fx/dfx
+                newton = low < x_new < high
+            if not newton:
+                x_new = _bisection_point(low, high)
+            dx_old, dx = dx, abs(x_new - x)
+            x = x_new
+            if dx <= xtol + rtol*abs(x):
+                converged = True
+                break
+    if not converged and disp:
+        raise RuntimeError('Failed to converge after %d iterations, value is %r'
+                           %(iterations, x))
+    if full_output:
+        try:
+            results = RootResults(x, iterations, calls, 0 if converged else -1,
+                                  'newton_bracketed')
+        except TypeError: # pragma: no cover
+            results = RootResults(x, iterations, calls, 0 if converged else -1)
+        return x, results
+    return x
 
 
 def _NTU_max_for_P_solver(data, R1):
@@ -3078,26 +3744,39 @@ def NTU_from_P_basic(P1, R1, subtype='crossflow'):
     '''
     NTU_min = 1E-11
     function = temperature_effectiveness_basic
-    if subtype == 'counterflow':
-        return -log((P1*R1 - 1.)/(P1 - 1.))/(R1 - 1.)
-    elif subtype == 'parallel':
-        return log(-1./(P1*(R1 + 1.) - 1.))/(R1 + 1.)
-    elif subtype == 'crossflow, mixed 1':
-        return -log(R1*log(-(P1 - 1.)*exp(1./R1)))/R1
-    elif subtype == 'crossflow, mixed 2':
-        return -log(log(-(P1*R1 - 1.)*exp(R1))/R1)
-    elif subtype == 'crossflow, mixed 1&2':
-        NTU_max = _NTU_max_for_P_solver(NTU_from_P_basic_crossflow_mixed_12, R1)        
-    elif subtype == 'crossflow approximate':
+    try:
+        func, config = _NTU_from_P_basic_cache[subtype]
+    except (KeyError, TypeError):
+        func, config = _subtype_dispatch(_NTU_from_P_basic_funcs,
+                                         _NTU_from_P_basic_cache, subtype)
+    if func is not None:
+        return func(P1, R1)
+    code = config.code
+    if code == HXSubtype.CROSSFLOW_MIXED_12:
+        NTU_max = _NTU_max_for_P_solver(NTU_from_P_basic_crossflow_mixed_12, R1)
+    elif code == HXSubtype.CROSSFLOW_APPROXIMATE:
         # These are tricky but also easy because P1 can always be 1
         NTU_max = 1E5
-    elif subtype == 'crossflow':
-        guess = NTU_from_P_basic(P1, R1, subtype='crossflow approximate')
-        to_solve = lambda NTU1 : _NTU_from_P_objective(NTU1, R1, P1, function, subtype='crossflow')
-        return newton(to_solve, guess)
+    elif code == HXSubtype.CROSSFLOW:
+        inputs = {'P1': P1, 'R1': R1, 'subtype': config.name}
+        try:
+            return _NTU_from_P_crossflow(P1, R1, function.__name__, inputs)
+        except Exception:
+            pass
+        guess = NTU_from_P_basic(P1, R1, subtype=HXSubtype.CROSSFLOW_APPROXIMATE)
+        to_solve = lambda NTU1 : _NTU_from_P_objective(NTU1, R1, P1, function, subtype=config.name)
+        return solve(function.__name__, newton, to_solve, inputs, guess)
     else:
         raise Exception('Subtype not recognized.')
-    return _NTU_from_P_solver(P1, R1, NTU_min, NTU_max, function, subtype=subtype)
+    return _NTU_from_P_solver(P1, R1, NTU_min, NTU_max, function, subtype=config.name)
+
+
+_NTU_from_P_basic_funcs = {
+    HXSubtype.COUNTERFLOW: lambda P1, R1: -log((P1*R1 - 1.)/(P1 - 1.))/(R1 - 1.),
+    HXSubtype.PARALLEL: lambda P1, R1: log(-1./(P1*(R1 + 1.) - 1.))/(R1 + 1.),
+    HXSubtype.CROSSFLOW_MIXED_1: lambda P1, R1: -log(R1*log(-(P1 - 1.)*exp(1./R1)))/R1,
+    HXSubtype.CROSSFLOW_MIXED_2: lambda P1, R1: -log(log(-(P1*R1 - 1.)*exp(R1))/R1)}
+_NTU_from_P_basic_cache = {}
 
 
 def NTU_from_P_G(P1, R1, Ntp, optimal=True):
@@ -3160,7 +3839,7 @@ def NTU_from_P_G(P1, R1, Ntp, optimal=True):
     Examples
     --------
     >>> NTU_from_P_G(P1=.573, R1=1/3., Ntp=1)
-    0.9999513707769526
+    0.9999513707759521
     '''
     NTU_min = 1E-11
     function = temperature_effectiveness_TEMA_G
@@ -3212,12 +3891,13 @@ def NTU_from_P_J(P1, R1, Ntp):
     numerically, with NTU1 ranging from 1E-11 to 1E3. NTU1 grows extremely
     quickly near its upper limit (NTU1 diverges to infinity at this maximum, 
     but because the solver is bounded it will only increase up to 1000 before
-    an exception is raised).
+    an exception is raised). Near the limit P1 is so flat that any NTU1 from
+    about 40 up reproduces it to within rounding error.
         
     >>> NTU_from_P_J(P1=.995024, R1=.01, Ntp=1)
-    13.940758760696617
+    13.940758766652785
     >>> NTU_from_P_J(P1=.99502487562188, R1=.01, Ntp=1)
-    536.4817955951684
+    39.50871168863796
     >>> NTU_from_P_J(P1=.99502487562189, R1=.01, Ntp=1)
     Traceback (most recent call last):
     ValueError: No solution possible gives such a high P1; maximum P1=0.995025 at NTU1=1000.000000
@@ -3230,7 +3910,7 @@ def NTU_from_P_J(P1, R1, Ntp):
     Examples
     --------
     >>> NTU_from_P_J(P1=.57, R1=1/3., Ntp=1)
-    1.0003070138879648
+    1.0003070138879657
     '''
     NTU_min = 1E-11
     function = temperature_effectiveness_TEMA_J
@@ -3414,7 +4094,7 @@ def NTU_from_P_H(P1, R1, Ntp, optimal=True):
     Examples
     --------
     >>> NTU_from_P_H(P1=0.573, R1=1/3., Ntp=1)
-    0.9997628696881165
+    0.9997628696891162
     '''
     NTU_min = 1E-11
     function = temperature_effectiveness_TEMA_H
@@ -3518,7 +4198,7 @@ def NTU_from_P_plate(P1, R1, Np1, Np2, counterflow=True,
     orientation.
     
     >>> NTU_from_P_plate(P1=0.5743, R1=1/3., Np1=3, Np2=1)
-    0.9998336056060733
+    0.9998336056090735
     '''
     NTU_min = 1E-11
     function = temperature_effectiveness_plate
@@ -3579,8 +4259,539 @@ def NTU_from_P_plate(P1, R1, Np1, Np2, counterflow=True,
                               passes_counterflow=passes_counterflow)
 
 
+def _Pp_vectorized(x, y):
+    with np.errstate(divide='ignore', invalid='ignore', over='ignore'):
+        z = (1. - np.exp(-x*(1. + y)))/(1. + y)
+    return np.where(1. + y == 0., x, z)
+
+
+def _Pc_vectorized(x, y):
+    with np.errstate(divide='ignore', invalid='ignore', over='ignore'):
+        term = np.exp(-x*(1. - y))
+        z = (1. - term)/(1. - y*term)
+        return np.where(1. - y*term == 0., x/(1. + x), z)
+
+
+# Array kernels of temperature_effectiveness_plate, one per pass arrangement;
+# the terms from Pp and Pc are calculated once and reused in each formula.
+
+def _plate_1_1_counterflow(R1, NTU1):
+    return _Pc_vectorized(NTU1, R1)
+
+
+def _plate_1_1_parallel(R1, NTU1):
+    return _Pp_vectorized(NTU1, R1)
+
+
+def _plate_1_2(R1, NTU1):
+    A = _Pp_vectorized(NTU1, 0.5*R1)
+    B = _Pc_vectorized(NTU1, 0.5*R1)
+    return 0.5*(A + B - 0.5*A*B*R1)
+
+
+def _plate_1_3_counterflow(R1, NTU1):
+    A = _Pp_vectorized(NTU1, R1/3.)
+    B = _Pc_vectorized(NTU1, R1/3.)
+    return 1/3.*(A + B*(1. - R1*A/3.)*(2. - R1*B/3.))
+
+
+def _plate_1_3_parallel(R1, NTU1):
+    A = _Pp_vectorized(NTU1, R1/3.)
+    B = _Pc_vectorized(NTU1, R1/3.)
+    return 1/3.*(B + A*(1. - R1*B/3.)*(2. - R1*A/3.))
+
+
+def _plate_1_4(R1, NTU1):
+    A = _Pp_vectorized(NTU1, 0.25*R1)
+    B = _Pc_vectorized(NTU1, 0.25*R1)
+    t3 = (1. - 0.25*A*R1)*(1. - 0.25*B*R1)
+    return (1. - t3*t3)/R1
+
+
+def _plate_2_2_counterflow_parallel_passes(R1, NTU1):
+    A = _Pp_vectorized(0.5*NTU1, R1)
+    return (2.*A - A*A*(1. + R1))/(1. - R1*A*A)
+
+
+def _plate_2_2_parallel_counterflow_passes(R1, NTU1):
+    B = _Pc_vectorized(0.5*NTU1, R1)
+    return B*(2. - B*(1. + R1))
+
+
+def _plate_2_3_counterflow(R1, NTU1):
+    H = _Pp_vectorized(0.5*NTU1, 2./3.*R1)
+    G = _Pc_vectorized(0.5*NTU1, 2./3.*R1)
+    E = 1./(2./3.*R1*G)
+    F = 1./(2./3.*R1*H)
+    E2 = E*E
+    F2 = F*F
+    A = (2.*R1*E*F2 - 2.*E*F + F - F2)/(2.*R1*E2*F2 - E2 - F2 - 2.*E*F + E + F)
+    C = (1. - A)/E
+    D = R1*E*E*C - R1*E + R1 - 0.5*C
+    B = A*(E - 1.)/F
+    return (A + 0.5*B + 0.5*C + D)/R1
+
+
+def _plate_2_3_parallel(R1, NTU1):
+    D = 2*R1/3.
+    A = _Pp_vectorized(NTU1/2, D)
+    B = _Pc_vectorized(NTU1/2, D)
+    return (A + B - (2/9. + D/3.)*(A*A + B*B)
+            -(5./9. + 4./3.*D)*A*B
+            + D*(1. + D)*A*B*(A + B)/3.
+            - D*D*A*A*B*B/9.)
+
+
+def _plate_2_4_counterflow(R1, NTU1):
+    A = _Pp_vectorized(0.5*NTU1, 0.5*R1)
+    B = _Pc_vectorized(0.5*NTU1, 0.5*R1)
+    D = 0.5*(A + B - 0.5*A*B*R1)
+    return (2.*D - (1. + R1)*D*D)/(1. - D*D*R1)
+
+
+def _plate_2_4_parallel(R1, NTU1):
+    A = _Pp_vectorized(0.5*NTU1, 0.5*R1)
+    B = _Pc_vectorized(0.5*NTU1, 0.5*R1)
+    D = 0.5*(A + B - 0.5*A*B*R1)
+    return 2.*D - ((1. + R1)*D*D)
+
+
+# Kernels keyed by (Np1, Np2, counterflow, passes_counterflow)
+_plate_kernels = {(2, 2, True, False): _plate_2_2_counterflow_parallel_passes,
+                  (2, 2, False, True): _plate_2_2_parallel_counterflow_passes,
+                  (2, 2, True, True): _plate_1_1_counterflow,
+                  (2, 2, False, False): _plate_1_1_parallel}
+for _pcf in (True, False):
+    for _cf in (True, False):
+        _plate_kernels[(1, 2, _cf, _pcf)] = _plate_1_2
+        _plate_kernels[(1, 4, _cf, _pcf)] = _plate_1_4
+    _plate_kernels[(1, 1, True, _pcf)] = _plate_1_1_counterflow
+    _plate_kernels[(1, 1, False, _pcf)] = _plate_1_1_parallel
+    _plate_kernels[(1, 3, True, _pcf)] = _plate_1_3_counterflow
+    _plate_kernels[(1, 3, False, _pcf)] = _plate_1_3_parallel
+    _plate_kernels[(2, 3, True, _pcf)] = _plate_2_3_counterflow
+    _plate_kernels[(2, 3, False, _pcf)] = _plate_2_3_parallel
+    _plate_kernels[(2, 4, True, _pcf)] = _plate_2_4_counterflow
+    _plate_kernels[(2, 4, False, _pcf)] = _plate_2_4_parallel
+
+# Upper bound on NTU1 when solving each kernel backwards; a number, or the
+# data of the Pade approximation of the bound as a function of R1. As in
+# NTU_from_P_plate, the 1 pass/1 pass kernels are solved analytically.
+_plate_NTU_maxs = {_plate_1_2: 100., _plate_1_3_counterflow: 100.,
+                   _plate_1_3_parallel: 100., _plate_1_4: 100.,
+                   _plate_2_2_counterflow_parallel_passes: 100.,
+                   _plate_2_2_parallel_counterflow_passes: NTU_from_plate_2_2_parallel_counterflow,
+                   _plate_2_3_counterflow: 100.,
+                   _plate_2_3_parallel: NTU_from_plate_2_3_parallel,
+                   _plate_2_4_counterflow: 100.,
+                   _plate_2_4_parallel: NTU_from_plate_2_4_parallel}
+
+
+def _plate_groups(Np1, Np2, counterflow, passes_counterflow):
+    # Yields each distinct pass arrangement in the inputs, and where it is
+    keys = zip(Np1.ravel().tolist(), Np2.ravel().tolist(),
+               counterflow.ravel().tolist(), passes_counterflow.ravel().tolist())
+    for key in set(keys):
+        mask = ((Np1 == key[0]) & (Np2 == key[1]) & (counterflow == key[2])
+                & (passes_counterflow == key[3]))
+        yield (int(key[0]), int(key[1]), bool(key[2]), bool(key[3])), mask
+
+
+def _plate_P1(R1, NTU1, key, reverse=False):
+    if key in _plate_kernels:
+        with np.errstate(divide='ignore', invalid='ignore', over='ignore'):
+            return _plate_kernels[key](R1, NTU1)
+    swapped = (key[1], key[0], key[2], key[3])
+    if not reverse and swapped in _plate_kernels:
+        R2 = 1./R1
+        return _plate_P1(R2, NTU1*R1, swapped, True)*R2
+    raise Exception('Supported number of passes does not have a formula available')
+
+
+def _temperature_effectiveness_plate_vectorized(R1, NTU1, Np1, Np2,
+                                                counterflow=True,
+                                                passes_counterflow=True,
+                                                reverse=False):
+    R1, NTU1, Np1, Np2, counterflow, passes_counterflow = np.broadcast_arrays(
+            np.asarray(R1, dtype=float), np.asarray(NTU1, dtype=float), Np1,
+            Np2, counterflow, passes_counterflow)
+    P1 = np.empty(R1.shape)
+    for key, mask in _plate_groups(Np1, Np2, counterflow, passes_counterflow):
+        P1[mask] = _plate_P1(R1[mask], NTU1[mask], key, reverse)
+    return P1
+
+
+def _NTU_max_for_P_solver_vectorized(data, R1):
+    offsets = np.array(data['offset'])
+    segments = np.minimum(np.searchsorted(offsets, R1, side='right'),
+                          len(offsets) - 1)
+    NTU_max = np.empty(R1.shape)
+    for i in set(segments.tolist()):
+        mask = segments == i
+        x = R1[mask] - offsets[i]
+        NTU_max[mask] = _horner(data['p'][i], x)/_horner(data['q'][i], x)
+    return NTU_max
+
+
+def _ridder_vectorized(f, a, b, fa, fb, xtol=2E-12, rtol=8.881784197001252e-16,
+                       maxiter=100):
+    '''Solves f(x) = 0 for every element of the arrays `a` and `b`, which
+    must bracket the roots, with the method of Ridder as in
+    :obj:`scipy.optimize.ridder`. `f` is evaluated on whole arrays; each
+    element stops being updated once it has converged. Elements for which `f`
+    is not finite are returned as NaN.
+    '''
+    a, b, fa, fb = a.copy(), b.copy(), fa.copy(), fb.copy()
+    x = np.where(fa == 0., a, b)
+    active = (fa != 0.) & (fb != 0.)
+    for _ in range(maxiter):
+        if not active.any():
+            break
+        m = 0.5*(a + b)
+        fm = f(m)
+        s = np.sqrt(fm*fm - fa*fb)
+        with np.errstate(divide='ignore', invalid='ignore'):
+            x_new = m + (m - a)*np.sign(fa - fb)*fm/s
+        x_new = np.where(s == 0., m, x_new)
+        fx = f(x_new)
+        failed = active & ~(np.isfinite(fm) & np.isfinite(fx))
+        x = np.where(failed, np.nan, np.where(active, x_new, x))
+        active &= ~failed
+        # The new bracket is the smallest of [m, x], [a, x] and [x, b]
+        # containing a sign change
+        mx = fm*fx < 0.
+        ax = ~mx & (fa*fx < 0.)
+        xb = ~mx & ~ax
+        update = active & mx
+        a, fa = np.where(update, np.minimum(m, x_new), a), np.where(update, np.where(m < x_new, fm, fx), fa)
+        b, fb = np.where(update, np.maximum(m, x_new), b), np.where(update, np.where(m < x_new, fx, fm), fb)
+        update = active & ax
+        b, fb = np.where(update, x_new, b), np.where(update, fx, fb)
+        update = active & xb
+        a, fa = np.where(update, x_new, a), np.where(update, fx, fa)
+        active &= ~((fx == 0.) | (np.abs(b - a) < xtol + rtol*np.abs(x)))
+    return x
+
+
+def _plate_NTU1(P1, R1, key, reverse=False):
+    # NaN where no NTU1 gives P1; the scalar function raises instead
+    if key in _plate_kernels:
+        kernel = _plate_kernels[key]
+        if kernel is _plate_1_1_counterflow:
+            with np.errstate(divide='ignore', invalid='ignore'):
+                NTU1 = -np.log((P1*R1 - 1.)/(P1 - 1.))/(R1 - 1.)
+            return np.where(np.isfinite(NTU1), NTU1, np.nan)
+        elif kernel is _plate_1_1_parallel:
+            with np.errstate(divide='ignore', invalid='ignore'):
+                NTU1 = np.log(-1./(P1*(R1 + 1.) - 1.))/(R1 + 1.)
+            return np.where(np.isfinite(NTU1), NTU1, np.nan)
+
+        NTU_max = _plate_NTU_maxs[kernel]
+        if type(NTU_max) is dict:
+            NTU_max = _NTU_max_for_P_solver_vectorized(NTU_max, R1)
+        else:
+            NTU_max = np.full(R1.shape, NTU_max)
+        NTU_min = np.full(R1.shape, 1E-11)
+        P1_max = _plate_P1(R1, NTU_max, key) - P1
+        P1_min = _plate_P1(R1, NTU_min, key) - P1
+        # P1 above the maximum or below the minimum has no solution; bounds
+        # which could not be evaluated are left to the fallback below
+        feasible = ~((P1_max < 0.) | (P1_min > 0.))
+        NTU1 = np.full(P1.shape, np.nan)
+        if feasible.any():
+            P1_f, R1_f = P1[feasible], R1[feasible]
+            NTU1[feasible] = _ridder_vectorized(lambda NTU1: _plate_P1(R1_f, NTU1, key) - P1_f,
+                                                NTU_min[feasible], NTU_max[feasible],
+                                                P1_min[feasible], P1_max[feasible])
+        # Points the array kernel could not evaluate in floating point are
+        # solved one at a time with the mpmath fallback of the scalar solver
+        for i in np.flatnonzero(feasible & ~np.isfinite(NTU1)):
+            NTU1[i] = NTU_from_P_plate(float(P1[i]), float(R1[i]), Np1=key[0],
+                                       Np2=key[1], counterflow=key[2],
+                                       passes_counterflow=key[3],
+                                       reverse=reverse)
+        return NTU1
+    swapped = (key[1], key[0], key[2], key[3])
+    if not reverse and swapped in _plate_kernels:
+        NTU2 = _plate_NTU1(P1*R1, 1./R1, swapped, True)
+        return NTU2/R1
+    raise Exception('Supported number of passes does not have a formula available')
+
+
+def _NTU_from_P_plate_vectorized(P1, R1, Np1, Np2, counterflow=True,
+                                 passes_counterflow=True, reverse=False):
+    P1, R1, Np1, Np2, counterflow, passes_counterflow = np.broadcast_arrays(
+            np.asarray(P1, dtype=float), np.asarray(R1, dtype=float), Np1,
+            Np2, counterflow, passes_counterflow)
+    NTU1 = np.empty(P1.shape)
+    for key, mask in _plate_groups(Np1, Np2, counterflow, passes_counterflow):
+        NTU1[mask] = _plate_NTU1(P1[mask], R1[mask], key, reverse)
+    return NTU1
+
+
+def temperature_effectiveness_shells(R1, NTU1, shells, function,
+                                     arrangement='counterflow', **kwargs):
+    r'''Returns the temperature effectiveness `P1` of a number of identical
+    shells (or other exchangers), each described by a single-shell function
+    such as :obj:`temperature_effectiveness_TEMA_E`, with the streams
+    arranged between them in one of three ways [1]_:
+
+    * 'counterflow': both streams flow through all of the shells in series, in
+      opposite orders.
+    * 'parallel': both streams flow through all of the shells in series, in
+      the same order.
+    * 'split 1': stream 1 is divided equally among the shells, and stream 2
+      flows through all of them in series.
+
+    `R1` and `NTU1` are those of the whole set of shells. In series, each
+    shell has the ratio `R1` and `NTU1/shells`; with stream 1 split, each
+    shell has the ratio `R1/shells` and `NTU1`. Then, with :math:`P_p` the
+    effectiveness of one shell:
+
+    .. math::
+        P_{1,counterflow} = \frac{X^n - 1}{X^n - R_1},
+        \quad X = \frac{1 - R_1 P_p}{1 - P_p}
+
+        P_{1,counterflow}(R_1 = 1) = \frac{n P_p}{1 + (n - 1)P_p}
+
+        P_{1,parallel} = \frac{1 - [1 - (1 + R_1)P_p]^n}{1 + R_1}
+
+        P_{1,split\, 1} = \frac{1 - (1 - R_1 P_p/n)^n}{R_1}
+
+    Parameters
+    ----------
+    R1 : float
+        Heat capacity ratio of the exchanger in the P-NTU method,
+        calculated with respect to stream 1, [-]
+    NTU1 : float
+        Thermal number of transfer units of the exchanger in the P-NTU method,
+        calculated with respect to stream 1, [-]
+    shells : int
+        Number of shells, [-]
+    function : callable
+        Function returning the `P1` of one shell, called as
+        `function(R1, NTU1, **kwargs)`, [-]
+    arrangement : str, optional
+        One of 'counterflow', 'parallel' or 'split 1', [-]
+    **kwargs
+        Other arguments of `function`, such as `Ntp`, [-]
+
+    Returns
+    -------
+    P1 : float
+        Thermal effectiveness of the exchanger in the P-NTU method,
+        calculated with respect to stream 1, [-]
+
+    Notes
+    -----
+    With 'counterflow' and `temperature_effectiveness_basic` with subtype
+    'counterflow', this is one counterflow exchanger. With
+    :obj:`temperature_effectiveness_TEMA_E` with one or two tube passes, it is
+    the 'nS&T' subtype of :obj:`effectiveness_from_NTU`.
+
+    Examples
+    --------
+    Three TEMA E shells with two tube passes each:
+
+    >>> temperature_effectiveness_shells(R1=1/3., NTU1=3., shells=3,
+    ... function=temperature_effectiveness_TEMA_E, Ntp=2)
+    0.894367334211...
+
+    References
+    ----------
+    .. [1] Shah, Ramesh K., and Dusan P. Sekulic. Fundamentals of Heat 
+       Exchanger Design. 1st edition. Hoboken, NJ: Wiley, 2002.
+    '''
+    n = shells
+    if arrangement == 'split 1':
+        R1p = R1/n
+        P1p = function(R1p, NTU1, **kwargs)
+        return (1. - (1. - R1p*P1p)**n)/R1
+    P1p = function(R1, NTU1/n, **kwargs)
+    if arrangement == 'counterflow':
+        if R1 == 1.:
+            return n*P1p/(1. + (n - 1.)*P1p)
+        X = ((1. - R1*P1p)/(1. - P1p))**n
+        return (X - 1.)/(X - R1)
+    elif arrangement == 'parallel':
+        return (1. - (1. - (1. + R1)*P1p)**n)/(1. + R1)
+    raise ValueError(_shells_arrangement_error)
+
+
+_shells_arrangement_error = "arrangement must be 'counterflow', 'parallel' or 'split 1'"
+
+
+def _shells_P1p(P1, R1, n, arrangement):
+    # Effectiveness and ratio of one shell for the effectiveness of the whole;
+    # NaN where no effectiveness of a shell gives it
+    if arrangement == 'counterflow':
+        ratio = (1. - R1*P1)/(1. - P1)
+        X = np.where(ratio >= 0., ratio, np.nan)**(1./n)
+        P1p = np.where(R1 == 1., P1/(n - (n - 1.)*P1), (X - 1.)/(X - R1))
+        return P1p, R1
+    elif arrangement == 'parallel':
+        # A shell may exceed the parallel flow limit, making the base of each
+        # shell negative; the real root is unique only for an odd number
+        base = 1. - (1. + R1)*P1
+        odd = np.asarray(n) % 2 == 1
+        root = np.where(base >= 0., np.abs(base)**(1./n),
+                        np.where(odd, -np.abs(base)**(1./n), np.nan))
+        return (1. - root)/(1. + R1), R1
+    elif arrangement == 'split 1':
+        base = 1. - R1*P1
+        R1p = R1/n
+        return (1. - np.where(base >= 0., base, np.nan)**(1./n))/R1p, R1p
+    raise ValueError(_shells_arrangement_error)
+
+
+def NTU_from_P_shells(P1, R1, shells, function, arrangement='counterflow',
+                      **kwargs):
+    r'''Returns the number of transfer units `NTU1` of a number of identical
+    shells with a specified effectiveness `P1`, as described in
+    :obj:`temperature_effectiveness_shells`. The effectiveness of one shell
+    is found in closed form, and the inverse of its function
+    (:obj:`NTU_from_P_E`, :obj:`NTU_from_P_G`, :obj:`NTU_from_P_H`,
+    :obj:`NTU_from_P_J`, :obj:`NTU_from_P_plate` or :obj:`NTU_from_P_basic`)
+    is then solved.
+
+    Parameters
+    ----------
+    P1 : float
+        Thermal effectiveness of the exchanger in the P-NTU method,
+        calculated with respect to stream 1, [-]
+    R1 : float
+        Heat capacity ratio of the exchanger in the P-NTU method,
+        calculated with respect to stream 1, [-]
+    shells : int
+        Number of shells, [-]
+    function : callable
+        Function returning the `P1` of one shell; one of
+        :obj:`temperature_effectiveness_TEMA_E`,
+        :obj:`temperature_effectiveness_TEMA_G`,
+        :obj:`temperature_effectiveness_TEMA_H`,
+        :obj:`temperature_effectiveness_TEMA_J`,
+        :obj:`temperature_effectiveness_plate` or
+        :obj:`temperature_effectiveness_basic`, [-]
+    arrangement : str, optional
+        One of 'counterflow', 'parallel' or 'split 1', [-]
+    **kwargs
+        Other arguments of `function`, such as `Ntp`, [-]
+
+    Returns
+    -------
+    NTU1 : float
+        Thermal number of transfer units of the exchanger in the P-NTU method,
+        calculated with respect to stream 1, [-]
+
+    Examples
+    --------
+    >>> NTU_from_P_shells(P1=0.8943673342113645, R1=1/3., shells=3,
+    ... function=temperature_effectiveness_TEMA_E, Ntp=2)
+    2.99999999999...
+    '''
+    try:
+        inverse = _shell_inverses[function]
+    except KeyError:
+        raise ValueError('No inverse is available for %s' %(getattr(function, '__name__', function)))
+    n = shells
+    with np.errstate(divide='ignore', invalid='ignore'):
+        P1p, R1p = _shells_P1p(P1, R1, n, arrangement)
+    P1p = float(P1p)
+    if not 0. < P1p < 1.:
+        raise ValueError('No solution possible gives such a P1 for %d shells' %(n))
+    NTU1p = inverse(P1p, float(R1p), **kwargs)
+    return NTU1p if arrangement == 'split 1' else n*NTU1p
+
+
+def _shell_array_function(function, kwargs):
+    # Array implementation of a single shell function
+    if function is temperature_effectiveness_plate:
+        return _temperature_effectiveness_plate_vectorized
+    elif function is temperature_effectiveness_basic:
+        kernel = array_kernel(_subtype_dispatch(_temperature_effectiveness_basic_funcs,
+                                                _temperature_effectiveness_basic_cache,
+                                                kwargs['subtype'])[0])
+        return lambda R1, NTU1, subtype: kernel(R1, NTU1)
+    return array_kernel(function, static=tuple(kwargs))
+
+
+def _temperature_effectiveness_shells_vectorized(R1, NTU1, shells, function,
+                                                 arrangement='counterflow',
+                                                 **kwargs):
+    R1, NTU1, n = np.broadcast_arrays(np.asarray(R1, dtype=float),
+                                      np.asarray(NTU1, dtype=float),
+                                      np.asarray(shells, dtype=float))
+    kernel = _shell_array_function(function, kwargs)
+    with np.errstate(divide='ignore', invalid='ignore', over='ignore'):
+        if arrangement == 'split 1':
+            R1p = R1/n
+            P1p = kernel(R1p, NTU1, **kwargs)
+            return (1. - (1. - R1p*P1p)**n)/R1
+        P1p = kernel(R1, NTU1/n, **kwargs)
+        if arrangement == 'counterflow':
+            X = ((1. - R1*P1p)/(1. - P1p))**n
+            return np.where(R1 == 1., n*P1p/(1. + (n - 1.)*P1p),
+                            (X - 1.)/(X - R1))
+        elif arrangement == 'parallel':
+            return (1. - (1. - (1. + R1)*P1p)**n)/(1. + R1)
+    raise ValueError(_shells_arrangement_error)
+
+
+def _NTU1_batched(P1, R1, function, kwargs):
+    # NTU1 of one shell for each element of P1 and R1, with the vectorized
+    # method of Ridder; bracketed from below by half the NTU1 of a counterflow
+    # exchanger (a lower bound), and from above by expanding from twice it
+    kernel = _shell_array_function(function, kwargs)
+    f = lambda NTU1: kernel(R1, NTU1, **kwargs) - P1
+    with np.errstate(divide='ignore', invalid='ignore', over='ignore'):
+        lower = np.where(R1 == 1., P1/(1. - P1),
+                         np.log((1. - R1*P1)/(1. - P1))/(1. - R1))
+        lower = np.where(np.isfinite(lower) & (lower > 0.), lower, np.nan)
+        a, b = 0.5*lower, 2.*lower
+        fa, fb = f(a), f(b)
+        for _ in range(20):
+            expand = fb < 0.
+            if not expand.any():
+                break
+            b = np.where(expand, np.minimum(4.*b, 1E5), b)
+            fb = np.where(expand, f(b), fb)
+        usable = (fa <= 0.) & (fb >= 0.)
+        NTU1 = np.full(P1.shape, np.nan)
+        if usable.any():
+            NTU1[usable] = _ridder_vectorized(
+                    lambda NTU1: kernel(R1[usable], NTU1, **kwargs) - P1[usable],
+                    a[usable], b[usable], fa[usable], fb[usable])
+    return NTU1
+
+
+def _NTU_from_P_shells_vectorized(P1, R1, shells, function,
+                                  arrangement='counterflow', **kwargs):
+    if function not in _shell_inverses:
+        raise ValueError('No inverse is available for %s' %(getattr(function, '__name__', function)))
+    P1, R1, n = np.broadcast_arrays(np.asarray(P1, dtype=float),
+                                    np.asarray(R1, dtype=float),
+                                    np.asarray(shells, dtype=float))
+    shape = P1.shape
+    P1, R1, n = P1.ravel(), R1.ravel(), n.ravel()
+    with np.errstate(divide='ignore', invalid='ignore'):
+        P1p, R1p = _shells_P1p(P1, R1, n, arrangement)
+    R1p = np.broadcast_to(R1p, P1p.shape)
+    if function is temperature_effectiveness_plate and np.isfinite(P1p).all():
+        NTU1p = _NTU_from_P_plate_vectorized(P1p, R1p, **kwargs)
+    else:
+        NTU1p = _NTU1_batched(P1p, R1p, function, kwargs)
+    # Points which could not be bracketed or evaluated in floating point are
+    # solved one at a time with the scalar solver, which raises if needed
+    for i in np.flatnonzero(~np.isfinite(NTU1p)):
+        NTU1p[i] = NTU_from_P_shells(float(P1[i]), float(R1[i]), int(n[i]),
+                                     function, arrangement, **kwargs)/(1. if arrangement == 'split 1' else n[i])
+    NTU1 = NTU1p if arrangement == 'split 1' else n*NTU1p
+    return NTU1.reshape(shape)
+
+
 def P_NTU_method(m1, m2, Cp1, Cp2, UA=None, T1i=None, T1o=None, 
-                 T2i=None, T2o=None, subtype='crossflow', Ntp=1, optimal=True):
+                 T2i=None, T2o=None, subtype='crossflow', Ntp=1, optimal=True,
+                 output='dict'):
     r'''Wrapper for the various P-NTU method function calls,
     which can solve a heat exchanger. The heat capacities and mass flows
     of each stream and the type of the heat exchanger are always required.
@@ -3628,6 +4839,10 @@ def P_NTU_method(m1, m2, Cp1, Cp2, UA=None, T1i=None, T1o=None,
         For real heat exchangers (types 'E', 'G', 'H', and 'J'), there is often
         a more countercurrent (optimal) way to arrange the tube passes and a
         more parallel (optimal=False) way to arrange them. This controls that.
+    output : str, optional
+        'dict' to return the results as a dict, or 'record' to return them as
+        a :obj:`PNTUResult`, which has an attribute for each key and is
+        cheaper to create, [-]
 
     Returns
     -------
@@ -3752,6 +4967,7 @@ def P_NTU_method(m1, m2, Cp1, Cp2, UA=None, T1i=None, T1o=None,
     NTU_from_P_G
     NTU_from_P_H
     NTU_from_P_J
+    P_NTU_method_batch
 
     Examples
     --------
@@ -3781,8 +4997,8 @@ def P_NTU_method(m1, m2, Cp1, Cp2, UA=None, T1i=None, T1o=None,
     ... Ntp=4, T1i=130, T2i=15, T2o=84.87829918042112))
     {'C1': 9672.0,
      'C2': 2755.0,
-     'NTU1': 0.31449028122515194,
-     'NTU2': 1.1040834845770124,
+     'NTU1': 0.3144902812241523,
+     'NTU2': 1.104083484573503,
      'P1': 0.17308116143602348,
      'P2': 0.607637384177575,
      'Q': 192514.7142420602,
@@ -3792,7 +5008,7 @@ def P_NTU_method(m1, m2, Cp1, Cp2, UA=None, T1i=None, T1o=None,
      'T1o': 110.09566643485729,
      'T2i': 15,
      'T2o': 84.87829918042112,
-     'UA': 3041.7500000096693}
+     'UA': 3041.750000000001}
 
     Solve a 2 pass/2 pass plate heat exchanger with overall parallel flow and
     its individual passes operating in parallel and known outlet temperatures.
@@ -3827,6 +5043,18 @@ def P_NTU_method(m1, m2, Cp1, Cp2, UA=None, T1i=None, T1o=None,
     .. [3] Rohsenow, Warren and James Hartnett and Young Cho. Handbook of Heat
        Transfer, 3E. New York: McGraw-Hill, 1998.
     '''
+    values = _P_NTU_method(m1, m2, Cp1, Cp2, UA, T1i, T1o, T2i, T2o,
+                           _parse_subtype(subtype), Ntp, optimal)
+    if output == 'dict':
+        return dict(zip(_P_NTU_method_fields, values))
+    elif output == 'record':
+        return PNTUResult(*values)
+    raise ValueError("output must be 'dict' or 'record'")
+
+
+def _P_NTU_method(m1, m2, Cp1, Cp2, UA, T1i, T1o, T2i, T2o, config, Ntp,
+                  optimal):
+    # Results of P_NTU_method, in the order of _P_NTU_method_fields
     # Shellside: 1
     # Tubeside: 2
     C1 = m1*Cp1
@@ -3838,29 +5066,11 @@ def P_NTU_method(m1, m2, Cp1, Cp2, UA=None, T1i=None, T1o=None,
         NTU1 = UA/C1
         NTU2 = UA/C2
         
-        if subtype in ['counterflow', 'parallel', 'crossflow', 'crossflow, mixed 1', 'crossflow, mixed 2', 'crossflow, mixed 1&2']:
-            P1 = temperature_effectiveness_basic(R1, NTU1, subtype=subtype)
-        elif subtype == 'E':
-            P1 = temperature_effectiveness_TEMA_E(R1=R1, NTU1=NTU1, Ntp=Ntp, optimal=optimal)
-        elif subtype == 'G':
-            P1 = temperature_effectiveness_TEMA_G(R1=R1, NTU1=NTU1, Ntp=Ntp, optimal=optimal)
-        elif subtype == 'H':
-            P1 = temperature_effectiveness_TEMA_H(R1=R1, NTU1=NTU1, Ntp=Ntp, optimal=optimal)
-        elif subtype == 'J':
-            P1 = temperature_effectiveness_TEMA_J(R1=R1, NTU1=NTU1, Ntp=Ntp)
-        elif '/' in subtype:
-            passes_counterflow = True
-            Np1, end = subtype.split('/')
-            if end[-1] in ['c','p']:
-                passes_counterflow = True if end[-1] == 'c' else False
-                end = end[0:-1]
-            Np1, Np2 = int(Np1), int(end)
-            P1 = temperature_effectiveness_plate(R1=R1, NTU1=NTU1, Np1=Np1, Np2=Np2, counterflow=optimal, passes_counterflow=passes_counterflow)
-        else:
-            raise Exception("Supported types are 'E', 'G', 'H', 'J', 'counterflow',\
-    'parallel', 'crossflow', 'crossflow, mixed 1', 'crossflow, mixed 2', \
-    'crossflow, mixed 1&2', or 'Np1/Np2' for plate exchangers")
-        
+        func = _P_NTU_method_P1_funcs.get(config.code)
+        if func is None:
+            raise Exception(_P_NTU_method_error)
+        P1 = func(R1, NTU1, Ntp, optimal, config)
+
         possible_inputs = [(T1i, T2i), (T1o, T2o), (T1i, T2o), (T1o, T2i), (T1i, T1o), (T2i, T2o)]
         if not any([i for i in possible_inputs if None not in i]):
             raise Exception('One set of (T1i, T2i), (T1o, T2o), (T1i, T2o), (T1o, T2i), (T1i, T1o), or (T2i, T2o) is required along with UA.')
@@ -3917,28 +5127,10 @@ def P_NTU_method(m1, m2, Cp1, Cp2, UA=None, T1i=None, T1o=None,
                             'when solving for UA')
                 
         P1 = Q/(C1*abs(T2i-T1i))
-        if subtype in ['counterflow', 'parallel', 'crossflow', 'crossflow, mixed 1', 'crossflow, mixed 2', 'crossflow, mixed 1&2']:
-            NTU1 = NTU_from_P_basic(P1=P1, R1=R1, subtype=subtype)
-        elif subtype == 'E':
-            NTU1 = NTU_from_P_E(P1=P1, R1=R1, Ntp=Ntp, optimal=optimal)
-        elif subtype == 'G':
-            NTU1 = NTU_from_P_G(P1=P1, R1=R1, Ntp=Ntp, optimal=optimal)
-        elif subtype == 'H':
-            NTU1 = NTU_from_P_H(P1=P1, R1=R1, Ntp=Ntp, optimal=optimal)
-        elif subtype == 'J':
-            NTU1 = NTU_from_P_J(P1=P1, R1=R1, Ntp=Ntp)
-        elif '/' in subtype:
-            passes_counterflow = True
-            Np1, end = subtype.split('/')
-            if end[-1] in ['c','p']:
-                passes_counterflow = True if end[-1] == 'c' else False
-                end = end[0:-1]
-            Np1, Np2 = int(Np1), int(end)
-            NTU1 = NTU_from_P_plate(P1=P1, R1=R1, Np1=Np1, Np2=Np2, counterflow=optimal, passes_counterflow=passes_counterflow)
-        else:
-            raise Exception("Supported types are 'E', 'G', 'H', 'J', 'counterflow',\
-    'parallel', 'crossflow', 'crossflow, mixed 1', 'crossflow, mixed 2', \
-    'crossflow, mixed 1&2', or 'Np1/Np2' for plate exchangers")
+        func = _P_NTU_method_NTU1_funcs.get(config.code)
+        if func is None:
+            raise Exception(_P_NTU_method_error)
+        NTU1 = func(P1, R1, Ntp, optimal, config)
         UA = NTU1*C1
         NTU2 = UA/C2
         
@@ -3946,9 +5138,702 @@ def P_NTU_method(m1, m2, Cp1, Cp2, UA=None, T1i=None, T1o=None,
     # extra:
     P2 = P1*R1
 #    effectiveness = max(C1, C2)/min(C1, C2)
-    results = {'Q': Q, 'T1i': T1i, 'T1o': T1o, 'T2i': T2i, 'T2o': T2o, 
-          'C1': C1, 'C2': C2, 'R1': R1, 'R2': R2, 'P1': P1, 'P2': P2, 'NTU1': NTU1, 'NTU2': NTU2, 'UA': UA}
-    return results
+    return (Q, T1i, T1o, T2i, T2o, C1, C2, R1, R2, P1, P2, NTU1, NTU2, UA)
+
+
+_P_NTU_method_fields = ('Q', 'T1i', 'T1o', 'T2i', 'T2o', 'C1', 'C2', 'R1',
+                        'R2', 'P1', 'P2', 'NTU1', 'NTU2', 'UA')
+P_NTU_method_dtype = np.dtype([(name, float) for name in _P_NTU_method_fields])
+
+
+class PNTUResult(_MethodResult):
+    r'''Results of :obj:`P_NTU_method` with `output='record'`; it has an
+    attribute for each key of the dict returned by default, which may also be
+    read by indexing with the key.
+    '''
+    __slots__ = _P_NTU_method_fields
+
+    def __init__(self, Q, T1i, T1o, T2i, T2o, C1, C2, R1, R2, P1, P2, NTU1,
+                 NTU2, UA):
+        self.Q = Q
+        self.T1i = T1i
+        self.T1o = T1o
+        self.T2i = T2i
+        self.T2o = T2o
+        self.C1 = C1
+        self.C2 = C2
+        self.R1 = R1
+        self.R2 = R2
+        self.P1 = P1
+        self.P2 = P2
+        self.NTU1 = NTU1
+        self.NTU2 = NTU2
+        self.UA = UA
+
+
+def P_NTU_method_batch(m1, m2, Cp1, Cp2, UA=None, T1i=None, T1o=None,
+                       T2i=None, T2o=None, subtype='crossflow', Ntp=1,
+                       optimal=True, out=None, output='structured'):
+    r'''Solves many heat exchangers with :obj:`P_NTU_method`, writing the
+    results into columns instead of returning a dict for each. The numeric
+    inputs may be arrays, which are broadcast together; the same inputs must
+    be given (not None) for every exchanger.
+
+    Parameters
+    ----------
+    m1 : float or array
+        Mass flow rate of stream 1 (shell side = 1, tube side = 2), [kg/s]
+    m2 : float or array
+        Mass flow rate of stream 2 (shell side = 1, tube side = 2), [kg/s]
+    Cp1 : float or array
+        Averaged heat capacity of stream 1 (shell side), [J/kg/K]
+    Cp2 : float or array
+        Averaged heat capacity of stream 2 (tube side), [J/kg/K]
+    UA : float or array, optional
+        Combined Area-heat transfer coefficient term, [W/K]
+    T1i : float or array, optional
+        Inlet temperature of stream 1 (shell side), [K]
+    T1o : float or array, optional
+        Outlet temperature of stream 1 (shell side), [K]
+    T2i : float or array, optional
+        Inlet temperature of stream 2 (tube side), [K]
+    T2o : float or array, optional
+        Outlet temperature of stream 2 (tube-side), [K]
+    subtype : str, optional
+        The subtype of exchanger, as for :obj:`P_NTU_method`, [-]
+    Ntp : int, optional
+        Number of tube passes, as for :obj:`P_NTU_method`, [-]
+    optimal : bool, optional
+        Arrangement of the tube passes, as for :obj:`P_NTU_method`, [-]
+    out : ndarray or dict, optional
+        Where to write the results: a C-contiguous structured array with the
+        dtype :obj:`P_NTU_method_dtype`, or a dict of C-contiguous float
+        arrays with the keys of the results; either with the shape of the
+        broadcast inputs, [-]
+    output : str, optional
+        If `out` is not given, 'structured' to return a structured array or
+        'columns' to return a dict of arrays, [-]
+
+    Returns
+    -------
+    results : ndarray or dict
+        Results with the keys of those of :obj:`P_NTU_method`; `out` if it
+        was given, [-]
+
+    Notes
+    -----
+    Exceptions are raised as :obj:`P_NTU_method` raises them; when one is,
+    the results of the exchangers before it have been written.
+
+    Examples
+    --------
+    >>> out = np.empty(2, dtype=P_NTU_method_dtype)
+    >>> res = P_NTU_method_batch(m1=5.2, m2=1.45, Cp1=1860., Cp2=1900,
+    ... subtype='E', Ntp=4, T2i=15, T1i=130, UA=[3000., 3041.75], out=out)
+    >>> res is out, out['T2o']
+    (True, array([84.40112255, 84.87829918]))
+    '''
+    return _method_batch(_P_NTU_method, _P_NTU_method_fields,
+                         P_NTU_method_dtype,
+                         [m1, m2, Cp1, Cp2, UA, T1i, T1o, T2i, T2o],
+                         [_parse_subtype(subtype), Ntp, optimal], out, output)
+
+
+_P_NTU_method_error = ("Supported types are 'E', 'G', 'H', 'J', 'counterflow',\
+    'parallel', 'crossflow', 'crossflow, mixed 1', 'crossflow, mixed 2', \
+    'crossflow, mixed 1&2', or 'Np1/Np2' for plate exchangers")
+
+# Functions of (R1, NTU1, Ntp, optimal, config) and (P1, R1, Ntp, optimal,
+# config) for each configuration supported by P_NTU_method
+_P_NTU_method_P1_funcs = {
+    HXSubtype.TEMA_E: lambda R1, NTU1, Ntp, optimal, config: temperature_effectiveness_TEMA_E(R1=R1, NTU1=NTU1, Ntp=Ntp, optimal=optimal),
+    HXSubtype.TEMA_G: lambda R1, NTU1, Ntp, optimal, config: temperature_effectiveness_TEMA_G(R1=R1, NTU1=NTU1, Ntp=Ntp, optimal=optimal),
+    HXSubtype.TEMA_H: lambda R1, NTU1, Ntp, optimal, config: temperature_effectiveness_TEMA_H(R1=R1, NTU1=NTU1, Ntp=Ntp, optimal=optimal),
+    HXSubtype.TEMA_J: lambda R1, NTU1, Ntp, optimal, config: temperature_effectiveness_TEMA_J(R1=R1, NTU1=NTU1, Ntp=Ntp),
+    HXSubtype.PLATE: lambda R1, NTU1, Ntp, optimal, config: temperature_effectiveness_plate(R1=R1, NTU1=NTU1, Np1=config.Np1, Np2=config.Np2, counterflow=optimal, passes_counterflow=config.passes_counterflow)}
+_P_NTU_method_NTU1_funcs = {
+    HXSubtype.TEMA_E: lambda P1, R1, Ntp, optimal, config: NTU_from_P_E(P1=P1, R1=R1, Ntp=Ntp, optimal=optimal),
+    HXSubtype.TEMA_G: lambda P1, R1, Ntp, optimal, config: NTU_from_P_G(P1=P1, R1=R1, Ntp=Ntp, optimal=optimal),
+    HXSubtype.TEMA_H: lambda P1, R1, Ntp, optimal, config: NTU_from_P_H(P1=P1, R1=R1, Ntp=Ntp, optimal=optimal),
+    HXSubtype.TEMA_J: lambda P1, R1, Ntp, optimal, config: NTU_from_P_J(P1=P1, R1=R1, Ntp=Ntp),
+    HXSubtype.PLATE: lambda P1, R1, Ntp, optimal, config: NTU_from_P_plate(P1=P1, R1=R1, Np1=config.Np1, Np2=config.Np2, counterflow=optimal, passes_counterflow=config.passes_counterflow)}
+for _code in (HXSubtype.COUNTERFLOW, HXSubtype.PARALLEL, HXSubtype.CROSSFLOW,
+              HXSubtype.CROSSFLOW_MIXED_1, HXSubtype.CROSSFLOW_MIXED_2,
+              HXSubtype.CROSSFLOW_MIXED_12):
+    _P_NTU_method_P1_funcs[_code] = lambda R1, NTU1, Ntp, optimal, config: temperature_effectiveness_basic(R1, NTU1, subtype=config)
+    _P_NTU_method_NTU1_funcs[_code] = lambda P1, R1, Ntp, optimal, config: NTU_from_P_basic(P1=P1, R1=R1, subtype=config)
+
+# Inverses of the single shell functions accepted by NTU_from_P_shells
+_shell_inverses = {temperature_effectiveness_TEMA_E: NTU_from_P_E,
+                   temperature_effectiveness_TEMA_G: NTU_from_P_G,
+                   temperature_effectiveness_TEMA_H: NTU_from_P_H,
+                   temperature_effectiveness_TEMA_J: NTU_from_P_J,
+                   temperature_effectiveness_plate: NTU_from_P_plate,
+                   temperature_effectiveness_basic: NTU_from_P_basic}
+
+
+class _NetworkExchanger(object):
+    __slots__ = ('nodes', 'm1', 'Cp1', 'm2', 'Cp2', 'UA', 'config', 'Ntp',
+                 'optimal', 'R1', 'P1', 'entries')
+
+
+class ExchangerNetwork(object):
+    r'''Steady-state network of heat exchangers, such as a preheat train or
+    shells in series and in parallel, solved for all of its stream
+    temperatures at once.
+
+    Stream temperatures are named nodes. The inlets of the network have a
+    fixed temperature; every other node is the outlet of one exchanger or of
+    one mixer. A node may be the inlet of any number of exchangers, which is
+    how a stream is split. Each exchanger is described as in
+    :obj:`P_NTU_method`, by its flows, heat capacities, `UA` and
+    configuration. For fixed values of these its temperature effectiveness
+    `P1` and heat capacity ratio `R1` are constants. Its outlet temperatures
+    are then linear in its inlet temperatures:
+
+    .. math::
+        T_{1,o} = (1 - P_1) T_{1,i} + P_1 T_{2,i}
+
+        T_{2,o} = R_1 P_1 T_{1,i} + (1 - R_1 P_1) T_{2,i}
+
+    A mixer's outlet temperature is the average of its inlet temperatures,
+    weighted by their heat capacity rates. The network is therefore one
+    sparse linear system, which is solved directly. No iteration is needed,
+    even when the streams are recycled or flow counter-currently between
+    exchangers.
+
+    The effectiveness of each exchanger is calculated when it is added.
+    Changing the `UA` or flows of an exchanger (:obj:`set_exchanger`)
+    recalculates only its effectiveness and updates only its entries in the
+    system before the next solve. Changing an inlet temperature
+    (:obj:`set_inlet`) reuses the factorization of the system.
+
+    Examples
+    --------
+    Two counterflow exchangers in series, with the hot stream flowing through
+    them in the opposite order to the cold stream:
+
+    >>> net = ExchangerNetwork()
+    >>> net.add_inlet('hot in', T=400.)
+    >>> net.add_inlet('cold in', T=300.)
+    >>> net.add_exchanger('A', 'cold in', 'cold mid', 'hot mid', 'hot out',
+    ... m1=1., Cp1=4000., m2=2., Cp2=2500., UA=2000., subtype='counterflow')
+    >>> net.add_exchanger('B', 'cold mid', 'cold out', 'hot in', 'hot mid',
+    ... m1=1., Cp1=4000., m2=2., Cp2=2500., UA=3000., subtype='counterflow')
+    >>> T = net.solve()
+
+    These are the temperatures of one counterflow exchanger with the sum of
+    their UAs:
+
+    >>> T['cold out'], T['hot out']
+    (358.679855..., 353.056115...)
+    >>> net.exchanger('B').Q
+    133740.284826...
+    '''
+    def __init__(self):
+        self.nodes = []
+        self.index = {}
+        self.T_fixed = []
+        self.exchangers = {}
+        self.mixers = {}
+        self._defined = {}
+        self._system = None
+        self._factor = None
+        self.T = None
+
+    def _node(self, name):
+        try:
+            return self.index[name]
+        except KeyError:
+            self.index[name] = len(self.nodes)
+            self.nodes.append(name)
+            self.T_fixed.append(np.nan)
+            self._system = None
+            return self.index[name]
+
+    def _check_outlet(self, node):
+        i = self.index.get(node)
+        if i is not None and (i in self._defined
+                              or self.T_fixed[i] == self.T_fixed[i]):
+            raise ValueError('Node %r is already an inlet or an outlet' %(node,))
+
+    def _define(self, node, owner):
+        self._check_outlet(node)
+        i = self._node(node)
+        self._defined[i] = owner
+        return i
+
+    def add_inlet(self, name, T):
+        '''Adds an inlet of the network, of fixed temperature `T` [K].'''
+        i = self._node(name)
+        if i in self._defined or self.T_fixed[i] == self.T_fixed[i]:
+            raise ValueError('Node %r is already an inlet or an outlet' %(name,))
+        self.T_fixed[i] = float(T)
+        self._system = None
+
+    def set_inlet(self, name, T):
+        '''Changes the temperature [K] of an inlet of the network.'''
+        i = self.index[name]
+        if self.T_fixed[i] != self.T_fixed[i]:
+            raise ValueError('Node %r is not an inlet' %(name,))
+        self.T_fixed[i] = float(T)
+
+    def add_exchanger(self, name, T1i, T1o, T2i, T2o, m1, Cp1, m2, Cp2, UA,
+                      subtype='crossflow', Ntp=1, optimal=True):
+        '''Adds an exchanger between the nodes `T1i` and `T1o` on side 1 and
+        `T2i` and `T2o` on side 2. The outlet nodes are created; the inlet
+        nodes may be defined before or after. The other arguments are as for
+        :obj:`P_NTU_method`.
+        '''
+        if name in self.exchangers:
+            raise ValueError('Exchanger %r already exists' %(name,))
+        config = _parse_subtype(subtype)
+        if config.code not in _P_NTU_method_P1_funcs:
+            raise ValueError(_P_NTU_method_error)
+        if T1o == T2o:
+            raise ValueError('Node %r is already an inlet or an outlet' %(T2o,))
+        self._check_outlet(T1o)
+        self._check_outlet(T2o)
+        unit = _NetworkExchanger()
+        unit.config, unit.Ntp, unit.optimal = config, Ntp, optimal
+        unit.m1, unit.Cp1, unit.m2, unit.Cp2, unit.UA = m1, Cp1, m2, Cp2, UA
+        self._evaluate(unit)
+        # Nodes are only added once the exchanger is known to be valid
+        unit.nodes = (self._node(T1i), self._define(T1o, name),
+                      self._node(T2i), self._define(T2o, name))
+        self.exchangers[name] = unit
+        self._system = None
+
+    def set_exchanger(self, name, UA=None, m1=None, Cp1=None, m2=None,
+                      Cp2=None):
+        '''Changes the `UA` [W/K], mass flows [kg/s] or heat capacities
+        [J/kg/K] of an exchanger; those not given are unchanged.'''
+        unit = self.exchangers[name]
+        if UA is not None:
+            unit.UA = UA
+        if m1 is not None:
+            unit.m1 = m1
+        if Cp1 is not None:
+            unit.Cp1 = Cp1
+        if m2 is not None:
+            unit.m2 = m2
+        if Cp2 is not None:
+            unit.Cp2 = Cp2
+        self._evaluate(unit)
+        if self._system is not None:
+            self._update(unit.entries, self._coefficients(unit))
+
+    def add_mixer(self, outlet, inlets, C):
+        '''Adds a mixer of the nodes `inlets` into the node `outlet`, with the
+        heat capacity rates `C` [W/K] of each inlet stream.'''
+        if len(inlets) != len(C) or not len(inlets):
+            raise ValueError('A heat capacity rate is required for each inlet')
+        C = [float(c) for c in C]
+        self._check_outlet(outlet)
+        nodes = [self._node(node) for node in inlets]
+        self.mixers[outlet] = [self._define(outlet, outlet), nodes, C, None]
+        self._system = None
+
+    def set_mixer(self, outlet, C):
+        '''Changes the heat capacity rates [W/K] of the inlets of a mixer.'''
+        mixer = self.mixers[outlet]
+        if len(C) != len(mixer[1]):
+            raise ValueError('A heat capacity rate is required for each inlet')
+        mixer[2] = [float(c) for c in C]
+        if self._system is not None:
+            self._update(mixer[3], self._mixer_coefficients(mixer))
+
+    def _evaluate(self, unit):
+        C1 = unit.m1*unit.Cp1
+        unit.R1 = R1 = C1/(unit.m2*unit.Cp2)
+        unit.P1 = _P_NTU_method_P1_funcs[unit.config.code](R1, unit.UA/C1,
+                                                            unit.Ntp,
+                                                            unit.optimal,
+                                                            unit.config)
+
+    def _coefficients(self, unit):
+        # Coefficients of T1i and T2i in T1o, and of T1i and T2i in T2o
+        P1, R1P1 = unit.P1, unit.R1*unit.P1
+        return [1. - P1, P1, R1P1, 1. - R1P1]
+
+    def _mixer_coefficients(self, mixer):
+        total = sum(mixer[2])
+        return [c/total for c in mixer[2]]
+
+    def _assemble(self):
+        T_fixed = np.array(self.T_fixed)
+        fixed = T_fixed == T_fixed
+        unknown = np.flatnonzero(~fixed)
+        for i in unknown.tolist():
+            if i not in self._defined:
+                raise ValueError('Node %r is not an inlet, nor the outlet of '
+                                 'an exchanger or mixer' %(self.nodes[i],))
+        position = np.empty(len(self.nodes), dtype=np.int64)
+        position[~fixed] = np.arange(unknown.size)
+        position[fixed] = np.arange(int(fixed.sum()))
+
+        # Each outlet T_o = sum(c_j T_j); rows of T_o - sum(c_j T_j) = 0,
+        # with the terms of fixed T_j moved to the right hand side
+        rows, cols, values = [], [], []
+        def add(row, col, value):
+            rows.append(row)
+            cols.append(col)
+            values.append(value)
+            return len(values) - 1
+        for unit in self.exchangers.values():
+            T1i, T1o, T2i, T2o = unit.nodes
+            unit.entries = [add(T1o, T1i, 0.), add(T1o, T2i, 0.),
+                            add(T2o, T1i, 0.), add(T2o, T2i, 0.)]
+            for entry, value in zip(unit.entries, self._coefficients(unit)):
+                values[entry] = value
+        for mixer in self.mixers.values():
+            mixer[3] = [add(mixer[0], node, c) for node, c in
+                        zip(mixer[1], self._mixer_coefficients(mixer))]
+
+        rows = position[np.array(rows, dtype=np.int64)]
+        cols = np.array(cols, dtype=np.int64)
+        col_fixed = fixed[cols]
+        cols = position[cols]
+        n_u, n_f = unknown.size, max(int(fixed.sum()), 1)
+        # Unknown columns are numbered first, then the fixed ones
+        keys = np.where(col_fixed, n_u*n_u + rows*n_f + cols, rows*n_u + cols)
+        keys, pos = np.unique(keys, return_inverse=True)
+        A_keys, B_keys = keys[keys < n_u*n_u], keys[keys >= n_u*n_u] - n_u*n_u
+        self._system = (fixed, n_u, n_f, pos, np.array(values), A_keys, B_keys)
+        self._factor = None
+
+    def _update(self, entries, coefficients):
+        values = self._system[4]
+        for entry, value in zip(entries, coefficients):
+            values[entry] = value
+        self._factor = None
+
+    def _matrices(self):
+        fixed, n_u, n_f, pos, values, A_keys, B_keys = self._system
+        data = np.bincount(pos, weights=values, minlength=A_keys.size + B_keys.size)
+        def build(keys, data, n_cols):
+            rows = keys//n_cols
+            indptr = np.concatenate(([0], np.cumsum(np.bincount(rows, minlength=n_u))))
+            return csr_matrix((data, keys % n_cols, indptr), shape=(n_u, n_cols))
+        # The unit diagonal of the outlet temperatures
+        A = identity(n_u, format='csr') - build(A_keys, data[:A_keys.size], n_u)
+        B = build(B_keys, data[A_keys.size:], n_f)
+        return A, B
+
+    def solve(self):
+        '''Solves for the temperatures of all nodes.
+
+        Returns
+        -------
+        T : dict
+            Temperatures of all nodes, keyed by node name, [K]
+        '''
+        if self._system is None:
+            self._assemble()
+        fixed, n_u = self._system[0], self._system[1]
+        T = np.array(self.T_fixed)
+        if n_u:
+            if self._factor is None:
+                A, self._B = self._matrices()
+                try:
+                    self._factor = splu(A.tocsc())
+                except RuntimeError:
+                    raise ValueError('The network has no unique solution; a '
+                                     'loop of streams has no exchange with '
+                                     'an inlet')
+            T[~fixed] = self._factor.solve(self._B.dot(T[fixed]) if fixed.any()
+                                           else np.zeros(n_u))
+        self.T = T
+        return dict(zip(self.nodes, T.tolist()))
+
+    def exchanger(self, name):
+        '''Returns the results of an exchanger as of the last solve, as a
+        :obj:`PNTUResult` with the same values as :obj:`P_NTU_method`
+        returns.'''
+        unit = self.exchangers[name]
+        T1i, T1o, T2i, T2o = [float(self.T[i]) for i in unit.nodes]
+        C1, C2 = unit.m1*unit.Cp1, unit.m2*unit.Cp2
+        return PNTUResult(abs(T1i - T2i)*unit.P1*C1, T1i, T1o, T2i, T2o, C1,
+                          C2, unit.R1, C2/C1, unit.P1, unit.P1*unit.R1,
+                          unit.UA/C1, unit.UA/C2, unit.UA)
+
+
+class DynamicExchanger(object):
+    r'''Transient model of a heat exchanger, for dynamic simulation and
+    control studies, whose steady state is that of :obj:`P_NTU_method`.
+
+    The exchanger is divided into `cells` cells along its length. Each has
+    one temperature for the fluid of each side held in it, and one for the
+    wall between them. Heat is carried between cells by the flows, and
+    passes from each fluid to the wall through the conductances `G1` and
+    `G2`:
+
+    .. math::
+        C_{f1}\frac{dT_{1,k}}{dt} = C_1(T_{1,k-1} - T_{1,k}) - G_1(T_{1,k} - T_{w,k})
+
+        C_{f2}\frac{dT_{2,k}}{dt} = C_2(T_{2,k\pm 1} - T_{2,k}) + G_2(T_{w,k} - T_{2,k})
+
+        C_w\frac{dT_{w,k}}{dt} = G_1(T_{1,k} - T_{w,k}) - G_2(T_{w,k} - T_{2,k})
+
+    where `C` are heat capacity rates and :math:`C_{f1}`, :math:`C_{f2}` and
+    :math:`C_w` the heat capacities of one cell's fluids and wall. Stream 2
+    flows through the cells in the opposite direction to stream 1, or in the
+    same direction for the 'parallel' subtype.
+
+    At steady state each cell is a small exchanger whose outlet temperatures
+    are linear in its inlet temperatures, so the cells combine in closed form
+    as in :obj:`temperature_effectiveness_shells`. The conductances of the
+    cells are chosen so that the combination has exactly the effectiveness of
+    the exchanger given by `subtype`, `Ntp` and `optimal`, rather than being
+    `UA`/`cells` with the error of the discretization. Crossflow and
+    shell-and-tube exchangers are therefore represented by a counterflow
+    chain of cells with their effectiveness. Only the total resistance of the
+    cells is fixed by this; `hA_ratio` splits it between the two sides,
+    which affects only the transient response.
+
+    The model is linear, :math:`dx/dt = Ax + Bu` with `u` the two inlet
+    temperatures, which are held constant over each time step. With
+    `method` 'implicit', it is advanced with the backward Euler method, with
+    the banded factorization of :math:`I - A\Delta t` made once and reused
+    for every step; this suits thousands of cells. With 'exponential',
+    :math:`x_{n+1} = e^{A\Delta t}x_n + A^{-1}(e^{A\Delta t} - I)Bu_{n+1}`
+    is exact for any time step, but the dense matrices used limit it to a
+    few hundred cells. Both have exactly the steady state of the exchanger.
+
+    Parameters
+    ----------
+    m1 : float
+        Mass flow rate of stream 1, [kg/s]
+    Cp1 : float
+        Averaged heat capacity of stream 1, [J/kg/K]
+    m2 : float
+        Mass flow rate of stream 2, [kg/s]
+    Cp2 : float
+        Averaged heat capacity of stream 2, [J/kg/K]
+    UA : float
+        Combined area-heat transfer coefficient term, [W/K]
+    M1 : float
+        Mass of fluid 1 held in the exchanger, [kg]
+    M2 : float
+        Mass of fluid 2 held in the exchanger, [kg]
+    Mw : float
+        Mass of the wall between the fluids, [kg]
+    Cpw : float
+        Heat capacity of the wall, [J/kg/K]
+    subtype : str, optional
+        The subtype of exchanger, as in :obj:`P_NTU_method`, [-]
+    Ntp : int, optional
+        For real heat exchangers (types 'E', 'G', 'H', and 'J'), the number
+        of tube passes, [-]
+    optimal : bool, optional
+        For real heat exchangers, whether the arrangement of the passes is
+        optimal, [-]
+    cells : int, optional
+        Number of cells, [-]
+    hA_ratio : float, optional
+        Ratio of the conductance between fluid 1 and the wall to that between
+        the wall and fluid 2, [-]
+    method : str, optional
+        'implicit' or 'exponential', [-]
+    T0 : float, optional
+        Initial temperature of every cell; if not given, :obj:`steady_state`
+        must be called before :obj:`simulate`, [K]
+
+    Attributes
+    ----------
+    T1 : array
+        Temperatures of fluid 1 in each cell, in the direction of flow of
+        stream 1, [K]
+    T2 : array
+        Temperatures of fluid 2 in each cell, in the same order, [K]
+    Tw : array
+        Temperatures of the wall in each cell, in the same order, [K]
+
+    Examples
+    --------
+    A counterflow exchanger started at its steady state, after which the
+    inlet temperature of stream 2 rises by 10 K:
+
+    >>> hx = DynamicExchanger(m1=1., Cp1=4000., m2=2., Cp2=2500., UA=5000.,
+    ... M1=20., M2=30., Mw=50., Cpw=500., subtype='counterflow', cells=200)
+    >>> hx.steady_state(T1i=300., T2i=400.)
+    (358.679855..., 353.056115...)
+    >>> T1o, T2o = hx.simulate(dt=1., steps=600, T1i=300., T2i=410.)
+    >>> float(T1o[-1])
+    364.547841...
+    '''
+    def __init__(self, m1, Cp1, m2, Cp2, UA, M1, M2, Mw, Cpw,
+                 subtype='crossflow', Ntp=1, optimal=True, cells=100,
+                 hA_ratio=1., method='implicit', T0=None):
+        config = _parse_subtype(subtype)
+        if config.code not in _P_NTU_method_P1_funcs:
+            raise ValueError(_P_NTU_method_error)
+        if method not in ('implicit', 'exponential'):
+            raise ValueError("method must be 'implicit' or 'exponential'")
+        self.config, self.Ntp, self.optimal = config, Ntp, optimal
+        self.parallel = config.code == HXSubtype.PARALLEL
+        self.m1, self.Cp1, self.m2, self.Cp2, self.UA = m1, Cp1, m2, Cp2, UA
+        self.cells = n = int(cells)
+        self.hA_ratio, self.method = hA_ratio, method
+        self.Cf1, self.Cf2, self.Cw = M1*Cp1/n, M2*Cp2/n, Mw*Cpw/n
+        # State of each cell stored together, which keeps the system banded
+        self.x = np.full(3*n, np.nan if T0 is None else float(T0))
+        self.T1, self.T2, self.Tw = self.x[0::3], self.x[1::3], self.x[2::3]
+        self._evaluate()
+
+    def set_flows(self, m1=None, m2=None, UA=None):
+        '''Changes the mass flows [kg/s] or `UA` [W/K] of the exchanger;
+        those not given are unchanged. The state is kept.'''
+        if m1 is not None:
+            self.m1 = m1
+        if m2 is not None:
+            self.m2 = m2
+        if UA is not None:
+            self.UA = UA
+        self._evaluate()
+
+    def _evaluate(self):
+        n = self.cells
+        C1, C2 = self.m1*self.Cp1, self.m2*self.Cp2
+        R1 = C1/C2
+        self.P1 = _P_NTU_method_P1_funcs[self.config.code](R1, self.UA/C1,
+                                                           self.Ntp,
+                                                           self.optimal,
+                                                           self.config)
+        # Effectiveness of each cell, and the total conductance between the
+        # fluids of a cell which gives it at steady state
+        P1p = float(_shells_P1p(self.P1, R1, n, 'parallel' if self.parallel
+                                else 'counterflow')[0])
+        G = C1/(1./P1p - 1. - R1) if P1p > 0. else np.nan
+        if not (G > 0. and G < np.inf):
+            raise ValueError('%d cells are too few to give the effectiveness '
+                             'of the exchanger' %(n))
+        G1, G2 = G*(1. + self.hA_ratio), G*(1. + 1./self.hA_ratio)
+
+        k = np.arange(n)
+        i1, i2, iw = 3*k, 3*k + 1, 3*k + 2
+        # Diagonal, exchange with the wall, and flow from the previous cell
+        rows = [i1, i2, iw, i1, iw, i2, iw, i1[1:]]
+        cols = [i1, i2, iw, iw, i1, iw, i2, i1[:-1]]
+        values = [np.full(n, -(C1 + G1)/self.Cf1), np.full(n, -(C2 + G2)/self.Cf2),
+                  np.full(n, -(G1 + G2)/self.Cw), np.full(n, G1/self.Cf1),
+                  np.full(n, G1/self.Cw), np.full(n, G2/self.Cf2),
+                  np.full(n, G2/self.Cw), np.full(n - 1, C1/self.Cf1)]
+        if self.parallel:
+            rows.append(i2[1:])
+            cols.append(i2[:-1])
+            self._inlet2, self._outlet2 = 1, 3*n - 2
+        else:
+            rows.append(i2[:-1])
+            cols.append(i2[1:])
+            self._inlet2, self._outlet2 = 3*n - 2, 1
+        values.append(np.full(n - 1, C2/self.Cf2))
+        self.A = csr_matrix((np.concatenate(values),
+                             (np.concatenate(rows), np.concatenate(cols))),
+                            shape=(3*n, 3*n))
+        # Only the first cell of each stream sees its inlet temperature
+        self._b = (C1/self.Cf1, C2/self.Cf2)
+        self._steps = {}
+        self._factor = None
+
+    @staticmethod
+    def _banded_lu(M):
+        # LU factorization of a matrix of the model, whose cells are stored
+        # together so that it has three diagonals each side of the main one
+        M = M.tocoo()
+        ab = np.zeros((10, M.shape[0]))
+        ab[6 + M.row - M.col, M.col] = M.data
+        lu, piv, info = dgbtrf(ab, 3, 3)
+        return lu, piv
+
+    def _B(self, T1i, T2i):
+        # B u for inlet temperatures T1i and T2i
+        Bu = np.zeros(3*self.cells)
+        Bu[0] = self._b[0]*T1i
+        Bu[self._inlet2] = self._b[1]*T2i
+        return Bu
+
+    def _outlets(self):
+        return float(self.x[3*self.cells - 3]), float(self.x[self._outlet2])
+
+    def steady_state(self, T1i, T2i):
+        '''Sets the state of the exchanger to its steady state with the inlet
+        temperatures `T1i` and `T2i` [K], and returns the outlet temperatures
+        `T1o` and `T2o` [K].'''
+        if self._factor is None:
+            self._factor = self._banded_lu(self.A)
+        lu, piv = self._factor
+        self.x[:] = dgbtrs(lu, 3, 3, -self._B(T1i, T2i), piv)[0]
+        return self._outlets()
+
+    def _step(self, dt):
+        # Matrices advancing the state by `dt`, and the coefficients of the
+        # two inlet temperatures
+        try:
+            return self._steps[dt]
+        except KeyError:
+            pass
+        n = 3*self.cells
+        if self.method == 'implicit':
+            # Only the first cell of each stream has a term of its inlet
+            step = (self._banded_lu(identity(n) - dt*self.A), dt*np.array(self._b))
+        else:
+            unit = np.zeros((n, 2))
+            unit[0, 0], unit[self._inlet2, 1] = self._b
+            A = self.A.toarray()
+            Phi = expm(A*dt)
+            step = (Phi, np.linalg.solve(A, (Phi - np.eye(n)).dot(unit)))
+        self._steps = {dt: step}
+        return step
+
+    def simulate(self, dt, steps, T1i, T2i):
+        r'''Advances the exchanger by `steps` time steps of `dt`, with the
+        inlet temperatures given for each step, and returns the outlet
+        temperatures at the end of each step.
+
+        Parameters
+        ----------
+        dt : float
+            Time step, [s]
+        steps : int
+            Number of time steps, [-]
+        T1i : float or array
+            Inlet temperature of stream 1, over each step, [K]
+        T2i : float or array
+            Inlet temperature of stream 2, over each step, [K]
+
+        Returns
+        -------
+        T1o : array
+            Outlet temperature of stream 1 at the end of each step, [K]
+        T2o : array
+            Outlet temperature of stream 2 at the end of each step, [K]
+        '''
+        if np.isnan(self.x).any():
+            raise ValueError('The state of the exchanger has not been set')
+        steps = int(steps)
+        u = np.empty((steps, 2))
+        u[:, 0], u[:, 1] = T1i, T2i
+        step = self._step(float(dt))
+        T1o, T2o = np.empty(steps), np.empty(steps)
+        x, o1, i2, o2 = self.x, 3*self.cells - 3, self._inlet2, self._outlet2
+        if self.method == 'implicit':
+            (lu, piv), b = step
+            u = u*b
+            rhs = np.empty_like(x)
+            for i in range(steps):
+                rhs[:] = x
+                rhs[0] += u[i, 0]
+                rhs[i2] += u[i, 1]
+                x[:] = dgbtrs(lu, 3, 3, rhs, piv)[0]
+                T1o[i], T2o[i] = x[o1], x[o2]
+        else:
+            Phi, Gamma = step
+            inputs = np.empty_like(x)
+            for i in range(steps):
+                x[:] = Phi.dot(x) + Gamma.dot(u[i], out=inputs)
+                T1o[i], T2o[i] = x[o1], x[o2]
+        return T1o, T2o
 
 
 def F_LMTD_Fakheri(Thi, Tho, Tci, Tco, shells=1):
@@ -4024,6 +5909,26 @@ def F_LMTD_Fakheri(Thi, Tho, Tci, Tco, shells=1):
         S = (R*R + 1.)**0.5/(R - 1.)
         return S*log(W)/log((1. + W - S + S*W)/(1. + W + S - S*W))
 
+
+def _F_LMTD_Fakheri_vectorized(Thi, Tho, Tci, Tco, shells=1):
+    Thi, Tho, Tci, Tco = (np.asarray(Thi, dtype=float),
+                          np.asarray(Tho, dtype=float),
+                          np.asarray(Tci, dtype=float),
+                          np.asarray(Tco, dtype=float))
+    R = (Thi - Tho)/(Tco - Tci)
+    P = (Tco - Tci)/(Thi - Tci)
+    # Both branches are evaluated everywhere; the one not selected may divide
+    # by zero or take the log of a negative number
+    with np.errstate(divide='ignore', invalid='ignore'):
+        W2 = (shells - shells*P)/(shells - shells*P + P)
+        W2_ratio = W2/(1. - W2)
+        F_R1 = (2**0.5*(1. - W2)/W2)/np.log((W2_ratio + 2**-0.5)
+                                            /(W2_ratio - 2**-0.5))
+        W = ((1. - P*R)/(1. - P))**(1./shells)
+        S = (R*R + 1.)**0.5/(R - 1.)
+        F = S*np.log(W)/np.log((1. + W - S + S*W)/(1. + W + S - S*W))
+    return np.where(R == 1.0, F_R1, F)
+
 ### Tubes
 
 # TEMA tubes from http://www.engineeringpage.com/technology/thermal/tubesize.html
@@ -5929,7 +7834,9 @@ def DBundle_for_Ntubes_Phadkeb(Ntubes, Do, pitch, Ntp, angle=30):
     def to_solve(DBundle):
         ans = Ntubes_Phadkeb(DBundle=DBundle, Do=Do, pitch=pitch, Ntp=Ntp, angle=angle) - Ntubes
         return ans
-    return sp_bisect(to_solve, 0, DBundle_max)
+    return solve('Ntubes_Phadkeb', sp_bisect, to_solve,
+                 {'Ntubes': Ntubes, 'Do': Do, 'pitch': pitch, 'Ntp': Ntp,
+                  'angle': angle}, 0, DBundle_max)
 
 
 def Ntubes_Perrys(DBundle, Do, Ntp, angle=30):
@@ -6400,7 +8307,9 @@ def size_bundle_from_tubecount(N, Do, pitch, Ntp=1, angle=30, Method=None,
         return DBundle_for_Ntubes_HEDH(N=N, Do=Do, pitch=pitch, angle=angle)
     elif Method == 'Perry':
         to_solve = lambda D : Ntubes_Perrys(DBundle=D, Do=Do, Ntp=Ntp, angle=angle) - N
-        return ridder(to_solve, Do*5, 1000*Do)
+        return solve('Ntubes_Perrys', ridder, to_solve,
+                     {'N': N, 'Do': Do, 'Ntp': Ntp, 'angle': angle}, Do*5,
+                     1000*Do)
     else:
         raise Exception('Method not recognized; allowable methods are '
                         '"Phadkeb", "HEDH", "VDI", and "Perry"')
@@ -0,0 +1,249 @@
+# -*- coding: utf-8 -*-
+'''Chemical Engineering Design Library (ChEDL). Utilities for process modeling.
+Copyright (C) 2018, Caleb Bell <Caleb.Andrew.Bell@gmail.com>
+
+Permission is hereby granted, free of charge, to any person obtaining a copy
+of this software and associated documentation files (the "Software"), to deal
+in the Software without restriction, including without limitation the rights
+to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+copies of the Software, and to permit persons to whom the Software is
+furnished to do so, subject to the following conditions:
+
+The above copyright notice and this permission notice shall be included in all
+copies or substantial portions of the Software.
+
+THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+SOFTWARE.'''
+
+from __future__ import division
+import sys
+import json
+import types
+import random
+import functools
+import threading
+import ht
+
+try:
+    from time import perf_counter
+except ImportError: # pragma: no cover
+    from time import time as perf_counter
+
+__all__ = ['instrument', 'enable', 'disable', 'is_enabled', 'reset',
+           'snapshot', 'snapshot_json']
+
+'''Opt-in recording of the number of calls, the time taken, and the number of
+exceptions raised by every public function in ht.
+
+When it is off, nothing is changed and there is no overhead. When it is on,
+every function in `ht.__all__` is replaced - in `ht` and in every ht
+submodule which refers to it - by a wrapper which records each call, so calls
+between ht functions are recorded as well. For each function, the functions
+it calls directly are counted too; for dispatchers such as
+`Nu_conv_internal`, `h_nucleic` and `Ntubes` this is the correlation which
+was selected.
+
+It can be switched on with the context manager:
+
+>>> import ht.instrumentation
+>>> with ht.instrumentation.instrument():
+...     Nu = ht.Nu_conv_internal(Re=1E5, Pr=.7)
+>>> ht.instrumentation.snapshot()['Nu_conv_internal']['methods']
+{'turbulent_Churchill_Zajic': 1}
+
+Or for a whole process, by setting the environment variable `HT_INSTRUMENT`
+to 1 before ht is imported. :obj:`snapshot` and :obj:`snapshot_json` export
+the records, and :obj:`reset` clears them.
+'''
+
+# Number of call durations kept per function to estimate the percentiles
+SAMPLES = 1000
+
+_originals = {}
+_wrappers = {}
+_records = {}
+_lock = threading.Lock()
+_local = threading.local()
+_depth = [0]
+
+
+class _Record(object):
+    __slots__ = ('calls', 'exceptions', 'total_time', 'max_time', 'samples',
+                 'methods')
+
+    def __init__(self):
+        self.calls = 0
+        self.exceptions = 0
+        self.total_time = 0.0
+        self.max_time = 0.0
+        self.samples = []
+        self.methods = {}
+
+
+def _record(name):
+    try:
+        return _records[name]
+    except KeyError:
+        return _records.setdefault(name, _Record())
+
+
+def _wrap(name, func):
+    @functools.wraps(func)
+    def wrapper(*args, **kwargs):
+        try:
+            stack = _local.stack
+        except AttributeError:
+            stack = _local.stack = []
+        if stack:
+            parent = _record(stack[-1])
+            with _lock:
+                parent.methods[name] = parent.methods.get(name, 0) + 1
+        stack.append(name)
+        failed = False
+        start = perf_counter()
+        try:
+            return func(*args, **kwargs)
+        except:
+            failed = True
+            raise
+        finally:
+            elapsed = perf_counter() - start
+            stack.pop()
+            record = _record(name)
+            with _lock:
+                record.calls += 1
+                record.exceptions += failed
+                record.total_time += elapsed
+                if elapsed > record.max_time:
+                    record.max_time = elapsed
+                # Reservoir sample of the durations
+                if len(record.samples) < SAMPLES:
+                    record.samples.append(elapsed)
+                else:
+                    i = random.randint(0, record.calls - 1)
+                    if i < SAMPLES:
+                        record.samples[i] = elapsed
+    return wrapper
+
+
+def _ht_modules():
+    return [module for name, module in list(sys.modules.items())
+            if module is not None and (name == 'ht' or name.startswith('ht.'))
+            and name != __name__]
+
+
+def _replace(mapping):
+    # Replace every reference to a key of `mapping` in the ht modules
+    for module in _ht_modules():
+        namespace = module.__dict__
+        for attr, obj in list(namespace.items()):
+            if isinstance(obj, types.FunctionType) and obj in mapping:
+                namespace[attr] = mapping[obj]
+
+
+def enable():
+    '''Starts recording calls to the functions of ht. Calls may be nested;
+    recording stops when :obj:`disable` has been called as many times as
+    :obj:`enable`.
+    '''
+    with _lock:
+        _depth[0] += 1
+        if _depth[0] > 1:
+            return
+        if not _originals:
+            for name in ht.__all__:
+                obj = getattr(ht, name)
+                if isinstance(obj, types.FunctionType):
+                    _originals[obj] = name
+                    _wrappers[obj] = _wrap(name, obj)
+        _replace(_wrappers)
+
+
+def disable():
+    '''Stops recording calls to the functions of ht, and restores the
+    original functions. The records are kept.
+    '''
+    with _lock:
+        if _depth[0] == 0:
+            return
+        _depth[0] -= 1
+        if _depth[0] == 0:
+            _replace(dict((wrapper, func) for func, wrapper in _wrappers.items()))
+
+
+def is_enabled():
+    return _depth[0] > 0
+
+
+def reset():
+    '''Clears all recorded calls.'''
+    with _lock:
+        _records.clear()
+
+
+class instrument(object):
+    '''Context manager which records calls to the functions of ht while it
+    is active.
+
+    Parameters
+    ----------
+    reset : bool, optional
+        Whether to clear the previous records on entering, [-]
+    '''
+    def __init__(self, reset=False):
+        self.reset = reset
+
+    def __enter__(self):
+        if self.reset:
+            reset()
+        enable()
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        disable()
+        return False
+
+
+def _percentile(ordered, q):
+    # Linear interpolation between the closest ranks, as numpy's default
+    position = (len(ordered) - 1)*q
+    low = int(position)
+    high = min(low + 1, len(ordered) - 1)
+    return ordered[low] + (ordered[high] - ordered[low])*(position - low)
+
+
+def snapshot():
+    '''Returns the records of all functions which have been called, as a dict
+    of dicts keyed by function name. Each has the keys 'calls', 'exceptions',
+    'total_time', 'mean_time', 'max_time', 'p50', 'p90' and 'p99' (times in
+    seconds), and 'methods', a dict of the number of calls made to each ht
+    function called directly by it.
+    '''
+    ans = {}
+    with _lock:
+        for name, record in _records.items():
+            if not record.calls:
+                continue
+            ordered = sorted(record.samples)
+            ans[name] = {'calls': record.calls,
+                         'exceptions': record.exceptions,
+                         'total_time': record.total_time,
+                         'mean_time': record.total_time/record.calls,
+                         'max_time': record.max_time,
+                         'p50': _percentile(ordered, 0.5),
+                         'p90': _percentile(ordered, 0.9),
+                         'p99': _percentile(ordered, 0.99),
+                         'methods': dict(record.methods)}
+    return ans
+
+
+def snapshot_json(**kwargs):
+    '''Returns :obj:`snapshot` as a JSON string; keyword arguments are passed
+    to `json.dumps`.
+    '''
+    return json.dumps(snapshot(), **kwargs)
@@ -0,0 +1,996 @@
+# -*- coding: utf-8 -*-
+'''Chemical Engineering Design Library (ChEDL). Utilities for process modeling.
+Copyright (C) 2018, Caleb Bell <Caleb.Andrew.Bell@gmail.com>
+
+Permission is hereby granted, free of charge, to any person obtaining a copy
+of this software and associated documentation files (the "Software"), to deal
+in the Software without restriction, including without limitation the rights
+to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+copies of the Software, and to permit persons to whom the Software is
+furnished to do so, subject to the following conditions:
+
+The above copyright notice and this permission notice shall be included in all
+copies or substantial portions of the Software.
+
+THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+SOFTWARE.'''
+
+from __future__ import division
+import ast
+import copy
+import math
+import types
+import inspect
+import textwrap
+import numpy as np
+try:
+    import builtins
+except ImportError: # pragma: no cover
+    import __builtin__ as builtins
+
+__all__ = ['array_kernel', 'verify', 'derivative_kernel']
+
+'''Generation of array implementations of the scalar correlations in ht.
+
+Most correlations are straight-line arithmetic with a few `if` statements.
+:obj:`array_kernel` reads the source of such a function and writes an
+equivalent one which accepts arrays:
+
+* Functions of `math` are replaced by those of numpy;
+* `if` statements and conditional expressions whose test depends on the
+  values of the inputs become `np.where` - both branches are evaluated for
+  every element, and the result of each chosen element by element;
+* Tests which only check whether an optional argument was given, or the
+  value of a flag or string option (`heating`, `Method == '...'`), are kept
+  as they are; an optional argument counts as given if it is not None;
+* So are tests of the arguments listed as `static`, such as a number of
+  passes (`Ntp == 2`), which must then be scalars;
+* Calls to other pure Python functions, including those given as arguments,
+  are replaced by their own array implementations.
+
+A function which does anything else - loops, calls to compiled functions,
+raising exceptions depending on the values of the inputs - cannot be
+translated, and :obj:`array_kernel` returns `np.vectorize` of it instead.
+
+:obj:`derivative_kernel` similarly writes a scalar function which returns
+the derivative of a function with respect to one of its arguments along with
+its value, by applying the chain rule to each operation of its source
+(forward-mode differentiation). The branches, exceptions and calls of the
+function are kept as they are, so the value is the same to the last bit.
+
+>>> from ht import turbulent_Dittus_Boelter
+>>> Nu = array_kernel(turbulent_Dittus_Boelter)
+>>> Nu([1E5, 1E6], Pr=1.2)
+array([ 247.40036409, 1561.00963024])
+>>> Nu.translated
+True
+'''
+
+_math_functions = {'exp': 'exp', 'log': 'log', 'log10': 'log10',
+                   'log1p': 'log1p', 'expm1': 'expm1', 'sqrt': 'sqrt',
+                   'sin': 'sin', 'cos': 'cos', 'tan': 'tan', 'asin': 'arcsin',
+                   'acos': 'arccos', 'atan': 'arctan', 'atan2': 'arctan2',
+                   'sinh': 'sinh', 'cosh': 'cosh', 'tanh': 'tanh',
+                   'fabs': 'abs', 'floor': 'floor', 'ceil': 'ceil',
+                   'pow': 'power', 'hypot': 'hypot', 'radians': 'radians',
+                   'degrees': 'degrees'}
+_builtin_functions = {'abs': 'abs', 'min': 'minimum', 'max': 'maximum'}
+_math_ids = dict((id(getattr(math, name)), name) for name in _math_functions)
+
+_kernels = {}
+_jvps = {}
+_derivatives = {}
+
+# Derivatives of the functions of math of one argument, in terms of the
+# argument `a` and the value `v`
+_derivative_rules = {'exp': 'v', 'expm1': 'v + 1.0', 'log': '1.0/a',
+                     'log1p': '1.0/(1.0 + a)', 'log10': '0.4342944819032518/a',
+                     'sqrt': '0.5/v', 'sin': '_math.cos(a)',
+                     'cos': '-_math.sin(a)', 'tan': '1.0 + v*v',
+                     'asin': '1.0/_math.sqrt(1.0 - a*a)',
+                     'acos': '-1.0/_math.sqrt(1.0 - a*a)',
+                     'atan': '1.0/(1.0 + a*a)', 'sinh': '_math.cosh(a)',
+                     'cosh': '_math.sinh(a)', 'tanh': '1.0 - v*v',
+                     'fabs': '_math.copysign(1.0, a)'}
+
+
+class _Untranslatable(Exception):
+    pass
+
+
+def _truth(value):
+    # Truth of an optional argument; one given as an array counts as given
+    if isinstance(value, np.ndarray):
+        return True
+    return bool(value)
+
+
+def _name(id):
+    return ast.Name(id=id, ctx=ast.Load())
+
+
+def _np(function, *args):
+    return ast.Call(func=ast.Attribute(value=_name('np'), attr=function,
+                                       ctx=ast.Load()),
+                    args=list(args), keywords=[])
+
+
+def _assign(target, value):
+    return ast.Assign(targets=[ast.Name(id=target, ctx=ast.Store())],
+                      value=value)
+
+
+def _is_none(node):
+    return isinstance(node, ast.Constant) and node.value is None
+
+
+def _is_str(node):
+    if isinstance(node, (ast.Tuple, ast.List)):
+        return all(_is_str(elt) for elt in node.elts)
+    return isinstance(node, ast.Constant) and isinstance(node.value, str)
+
+
+class _Translator(object):
+    '''Translates one function by symbolic execution of its statements,
+    keeping for each variable the name of the single assignment holding its
+    current value; the values of variables assigned differently in the
+    branches of an `if` are merged after it.
+    '''
+    def __init__(self, func, static=()):
+        self.func = func
+        self.globals = func.__globals__
+        try:
+            source = textwrap.dedent(inspect.getsource(func))
+        except (IOError, TypeError):
+            raise _Untranslatable('source is not available')
+        node = ast.parse(source).body[0]
+        if not isinstance(node, ast.FunctionDef) or node.decorator_list:
+            raise _Untranslatable('not a plain function')
+        args = node.args
+        if args.vararg or args.kwarg or args.kwonlyargs:
+            raise _Untranslatable('variable arguments')
+        self.node = node
+        self.params = [arg.arg for arg in args.args]
+        # Arguments with a default of None, a bool or a string are options
+        defaults = dict(zip(self.params[len(self.params) - len(args.defaults):],
+                            args.defaults))
+        self.optional = set(p for p, d in defaults.items() if _is_none(d))
+        self.options = set(p for p, d in defaults.items() if _is_none(d)
+                           or (isinstance(d, ast.Constant)
+                               and isinstance(d.value, (bool, str))))
+        self.static_params = set(static)
+        self.options |= self.static_params
+        self.counts = {}
+        self.depth = 0
+        self.dependencies = {}
+
+    def fresh(self, name):
+        self.counts[name] = count = self.counts.get(name, 0) + 1
+        return '_%s%d' %(name, count)
+
+    def translate(self):
+        env = dict((p, p) for p in self.params)
+        code, env, _ = self.block(self.node.body, env)
+        value = _name(env['return']) if 'return' in env else ast.Constant(value=None)
+        code.append(ast.Return(value=value))
+        node = ast.FunctionDef(name=self.node.name, args=self.node.args,
+                               body=code, decorator_list=[], returns=None,
+                               type_comment=None)
+        if hasattr(ast, 'type_param'): # pragma: no cover
+            node.type_params = []
+        module = ast.Module(body=[node], type_ignores=[])
+        return ast.fix_missing_locations(module)
+
+    # Statements
+    def block(self, stmts, env):
+        '''Returns the translated statements, the variables after them, and
+        whether they always return (True), always raise ('raise') or neither
+        (False).'''
+        code = []
+        for i, stmt in enumerate(stmts):
+            if isinstance(stmt, ast.Expr) and isinstance(stmt.value, ast.Constant):
+                continue # docstring
+            elif isinstance(stmt, ast.Pass):
+                continue
+            elif isinstance(stmt, ast.Assign):
+                code.extend(self.assign(stmt.targets, stmt.value, env))
+            elif isinstance(stmt, ast.AugAssign):
+                value = ast.BinOp(left=ast.Name(id=self.target(stmt.target), ctx=ast.Load()),
+                                  op=stmt.op, right=stmt.value)
+                code.extend(self.assign([stmt.target], value, env))
+            elif isinstance(stmt, ast.Return):
+                value = stmt.value if stmt.value is not None else ast.Constant(value=None)
+                code.extend(self.assign([ast.Name(id='return', ctx=ast.Store())], value, env))
+                return code, env, True
+            elif isinstance(stmt, ast.Raise):
+                if self.depth:
+                    raise _Untranslatable('raise depends on the values of the inputs')
+                exc = _Rename(env).visit(copy.deepcopy(stmt.exc))
+                code.append(ast.Raise(exc=exc, cause=None))
+                return code, env, 'raise'
+            elif isinstance(stmt, ast.If):
+                if_code, env, returned = self.branch(stmt, stmts[i+1:], env)
+                code.extend(if_code)
+                return code, env, returned
+            else:
+                raise _Untranslatable('%s statement' %(type(stmt).__name__))
+        return code, env, False
+
+    def target(self, node):
+        if not isinstance(node, ast.Name):
+            raise _Untranslatable('assignment to %s' %(type(node).__name__))
+        return node.id
+
+    def assign(self, targets, value, env):
+        if len(targets) != 1:
+            raise _Untranslatable('chained assignment')
+        target = targets[0]
+        if isinstance(target, ast.Tuple):
+            if not isinstance(value, ast.Tuple) or len(value.elts) != len(target.elts):
+                raise _Untranslatable('unpacking')
+            pairs = list(zip(target.elts, value.elts))
+        else:
+            pairs = [(target, value)]
+        # Evaluate every value before binding any name
+        values = [self.expr(v, env) for _, v in pairs]
+        code = []
+        for (t, _), v in zip(pairs, values):
+            name = self.target(t)
+            env[name] = self.fresh(name)
+            code.append(_assign(env[name], v))
+        return code
+
+    def branch(self, stmt, rest, env):
+        static = self.static(stmt.test)
+        if static:
+            test = self.static_test(stmt.test, env)
+        else:
+            test = self.fresh('cond')
+            code = [_assign(test, self.dynamic_test(stmt.test, env))]
+            self.depth += 1
+        code_t, env_t, returned_t = self.block(stmt.body, dict(env))
+        code_f, env_f, returned_f = self.block(stmt.orelse, dict(env))
+        # A branch which does not return continues with the statements after
+        # the if, when the other one does
+        if returned_t and not returned_f:
+            code_f, env_f, returned_f = self.block(stmt.orelse + rest, dict(env))
+            rest = []
+        elif returned_f and not returned_t:
+            code_t, env_t, returned_t = self.block(stmt.body + rest, dict(env))
+            rest = []
+        # The variables of a branch which raises do not matter
+        # (only static tests can have one; a raise in a branch on the values
+        # cannot be translated)
+        if returned_t == 'raise' or returned_f == 'raise':
+            code = [ast.If(test=test, body=code_t or [ast.Pass()],
+                           orelse=code_f or [ast.Pass()])]
+            if returned_t == 'raise':
+                env_t, returned_t = env_f, returned_f
+            merged, returned = env_t, returned_t
+            if returned or not rest:
+                return code, merged, returned
+            more, merged, returned = self.block(rest, merged)
+            return code + more, merged, returned
+        if not static and ('return' in env_t) != ('return' in env_f):
+            raise _Untranslatable('a branch on the values of the inputs returns nothing')
+        merged = {}
+        for name in sorted(set(env_t) | set(env_f)):
+            if name in env_t and name in env_f:
+                if env_t[name] == env_f[name]:
+                    merged[name] = env_t[name]
+                else:
+                    merged[name] = self.fresh(name)
+                    if static:
+                        code_t.append(_assign(merged[name], _name(env_t[name])))
+                        code_f.append(_assign(merged[name], _name(env_f[name])))
+            # A variable assigned in only one branch is undefined afterwards
+        if static:
+            code = [ast.If(test=test, body=code_t or [ast.Pass()],
+                           orelse=code_f or [ast.Pass()])]
+        else:
+            self.depth -= 1
+            code.extend(code_t)
+            code.extend(code_f)
+            for name, new in sorted(merged.items()):
+                if new != env_t[name]:
+                    code.append(_assign(new, _np('where', _name(test),
+                                                 _name(env_t[name]),
+                                                 _name(env_f[name]))))
+        returned = returned_t and returned_f
+        if returned or not rest:
+            return code, merged, returned
+        more, merged, returned = self.block(rest, merged)
+        return code + more, merged, returned
+
+    # Tests
+    def static(self, node):
+        '''Whether a test depends only on which options were given and their
+        values, not on the values of the inputs.'''
+        if isinstance(node, ast.Name):
+            return node.id in self.options
+        elif isinstance(node, ast.Constant):
+            return True
+        elif isinstance(node, ast.UnaryOp) and isinstance(node.op, ast.Not):
+            return self.static(node.operand)
+        elif isinstance(node, ast.BoolOp):
+            return all(self.static(v) for v in node.values)
+        elif (isinstance(node, ast.Compare)
+              and not any(isinstance(op, (ast.Is, ast.IsNot, ast.In, ast.NotIn))
+                          for op in node.ops)
+              and all(self.static_value(v) for v in [node.left] + node.comparators)):
+            return True
+        elif isinstance(node, ast.Compare) and len(node.ops) == 1:
+            op, right = node.ops[0], node.comparators[0]
+            if isinstance(op, (ast.Is, ast.IsNot)):
+                return (isinstance(node.left, ast.Name) and isinstance(right, ast.Constant)
+                        and any(right.value is v for v in (None, True, False)))
+            if isinstance(op, (ast.Eq, ast.NotEq, ast.In, ast.NotIn)):
+                return (isinstance(node.left, ast.Name) and node.left.id in self.options
+                        and _is_str(right))
+        elif (isinstance(node, ast.Call) and isinstance(node.func, ast.Name)
+              and node.func.id in ('all', 'any') and len(node.args) == 1
+              and isinstance(node.args[0], (ast.List, ast.Tuple))):
+            return all(self.static(v) for v in node.args[0].elts)
+        return False
+
+    def static_value(self, node):
+        # Arithmetic on the static arguments and numbers only
+        if isinstance(node, ast.Name):
+            return node.id in self.static_params
+        elif isinstance(node, ast.Constant):
+            return isinstance(node.value, (int, float)) and not isinstance(node.value, bool)
+        elif isinstance(node, ast.UnaryOp):
+            return self.static_value(node.operand)
+        elif isinstance(node, ast.BinOp):
+            return self.static_value(node.left) and self.static_value(node.right)
+        return False
+
+    def static_test(self, node, env):
+        if isinstance(node, ast.Name) and node.id in self.optional:
+            return ast.Call(func=_name('_truth'), args=[self.expr(node, env)],
+                            keywords=[])
+        elif isinstance(node, ast.UnaryOp):
+            return ast.UnaryOp(op=ast.Not(), operand=self.static_test(node.operand, env))
+        elif isinstance(node, ast.BoolOp):
+            return ast.BoolOp(op=node.op, values=[self.static_test(v, env)
+                                                  for v in node.values])
+        elif isinstance(node, ast.Call):
+            op = ast.And() if node.func.id == 'all' else ast.Or()
+            return ast.BoolOp(op=op, values=[self.static_test(v, env)
+                                             for v in node.args[0].elts])
+        return self.expr(node, env)
+
+    def dynamic_test(self, node, env):
+        if isinstance(node, ast.BoolOp):
+            function = 'logical_and' if isinstance(node.op, ast.And) else 'logical_or'
+            values = [self.dynamic_test(v, env) for v in node.values]
+            ans = values[0]
+            for value in values[1:]:
+                ans = _np(function, ans, value)
+            return ans
+        elif isinstance(node, ast.UnaryOp) and isinstance(node.op, ast.Not):
+            return _np('logical_not', self.dynamic_test(node.operand, env))
+        elif self.static(node):
+            # A test of the options inside a test of the values
+            return self.static_test(node, env)
+        elif isinstance(node, ast.Compare):
+            if any(isinstance(op, (ast.Is, ast.IsNot, ast.In, ast.NotIn)) for op in node.ops):
+                raise _Untranslatable('identity or membership test of values')
+            left = self.expr(node.left, env)
+            parts = []
+            for op, right in zip(node.ops, node.comparators):
+                right = self.expr(right, env)
+                parts.append(ast.Compare(left=left, ops=[op], comparators=[right]))
+                left = right
+            ans = parts[0]
+            for part in parts[1:]:
+                ans = _np('logical_and', ans, part)
+            return ans
+        return self.expr(node, env)
+
+    # Expressions
+    def expr(self, node, env):
+        return _Expression(self, env).visit(copy.deepcopy(node))
+
+    def call(self, node, env):
+        func = node.func
+        if node.keywords and not isinstance(func, ast.Name):
+            raise _Untranslatable('call with keywords')
+        if isinstance(func, ast.Attribute) and isinstance(func.value, ast.Name):
+            module = self.globals.get(func.value.id)
+            if module is math and func.attr in _math_functions:
+                return _np(_math_functions[func.attr], *node.args)
+            raise _Untranslatable('call to %s.%s' %(func.value.id, func.attr))
+        if isinstance(func, ast.Name) and func.id in self.params:
+            # A function given as an argument; its own array implementation
+            # is looked up when the kernel is called
+            node.func = ast.Call(func=_name('_array_kernel'), args=[func],
+                                 keywords=[])
+            return node
+        if not isinstance(func, ast.Name) or func.id in env:
+            raise _Untranslatable('call to a computed function')
+        obj = self.globals.get(func.id)
+        if obj is None:
+            if func.id in _builtin_functions and len(node.args) == 2 or func.id == 'abs':
+                return _np(_builtin_functions[func.id], *node.args)
+            if func.id == 'float' and len(node.args) == 1:
+                return ast.BinOp(left=node.args[0], op=ast.Mult(),
+                                 right=ast.Constant(value=1.0))
+            raise _Untranslatable('call to %s' %(func.id))
+        if id(obj) in _math_ids:
+            return _np(_math_functions[_math_ids[id(obj)]], *node.args)
+        if isinstance(obj, types.FunctionType) and obj is not self.func:
+            kernel = _translate(obj)
+            if kernel is None:
+                raise _Untranslatable('call to %s, which cannot be translated'
+                                      %(func.id))
+            name = '_%s_kernel' %(func.id)
+            self.dependencies[name] = kernel
+            node.func = _name(name)
+            return node
+        raise _Untranslatable('call to %s' %(func.id))
+
+
+class _Rename(ast.NodeTransformer):
+    def __init__(self, env):
+        self.env = env
+
+    def visit_Name(self, node):
+        if node.id in self.env:
+            return _name(self.env[node.id])
+        return node
+
+
+class _Expression(ast.NodeTransformer):
+    def __init__(self, translator, env):
+        self.translator = translator
+        self.env = env
+
+    def visit_Name(self, node):
+        if node.id in self.env:
+            return _name(self.env[node.id])
+        if node.id not in self.translator.globals and not hasattr(builtins, node.id):
+            raise _Untranslatable('undefined name %s' %(node.id))
+        return node
+
+    def visit_Call(self, node):
+        self.generic_visit(node)
+        return self.translator.call(node, self.env)
+
+    def visit_IfExp(self, node):
+        if self.translator.static(node.test):
+            test = self.translator.static_test(node.test, self.env)
+            return ast.IfExp(test=test, body=self.visit(node.body),
+                             orelse=self.visit(node.orelse))
+        test = self.translator.dynamic_test(node.test, self.env)
+        return _np('where', test, self.visit(node.body), self.visit(node.orelse))
+
+    def visit_Lambda(self, node):
+        raise _Untranslatable('lambda')
+
+    def visit_ListComp(self, node):
+        raise _Untranslatable('comprehension')
+
+    visit_GeneratorExp = visit_SetComp = visit_DictComp = visit_ListComp
+
+    def visit_Subscript(self, node):
+        raise _Untranslatable('subscript')
+
+
+def _key(func, static):
+    return (func, tuple(sorted(static))) if static else func
+
+
+def _translate(func, static=()):
+    '''Returns the array implementation of `func`, or None if it cannot be
+    translated; the reason is kept in `_kernels`.'''
+    key = _key(func, static)
+    try:
+        return _kernels[key][0]
+    except KeyError:
+        pass
+    _kernels[key] = (None, None, 'recursive call')
+    try:
+        translator = _Translator(func, static)
+        module = translator.translate()
+    except _Untranslatable as e:
+        _kernels[key] = (None, None, str(e))
+        return None
+    namespace = dict(func.__globals__)
+    namespace['np'] = np
+    namespace['_truth'] = _truth
+    namespace['_array_kernel'] = array_kernel
+    namespace.update(translator.dependencies)
+    exec(compile(module, '<array kernel of %s>' %(func.__name__), 'exec'), namespace)
+    generated = namespace[func.__name__]
+    source = ast.unparse(module) if hasattr(ast, 'unparse') else None
+
+    def kernel(*args, **kwargs):
+        args = [np.asarray(v) if isinstance(v, (list, tuple)) else v for v in args]
+        for k, v in kwargs.items():
+            if isinstance(v, (list, tuple)):
+                kwargs[k] = np.asarray(v)
+        with np.errstate(all='ignore'):
+            return generated(*args, **kwargs)
+    kernel.__name__ = func.__name__
+    kernel.__doc__ = func.__doc__
+    kernel.translated = True
+    kernel.source = source
+    kernel.reason = None
+    _kernels[key] = (kernel, source, None)
+    return kernel
+
+
+def _parse(func):
+    try:
+        source = textwrap.dedent(inspect.getsource(func))
+    except (IOError, TypeError):
+        raise _Untranslatable('source is not available')
+    node = ast.parse(source).body[0]
+    if not isinstance(node, ast.FunctionDef) or node.decorator_list:
+        raise _Untranslatable('not a plain function')
+    args = node.args
+    if args.vararg or args.kwarg or args.kwonlyargs:
+        raise _Untranslatable('variable arguments')
+    return node
+
+
+def _add(a, b):
+    if a is None or b is None:
+        return b if a is None else a
+    return ast.BinOp(left=a, op=ast.Add(), right=b)
+
+
+def _mul(a, b):
+    if a is None or b is None:
+        return None
+    return ast.BinOp(left=a, op=ast.Mult(), right=b)
+
+
+def _zero(d):
+    return ast.Constant(value=0.0) if d is None else d
+
+
+class _Differentiator(object):
+    '''Writes the forward-mode derivative of one function: each expression is
+    split into one assignment per operation, each followed by the assignment
+    of its derivative, `_d_<name>` for the variables of the function. The
+    generated function takes the derivatives of the arguments as the extra
+    keyword arguments `_d_<argument>` and returns (value, derivative).
+    '''
+    def __init__(self, func):
+        self.func = func
+        self.globals = func.__globals__
+        self.node = _parse(func)
+        self.params = [arg.arg for arg in self.node.args.args]
+        self.variables = set(self.params)
+        for node in ast.walk(self.node):
+            if isinstance(node, ast.Name) and isinstance(node.ctx, ast.Store):
+                self.variables.add(node.id)
+        self.count = 0
+        self.dependencies = {}
+
+    def generate(self):
+        body = self.block(self.node.body)
+        args = copy.deepcopy(self.node.args)
+        args.args = args.args + [ast.arg(arg='_d_' + p, annotation=None)
+                                 for p in self.params]
+        args.defaults = args.defaults + [ast.Constant(value=0.0) for p in self.params]
+        node = ast.FunctionDef(name='_jvp_' + self.node.name, args=args,
+                               body=body or [ast.Pass()], decorator_list=[],
+                               returns=None, type_comment=None)
+        if hasattr(ast, 'type_param'): # pragma: no cover
+            node.type_params = []
+        module = ast.Module(body=[node], type_ignores=[])
+        return ast.fix_missing_locations(module)
+
+    def tmp(self, code, value, prefix='_t'):
+        self.count += 1
+        name = '%s%d' %(prefix, self.count)
+        code.append(_assign(name, value))
+        return _name(name)
+
+    # Statements
+    def block(self, stmts):
+        code = []
+        for stmt in stmts:
+            if isinstance(stmt, ast.Expr) and isinstance(stmt.value, ast.Constant):
+                continue # docstring
+            elif isinstance(stmt, ast.Pass):
+                continue
+            elif isinstance(stmt, ast.Assign):
+                self.assign(stmt.targets, stmt.value, code)
+            elif isinstance(stmt, ast.AugAssign):
+                value = ast.BinOp(left=_name(self.target(stmt.target)), op=stmt.op,
+                                  right=stmt.value)
+                self.assign([stmt.target], value, code)
+            elif isinstance(stmt, ast.Return):
+                if stmt.value is None:
+                    raise _Untranslatable('return without a value')
+                value, d = self.expr(stmt.value, code)
+                code.append(ast.Return(value=ast.Tuple(elts=[value, _zero(d)],
+                                                       ctx=ast.Load())))
+            elif isinstance(stmt, ast.Raise):
+                code.append(copy.deepcopy(stmt))
+            elif isinstance(stmt, ast.If):
+                code.append(ast.If(test=copy.deepcopy(stmt.test),
+                                   body=self.block(stmt.body) or [ast.Pass()],
+                                   orelse=self.block(stmt.orelse)))
+            elif isinstance(stmt, ast.Try):
+                handlers = [ast.ExceptHandler(type=copy.deepcopy(h.type), name=h.name,
+                                              body=self.block(h.body) or [ast.Pass()])
+                            for h in stmt.handlers]
+                code.append(ast.Try(body=self.block(stmt.body) or [ast.Pass()],
+                                    handlers=handlers, orelse=self.block(stmt.orelse),
+                                    finalbody=self.block(stmt.finalbody)))
+            else:
+                raise _Untranslatable('%s statement' %(type(stmt).__name__))
+        return code
+
+    def target(self, node):
+        if not isinstance(node, ast.Name):
+            raise _Untranslatable('assignment to %s' %(type(node).__name__))
+        return node.id
+
+    def assign(self, targets, value, code):
+        if len(targets) != 1:
+            raise _Untranslatable('chained assignment')
+        target = targets[0]
+        if isinstance(target, ast.Tuple):
+            if not isinstance(value, ast.Tuple) or len(value.elts) != len(target.elts):
+                raise _Untranslatable('unpacking')
+            pairs = list(zip(target.elts, value.elts))
+        else:
+            pairs = [(target, value)]
+        # Evaluate every value before binding any name
+        values = [self.expr(v, code) for _, v in pairs]
+        for (t, _), (v, d) in zip(pairs, values):
+            name = self.target(t)
+            code.append(_assign(name, v))
+            code.append(_assign('_d_' + name, _zero(d)))
+
+    # Expressions
+    def expr(self, node, code):
+        '''Appends the statements evaluating `node` to `code`, and returns the
+        names (or constants) holding its value and derivative; the derivative
+        is None if it is zero.'''
+        if isinstance(node, ast.Constant):
+            return node, None
+        elif isinstance(node, ast.Name):
+            if node.id in self.variables:
+                return _name(node.id), _name('_d_' + node.id)
+            if node.id not in self.globals and not hasattr(builtins, node.id):
+                raise _Untranslatable('undefined name %s' %(node.id))
+            return _name(node.id), None
+        elif isinstance(node, (ast.Attribute, ast.Subscript, ast.Compare, ast.BoolOp)):
+            # Not differentiable; kept as it is
+            return self.tmp(code, copy.deepcopy(node)), None
+        elif isinstance(node, ast.UnaryOp):
+            if isinstance(node.op, ast.Not):
+                return self.tmp(code, copy.deepcopy(node)), None
+            a, da = self.expr(node.operand, code)
+            if isinstance(node.op, ast.UAdd):
+                return a, da
+            elif isinstance(node.op, ast.USub):
+                value = self.tmp(code, ast.UnaryOp(op=ast.USub(), operand=a))
+                if da is None:
+                    return value, None
+                return value, self.tmp(code, ast.UnaryOp(op=ast.USub(), operand=da), '_dt')
+            raise _Untranslatable('operator %s' %(type(node.op).__name__))
+        elif isinstance(node, ast.BinOp):
+            a, da = self.expr(node.left, code)
+            b, db = self.expr(node.right, code)
+            value = self.tmp(code, ast.BinOp(left=a, op=node.op, right=b))
+            return value, self.binop(node.op, a, b, value, da, db, code)
+        elif isinstance(node, ast.IfExp):
+            value, d = '_t%d' %(self.count + 1), '_dt%d' %(self.count + 1)
+            self.count += 1
+            branches = []
+            for branch in (node.body, node.orelse):
+                branch_code = []
+                v, dv = self.expr(branch, branch_code)
+                branch_code.append(_assign(value, v))
+                branch_code.append(_assign(d, _zero(dv)))
+                branches.append(branch_code)
+            code.append(ast.If(test=copy.deepcopy(node.test), body=branches[0],
+                               orelse=branches[1]))
+            return _name(value), _name(d)
+        elif isinstance(node, ast.Call):
+            return self.call(node, code)
+        raise _Untranslatable('%s expression' %(type(node).__name__))
+
+    def binop(self, op, a, b, value, da, db, code):
+        if da is None and db is None:
+            return None
+        if isinstance(op, ast.Add):
+            d = _add(da, db)
+        elif isinstance(op, ast.Sub):
+            d = _add(da, None if db is None else ast.UnaryOp(op=ast.USub(), operand=db))
+        elif isinstance(op, ast.Mult):
+            d = _add(_mul(da, b), _mul(a, db))
+        elif isinstance(op, ast.Div):
+            d = _add(da, None if db is None else ast.UnaryOp(
+                op=ast.USub(), operand=_mul(value, db)))
+            d = ast.BinOp(left=d, op=ast.Div(), right=b)
+        elif isinstance(op, ast.Pow):
+            d = None
+            if da is not None:
+                if isinstance(b, ast.Constant):
+                    power = ast.BinOp(left=a, op=ast.Pow(),
+                                      right=ast.Constant(value=b.value - 1))
+                else:
+                    power = ast.BinOp(left=a, op=ast.Pow(), right=ast.BinOp(
+                        left=b, op=ast.Sub(), right=ast.Constant(value=1.0)))
+                d = _mul(da, ast.BinOp(left=b, op=ast.Mult(), right=power))
+            if db is not None:
+                log = ast.Call(func=ast.Attribute(value=_name('_math'), attr='log',
+                                                  ctx=ast.Load()),
+                               args=[a], keywords=[])
+                d = _add(d, _mul(db, _mul(value, log)))
+        elif isinstance(op, ast.FloorDiv):
+            return None
+        elif isinstance(op, ast.Mod) and db is None:
+            d = da
+        else:
+            raise _Untranslatable('derivative of operator %s' %(type(op).__name__))
+        return self.tmp(code, d, '_dt')
+
+    def call(self, node, code):
+        func = node.func
+        if any(isinstance(a, ast.Starred) for a in node.args) or any(
+                k.arg is None for k in node.keywords):
+            raise _Untranslatable('call with variable arguments')
+        if isinstance(func, ast.Attribute) and isinstance(func.value, ast.Name):
+            if self.globals.get(func.value.id) is math and func.attr in _derivative_rules:
+                return self.unary(func.attr, node, code)
+            raise _Untranslatable('call to %s.%s' %(func.value.id, func.attr))
+        if not isinstance(func, ast.Name) or func.id in self.variables:
+            raise _Untranslatable('call to a computed function')
+        obj = self.globals.get(func.id)
+        if obj is None:
+            if func.id == 'abs' and len(node.args) == 1:
+                return self.unary('fabs', node, code)
+            elif func.id == 'float' and len(node.args) == 1:
+                a, da = self.expr(node.args[0], code)
+                return self.tmp(code, ast.Call(func=func, args=[a], keywords=[])), da
+            elif func.id in ('min', 'max') and len(node.args) == 2 and not node.keywords:
+                op = ast.LtE() if func.id == 'min' else ast.GtE()
+                a, b = node.args
+                choice = ast.IfExp(test=ast.Compare(left=a, ops=[op], comparators=[b]),
+                                   body=a, orelse=b)
+                return self.expr(choice, code)
+            raise _Untranslatable('call to %s' %(func.id))
+        if id(obj) in _math_ids and _math_ids[id(obj)] in _derivative_rules:
+            return self.unary(_math_ids[id(obj)], node, code)
+        if obj is math.pow and len(node.args) == 2:
+            return self.expr(ast.BinOp(left=node.args[0], op=ast.Pow(),
+                                       right=node.args[1]), code)
+        if isinstance(obj, types.FunctionType):
+            name = '_jvp_%s' %(obj.__name__)
+            if obj is not self.func:
+                jvp = _differentiate(obj)
+                if jvp is None:
+                    raise _Untranslatable('call to %s, which cannot be differentiated'
+                                          %(func.id))
+                self.dependencies[name] = jvp
+            params = _differentiator_params(obj)
+            args, keywords = [], []
+            for i, arg in enumerate(node.args):
+                a, da = self.expr(arg, code)
+                args.append(a)
+                if da is not None:
+                    keywords.append(ast.keyword(arg='_d_' + params[i], value=da))
+            for keyword in node.keywords:
+                a, da = self.expr(keyword.value, code)
+                keywords.append(ast.keyword(arg=keyword.arg, value=a))
+                if da is not None:
+                    keywords.append(ast.keyword(arg='_d_' + keyword.arg, value=da))
+            self.count += 1
+            value, d = '_t%d' %(self.count), '_dt%d' %(self.count)
+            call = ast.Call(func=_name(name), args=args, keywords=keywords)
+            code.append(ast.Assign(targets=[ast.Tuple(elts=[ast.Name(id=value, ctx=ast.Store()),
+                                                            ast.Name(id=d, ctx=ast.Store())],
+                                                      ctx=ast.Store())], value=call))
+            return _name(value), _name(d)
+        raise _Untranslatable('call to %s' %(func.id))
+
+    def unary(self, function, node, code):
+        if len(node.args) != 1 or node.keywords:
+            raise _Untranslatable('call to %s with %d arguments' %(function, len(node.args)))
+        a, da = self.expr(node.args[0], code)
+        value = self.tmp(code, ast.Call(func=copy.deepcopy(node.func), args=[a],
+                                        keywords=[]))
+        if da is None:
+            return value, None
+        rule = _Rename({'a': a.id if isinstance(a, ast.Name) else None,
+                        'v': value.id})
+        factor = ast.parse(_derivative_rules[function], mode='eval').body
+        if isinstance(a, ast.Constant): # pragma: no cover
+            return value, None
+        factor = rule.visit(factor)
+        return value, self.tmp(code, _mul(factor, da), '_dt')
+
+
+def _differentiator_params(func):
+    return list(func.__code__.co_varnames[:func.__code__.co_argcount])
+
+
+def _differentiate(func):
+    '''Returns the generated forward-mode derivative of `func`, or None if it
+    cannot be differentiated; the reason is kept in `_jvps`.'''
+    try:
+        return _jvps[func][0]
+    except KeyError:
+        pass
+    _jvps[func] = (None, None, 'recursive call')
+    try:
+        differentiator = _Differentiator(func)
+        module = differentiator.generate()
+    except _Untranslatable as e:
+        _jvps[func] = (None, None, str(e))
+        return None
+    namespace = dict(func.__globals__)
+    namespace['_math'] = math
+    namespace.update(differentiator.dependencies)
+    exec(compile(module, '<derivative of %s>' %(func.__name__), 'exec'), namespace)
+    generated = namespace['_jvp_' + func.__name__]
+    source = ast.unparse(module) if hasattr(ast, 'unparse') else None
+    _jvps[func] = (generated, source, None)
+    return generated
+
+
+def derivative_kernel(func, wrt):
+    r'''Returns a function which evaluates a scalar function and its
+    derivative with respect to one of its arguments, generated from its
+    source by forward-mode differentiation.
+
+    The result takes the same arguments as `func` and returns a tuple of the
+    value of `func` and the derivative; it has the attribute `source`, the
+    source of the generated function.
+
+    Parameters
+    ----------
+    func : callable
+        Scalar function to differentiate, [-]
+    wrt : str
+        Name of the argument to differentiate with respect to, [-]
+
+    Returns
+    -------
+    kernel : callable
+        Function returning `func` and its derivative, [-]
+
+    Raises
+    ------
+    ValueError
+        If `func` cannot be differentiated; for example, if it has loops or
+        calls compiled functions other than those of `math`
+
+    Examples
+    --------
+    >>> from ht import temperature_effectiveness_TEMA_J
+    >>> dP1 = derivative_kernel(temperature_effectiveness_TEMA_J, 'NTU1')
+    >>> dP1(R1=0.5, NTU1=1.2, Ntp=2)
+    (0.5862949549909279, 0.20516702786114707)
+    '''
+    key = (func, wrt)
+    try:
+        return _derivatives[key]
+    except KeyError:
+        pass
+    generated = _differentiate(func)
+    if generated is None:
+        raise ValueError('%s cannot be differentiated: %s' %(func.__name__,
+                                                            _jvps[func][2]))
+    if wrt not in _differentiator_params(func):
+        raise ValueError('%s has no argument %s' %(func.__name__, wrt))
+    seed = '_d_' + wrt
+
+    def kernel(*args, **kwargs):
+        kwargs[seed] = 1.0
+        return generated(*args, **kwargs)
+    kernel.__name__ = func.__name__
+    kernel.__doc__ = func.__doc__
+    kernel.source = _jvps[func][1]
+    _derivatives[key] = kernel
+    return kernel
+
+
+def verify(func, kernel, inputs, rtol=1e-9):
+    r'''Checks an array implementation of a function against the function,
+    evaluated element by element. Elements for which the function raises an
+    exception or returns a complex or non-finite number are not checked.
+
+    Parameters
+    ----------
+    func : callable
+        Scalar function, [-]
+    kernel : callable
+        Array implementation of `func`, [-]
+    inputs : dict[str, array-like]
+        Arguments, which are broadcast together, [various]
+    rtol : float, optional
+        Relative tolerance, [-]
+
+    Returns
+    -------
+    checked : int
+        Number of elements compared, [-]
+
+    Raises
+    ------
+    AssertionError
+        If any element differs by more than `rtol`
+    '''
+    names = list(inputs)
+    arrays = np.broadcast_arrays(*[np.asarray(inputs[n]) for n in names])
+    shape = arrays[0].shape if arrays else ()
+    expect = np.full(shape, np.nan)
+    for index in np.ndindex(*shape):
+        kwargs = dict((n, a[index].item()) for n, a in zip(names, arrays))
+        try:
+            value = func(**kwargs)
+        except Exception:
+            continue
+        if isinstance(value, (int, float)) or isinstance(value, np.number) and not isinstance(value, complex):
+            expect[index] = value
+    mask = np.isfinite(expect)
+    try:
+        got = np.broadcast_to(kernel(**dict(zip(names, arrays))), shape)
+    except Exception as e:
+        if mask.any():
+            raise AssertionError('The array implementation of %s raised %r'
+                                 %(func.__name__, e))
+        return 0
+    if not np.allclose(got[mask], expect[mask], rtol=rtol, atol=0, equal_nan=False):
+        bad = np.argmax(~np.isclose(got[mask], expect[mask], rtol=rtol, atol=0))
+        raise AssertionError('%s differs from its array implementation: %r != %r'
+                             %(func.__name__, expect[mask][bad], got[mask][bad]))
+    return int(mask.sum())
+
+
+def array_kernel(func, samples=None, rtol=1e-9, static=()):
+    r'''Returns an array implementation of a scalar function, generated from
+    its source, or `np.vectorize` of it if it cannot be translated.
+
+    The result has the attributes `translated` (whether the function was
+    translated), `source` (the source of the generated function) and `reason`
+    (why it could not be translated).
+
+    Parameters
+    ----------
+    func : callable
+        Scalar function to translate, [-]
+    samples : dict[str, array-like], optional
+        Arguments to check the generated function against `func` with (see
+        :obj:`verify`); if they disagree, `np.vectorize` is returned, [various]
+    rtol : float, optional
+        Relative tolerance of the check, [-]
+    static : tuple[str], optional
+        Names of arguments, such as a number of passes, whose values select
+        the formula used; the kernel requires them to be scalars, and tests
+        of their values are kept as they are, [-]
+
+    Returns
+    -------
+    kernel : callable
+        Array implementation of `func`, [-]
+    '''
+    kernel = _translate(func, static)
+    reason = _kernels[_key(func, static)][2]
+    if kernel is not None and samples is not None:
+        try:
+            verify(func, kernel, samples, rtol=rtol)
+        except AssertionError as e:
+            kernel, reason = None, str(e)
+    if kernel is None:
+        kernel = np.vectorize(func)
+        kernel.translated = False
+        kernel.source = None
+        kernel.reason = reason
+    return kernel
@@ -0,0 +1,574 @@
+# -*- coding: utf-8 -*-
+'''Chemical Engineering Design Library (ChEDL). Utilities for process modeling.
+Copyright (C) 2018, Caleb Bell <Caleb.Andrew.Bell@gmail.com>
+
+Permission is hereby granted, free of charge, to any person obtaining a copy
+of this software and associated documentation files (the "Software"), to deal
+in the Software without restriction, including without limitation the rights
+to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+copies of the Software, and to permit persons to whom the Software is
+furnished to do so, subject to the following conditions:
+
+The above copyright notice and this permission notice shall be included in all
+copies or substantial portions of the Software.
+
+THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+SOFTWARE.'''
+
+from __future__ import division
+from math import pi, log, floor
+import numpy as np
+import fluids.vectorized
+from ht.hx import (Ntubes, shell_clearance, temperature_effectiveness_TEMA_E,
+                   temperature_effectiveness_TEMA_G,
+                   temperature_effectiveness_TEMA_H,
+                   temperature_effectiveness_TEMA_J, TEMA_tubing,
+                   get_tube_TEMA, HEDH_pitches, HEDH_shells, TEMA_Ls)
+from ht.conv_internal import Nu_conv_internal
+from ht.conv_tube_bank import Kern_f_Re
+
+__all__ = ['ShellTubeExchanger', 'design_shell_tube']
+
+
+_TEMA_shell_effectiveness = {'E': temperature_effectiveness_TEMA_E,
+                             'G': temperature_effectiveness_TEMA_G,
+                             'H': temperature_effectiveness_TEMA_H,
+                             'J': temperature_effectiveness_TEMA_J}
+
+
+try:
+    from concurrent.futures import ProcessPoolExecutor
+except ImportError: # pragma: no cover
+    ProcessPoolExecutor = None
+
+# Numbers of tube passes with an effectiveness formula for each shell type
+_TEMA_shell_Ntps = {'G': (1, 2), 'H': (1, 2), 'J': (1, 2, 4)}
+
+_vectorized_cache = {}
+
+def _vectorized(func):
+    # Deferred to avoid a circular import; ht.vectorized imports all of ht
+    try:
+        return _vectorized_cache[func]
+    except KeyError:
+        import ht.vectorized
+        ans = _vectorized_cache[func] = getattr(ht.vectorized, func.__name__)
+        return ans
+
+
+class ShellTubeExchanger(object):
+    r'''Class representing the geometry of a single-shell TEMA shell-and-tube
+    heat exchanger, which can be rated at any number of operating points at
+    once. All parameters are also attributes.
+
+    Everything which depends only on the geometry - the tube count, the flow
+    areas on both sides, the shell-side equivalent diameter, the heat transfer
+    areas and the number of baffles - is calculated once when the object is
+    created. :obj:`rate` then only evaluates the correlations which depend on
+    the operating conditions, on arrays of conditions.
+
+    The shell side is side 1 and the tube side is side 2, as in
+    :obj:`ht.hx.P_NTU_method`. The shell side is handled with Kern's
+    equivalent-diameter method [1]_, and the tube side with
+    :obj:`ht.conv_internal.Nu_conv_internal`.
+
+    .. math::
+        \frac{1}{U_o} = \frac{1}{h_o} + R_{f,o} + \frac{D_o\ln(D_o/D_i)}{2k_w}
+        + \left(R_{f,i} + \frac{1}{h_i}\right)\frac{D_o}{D_i}
+
+        S_S = \frac{D_S (P_T-D_o) L_B}{P_T}
+
+        D_e = \frac{4(P_T^2 - \pi D_o^2/4)}{\pi D_o}
+
+    Parameters
+    ----------
+    DShell : float
+        Shell inner diameter, [m]
+    Do : float
+        Tube outer diameter, [m]
+    Di : float
+        Tube inner diameter, [m]
+    pitch : float
+        Pitch; distance between two orthogonal tube centers, [m]
+    L : float
+        Length of the tubes, [m]
+    LSpacing : float
+        Baffle spacing, [m]
+    Ntp : int, optional
+        Number of tube passes, [-]
+    angle : float, optional
+        The angle the tubes are positioned; 30, 45, 60 or 90, [degrees]
+    shell : str, optional
+        TEMA shell type; one of 'E', 'G', 'H', or 'J', [-]
+    optimal : bool, optional
+        Whether the tube passes are arranged in the more countercurrent
+        (optimal) way, [-]
+    k_wall : float, optional
+        Thermal conductivity of the tube wall; if not specified, the wall
+        resistance is neglected, [W/m/K]
+    Rf_shell : float, optional
+        Fouling factor on the shell side, [m^2*K/W]
+    Rf_tube : float, optional
+        Fouling factor on the tube side (referred to the inner area),
+        [m^2*K/W]
+    roughness : float, optional
+        Roughness of the tube inner surface, [m]
+    Ntubes_method : str, optional
+        Method used to calculate the tube count; see :obj:`ht.hx.Ntubes`, [-]
+    tube_method : str, optional
+        Tube-side Nusselt number correlation; see
+        :obj:`ht.conv_internal.Nu_conv_internal`, [-]
+
+    Attributes
+    ----------
+    DBundle : float
+        Outer diameter of the tube bundle; the shell diameter minus the TEMA
+        recommended clearance, [m]
+    N : int
+        Number of tubes in the exchanger, [-]
+    N_per_pass : float
+        Number of tubes in each tube pass, [-]
+    NBaffles : int
+        Number of baffles, [-]
+    A_tube_flow : float
+        Tube-side flow area of one tube pass, [m^2]
+    A_shell_flow : float
+        Shell-side crossflow area at the shell centerline, [m^2]
+    De : float
+        Shell-side equivalent diameter of Kern, [m]
+    A_o : float
+        Outer heat transfer area of all tubes, [m^2]
+    A_i : float
+        Inner heat transfer area of all tubes, [m^2]
+    R_wall : float
+        Tube wall conduction resistance referred to the outer area, [m^2*K/W]
+
+    Notes
+    -----
+    Fluid properties are taken as constant at the values given to
+    :obj:`rate`; no iteration on the wall temperature is performed.
+
+    The shell-side heat transfer correlation of Kern [1]_ is:
+
+    .. math::
+        Nu = 0.36Re^{0.55}Pr^{1/3}\left(\frac{\mu}{\mu_w}\right)^{0.14}
+
+    The shell-side pressure drop is calculated as in
+    :obj:`ht.conv_tube_bank.dP_Kern`; the tube-side pressure drop includes
+    only the friction in the straight tubes. If the viscosities at the wall
+    are given, the Sieder-Tate factor :math:`(\mu/\mu_w)^{0.14}` multiplies
+    the Nusselt number and divides the pressure drop on that side.
+
+    The tube-side Nusselt number and the shell effectiveness are evaluated
+    element by element through :obj:`ht.vectorized`.
+
+    Examples
+    --------
+    >>> HX = ShellTubeExchanger(DShell=0.584, Do=0.019, Di=0.0157,
+    ... pitch=0.0254, L=3.66, LSpacing=0.1524, Ntp=2, k_wall=45.)
+    >>> HX.N, HX.NBaffles
+    (416, 23)
+    >>> ans = HX.rate(m1=11., m2=15., T1i=370., T2i=300., Cp1=2300.,
+    ... Cp2=4180., rho1=800., rho2=995., mu1=5E-4, mu2=8E-4, k1=0.13, k2=0.6)
+    >>> round(float(ans['Q']), 1), round(float(ans['U']), 2)
+    (1301005.5, 593.44)
+
+    References
+    ----------
+    .. [1] Kern, Donald Quentin. Process Heat Transfer. McGraw-Hill, 1950.
+    '''
+    def __repr__(self): # pragma: no cover
+        return ('<TEMA %s shell-and-tube exchanger, shell diameter=%s m, %s '
+                'tubes of outer diameter=%s m, length=%s m, %s tube passes>'
+                %(self.shell, self.DShell, self.N, self.Do, self.L, self.Ntp))
+
+    def __init__(self, DShell, Do, Di, pitch, L, LSpacing, Ntp=1, angle=30,
+                 shell='E', optimal=True, k_wall=None, Rf_shell=0.0,
+                 Rf_tube=0.0, roughness=0.0, Ntubes_method=None,
+                 tube_method=None):
+        if shell not in _TEMA_shell_effectiveness:
+            raise Exception("Supported shell types are 'E', 'G', 'H', and 'J'")
+        if shell == 'E':
+            if Ntp > 3 and Ntp % 2:
+                raise Exception('For TEMA E shells with an odd number of tube '
+                                'passes more than 3, no solution is implemented.')
+        elif Ntp not in _TEMA_shell_Ntps[shell]:
+            raise Exception('Supported numbers of tube passes for TEMA %s '
+                            'shells are %s' %(shell, _TEMA_shell_Ntps[shell]))
+        self.DShell = DShell
+        self.Do = Do
+        self.Di = Di
+        self.pitch = pitch
+        self.L = L
+        self.LSpacing = LSpacing
+        self.Ntp = Ntp
+        self.angle = angle
+        self.shell = shell
+        self.optimal = optimal
+        self.k_wall = k_wall
+        self.Rf_shell = Rf_shell
+        self.Rf_tube = Rf_tube
+        self.roughness = roughness
+        self.Ntubes_method = Ntubes_method
+        self.tube_method = tube_method
+
+        self.DBundle = DShell - shell_clearance(DShell=DShell)
+        self.N = Ntubes(DBundle=self.DBundle, Do=Do, pitch=pitch, Ntp=Ntp,
+                        angle=angle, Method=Ntubes_method)
+        self.N_per_pass = self.N/Ntp
+        self.NBaffles = int(floor(L/LSpacing)) - 1
+
+        self.A_tube_flow = self.N_per_pass*0.25*pi*Di*Di
+        self.A_shell_flow = DShell*(pitch - Do)*LSpacing/pitch
+        self.De = 4.*(pitch*pitch - 0.25*pi*Do*Do)/(pi*Do)
+        self.A_o = self.N*pi*Do*L
+        self.A_i = self.N*pi*Di*L
+        self.eD = roughness/Di
+        if k_wall is not None:
+            self.R_wall = Do*log(Do/Di)/(2.*k_wall)
+        else:
+            self.R_wall = 0.0
+
+    def rate(self, m1, m2, T1i, T2i, Cp1, Cp2, rho1, rho2, mu1, mu2, k1, k2,
+             mu_w1=None, mu_w2=None):
+        r'''Rates the heat exchanger at one or many operating points, given
+        the flows, inlet temperatures and properties of both streams. All
+        arguments may be floats or arrays of the same shape; the results are
+        arrays of that shape.
+
+        Parameters
+        ----------
+        m1 : float
+            Mass flow rate of stream 1 (shell side), [kg/s]
+        m2 : float
+            Mass flow rate of stream 2 (tube side), [kg/s]
+        T1i : float
+            Inlet temperature of stream 1 (shell side), [K]
+        T2i : float
+            Inlet temperature of stream 2 (tube side), [K]
+        Cp1 : float
+            Averaged heat capacity of stream 1 (shell side), [J/kg/K]
+        Cp2 : float
+            Averaged heat capacity of stream 2 (tube side), [J/kg/K]
+        rho1 : float
+            Density of stream 1 (shell side), [kg/m^3]
+        rho2 : float
+            Density of stream 2 (tube side), [kg/m^3]
+        mu1 : float
+            Viscosity of stream 1 (shell side), [Pa*s]
+        mu2 : float
+            Viscosity of stream 2 (tube side), [Pa*s]
+        k1 : float
+            Thermal conductivity of stream 1 (shell side), [W/m/K]
+        k2 : float
+            Thermal conductivity of stream 2 (tube side), [W/m/K]
+        mu_w1 : float, optional
+            Viscosity of stream 1 at the wall temperature, [Pa*s]
+        mu_w2 : float, optional
+            Viscosity of stream 2 at the wall temperature, [Pa*s]
+
+        Returns
+        -------
+        results : dict
+            * Q : Heat exchanged in the heat exchanger, [W]
+            * T1o : Outlet temperature of stream 1 (shell side), [K]
+            * T2o : Outlet temperature of stream 2 (tube side), [K]
+            * U : Overall heat transfer coefficient based on the outer tube
+              area, [W/m^2/K]
+            * UA : Combined area-heat transfer coefficient term, [W/K]
+            * h1 : Shell-side heat transfer coefficient, [W/m^2/K]
+            * h2 : Tube-side heat transfer coefficient, [W/m^2/K]
+            * dP1 : Shell-side pressure drop, [Pa]
+            * dP2 : Tube-side pressure drop, [Pa]
+            * P1 : Thermal effectiveness with respect to stream 1, [-]
+            * R1 : Heat capacity ratio with respect to stream 1, [-]
+            * NTU1 : Thermal Number of Transfer Units with respect to
+              stream 1 [-]
+        '''
+        (m1, m2, T1i, T2i, Cp1, Cp2, rho1, rho2, mu1, mu2, k1,
+         k2) = np.broadcast_arrays(*[np.asarray(i, dtype=float) for i in 
+                                     (m1, m2, T1i, T2i, Cp1, Cp2, rho1, rho2,
+                                      mu1, mu2, k1, k2)])
+
+        # Shell side, Kern's method
+        Gs = m1/self.A_shell_flow
+        Re1 = self.De*Gs/mu1
+        Pr1 = Cp1*mu1/k1
+        Nu1 = 0.36*Re1**0.55*Pr1**(1/3.)
+        if mu_w1 is not None:
+            Nu1 = Nu1*(mu1/mu_w1)**0.14
+        h1 = Nu1*k1/self.De
+        f = Kern_f_Re(Re1.ravel()).reshape(Re1.shape)
+        dP1 = f*Gs*Gs*self.DShell*(self.NBaffles + 1)/(2.*rho1*self.De)
+        if mu_w1 is not None:
+            dP1 = dP1/(mu1/mu_w1)**0.14
+
+        # Tube side
+        V2 = m2/(rho2*self.A_tube_flow)
+        Re2 = rho2*V2*self.Di/mu2
+        Pr2 = Cp2*mu2/k2
+        fd = fluids.vectorized.friction_factor(Re2, eD=self.eD)
+        Nu2 = _vectorized(Nu_conv_internal)(Re=Re2, Pr=Pr2, eD=self.eD,
+                                            Di=self.Di, x=self.L, fd=fd,
+                                            Method=self.tube_method)
+        dP2 = fd*self.L*self.Ntp/self.Di*0.5*rho2*V2*V2
+        if mu_w2 is not None:
+            Nu2 = Nu2*(mu2/mu_w2)**0.14
+            dP2 = dP2/(mu2/mu_w2)**0.14
+        h2 = Nu2*k2/self.Di
+
+        U = 1./(1./h1 + self.Rf_shell + self.R_wall
+                + (self.Rf_tube + 1./h2)*self.Do/self.Di)
+        UA = U*self.A_o
+
+        C1 = m1*Cp1
+        C2 = m2*Cp2
+        R1 = C1/C2
+        NTU1 = UA/C1
+        function = _vectorized(_TEMA_shell_effectiveness[self.shell])
+        if self.shell == 'J':
+            P1 = function(R1, NTU1, self.Ntp)
+        else:
+            P1 = function(R1, NTU1, self.Ntp, self.optimal)
+        Q = np.abs(T1i - T2i)*P1*C1
+        T1o = T1i + P1*(T2i - T1i)
+        T2o = T2i - P1*R1*(T2i - T1i)
+        return {'Q': Q, 'T1o': T1o, 'T2o': T2o, 'U': U, 'UA': UA, 'h1': h1,
+                'h2': h2, 'dP1': dP1, 'dP2': dP2, 'P1': P1, 'R1': R1,
+                'NTU1': NTU1}
+
+
+def _design_branch(branch):
+    '''Evaluates every shell diameter of one branch of the design space (a
+    fixed tube, pitch, layout angle, number of tube passes and tube length),
+    and returns the feasible designs. The shells must be sorted in ascending
+    order. Module-level so that it can be sent to worker processes.
+
+    The tube count never falls as the shell grows, so the tube velocity and
+    the tube-side pressure drop - which depend on nothing else that changes
+    with the shell - never rise. The smallest shell meeting the tube-side
+    pressure drop limit is found by bisection; the smaller shells are not
+    rated, and the whole branch is dropped if the largest shell fails it.
+    The shell side and the duty also depend on the baffle spacing, which
+    scales with the shell, so every remaining shell is rated.
+    '''
+    (NPS, BWG, Do, Di, pitch, angle, Ntp, L, DShells, baffle_ratio, kwargs,
+     conditions, Q, dP1_max, dP2_max) = branch
+    exchangers = []
+    for DShell in DShells:
+        # Shells too small for a tube in each pass, or too large for a baffle,
+        # are infeasible; any other error is the caller's to see
+        HX = ShellTubeExchanger(DShell=DShell, Do=Do, Di=Di, pitch=pitch,
+                                L=L, LSpacing=baffle_ratio*DShell, Ntp=Ntp,
+                                angle=angle, **kwargs)
+        if HX.N >= Ntp and HX.NBaffles >= 0:
+            exchangers.append(HX)
+    if not exchangers:
+        return []
+
+    ratings = {}
+    def rating(i):
+        if i not in ratings:
+            ratings[i] = exchangers[i].rate(**conditions)
+        return ratings[i]
+
+    low, high = 0, len(exchangers) - 1
+    if rating(high)['dP2'] > dP2_max:
+        return []
+    while low < high:
+        mid = (low + high)//2
+        if rating(mid)['dP2'] <= dP2_max:
+            high = mid
+        else:
+            low = mid + 1
+
+    designs = []
+    for i in range(low, len(exchangers)):
+        HX, ans = exchangers[i], rating(i)
+        dP1, dP2 = float(ans['dP1']), float(ans['dP2'])
+        if ans['Q'] < Q or dP1 > dP1_max or dP2 > dP2_max:
+            continue
+        power = (conditions['m1']*dP1/conditions['rho1']
+                 + conditions['m2']*dP2/conditions['rho2'])
+        designs.append({'NPS': NPS, 'BWG': BWG, 'Do': Do, 'Di': Di,
+                        'pitch': pitch, 'angle': angle, 'Ntp': Ntp,
+                        'DShell': HX.DShell, 'L': L, 'LSpacing': HX.LSpacing,
+                        'N': HX.N, 'A': HX.A_o, 'Q': float(ans['Q']),
+                        'U': float(ans['U']), 'dP1': dP1, 'dP2': dP2,
+                        'power': power, 'T1o': float(ans['T1o']),
+                        'T2o': float(ans['T2o'])})
+    return designs
+
+
+def _pareto_front(designs, keys=('A', 'power')):
+    # After sorting on the objectives, a design can only be dominated by one
+    # before it, and only by one which is itself on the front
+    front = []
+    for design in sorted(designs, key=lambda d: [d[k] for k in keys]):
+        values = [design[k] for k in keys]
+        for other in front:
+            if all(other[k] <= v for k, v in zip(keys, values)):
+                break
+        else:
+            front.append(design)
+    return front
+
+
+def design_shell_tube(Q, dP1_max, dP2_max, m1, m2, T1i, T2i, Cp1, Cp2, rho1,
+                      rho2, mu1, mu2, k1, k2, mu_w1=None, tubes=None,
+                      pitch_ratios=None, angles=(30, 45, 60, 90),
+                      Ntps=None, DShells=None, Ls=None,
+                      baffle_ratio=0.4, processes=None, **kwargs):
+    r'''Searches the standard TEMA geometries for single-shell shell-and-tube
+    heat exchangers which transfer at least a required duty between two
+    streams without exceeding a pressure drop limit on either side, and
+    returns the designs which are Pareto-optimal in outer heat transfer area
+    and pumping power.
+
+    The design space is the combination of every standard tube (outer
+    diameter and BWG gauge), tube pitch, tube layout angle, number of tube
+    passes, tube length and shell diameter. Each design is rated with
+    :obj:`ShellTubeExchanger`; the shell is side 1 and the tubes are side 2.
+
+    Parameters
+    ----------
+    Q : float
+        Required heat duty, [W]
+    dP1_max : float
+        Maximum allowable shell-side pressure drop, [Pa]
+    dP2_max : float
+        Maximum allowable tube-side pressure drop, [Pa]
+    m1 : float
+        Mass flow rate of stream 1 (shell side), [kg/s]
+    m2 : float
+        Mass flow rate of stream 2 (tube side), [kg/s]
+    T1i : float
+        Inlet temperature of stream 1 (shell side), [K]
+    T2i : float
+        Inlet temperature of stream 2 (tube side), [K]
+    Cp1 : float
+        Averaged heat capacity of stream 1 (shell side), [J/kg/K]
+    Cp2 : float
+        Averaged heat capacity of stream 2 (tube side), [J/kg/K]
+    rho1 : float
+        Density of stream 1 (shell side), [kg/m^3]
+    rho2 : float
+        Density of stream 2 (tube side), [kg/m^3]
+    mu1 : float
+        Viscosity of stream 1 (shell side), [Pa*s]
+    mu2 : float
+        Viscosity of stream 2 (tube side), [Pa*s]
+    k1 : float
+        Thermal conductivity of stream 1 (shell side), [W/m/K]
+    k2 : float
+        Thermal conductivity of stream 2 (tube side), [W/m/K]
+    mu_w1 : float, optional
+        Viscosity of stream 1 at the wall temperature, [Pa*s]
+    tubes : list[tuple(float, float)], optional
+        (NPS, BWG) pairs of the tubes to consider; defaults to all of the
+        tubes in `TEMA_tubing`, [in, -]
+    pitch_ratios : list[float], optional
+        Ratios of tube pitch to tube outer diameter to consider; defaults to
+        the common ratios of each tube size in `HEDH_pitches`, [-]
+    angles : list[float], optional
+        Tube layout angles to consider, [degrees]
+    Ntps : list[int], optional
+        Numbers of tube passes to consider; defaults to 1, 2, 4, 6 and 8, or
+        those supported by the shell type if it is not 'E', [-]
+    DShells : list[float], optional
+        Shell inner diameters to consider; defaults to `HEDH_shells`, [m]
+    Ls : list[float], optional
+        Tube lengths to consider; defaults to `TEMA_Ls`, [m]
+    baffle_ratio : float, optional
+        Ratio of the baffle spacing to the shell diameter, [-]
+    processes : int, optional
+        Number of worker processes to evaluate the design space with; 1
+        evaluates it in the calling process, and None uses one per CPU, [-]
+
+    Returns
+    -------
+    designs : list[dict]
+        Pareto-optimal designs sorted by outer heat transfer area, each with
+        the keys 'NPS', 'BWG', 'Do', 'Di', 'pitch', 'angle', 'Ntp', 'DShell',
+        'L', 'LSpacing', 'N', 'A', 'Q', 'U', 'dP1', 'dP2', 'power', 'T1o'
+        and 'T2o', [-]
+
+    Notes
+    -----
+    Any other keyword arguments, such as `shell` or `k_wall`, are passed on
+    to :obj:`ShellTubeExchanger`.
+
+    The pumping power is the sum of the volumetric flow times the pressure
+    drop of each stream, :math:`m_1\Delta P_1/\rho_1 + m_2\Delta P_2/\rho_2`.
+    A design is kept if no other feasible design has both a smaller or equal
+    area and a smaller or equal pumping power.
+
+    The search is split into branches which differ only in shell diameter.
+    Within a branch the tube count cannot fall as the shell grows, so the
+    tube-side pressure drop cannot rise; the shells too small to meet its
+    limit are skipped by bisection, and a branch is dropped after a single
+    rating if its largest shell fails it. No search is done at all if the
+    duty is more than the maximum possible, :math:`C_{min}|T_{1,i}-T_{2,i}|`.
+    The branches are independent and are evaluated in parallel.
+
+    Examples
+    --------
+    >>> designs = design_shell_tube(Q=1E6, dP1_max=5E4, dP2_max=5E4, m1=11.,
+    ... m2=15., T1i=370., T2i=300., Cp1=2300., Cp2=4180., rho1=800.,
+    ... rho2=995., mu1=5E-4, mu2=8E-4, k1=0.13, k2=0.6, tubes=[(0.75, 16)],
+    ... pitch_ratios=[1.25], angles=[30], Ntps=[2], Ls=[3.658],
+    ... DShells=HEDH_shells[:12], k_wall=45., processes=1)
+    >>> [(d['DShell'], d['N']) for d in designs[:4]]
+    [(0.4064, 224), (0.4318, 248), (0.4572, 282), (0.4826, 318)]
+    '''
+    if tubes is None:
+        tubes = [(NPS, BWG) for NPS in sorted(TEMA_tubing.keys())
+                 for BWG in TEMA_tubing[NPS]]
+    if DShells is None:
+        DShells = HEDH_shells
+    if Ls is None:
+        Ls = TEMA_Ls
+    if Ntps is None:
+        Ntps = _TEMA_shell_Ntps.get(kwargs.get('shell', 'E'), (1, 2, 4, 6, 8))
+    DShells = sorted(DShells)
+    if Q > min(m1*Cp1, m2*Cp2)*abs(T1i - T2i):
+        return []
+    conditions = {'m1': m1, 'm2': m2, 'T1i': T1i, 'T2i': T2i, 'Cp1': Cp1,
+                  'Cp2': Cp2, 'rho1': rho1, 'rho2': rho2, 'mu1': mu1,
+                  'mu2': mu2, 'k1': k1, 'k2': k2, 'mu_w1': mu_w1}
+
+    branches = []
+    for NPS, BWG in tubes:
+        _, _, Do, Di, _ = get_tube_TEMA(NPS=NPS, BWG=BWG)
+        if pitch_ratios is None:
+            ratios = HEDH_pitches.get(NPS, 1.25)
+            if not isinstance(ratios, tuple):
+                ratios = (ratios,)
+        else:
+            ratios = pitch_ratios
+        for ratio in ratios:
+            for angle in angles:
+                for Ntp in Ntps:
+                    for L in Ls:
+                        branches.append((NPS, BWG, Do, Di, ratio*Do, angle,
+                                         Ntp, L, DShells, baffle_ratio, kwargs,
+                                         conditions, Q, dP1_max, dP2_max))
+
+    if processes == 1 or ProcessPoolExecutor is None:
+        results = map(_design_branch, branches)
+        designs = [design for result in results for design in result]
+    else:
+        with ProcessPoolExecutor(max_workers=processes) as executor:
+            chunksize = max(1, len(branches)//(4*(processes or 8)))
+            results = executor.map(_design_branch, branches,
+                                   chunksize=chunksize)
+            designs = [design for result in results for design in result]
+    designs = _pareto_front(designs)
+    designs.sort(key=lambda design: (design['A'], design['dP1'],
+                                     design['dP2']))
+    return designs
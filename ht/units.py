@@ -22,8 +22,10 @@ SOFTWARE.'''
 
 from __future__ import division
 import types
+import functools
 import numpy as np
 import ht
+import ht.vectorized
 
 __all__ = ['wraps_numpydoc', 'u']
 
@@ -36,7 +38,9 @@ except ImportError: # pragma: no cover
     raise ImportError('The unit handling in fluids requires the installation '
                       'of the package pint, available on pypi or from '
                       'https://github.com/hgrecco/pint')
-from fluids.units import wraps_numpydoc
+from fluids.units import wraps_numpydoc as fluids_wraps_numpydoc
+from fluids.units import (parse_numpydoc_variables_units, convert_input,
+                          parse_expression_cached)
 
 
 '''
@@ -44,6 +48,82 @@ Functions which will need custom wrappers:
 ht.get_tube_TEMA, ht.check_tubing_TEMA
 '''
 
+
+def wraps_numpydoc(ureg, strict=True):
+    '''Decorator which wraps an ht function so it accepts and returns pint
+    quantities, using the units listed in its numpydoc docstring.
+
+    Scalar calls are handled by `fluids.units.wraps_numpydoc`. That wrapper
+    sends array quantities to `fluids.vectorized`, which does not have the
+    ht functions; here they are sent to :obj:`ht.vectorized` instead. Each
+    argument is converted to its documented unit once, as a whole array, so
+    the cost of a call is that of the unitless :obj:`ht.vectorized` call.
+    '''
+    def decorator(func):
+        scalar_wrapper = fluids_wraps_numpydoc(ureg, strict)(func)
+        array_func = getattr(ht.vectorized, func.__name__, None)
+        if array_func is None:
+            return scalar_wrapper
+
+        parsed_info = parse_numpydoc_variables_units(func)
+        in_vars = parsed_info['Parameters']['vars']
+        in_units = parsed_info['Parameters']['units']
+        if 'Other Parameters' in parsed_info:
+            in_vars += parsed_info['Other Parameters']['vars']
+            in_units += parsed_info['Other Parameters']['units']
+        in_vars_to_dict = dict(zip(in_vars, in_units))
+        out_units = parsed_info['Returns']['units']
+        out_vars = parsed_info['Returns']['vars']
+        if out_vars and 'results' == out_vars[0]:
+            out_units.pop(0)
+            out_vars.pop(0)
+
+        @functools.wraps(scalar_wrapper)
+        def wrapper(*values, **kw):
+            if not any(is_array(i) for i in list(values) + list(kw.values())):
+                return scalar_wrapper(*values, **kw)
+            conv_values = [convert_input(val, unit, ureg, strict)
+                           for val, unit in zip(values, in_units)]
+            kwargs = {}
+            for name, val in kw.items():
+                kwargs[name] = convert_input(val, in_vars_to_dict[name], ureg, strict)
+            result = array_func(*conv_values, **kwargs)
+            return convert_array_output(result, out_units, out_vars, ureg)
+        return wrapper
+    return decorator
+
+
+def is_array(val):
+    if type(val) is u.Quantity:
+        val = val.magnitude
+    return type(val) is np.ndarray
+
+
+def convert_array_output(result, out_units, out_vars, ureg):
+    '''Attach units to the result of an array calculation. Single arrays
+    have the first documented unit attached; tuples of arrays (from functions
+    with several return values) have each of their documented units attached.
+    Arrays of dicts (from functions returning a dict) are rebuilt as one dict
+    of arrays, each with the unit documented for its key. Other arrays of
+    objects (strings) are returned unchanged.
+    '''
+    if type(result) is tuple:
+        return tuple(convert_array_output(ans, [unit], [var], ureg)
+                     for ans, unit, var in zip(result, out_units, out_vars))
+    if type(result) is np.ndarray and result.dtype == object:
+        flat = result.ravel()
+        if not flat.size or type(flat[0]) is not dict:
+            return result
+        converted = {}
+        for key in flat[0]:
+            unit = out_units[out_vars.index(key)]
+            values = np.array([ans[key] for ans in flat]).reshape(result.shape)
+            converted[key] = values*parse_expression_cached(unit, ureg)
+        return converted
+    if not out_units:
+        return result
+    return result*parse_expression_cached(out_units[0], ureg)
+
 __funcs = {}
 
 
@@ -65,6 +65,25 @@ for name in dir(ht):
     __all__.append(name)
     __funcs.update({name: obj})
 #    globals()[name] = obj
+
+# Functions with array implementations, used instead of np.vectorize. Each
+# has the same signature as the function it replaces, and falls back to
+# np.vectorize for the cases it does not implement.
+__array_funcs = {
+    'temperature_effectiveness_air_cooler': ht.hx._temperature_effectiveness_air_cooler_vectorized,
+    'Ft_aircooler': ht.air_cooler._Ft_aircooler_vectorized,
+    'F_LMTD_Fakheri': ht.hx._F_LMTD_Fakheri_vectorized,
+    'LMTD': ht.core._LMTD_vectorized,
+    'temperature_effectiveness_plate': ht.hx._temperature_effectiveness_plate_vectorized,
+    'NTU_from_P_plate': ht.hx._NTU_from_P_plate_vectorized,
+    'temperature_effectiveness_shells': ht.hx._temperature_effectiveness_shells_vectorized,
+    'NTU_from_P_shells': ht.hx._NTU_from_P_shells_vectorized,
+    'Nu_vertical_cylinder': ht.conv_free_immersed._Nu_vertical_cylinder_vectorized,
+    'Nu_horizontal_cylinder': ht.conv_free_immersed._Nu_horizontal_cylinder_vectorized,
+    'Lehrer': ht.conv_jacket._Lehrer_vectorized,
+    'Stein_Schmidt': ht.conv_jacket._Stein_Schmidt_vectorized,
+}
+__funcs.update(__array_funcs)
 globals().update(__funcs)
 
 
@@ -0,0 +1,139 @@
+# -*- coding: utf-8 -*-
+'''Chemical Engineering Design Library (ChEDL). Utilities for process modeling.
+Copyright (C) 2017 Caleb Bell <Caleb.Andrew.Bell@gmail.com>
+
+Permission is hereby granted, free of charge, to any person obtaining a copy
+of this software and associated documentation files (the "Software"), to deal
+in the Software without restriction, including without limitation the rights
+to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+copies of the Software, and to permit persons to whom the Software is
+furnished to do so, subject to the following conditions:
+
+The above copyright notice and this permission notice shall be included in all
+copies or substantial portions of the Software.
+
+THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+SOFTWARE.'''
+
+
+from __future__ import division
+import numpy as np
+import ht
+import csv
+from io import StringIO
+from ht.batch import evaluate, evaluate_csv, ERROR_CODES, ERROR_NONNUMERIC
+from ht.__main__ import main
+from numpy.testing import assert_allclose
+import pytest
+
+
+def test_evaluate():
+    NTUs = np.linspace(0.1, 5, 50)
+    Crs = np.linspace(0.1, 1.5, 50)
+    subtypes = ['crossflow', 'counterflow']*25
+    expect = []
+    for NTU, Cr, subtype in zip(NTUs, Crs, subtypes):
+        try:
+            expect.append(ht.effectiveness_from_NTU(NTU, Cr, subtype))
+        except Exception:
+            expect.append(np.nan)
+
+    inputs = {'NTU': NTUs, 'Cr': Crs, 'subtype': subtypes}
+    for processes, chunksize in [(1, None), (2, None), (2, 7)]:
+        results, errors = evaluate(ht.effectiveness_from_NTU, inputs,
+                                   processes=processes, chunksize=chunksize)
+        assert_allclose(results, expect)
+        assert results.dtype == np.float64
+        assert errors.dtype == np.int8
+        # Crossflow is only defined for Cr <= 1
+        assert (errors[np.isnan(expect)] == ERROR_CODES[Exception]).all()
+        assert (errors[~np.isnan(expect)] == 0).all()
+
+
+def test_evaluate_method_constants():
+    Res = [1E4, 1E5, 1E6]
+    results, errors = evaluate('Nu_conv_internal', {'Re': Res}, method='Dittus-Boelter',
+                               constants={'Pr': 0.7}, processes=2, chunksize=1)
+    assert_allclose(results, [ht.Nu_conv_internal(Re, 0.7, Method='Dittus-Boelter') for Re in Res])
+    assert not errors.any()
+
+    # Integer and boolean columns are shared as well
+    results, errors = evaluate('NTU_from_P_G', {'P1': [.573, .99], 'R1': [1/3., 1/3.],
+                               'Ntp': np.array([2, 2]), 'optimal': [True, True]}, processes=1)
+    assert_allclose(results[0], ht.NTU_from_P_G(.573, 1/3., 2))
+    assert np.isnan(results[1])
+    assert errors.tolist() == [0, ERROR_CODES[ValueError]]
+
+
+def test_evaluate_errors():
+    # Complex results are not numbers
+    results, errors = evaluate('Nu_conv_internal', {'Re': [1E5, -1.], 'Pr': [.7, .7]},
+                               method='Dittus-Boelter', processes=1)
+    assert errors.tolist() == [0, ERROR_NONNUMERIC]
+
+    with pytest.raises(ValueError):
+        evaluate('LMTD', {'Thi': [1., 2.], 'Tho': [1.]})
+
+    results, errors = evaluate('LMTD', {'Thi': [], 'Tho': [], 'Tci': [], 'Tco': []})
+    assert results.shape == errors.shape == (0,)
+
+
+def test_evaluate_csv():
+    text = 'Thi,Tho,Tcold_in,Tco\n100,60,30,40.2\n101,60,30,40.2\n102,60,30,40.2\n'
+    for path in ['auto', 'vectorized', 'batch']:
+        out = StringIO()
+        stats = {}
+        rows = evaluate_csv('LMTD', StringIO(text), out, columns={'Tci': 'Tcold_in'},
+                            chunksize=2, path=path, stats=stats)
+        assert rows == stats['rows'] == 3
+        assert stats['path'] == ('array' if path == 'auto' else path)
+        table = list(csv.reader(StringIO(out.getvalue())))
+        assert table[0][:5] == ['Thi', 'Tho', 'Tcold_in', 'Tco', 'LMTD']
+        assert table[0][5:] == ([] if path == 'auto' else ['error'])
+        assert_allclose([float(row[4]) for row in table[1:]],
+                        [ht.LMTD(Thi, 60, 30, 40.2) for Thi in (100, 101, 102)])
+
+    # Bad values only fail their own row
+    out = StringIO()
+    stats = {}
+    evaluate_csv('Nu_conv_internal', StringIO('Re,Pr\n1e5,0.7\nabc,0.7\n'), out,
+                 method='Dittus-Boelter', stats=stats)
+    table = list(csv.reader(StringIO(out.getvalue())))
+    assert_allclose(float(table[1][2]), ht.Nu_conv_internal(1E5, .7, Method='Dittus-Boelter'))
+    assert table[1][3] == '0'
+    assert table[2][2] == 'nan' and table[2][3] == str(ERROR_CODES[TypeError])
+    assert stats['errors'] == 1
+
+    with pytest.raises(ValueError):
+        evaluate_csv('LMTD', StringIO(text), StringIO(), columns={'Tci': 'missing'})
+    with pytest.raises(ValueError):
+        evaluate_csv('Nu_conv_internal', StringIO(text), StringIO(), path='array')
+
+
+def test_main(tmpdir, capsys, monkeypatch):
+    source = tmpdir.join('in.csv')
+    source.write('NTU,Cr\n1,0.5\n2,0.5\n')
+    destination = tmpdir.join('out.csv')
+    assert main(['effectiveness_from_NTU', str(source), str(destination),
+                 '--set', 'subtype=crossflow', '--output-column', 'eff',
+                 '--processes', '2', '--chunk-size', '1']) == 0
+    table = list(csv.reader(destination.open()))
+    assert table[0] == ['NTU', 'Cr', 'eff', 'error']
+    assert_allclose([float(row[2]) for row in table[1:]],
+                    [ht.effectiveness_from_NTU(NTU, .5, 'crossflow') for NTU in (1, 2)])
+    assert '2 rows (0 errors)' in capsys.readouterr().err
+
+    # Without --processes, the batch path uses as many processes as the API
+    calls = []
+    def recording_evaluate(*args, **kwargs):
+        calls.append(kwargs['processes'])
+        return evaluate(*args, **kwargs)
+    monkeypatch.setattr(ht.batch, 'evaluate', recording_evaluate)
+    assert main(['effectiveness_from_NTU', str(source), str(destination),
+                 '--set', 'subtype=crossflow', '--path', 'batch', '--quiet']) == 0
+    assert calls == [None]
@@ -0,0 +1,133 @@
+# -*- coding: utf-8 -*-
+'''Chemical Engineering Design Library (ChEDL). Utilities for process modeling.
+Copyright (C) 2017 Caleb Bell <Caleb.Andrew.Bell@gmail.com>
+
+Permission is hereby granted, free of charge, to any person obtaining a copy
+of this software and associated documentation files (the "Software"), to deal
+in the Software without restriction, including without limitation the rights
+to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+copies of the Software, and to permit persons to whom the Software is
+furnished to do so, subject to the following conditions:
+
+The above copyright notice and this permission notice shall be included in all
+copies or substantial portions of the Software.
+
+THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+SOFTWARE.'''
+
+
+from __future__ import division
+import threading
+import numpy as np
+import ht
+import ht.hx
+import ht.caching
+from ht.caching import memoize
+from numpy.testing import assert_allclose
+import pytest
+
+
+def test_memoize():
+    calls = []
+    @memoize(maxsize=2)
+    def f(x, y=1.0):
+        calls.append(x)
+        return x*y
+
+    assert f(1.0) == 1.0
+    assert f(1.0) == 1.0
+    assert f(2.0, y=3.0) == 6.0
+    assert f.cache_info() == {'hits': 1, 'misses': 2, 'size': 2, 'maxsize': 2}
+    # 1.0 is the most recently used, so 2.0 is dropped
+    f(1.0)
+    f(3.0)
+    assert f.cache_info()['size'] == 2
+    f(2.0, y=3.0)
+    assert calls == [1.0, 2.0, 3.0, 2.0]
+
+    # Unhashable arguments are not cached
+    assert_allclose(f(np.array([1.0, 2.0])), [1.0, 2.0])
+    assert f.cache_info()['misses'] == 4
+
+    f.cache_clear()
+    assert f.cache_info() == {'hits': 0, 'misses': 0, 'size': 0, 'maxsize': 2}
+
+    with pytest.raises(ValueError):
+        memoize(f, maxsize=0)
+
+
+def test_memoize_digits():
+    g = memoize(ht.effectiveness_from_NTU, digits=6)
+    e1 = g(NTU=5, Cr=0.7, subtype='crossflow')
+    e2 = g(NTU=5+1E-9, Cr=0.7, subtype='crossflow')
+    assert e1 == e2
+    assert g.cache_info()['hits'] == 1
+    assert_allclose(e1, ht.effectiveness_from_NTU(NTU=5, Cr=0.7, subtype='crossflow'))
+
+
+def test_enable_disable_clear():
+    g = memoize(ht.nearest_material)
+    g('stainless steel')
+    try:
+        ht.caching.disable()
+        assert not ht.caching.is_enabled()
+        assert g.cache_info()['size'] == 0
+        assert g('stainless steel') == 'Metals, stainless steel'
+        assert g.cache_info()['misses'] == 0
+    finally:
+        ht.caching.enable()
+    g('stainless steel')
+    g('stainless steel')
+    assert g.cache_info()['hits'] == 1
+    ht.caching.clear()
+    assert g.cache_info()['size'] == 0
+
+
+def test_install():
+    original = ht.NTU_from_P_G
+    ht.caching.install(maxsize=8)
+    try:
+        assert ht.NTU_from_P_G is not original
+        assert ht.hx.NTU_from_P_G is ht.NTU_from_P_G
+        NTU1 = ht.NTU_from_P_G(P1=.573, R1=1/3., Ntp=2)
+        NTU2 = ht.NTU_from_P_G(P1=.573, R1=1/3., Ntp=2)
+        assert NTU1 == NTU2
+        stats = ht.caching.stats()['NTU_from_P_G']
+        assert stats['hits'] == 1 and stats['misses'] == 1
+        # Installing again leaves the existing caches in place
+        wrapper = ht.NTU_from_P_G
+        ht.caching.install()
+        assert ht.NTU_from_P_G is wrapper
+    finally:
+        ht.caching.uninstall()
+    assert ht.NTU_from_P_G is original
+    assert ht.hx.NTU_from_P_G is original
+
+    with pytest.raises(ValueError):
+        ht.caching.install(['__version__'])
+
+
+def test_memoize_threads():
+    calls = []
+    @memoize(maxsize=16)
+    def f(x):
+        calls.append(x)
+        return x*x
+
+    def work():
+        for i in range(200):
+            assert f(i % 32) == (i % 32)**2
+
+    threads = [threading.Thread(target=work) for _ in range(4)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    info = f.cache_info()
+    assert info['size'] <= 16
+    assert info['hits'] + info['misses'] == 800
@@ -137,4 +137,52 @@ def test_Nu_vertical_cylinder():
 
 def test_Nu_vertical_helical_coil_Ali():
     Nu = Nu_vertical_helical_coil_Ali(4.4, 1E11)
-    assert_allclose(Nu, 1808.5774997297106)
\ No newline at end of file
+    assert_allclose(Nu, 1808.5774997297106)
+
+def test_Ts_free_convection_radiation():
+    from fluids import Grashof
+    T_process = np.linspace(250, 900, 7)
+    Nu_funcs = {('vertical plate', None): Nu_vertical_plate_Churchill,
+                ('horizontal cylinder', None): Nu_horizontal_cylinder_Churchill_Chu,
+                ('horizontal cylinder', 'Morgan'): Nu_horizontal_cylinder_Morgan,
+                ('horizontal cylinder', 'Kuehn & Goldstein'): Nu_horizontal_cylinder_Kuehn_Goldstein,
+                ('sphere', None): Nu_sphere_Churchill}
+    for (geometry, Method), Nu_func in Nu_funcs.items():
+        res = Ts_free_convection_radiation(T_process=T_process, R=0.3, T_inf=290., L=.5,
+                                           k=0.028, nu=1.7E-5, Pr=0.7, emissivity=0.8,
+                                           geometry=geometry, Method=Method)
+        assert res['converged'].all()
+        assert (res['iterations'] <= 8).all()
+        for i, Ts in enumerate(res['Ts']):
+            Gr = Grashof(L=.5, beta=2/(Ts + 290.), T1=Ts, T2=290., nu=1.7E-5)
+            h = Nu_func(0.7, Gr)*0.028/.5
+            assert_allclose(res['h'][i], h, rtol=1E-12)
+            assert_allclose(res['q_rad'][i], q_rad(0.8, Ts, 290.), rtol=1E-12)
+            assert_allclose((T_process[i] - Ts)/0.3, res['q'][i], rtol=1E-9, atol=1E-9)
+
+    # Radiating to colder surroundings, fixed beta
+    res = Ts_free_convection_radiation(T_process=[400., 500.], R=[0.1, 0.2], T_inf=300., L=2.,
+                                       k=0.028, nu=1.7E-5, Pr=0.7, T_surroundings=250., beta=1/300.)
+    for i, Ts in enumerate(res['Ts']):
+        Gr = Grashof(L=2., beta=1/300., T1=Ts, T2=300., nu=1.7E-5)
+        q = Nu_vertical_plate_Churchill(0.7, Gr)*0.028/2.*(Ts - 300.) + q_rad(0.9, Ts, 250.)
+        assert_allclose(q, ([400., 500.][i] - Ts)/[0.1, 0.2][i])
+
+    # Warm start from the previous solution
+    res = Ts_free_convection_radiation(T_process=[400., 500.], R=0.1, T_inf=300., L=2., k=0.028, nu=1.7E-5, Pr=0.7)
+    assert_allclose(res['Ts'], [345.98351891, 383.32557457])
+    res2 = Ts_free_convection_radiation(T_process=[400., 500.], R=0.1, T_inf=300., L=2., k=0.028,
+                                        nu=1.7E-5, Pr=0.7, Ts0=res['Ts'])
+    assert (res2['iterations'] <= 1).all()
+    assert_allclose(res2['Ts'], res['Ts'], rtol=1E-13)
+
+    # No resistance, and iteration limit
+    res = Ts_free_convection_radiation(T_process=[400., 500.], R=[0., 0.1], T_inf=300., L=2., k=0.028, nu=1.7E-5, Pr=0.7, maxiter=1)
+    assert res['Ts'][0] == 400.
+    assert_allclose(res['q'][0], Nu_vertical_plate_Churchill(0.7, Grashof(L=2., beta=2/700., T1=400., T2=300., nu=1.7E-5))*0.028/2.*100. + q_rad(0.9, 400., 300.))
+    assert res['converged'].tolist() == [True, False]
+
+    with pytest.raises(ValueError):
+        Ts_free_convection_radiation(400., 0.1, 300., 2., 0.028, 1.7E-5, 0.7, geometry='cube')
+    with pytest.raises(Exception):
+        Ts_free_convection_radiation(400., 0.1, 300., 2., 0.028, 1.7E-5, 0.7, Method='BADMETHOD')
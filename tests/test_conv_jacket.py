@@ -17,6 +17,7 @@ along with this program.  If not, see <http://www.gnu.org/licenses/>.'''
 
 from __future__ import division
 from ht import *
+from math import pi, exp
 from numpy.testing import assert_allclose
 import pytest
 
@@ -67,4 +68,124 @@ def test_conv_jacket():
     assert_allclose(h, 5685.532991556428)
 
     h = Stein_Schmidt(.1, 0.6, 0.65, 0.6, 0.025, 971.8, 4178.1, 0.615, 798E-6)
-    assert_allclose(h, 151.78819106776797)
\ No newline at end of file
+    assert_allclose(h, 151.78819106776797)
+
+def test_jacket_vectorized():
+    import numpy as np
+    from ht.conv_jacket import _Lehrer_vectorized, _Stein_Schmidt_vectorized
+    m = np.array([0.5, 2.5, 10.0])
+    kwargs = dict(Dtank=0.6, Djacket=0.65, H=0.6, Dinlet=0.025, rho=995.7,
+                  Cp=4178.1, k=0.615, mu=798E-6, muw=355E-6)
+    for inlettype in ('tangential', 'radial'):
+        for inletlocation in ('auto', 'top', 'bottom'):
+            for dT in (20., -20.):
+                ans = _Lehrer_vectorized(m, dT=dT, isobaric_expansion=0.000303,
+                                         inlettype=inlettype,
+                                         inletlocation=inletlocation, **kwargs)
+                expect = [Lehrer(mi, dT=dT, isobaric_expansion=0.000303,
+                                 inlettype=inlettype,
+                                 inletlocation=inletlocation, **kwargs) for mi in m]
+                assert_allclose(ans, expect, rtol=1e-12)
+            for rhow in (971.8, 1010.0):
+                ans = _Stein_Schmidt_vectorized(m, rhow=rhow, inlettype=inlettype,
+                                                inletlocation=inletlocation,
+                                                roughness=1E-5, **kwargs)
+                expect = [Stein_Schmidt(mi, rhow=rhow, inlettype=inlettype,
+                                        inletlocation=inletlocation,
+                                        roughness=1E-5, **kwargs) for mi in m]
+                assert_allclose(ans, expect, rtol=1e-12)
+
+    import ht.vectorized
+    assert_allclose(ht.vectorized.Stein_Schmidt(m, **kwargs),
+                    [Stein_Schmidt(mi, **kwargs) for mi in m], rtol=1e-12)
+
+
+def test_jacket_transient():
+    import numpy as np
+    t = np.linspace(0, 3600, 13)
+    m = np.array([1.0, 2.5, 5.0])
+    T_in = np.array([353.15, 353.15, 278.15])
+    kwargs = dict(Dtank=1.6, Djacket=1.7, H=1.5, Dinlet=0.05, rho=975., Cp=4190.,
+                  k=0.66, mu=3.5E-4)
+    res = jacket_transient(t, T0=313.15, mass=3000., Cp_contents=4180., m=m,
+                           T_in=T_in, h_contents=800., R_wall=1E-4, **kwargs)
+    assert res['T'].shape == (13, 3)
+    assert res['h'].shape == res['Q'].shape == res['T_out'].shape == (12, 3)
+
+    # Constant properties - the solution is exact at any step size
+    A = pi*1.6*1.5
+    for i in range(3):
+        h = Lehrer(m[i], **kwargs)
+        UA = A/(1/h + 1E-4 + 1/800.)
+        eff = 1 - exp(-UA/(m[i]*4190.))
+        expect = T_in[i] - (T_in[i] - 313.15)*np.exp(-eff*m[i]*4190.*t/(3000.*4180.))
+        assert_allclose(res['T'][:, i], expect, rtol=1e-12)
+        assert_allclose(res['h'][:, i], h, rtol=1e-12)
+    # Energy balance of the contents
+    dE = 3000.*4180.*(res['T'][-1] - res['T'][0])
+    assert_allclose(dE, (res['Q'][1:]*300.).sum(0) + (res['Q'][0]*300.), rtol=0.05)
+
+    # Temperature dependent properties, with the friction factor carried
+    # from step to step for Stein_Schmidt
+    mu = lambda T: 3.5E-4*np.exp(1800.*(1/T - 1/353.15))
+    rho = lambda T: 1000. - 0.35*(T - 293.15)
+    kwargs.update(mu=mu, rho=rho)
+    m = np.array([2.5, 2.5, 5.0])
+    res = jacket_transient(t, T0=313.15, mass=3000., Cp_contents=4180., m=m,
+                           T_in=T_in, method='Stein_Schmidt', roughness=1E-5,
+                           **kwargs)
+    assert np.all(np.diff(res['T'][:, :2], axis=0) > 0)
+    assert np.all(np.diff(res['T'][:, 2]) < 0)
+
+    # Same result stepping one vessel at a time with the scalar function
+    T = 313.15
+    T_wall = 0.5*(353.15 + T)
+    T_jacket = 353.15
+    for i in range(12):
+        h = Stein_Schmidt(2.5, Dtank=1.6, Djacket=1.7, H=1.5, Dinlet=0.05,
+                          rho=rho(T_jacket), Cp=4190., k=0.66, mu=mu(T_jacket),
+                          muw=mu(T_wall), rhow=rho(T_wall), roughness=1E-5,
+                          xtol=1E-13, maxiter=100)
+        assert_allclose(res['h'][i, 1], h, rtol=1e-9)
+        eff = 1 - exp(-A*h/(2.5*4190.))
+        Q = eff*2.5*4190.*(353.15 - T)
+        T_jacket = 353.15 - 0.5*eff*(353.15 - T)
+        T_wall = T_jacket - Q/(h*A)
+        T = 353.15 - (353.15 - T)*exp(-eff*2.5*4190.*300./(3000.*4180.))
+        assert_allclose(res['T'][i+1, 1], T, rtol=1e-9)
+
+    with pytest.raises(ValueError):
+        jacket_transient(t, T0=313.15, mass=3000., Cp_contents=4180., m=m,
+                         T_in=T_in, method='Dittus', **kwargs)
+
+
+def test_Stein_Schmidt_friction_factor():
+    import numpy as np
+    m = np.array([[0.05, 0.1, 0.5], [2.5, 10., 50.]])
+    kwargs = dict(Dtank=0.6, Djacket=0.65, H=0.6, Dinlet=0.025, rho=995.7,
+                  mu=798E-6, roughness=1E-5)
+    res = Stein_Schmidt_friction_factor(m, **kwargs)
+    assert res['fd'].shape == m.shape
+    assert np.all(res['converged'])
+    assert np.all(res['iterations'] <= 10)
+    # The direct iteration converges to the same friction factor
+    from fluids.friction import friction_factor
+    for fd, Re in zip(res['fd'].ravel(), res['Re'].ravel()):
+        assert_allclose(friction_factor(Re, 1E-5/0.05), fd, rtol=1e-11)
+    h = Stein_Schmidt(0.1, Cp=4178.1, k=0.615, xtol=1E-14, maxiter=500, **kwargs)
+    h_fd = Stein_Schmidt(0.1, Cp=4178.1, k=0.615, fd=res['fd'][0, 1], maxiter=1,
+                         **kwargs)
+    assert_allclose(h, h_fd, rtol=1e-10)
+    # Default of 5 iterations is not converged at low flow
+    h_5 = Stein_Schmidt(0.1, Cp=4178.1, k=0.615, **kwargs)
+    assert abs(h_5 - h) > 1e-3*h
+
+    # Warm start from the converged values takes a single iteration
+    res2 = Stein_Schmidt_friction_factor(m, fd=res['fd'], **kwargs)
+    assert np.all(res2['iterations'] == 1)
+    assert_allclose(res2['fd'], res['fd'], rtol=1e-12)
+
+    # Iteration cap, and elements which cannot be solved
+    res = Stein_Schmidt_friction_factor([0.05, 0.0], maxiter=2, **kwargs)
+    assert_allclose(res['iterations'], [2, 1])
+    assert not np.any(res['converged'])
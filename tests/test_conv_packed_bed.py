@@ -18,6 +18,7 @@ along with this program.  If not, see <http://www.gnu.org/licenses/>.'''
 from __future__ import division
 from ht import *
 from numpy.testing import assert_allclose
+import pytest
 
 
 def test_Nu_packed_bed_Gnielinski():
@@ -39,4 +40,66 @@ def test_Nu_Achenbach():
 
 def test_Nu_KTA():
     Nu = Nu_KTA(2000, 0.7, 0.4)
-    assert_allclose(Nu, 102.08516480718129)
\ No newline at end of file
+    assert_allclose(Nu, 102.08516480718129)
+
+def test_PackedBedColumn():
+    import numpy as np
+    from scipy.integrate import quad
+    from scipy.special import ive
+    from math import pi
+    kwargs = dict(m=0.05, rho=0.6, Cp=1050., k=0.045, mu=2.9E-5)
+
+    # Step change of the inlet temperature of a bed at zero - Anzelius'
+    # solution for the outlet fluid temperature
+    def J(x, y):
+        f = lambda s: np.exp(-y - s + 2*np.sqrt(y*s))*ive(0, 2*np.sqrt(y*s))
+        return 1 - quad(f, 0, x, limit=200)[0]
+
+    bed = PackedBedColumn(L=1., D=0.3, dp=5E-3, voidage=0.4, rho_s=3900.,
+                          Cp_s=880., T0=0., N=2000)
+    res = bed.run(T_in=1., dt=0.2, steps=18000, **kwargs)
+    h = Nu_packed_bed_Gnielinski(5E-3, 0.4, 0.05/(0.6*bed.A), 0.6, 2.9E-5,
+                                 1050.*2.9E-5/0.045)*0.045/5E-3
+    assert_allclose(bed.h, h)
+    ha = h*6*0.6/5E-3
+    xi = ha*bed.A/(0.05*1050.)
+    tau = 0.4*0.6*bed.A/0.05
+    times = np.array([1800, 2400, 3000, 3600.])
+    expect = [J(xi, ha*(t - tau)/(0.6*3900*880.)) for t in times]
+    assert_allclose(res['T_out'][(times/0.2).astype(int) - 1], expect, atol=0.01)
+
+    # Energy balance over a cycle, with profiles recorded
+    bed = PackedBedColumn(L=1., D=0.3, dp=5E-3, voidage=0.4, rho_s=3900.,
+                          Cp_s=880., T0=300., N=50, Method='KTA')
+    T_in = 600. - 100.*np.cos(np.arange(400)/50.)
+    res = bed.run(T_in=T_in, dt=5., steps=400, record=100, **kwargs)
+    assert res['T_fluid'].shape == res['T_solid'].shape == (4, 50)
+    assert_allclose(res['T_fluid'][-1], bed.T_fluid)
+    assert_allclose(res['T_solid'][-1], bed.T_solid)
+    volume = bed.A*bed.dx
+    stored = ((0.4*0.6*1050.*(bed.T_fluid - 300.)).sum()
+              + (0.6*3900.*880.*(bed.T_solid - 300.)).sum())*volume
+    assert_allclose(stored, (0.05*1050.*(T_in - res['T_out'])*5.).sum(), rtol=1e-10)
+
+    # Reversed flow mirrors the profiles
+    profiles = []
+    for reverse in (False, True):
+        bed = PackedBedColumn(L=1., D=0.3, dp=5E-3, voidage=0.4, rho_s=3900.,
+                              Cp_s=880., T0=300., N=50, Method='Achenbach')
+        res = bed.run(T_in=600., dt=5., steps=100, reverse=reverse, **kwargs)
+        profiles.append(bed.T_solid.copy())
+    assert_allclose(profiles[0], profiles[1][::-1])
+
+    # Heat transfer coefficients of each correlation; Nu = 2 without flow
+    bed = PackedBedColumn(L=1., D=0.3, dp=5E-3, voidage=0.4, rho_s=3900.,
+                          Cp_s=880., T0=300., Method='Wakao-Kagei')
+    Re = 0.6*0.05/(0.6*pi/4*0.09)*5E-3/2.9E-5
+    h = bed.heat_transfer_coefficient(0.05, 0.6, 1050., 0.045, 2.9E-5)
+    assert_allclose(h, Nu_Wakao_Kagei(Re, 1050.*2.9E-5/0.045)*0.045/5E-3)
+    assert_allclose(bed.heat_transfer_coefficient(0, 0.6, 1050., 0.045, 2.9E-5), 18.)
+    bed.run(m=0., T_in=600., rho=0.6, Cp=1050., k=0.045, mu=2.9E-5, dt=10., steps=5)
+    assert_allclose(bed.T_solid, 300.)
+
+    with pytest.raises(ValueError):
+        PackedBedColumn(L=1., D=0.3, dp=5E-3, voidage=0.4, rho_s=3900.,
+                        Cp_s=880., T0=300., Method='Dittus')
@@ -0,0 +1,127 @@
+# -*- coding: utf-8 -*-
+'''Chemical Engineering Design Library (ChEDL). Utilities for process modeling.
+Copyright (C) 2018 Caleb Bell <Caleb.Andrew.Bell@gmail.com>
+
+Permission is hereby granted, free of charge, to any person obtaining a copy
+of this software and associated documentation files (the "Software"), to deal
+in the Software without restriction, including without limitation the rights
+to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+copies of the Software, and to permit persons to whom the Software is
+furnished to do so, subject to the following conditions:
+
+The above copyright notice and this permission notice shall be included in all
+copies or substantial portions of the Software.
+
+THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+SOFTWARE.'''
+
+
+
+from __future__ import division
+import numpy as np
+from ht import *
+from ht.derivatives import derivatives, Dual
+from numpy.testing import assert_allclose
+import pytest
+
+R1s = np.array([0.3, 0.7, 1.3, 2.5])
+NTU1s = np.array([0.4, 1.1, 2.7, 6.])
+
+
+def central_differences(func, x, y, kwargs, h=1E-6):
+    dx = (func(x*(1. + h), y, **kwargs) - func(x*(1. - h), y, **kwargs))/(2.*x*h)
+    dy = (func(x, y*(1. + h), **kwargs) - func(x, y*(1. - h), **kwargs))/(2.*y*h)
+    return dx, dy
+
+
+def check(func, kwargs, xs=R1s, ys=NTU1s, rtol=1E-6):
+    value, d1, d2 = derivatives(func, xs, ys, **kwargs)
+    for i, (x, y) in enumerate(zip(xs, ys)):
+        assert_allclose(value[i], func(x, y, **kwargs), rtol=1E-11)
+        dx, dy = central_differences(func, x, y, kwargs)
+        assert_allclose([d1[i], d2[i]], [dx, dy], rtol=rtol, atol=1E-9)
+
+
+def test_derivatives_P_NTU():
+    for subtype in ['counterflow', 'parallel', 'crossflow', 'crossflow approximate',
+                    'crossflow, mixed 1', 'crossflow, mixed 2', 'crossflow, mixed 1&2']:
+        check(temperature_effectiveness_basic, {'subtype': subtype})
+    for Ntp, optimal in [(1, True), (2, True), (2, False), (3, True), (3, False), (4, True), (6, True)]:
+        check(temperature_effectiveness_TEMA_E, {'Ntp': Ntp, 'optimal': optimal})
+    for Ntp, optimal in [(1, True), (2, True), (2, False)]:
+        check(temperature_effectiveness_TEMA_G, {'Ntp': Ntp, 'optimal': optimal})
+        check(temperature_effectiveness_TEMA_H, {'Ntp': Ntp, 'optimal': optimal})
+    for Ntp in [1, 2, 4]:
+        check(temperature_effectiveness_TEMA_J, {'Ntp': Ntp})
+    for Np1, Np2 in [(1, 1), (1, 2), (1, 3), (1, 4), (2, 2), (2, 3), (2, 4), (3, 1), (4, 2)]:
+        for counterflow in (True, False):
+            for passes_counterflow in (True, False):
+                check(temperature_effectiveness_plate, {'Np1': Np1, 'Np2': Np2,
+                      'counterflow': counterflow, 'passes_counterflow': passes_counterflow})
+    for rows, passes in [(1, 1), (3, 1), (5, 1), (2, 2), (3, 3), (4, 4), (5, 5), (4, 2)]:
+        check(temperature_effectiveness_air_cooler, {'rows': rows, 'passes': passes})
+
+    # Scalars in, scalars out
+    P1, dP1_dR1, dP1_dNTU1 = derivatives(temperature_effectiveness_TEMA_J, 0.5, 2., Ntp=2)
+    assert type(P1) is np.float64
+    assert_allclose(P1, temperature_effectiveness_TEMA_J(0.5, 2., 2))
+
+    with pytest.raises(Exception):
+        derivatives(temperature_effectiveness_TEMA_G, R1s, NTU1s, Ntp=3)
+    with pytest.raises(ValueError):
+        derivatives(NTU_from_P_basic, 0.5, 2.)
+
+
+def test_derivatives_effectiveness():
+    Crs = np.array([0.1, 0.4, 0.8, 0.95])
+    for subtype in ['counterflow', 'parallel', 'crossflow', 'crossflow approximate',
+                    'crossflow, mixed Cmin', 'crossflow, mixed Cmax', 'boiler',
+                    'S&T', '3S&T']:
+        check(effectiveness_from_NTU, {'subtype': subtype}, xs=NTU1s, ys=Crs)
+    with pytest.raises(Exception):
+        derivatives(effectiveness_from_NTU, 1., 1.2)
+
+
+def test_derivatives_singular():
+    # At R1 = 1 the counterflow formula is replaced by its limit, which does
+    # not depend on R1; the derivative is still that of the limit
+    NTU1 = 1.7
+    P1, dP1_dR1, dP1_dNTU1 = derivatives(temperature_effectiveness_TEMA_E, 1., NTU1)
+    assert_allclose(P1, NTU1/(1. + NTU1))
+    assert_allclose(dP1_dR1, -0.5*NTU1**2/(1. + NTU1)**2, rtol=1E-9)
+    assert_allclose(dP1_dNTU1, 1./(1. + NTU1)**2, rtol=1E-12)
+    e, de_dNTU, de_dCr = derivatives(effectiveness_from_NTU, [NTU1, NTU1], [1., 0.5])
+    assert_allclose(de_dCr[0], -0.5*NTU1**2/(1. + NTU1)**2, rtol=1E-9)
+
+    for func, kwargs, R1 in [(temperature_effectiveness_TEMA_G, {'Ntp': 1}, 1.),
+                             (temperature_effectiveness_TEMA_G, {'Ntp': 2}, 2.),
+                             (temperature_effectiveness_TEMA_H, {'Ntp': 2}, 4.),
+                             (temperature_effectiveness_TEMA_J, {'Ntp': 1}, 2.),
+                             (temperature_effectiveness_plate, {'Np1': 1, 'Np2': 2}, 2.)]:
+        h = 1E-4
+        expect = (func(R1 + h, NTU1, **kwargs) - func(R1 - h, NTU1, **kwargs))/(2.*h)
+        assert_allclose(derivatives(func, R1, NTU1, **kwargs)[1], expect, rtol=1E-7)
+
+
+def test_Dual():
+    x = Dual(np.array([0.5, 2.]), (1., 0.))
+    y = Dual(np.array([3., 4.]), (0., 1.))
+    z = np.exp(x*y) + x**y - np.tanh(x)/y
+    assert_allclose(z.value, np.exp([1.5, 8.]) + np.array([0.5**3, 2.**4]) - np.tanh([0.5, 2.])/[3., 4.])
+    dz_dx = y.value*np.exp(x.value*y.value) + y.value*x.value**(y.value - 1.) - (1. - np.tanh(x.value)**2)/y.value
+    dz_dy = x.value*np.exp(x.value*y.value) + x.value**y.value*np.log(x.value) + np.tanh(x.value)/y.value**2
+    assert_allclose(z.partials[0], dz_dx)
+    assert_allclose(z.partials[1], dz_dy)
+
+    w = np.where(x.value > 1., x, y)
+    assert_allclose(w.value, [3., 2.])
+    assert_allclose(w.partials[0], [0., 1.])
+    assert_allclose(w.partials[1], [1., 0.])
+    assert_allclose(np.sum(x*y).partials[0], 7.)
+    with pytest.raises(TypeError):
+        np.arcsinh(x)
@@ -0,0 +1,88 @@
+# -*- coding: utf-8 -*-
+'''Chemical Engineering Design Library (ChEDL). Utilities for process modeling.
+Copyright (C) 2017 Caleb Bell <Caleb.Andrew.Bell@gmail.com>
+
+Permission is hereby granted, free of charge, to any person obtaining a copy
+of this software and associated documentation files (the "Software"), to deal
+in the Software without restriction, including without limitation the rights
+to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+copies of the Software, and to permit persons to whom the Software is
+furnished to do so, subject to the following conditions:
+
+The above copyright notice and this permission notice shall be included in all
+copies or substantial portions of the Software.
+
+THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+SOFTWARE.'''
+
+
+from __future__ import division
+from ht import *
+from ht.diagnostics import record_solves, add_callback, remove_callback
+from numpy.testing import assert_allclose
+import pytest
+
+
+def test_record_solves():
+    with record_solves() as solves:
+        NTU1 = NTU_from_P_G(P1=.573, R1=1/3., Ntp=2)
+    assert len(solves) == 1
+    report = solves[0]
+    assert report['function'] == 'temperature_effectiveness_TEMA_G'
+    assert report['solver'] == 'newton_bracketed'
+    assert report['inputs'] == {'P1': .573, 'R1': 1/3., 'Ntp': 2, 'optimal': True}
+    assert report['root'] == NTU1
+    assert report['converged']
+    assert report['iterations'] > 0
+    assert report['function_calls'] >= report['iterations']
+    assert abs(report['residual']) < 1E-9
+    assert report['bracket'] == (1E-11, 1E4)
+    # Started from the NTU1 of a counterflow exchanger
+    assert_allclose(report['x0'], NTU_from_P_basic(.573, 1/3., 'counterflow'))
+    assert not report['mpmath']
+
+    with record_solves() as solves:
+        NTU_from_effectiveness(.5, .7, 'crossflow')
+    assert [r['solver'] for r in solves] == ['newton_bracketed']
+    assert solves[0]['bracket'] == (0., 1E5)
+    assert solves[0]['iterations'] <= 6
+
+    with record_solves() as solves:
+        DBundle = DBundle_for_Ntubes_Phadkeb(Ntubes=782, Do=.028, pitch=.036, Ntp=2, angle=45.)
+    assert solves[0]['solver'] == 'bisect'
+    assert solves[0]['root'] == DBundle
+    assert solves[0]['bracket'][0] == 0
+
+    # Failed solves are reported before the exception propagates
+    kwargs = dict(m=10, x=0.5, D=0.3, rhol=567., rhog=18.09, kl=0.086, kg=0.2,
+                  mul=156E-6, mug=1E-5, Cpl=2300, Cpg=1400, sigma=0.02,
+                  Hvap=9E5, Psat=1E5, Pc=22E6)
+    with record_solves() as solves:
+        Thome(Te=32.04944566414243, **kwargs)
+        with pytest.raises(Exception):
+            Thome(Te=3., **kwargs)
+    assert solves[0]['converged']
+    assert_allclose(solves[0]['root'], 1E5)
+    # Newton's method reports its initial guess
+    assert solves[0]['x0'] == 1E4
+    assert not solves[1]['converged']
+    assert solves[1]['root'] is None
+    assert solves[1]['inputs']['Te'] == 3.
+    assert 'converge' in solves[1]['error']
+
+
+def test_callbacks():
+    reports = []
+    add_callback(reports.append)
+    try:
+        NTU_from_P_plate(P1=.5, R1=.5, Np1=1, Np2=2)
+    finally:
+        remove_callback(reports.append)
+    NTU_from_P_plate(P1=.5, R1=.5, Np1=1, Np2=2)
+    assert len(reports) == 1
+    assert reports[0]['inputs']['Np2'] == 2
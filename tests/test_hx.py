@@ -739,6 +739,11 @@ def test_temperature_effectiveness_air_cooler():
     assert_allclose(P1_calc, 0.32552127419957044)
     
     # Tentative checking of the above has been done with hete.c for isolated cases
+
+    # Many rows approach unmixed crossflow, without overflowing
+    P1 = temperature_effectiveness_air_cooler(R1=1., NTU1=2., rows=400, passes=1)
+    P1_crossflow = temperature_effectiveness_basic(R1=1., NTU1=2., subtype='crossflow')
+    assert_allclose(P1, P1_crossflow, rtol=1E-5)
     
 
 @pytest.mark.mpmath
@@ -813,6 +818,265 @@ def test_P_NTU_method():
     assert_allclose(ans['Q'], 32195.273806845064)
 
 
+def test_P_NTU_method_records():
+    kwargs = dict(m1=5.2, m2=1.45, Cp1=1860., Cp2=1900, subtype='E', Ntp=4, T2i=15, T1i=130)
+    ans = P_NTU_method(UA=3041.75, **kwargs)
+    rec = P_NTU_method(UA=3041.75, output='record', **kwargs)
+    assert isinstance(rec, PNTUResult)
+    assert rec.as_dict() == ans
+    assert sorted(rec.keys()) == sorted(ans.keys())
+    assert rec['T2o'] == rec.T2o == ans['T2o']
+    with pytest.raises(KeyError):
+        rec['Tco']
+    with pytest.raises(AttributeError):
+        rec.extra = 1.
+    with pytest.raises(ValueError):
+        P_NTU_method(UA=3041.75, output='array', **kwargs)
+
+    # Batches match the scalar calls, in a new array or a given one
+    UA = np.array([[1000., 2000.], [3041.75, 5000.]])
+    res = P_NTU_method_batch(UA=UA, **kwargs)
+    assert res.dtype == P_NTU_method_dtype
+    assert res.shape == (2, 2)
+    for idx in np.ndindex(UA.shape):
+        ans = P_NTU_method(UA=UA[idx], **kwargs)
+        for key in ans:
+            assert res[key][idx] == ans[key]
+    out = np.zeros(UA.shape, dtype=P_NTU_method_dtype)
+    assert P_NTU_method_batch(UA=UA, out=out, **kwargs) is out
+    assert_allclose(out['Q'], res['Q'], rtol=0)
+    out = dict((key, np.zeros(UA.shape)) for key in P_NTU_method_dtype.names)
+    assert P_NTU_method_batch(UA=UA, out=out, **kwargs) is out
+    columns = P_NTU_method_batch(UA=UA, output='columns', **kwargs)
+    for key in columns:
+        assert_allclose(columns[key], res[key], rtol=0)
+        assert_allclose(out[key], res[key], rtol=0)
+    with pytest.raises(ValueError):
+        P_NTU_method_batch(UA=UA, out=np.zeros(3, dtype=P_NTU_method_dtype), **kwargs)
+    with pytest.raises(ValueError):
+        P_NTU_method_batch(UA=UA, out=np.zeros((2, 2)), **kwargs)
+
+    # Solving for UA
+    T2o = res['T2o'].ravel()
+    res = P_NTU_method_batch(m1=5.2, m2=1.45, Cp1=1860., Cp2=1900, subtype='E', Ntp=4,
+                             T2i=15, T1i=130, T2o=T2o)
+    assert_allclose(res['UA'], UA.ravel(), rtol=1E-9)
+
+    kwargs = dict(mh=5.2, mc=1.45, Cph=1860., Cpc=1900, subtype='crossflow, mixed Cmax', Tci=15, Thi=130)
+    ans = effectiveness_NTU_method(UA=3041.75, **kwargs)
+    rec = effectiveness_NTU_method(UA=3041.75, output='record', **kwargs)
+    assert isinstance(rec, EffectivenessNTUResult)
+    assert rec.as_dict() == ans
+    res = effectiveness_NTU_method_batch(UA=[3041.75, 1000.], **kwargs)
+    assert res.dtype == effectiveness_NTU_method_dtype
+    for key in ans:
+        assert res[key][0] == ans[key]
+    res = effectiveness_NTU_method_batch(mh=5.2, mc=1.45, Cph=1860., Cpc=1900,
+                                         subtype='crossflow, mixed Cmax', Tci=15, Thi=130,
+                                         Tco=res['Tco'], output='columns')
+    assert_allclose(res['UA'], [3041.75, 1000.], rtol=1E-9)
+
+
+def test_ExchangerNetwork():
+    # Counterflow exchangers in series are one counterflow exchanger
+    net = ExchangerNetwork()
+    net.add_inlet('c0', T=300.)
+    net.add_inlet('h3', T=400.)
+    UAs = [1000., 1500., 2500.]
+    for i, UA in enumerate(UAs):
+        net.add_exchanger(str(i), 'c%d' %i, 'c%d' %(i+1), 'h%d' %(i+1), 'h%d' %i,
+                          m1=1., Cp1=4000., m2=2., Cp2=2500., UA=UA, subtype='counterflow')
+    T = net.solve()
+    ans = P_NTU_method(m1=1., Cp1=4000., m2=2., Cp2=2500., UA=sum(UAs), T1i=300., T2i=400.,
+                       subtype='counterflow')
+    assert_allclose([T['c3'], T['h0']], [ans['T1o'], ans['T2o']], rtol=1E-13)
+    assert_allclose(sum(net.exchanger(str(i)).Q for i in range(3)), ans['Q'], rtol=1E-12)
+    rec = net.exchanger('1')
+    one = P_NTU_method(m1=1., Cp1=4000., m2=2., Cp2=2500., UA=1500., T1i=rec.T1i, T2i=rec.T2i,
+                       subtype='counterflow')
+    assert_allclose([rec[k] for k in one], [one[k] for k in one], rtol=1E-12)
+
+    # Changes to one exchanger or an inlet give the same as a new network
+    net.set_exchanger('1', UA=3000., m2=1.5)
+    net.set_inlet('c0', 290.)
+    T = net.solve()
+    new = ExchangerNetwork()
+    new.add_inlet('c0', T=290.)
+    new.add_inlet('h3', T=400.)
+    for i, UA in enumerate([1000., 3000., 2500.]):
+        new.add_exchanger(str(i), 'c%d' %i, 'c%d' %(i+1), 'h%d' %(i+1), 'h%d' %i,
+                          m1=1., Cp1=4000., m2=1.5 if i == 1 else 2., Cp2=2500., UA=UA,
+                          subtype='counterflow')
+    T_new = new.solve()
+    assert_allclose([T[k] for k in T_new], [T_new[k] for k in T_new], rtol=1E-13)
+
+    # Two halves in parallel on both sides are the whole exchanger
+    net = ExchangerNetwork()
+    net.add_inlet('T1i', T=350.)
+    net.add_inlet('T2i', T=290.)
+    for i in (1, 2):
+        net.add_exchanger(i, 'T1i', 'T1o%d' %i, 'T2i', 'T2o%d' %i, m1=2., Cp1=2000.,
+                          m2=1., Cp2=4180., UA=1500., subtype='E', Ntp=2)
+    net.add_mixer('T1o', ['T1o1', 'T1o2'], [4000., 4000.])
+    net.add_mixer('T2o', ['T2o1', 'T2o2'], [4180., 4180.])
+    T = net.solve()
+    ans = P_NTU_method(m1=4., Cp1=2000., m2=2., Cp2=4180., UA=3000., T1i=350., T2i=290.,
+                       subtype='E', Ntp=2)
+    assert_allclose([T['T1o'], T['T2o']], [ans['T1o'], ans['T2o']], rtol=1E-13)
+    net.set_mixer('T1o', [4000., 0.])
+    assert_allclose(net.solve()['T1o'], T['T1o1'], rtol=1E-13)
+
+    # A recycle: part of the heated stream returns to the inlet
+    net = ExchangerNetwork()
+    net.add_inlet('feed', T=300.)
+    net.add_inlet('hot', T=400.)
+    net.add_mixer('in', ['feed', 'out'], [3000., 1000.])
+    net.add_exchanger('E', 'in', 'out', 'hot', 'hot out', m1=1., Cp1=4000., m2=2.,
+                      Cp2=4000., UA=4000., subtype='counterflow')
+    T = net.solve()
+    assert_allclose(T['in'], (3.*300. + T['out'])/4., rtol=1E-13)
+    P1 = temperature_effectiveness_basic(R1=.5, NTU1=1., subtype='counterflow')
+    assert_allclose(T['out'], T['in'] + P1*(400. - T['in']), rtol=1E-13)
+
+    net = ExchangerNetwork()
+    net.add_inlet('a', T=300.)
+    with pytest.raises(ValueError):
+        net.add_inlet('a', T=310.)
+    net.add_exchanger('E', 'a', 'b', 'c', 'd', m1=1., Cp1=4000., m2=1., Cp2=4000., UA=4000.)
+    with pytest.raises(ValueError):
+        net.add_exchanger('F', 'a', 'b', 'c', 'e', m1=1., Cp1=4000., m2=1., Cp2=4000., UA=4000.)
+    with pytest.raises(ValueError):
+        net.solve() # 'c' is not defined
+    with pytest.raises(ValueError):
+        net.add_exchanger('G', 'a', 'f', 'c', 'g', m1=1., Cp1=4000., m2=1., Cp2=4000.,
+                          UA=4000., subtype='boiler')
+
+    # A failed add leaves no nodes behind, and can be retried
+    net = ExchangerNetwork()
+    net.add_inlet('ci', T=300.)
+    net.add_inlet('hi', T=400.)
+    with pytest.raises(Exception):
+        net.add_exchanger('E', 'ci', 'co', 'hi', 'ho', m1=1., Cp1=4000., m2=2., Cp2=2500.,
+                          UA=4000., subtype='E', Ntp=5)
+    with pytest.raises(ValueError):
+        net.add_exchanger('E', 'ci', 'co', 'hi', 'ci', m1=1., Cp1=4000., m2=2., Cp2=2500.,
+                          UA=4000., subtype='counterflow')
+    with pytest.raises(ValueError):
+        net.add_mixer('hi', ['co', 'ho'], [1., 1.])
+    assert net.nodes == ['ci', 'hi']
+    net.add_exchanger('E', 'ci', 'co', 'hi', 'ho', m1=1., Cp1=4000., m2=2., Cp2=2500.,
+                      UA=4000., subtype='counterflow')
+    T = net.solve()
+    ans = P_NTU_method(m1=1., Cp1=4000., m2=2., Cp2=2500., UA=4000., T1i=300., T2i=400.,
+                       subtype='counterflow')
+    assert_allclose([T['co'], T['ho']], [ans['T1o'], ans['T2o']], rtol=1E-13)
+
+
+def test_temperature_effectiveness_shells():
+    # Counterflow exchangers in counterflow series are one counterflow exchanger
+    assert_allclose(temperature_effectiveness_shells(0.4, 2., 4, temperature_effectiveness_basic,
+                                                     subtype='counterflow'),
+                    temperature_effectiveness_basic(0.4, 2., 'counterflow'), rtol=1E-14)
+    # TEMA E shells with two tube passes are the S&T subtype
+    for Cr in (0.2, 0.7):
+        assert_allclose(temperature_effectiveness_shells(Cr, 2., 3, temperature_effectiveness_TEMA_E, Ntp=2),
+                        effectiveness_from_NTU(2., Cr, '3S&T'), rtol=1E-14)
+    # R1 = 1 is the limit of the general expression
+    assert_allclose(temperature_effectiveness_shells(1., 2., 3, temperature_effectiveness_TEMA_E, Ntp=2),
+                    temperature_effectiveness_shells(1. + 1E-7, 2., 3, temperature_effectiveness_TEMA_E, Ntp=2),
+                    rtol=1E-6)
+
+    # Each arrangement as a network of the single shells
+    C1, C2, UA, n = 4000., 5000., 6000., 3
+    for arrangement in ('counterflow', 'parallel', 'split 1'):
+        net = ExchangerNetwork()
+        net.add_inlet('a0', 300.)
+        net.add_inlet('b%d' %n if arrangement == 'counterflow' else 'b0', 400.)
+        for i in range(n):
+            if arrangement == 'counterflow':
+                nodes = ('a%d' %i, 'a%d' %(i+1), 'b%d' %(i+1), 'b%d' %i)
+            elif arrangement == 'parallel':
+                nodes = ('a%d' %i, 'a%d' %(i+1), 'b%d' %i, 'b%d' %(i+1))
+            else:
+                nodes = ('a0', 'a%d' %(i+1), 'b%d' %i, 'b%d' %(i+1))
+            net.add_exchanger(i, *nodes, m1=C1/n if arrangement == 'split 1' else C1, Cp1=1.,
+                              m2=C2, Cp2=1., UA=UA/n, subtype='E', Ntp=2)
+        if arrangement == 'split 1':
+            net.add_mixer('a%d' %(n+1), ['a%d' %(i+1) for i in range(n)], [C1/n]*n)
+        T = net.solve()
+        P1 = (T['a%d' %(n+1 if arrangement == 'split 1' else n)] - 300.)/100.
+        P1_calc = temperature_effectiveness_shells(C1/C2, UA/C1, n, temperature_effectiveness_TEMA_E,
+                                                   arrangement, Ntp=2)
+        assert_allclose(P1_calc, P1, rtol=1E-13)
+
+        NTU1 = NTU_from_P_shells(P1_calc, C1/C2, n, temperature_effectiveness_TEMA_E, arrangement, Ntp=2)
+        assert_allclose(NTU1, UA/C1, rtol=1E-10)
+
+    for function, kwargs in [(temperature_effectiveness_TEMA_G, {'Ntp': 2}),
+                             (temperature_effectiveness_TEMA_H, {'Ntp': 1}),
+                             (temperature_effectiveness_TEMA_J, {'Ntp': 4}),
+                             (temperature_effectiveness_plate, {'Np1': 2, 'Np2': 2}),
+                             (temperature_effectiveness_basic, {'subtype': 'crossflow'})]:
+        P1 = temperature_effectiveness_shells(0.6, 1.5, 2, function, **kwargs)
+        assert_allclose(NTU_from_P_shells(P1, 0.6, 2, function, **kwargs), 1.5, rtol=1E-9)
+
+    with pytest.raises(ValueError):
+        temperature_effectiveness_shells(0.6, 1.5, 2, temperature_effectiveness_TEMA_E, 'mixed')
+    with pytest.raises(ValueError):
+        NTU_from_P_shells(0.99, 2., 2, temperature_effectiveness_TEMA_E, Ntp=2)
+    with pytest.raises(ValueError):
+        NTU_from_P_shells(0.5, 0.6, 2, temperature_effectiveness_air_cooler, rows=2, passes=2)
+
+
+def test_DynamicExchanger():
+    flows = dict(m1=1., Cp1=4000., m2=2., Cp2=2500., UA=5000.)
+    kwargs = dict(flows, M1=20., M2=30., Mw=50., Cpw=500.)
+    # The steady state is that of the P-NTU method, for any number of cells
+    for subtype, Ntp, cells in [('counterflow', 1, 20), ('counterflow', 1, 1000), ('parallel', 1, 50),
+                                ('crossflow', 1, 50), ('crossflow, mixed 1', 1, 50), ('E', 2, 50),
+                                ('J', 4, 50)]:
+        hx = DynamicExchanger(subtype=subtype, Ntp=Ntp, cells=cells, **kwargs)
+        ans = P_NTU_method(T1i=300., T2i=400., subtype=subtype, Ntp=Ntp, **flows)
+        assert_allclose(hx.steady_state(T1i=300., T2i=400.), (ans['T1o'], ans['T2o']), rtol=1E-13)
+        # And is kept by the integrator
+        T1o, T2o = hx.simulate(dt=10., steps=5, T1i=300., T2i=400.)
+        assert_allclose(T1o, ans['T1o'], rtol=1E-13)
+        assert_allclose(T2o, ans['T2o'], rtol=1E-13)
+
+    # Step response; the exponential integrator is exact for any time step
+    # and the implicit one converges to it
+    exact = DynamicExchanger(cells=40, method='exponential', T0=300., subtype='counterflow', **kwargs)
+    T1o = exact.simulate(dt=20., steps=10, T1i=300., T2i=400.)[0]
+    fine = DynamicExchanger(cells=40, method='exponential', T0=300., subtype='counterflow', **kwargs)
+    assert_allclose(fine.simulate(dt=2., steps=100, T1i=300., T2i=400.)[0][9::10], T1o, rtol=1E-12)
+    assert_allclose(fine.T1, exact.T1, rtol=1E-12)
+    implicit = DynamicExchanger(cells=40, T0=300., subtype='counterflow', **kwargs)
+    assert_allclose(implicit.simulate(dt=0.02, steps=10000, T1i=300., T2i=400.)[0][999::1000], T1o,
+                    rtol=1E-4)
+    # Which ends at the steady state
+    T1o, T2o = implicit.simulate(dt=10., steps=1000, T1i=300., T2i=400.)
+    ans = P_NTU_method(T1i=300., T2i=400., subtype='counterflow', **flows)
+    assert_allclose((T1o[-1], T2o[-1]), (ans['T1o'], ans['T2o']), rtol=1E-12)
+
+    # Inlet temperatures varying over each step, and a change of flow
+    hx = DynamicExchanger(cells=100, T0=350., subtype='crossflow', **kwargs)
+    T2i = 400. + 10.*np.sin(np.linspace(0., 10., 500))
+    T1o, T2o = hx.simulate(dt=1., steps=500, T1i=300., T2i=T2i)
+    assert T1o.shape == T2o.shape == (500,)
+    assert np.all((T1o > 300.) & (T2o < T2i.max()))
+    hx.set_flows(m2=1.5, UA=6000.)
+    T1o, T2o = hx.simulate(dt=50., steps=1000, T1i=300., T2i=400.)
+    ans = P_NTU_method(T1i=300., T2i=400., subtype='crossflow', **dict(flows, m2=1.5, UA=6000.))
+    assert_allclose((T1o[-1], T2o[-1]), (ans['T1o'], ans['T2o']), rtol=1E-12)
+
+    with pytest.raises(ValueError):
+        DynamicExchanger(cells=1, subtype='counterflow', **kwargs)
+    with pytest.raises(ValueError):
+        DynamicExchanger(method='explicit', **kwargs)
+    with pytest.raises(ValueError):
+        DynamicExchanger(**kwargs).simulate(dt=1., steps=10, T1i=300., T2i=400.)
+
+
 def test_P_NTU_method_backwards():
     ans = effectiveness_NTU_method(mh=5.2, mc=1.45, Cph=1860., Cpc=1900, subtype='counterflow', Tci=15, Tco=85, Tho=110.06100082712986)
     ans2 = P_NTU_method(m1=5.2, m2=1.45, Cp1=1860., Cp2=1900., T2i=15, T2o=85, T1o=110.06100082712986, subtype='counterflow')
@@ -1658,6 +1922,117 @@ def test_NTU_from_P_plate():
     with pytest.raises(Exception):
         NTU_from_P_plate(P1=0.5743, R1=1/3., Np1=3, Np2=13415151213) 
 
+def test_newton_bracketed():
+    from ht.hx import newton_bracketed
+    f = lambda x: (x**3 - 2., 3.*x**2)
+    assert_allclose(newton_bracketed(f, 0., 4.), 2**(1/3.), rtol=1E-15)
+    root, results = newton_bracketed(f, 0., 4., x0=1., full_output=True)
+    assert_allclose(root, 2**(1/3.), rtol=1E-15)
+    assert results.converged
+    assert results.function_calls == results.iterations + 2
+
+    # A zero derivative or a step out of the bracket bisects instead
+    f = lambda x: (tanh(x - 3.), 1. - tanh(x - 3.)**2)
+    assert_allclose(newton_bracketed(f, -10., 50., x0=-9.), 3., atol=1E-12)
+    f = lambda x: (x - 1E-5, 0.)
+    assert_allclose(newton_bracketed(f, 1E-11, 1E4), 1E-5, atol=2E-12)
+
+    with pytest.raises(ValueError):
+        newton_bracketed(lambda x: (x**2 + 1., 2.*x), -1., 1.)
+    with pytest.raises(RuntimeError):
+        newton_bracketed(lambda x: (x - 1E-5, 0.), 1E-11, 1E4, maxiter=3)
+
+
+def test_NTU_from_P_newton():
+    from ht.diagnostics import record_solves
+    from ht.hx import _P1_crossflow_series
+    # Exact derivatives converge in a few iterations from the counterflow NTU1
+    cases = [(NTU_from_P_G, temperature_effectiveness_TEMA_G, {'Ntp': 2}),
+             (NTU_from_P_E, temperature_effectiveness_TEMA_E, {'Ntp': 3}),
+             (NTU_from_P_J, temperature_effectiveness_TEMA_J, {'Ntp': 4}),
+             (NTU_from_P_H, temperature_effectiveness_TEMA_H, {'Ntp': 1}),
+             (NTU_from_P_plate, temperature_effectiveness_plate, {'Np1': 2, 'Np2': 3}),
+             (NTU_from_P_basic, temperature_effectiveness_basic, {'subtype': 'crossflow'}),
+             (NTU_from_P_basic, temperature_effectiveness_basic, {'subtype': 'crossflow approximate'})]
+    for solver, func, kwargs in cases:
+        for R1, NTU1 in [(0.3, 0.2), (0.7, 1.5), (1.5, 1.2)]:
+            P1 = func(R1, NTU1, **kwargs)
+            with record_solves() as solves:
+                NTU1_calc = solver(P1, R1, **kwargs)
+            assert_allclose(NTU1_calc, NTU1, rtol=1E-9)
+            assert [r['solver'] for r in solves] == ['newton_bracketed']
+            assert solves[0]['iterations'] <= 8
+
+    # The series for crossflow agrees with the integral
+    for R1, NTU1 in [(0.01, 30.), (0.5, 0.01), (1., 3.), (3., 12.)]:
+        P1, dP1 = _P1_crossflow_series(R1, NTU1)
+        assert_allclose(P1, temperature_effectiveness_basic(R1, NTU1, 'crossflow'), rtol=1E-12)
+        dP1_num = (_P1_crossflow_series(R1, NTU1*(1. + 1E-6))[0]
+                   - _P1_crossflow_series(R1, NTU1*(1. - 1E-6))[0])/(2E-6*NTU1)
+        assert_allclose(dP1, dP1_num, rtol=1E-7, atol=1E-10)
+
+    # Formerly failed to converge from the approximate solution
+    P1 = temperature_effectiveness_basic(0.3, 30., 'crossflow')
+    assert_allclose(NTU_from_P_basic(P1, 0.3, 'crossflow'), 30., rtol=1E-7)
+
+
+def test_hx_subtype():
+    config = hx_subtype('3S&T')
+    assert config.code == HXSubtype.SHELL_AND_TUBE and config.shells == 3
+    assert hx_subtype(config) is config
+    assert hx_subtype('3S&T') is config
+    assert hx_subtype('S&T').shells == 1
+    config = hx_subtype('2/3p')
+    assert (config.code, config.Np1, config.Np2, config.passes_counterflow) == (HXSubtype.PLATE, 2, 3, False)
+    assert hx_subtype('2/3').passes_counterflow
+    assert hx_subtype(HXSubtype.CROSSFLOW_MIXED_12).name == 'crossflow, mixed 1&2'
+    for bad in ('crossflow mixed', HXSubtype.PLATE, 100, None, ['counterflow']):
+        with pytest.raises(ValueError):
+            hx_subtype(bad)
+
+    # Strings, parsed configurations and codes give the same results
+    for subtype in ['counterflow', 'parallel', '2S&T', 'S&T', 'crossflow',
+                    'crossflow approximate', 'crossflow, mixed Cmin',
+                    'crossflow, mixed Cmax', 'boiler', 'condenser']:
+        config = hx_subtype(subtype)
+        eff = effectiveness_from_NTU(NTU=1.5, Cr=0.6, subtype=subtype)
+        assert eff == effectiveness_from_NTU(NTU=1.5, Cr=0.6, subtype=config)
+        if config.code != HXSubtype.SHELL_AND_TUBE:
+            assert eff == effectiveness_from_NTU(NTU=1.5, Cr=0.6, subtype=config.code)
+        assert_allclose(NTU_from_effectiveness(eff, Cr=0.6, subtype=config), 1.5)
+    for subtype in ['counterflow', 'parallel', 'crossflow', 'crossflow approximate',
+                    'crossflow, mixed 1', 'crossflow, mixed 2', 'crossflow, mixed 1&2']:
+        config = hx_subtype(subtype)
+        P1 = temperature_effectiveness_basic(R1=0.6, NTU1=1.5, subtype=subtype)
+        assert P1 == temperature_effectiveness_basic(R1=0.6, NTU1=1.5, subtype=config.code)
+        assert_allclose(NTU_from_P_basic(P1, R1=0.6, subtype=config), 1.5)
+    for subtype in ['E', 'G', 'H', 'J', 'crossflow, mixed 1', '2/3p']:
+        res = P_NTU_method(m1=5.2, m2=1.45, Cp1=1860., Cp2=1900, subtype=subtype, Ntp=2, UA=3041.75, T2i=15, T1i=130)
+        res2 = P_NTU_method(m1=5.2, m2=1.45, Cp1=1860., Cp2=1900, subtype=hx_subtype(subtype), Ntp=2, UA=3041.75, T2i=15, T1i=130)
+        assert res == res2
+        res3 = P_NTU_method(m1=5.2, m2=1.45, Cp1=1860., Cp2=1900, subtype=hx_subtype(subtype), Ntp=2, T2i=15, T1i=130, T1o=res['T1o'])
+        assert_allclose(res3['UA'], 3041.75)
+
+    # A configuration which is parsed but not supported by a function
+    with pytest.raises(Exception):
+        effectiveness_from_NTU(NTU=1.5, Cr=0.6, subtype=hx_subtype('E'))
+    with pytest.raises(Exception):
+        temperature_effectiveness_basic(R1=0.6, NTU1=1.5, subtype='2S&T')
+    with pytest.raises(Exception):
+        P_NTU_method(m1=5.2, m2=1.45, Cp1=1860., Cp2=1900, subtype='crossflow approximate', UA=3041.75, T2i=15, T1i=130)
+
+    # Malformed strings are not recognized, with each function's own message
+    for bad in ('2/x', '2/', '1/2/3', 'xS&T'):
+        with pytest.raises(ValueError, match='not recognized'):
+            hx_subtype(bad)
+        with pytest.raises(Exception, match='type not recognized'):
+            effectiveness_from_NTU(NTU=1.5, Cr=0.6, subtype=bad)
+        with pytest.raises(Exception, match='Subtype not recognized'):
+            temperature_effectiveness_basic(R1=0.6, NTU1=1.5, subtype=bad)
+        with pytest.raises(Exception, match='Supported types'):
+            P_NTU_method(m1=5.2, m2=1.45, Cp1=1860., Cp2=1900, subtype=bad, UA=3041.75, T2i=15, T1i=130)
+
+
 def test_DBundle_min():
     assert_allclose(DBundle_min(0.0254), 1)
     assert_allclose(DBundle_min(0.005), .1)
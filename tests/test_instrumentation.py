@@ -0,0 +1,77 @@
+# -*- coding: utf-8 -*-
+'''Chemical Engineering Design Library (ChEDL). Utilities for process modeling.
+Copyright (C) 2017 Caleb Bell <Caleb.Andrew.Bell@gmail.com>
+
+Permission is hereby granted, free of charge, to any person obtaining a copy
+of this software and associated documentation files (the "Software"), to deal
+in the Software without restriction, including without limitation the rights
+to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+copies of the Software, and to permit persons to whom the Software is
+furnished to do so, subject to the following conditions:
+
+The above copyright notice and this permission notice shall be included in all
+copies or substantial portions of the Software.
+
+THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+SOFTWARE.'''
+
+
+from __future__ import division
+import json
+import os
+import subprocess
+import sys
+import ht
+import ht.instrumentation
+import pytest
+
+
+def test_instrument():
+    Ntubes = ht.hx.Ntubes
+    with ht.instrumentation.instrument(reset=True):
+        assert ht.instrumentation.is_enabled()
+        # References in other modules are replaced too
+        assert ht.hx.Ntubes is not Ntubes
+        assert ht.Ntubes is ht.hx.Ntubes
+        ht.Nu_conv_internal(Re=1E5, Pr=.7)
+        ht.Nu_conv_internal(Re=1E3, Pr=.7)
+        ht.Ntubes(DBundle=1.2, Do=.025, pitch=.03125)
+        with pytest.raises(Exception):
+            ht.Ntubes(DBundle=1.2, Do=.025, pitch=.03125, Ntp=3)
+    assert not ht.instrumentation.is_enabled()
+    assert ht.hx.Ntubes is Ntubes
+
+    ans = ht.instrumentation.snapshot()
+    assert ans['Nu_conv_internal']['calls'] == 2
+    assert ans['Nu_conv_internal']['methods'] == {'turbulent_Churchill_Zajic': 1,
+                                                  'laminar_T_const': 1}
+    assert ans['Ntubes']['calls'] == 2
+    assert ans['Ntubes']['exceptions'] == 1
+    assert ans['Ntubes']['methods'] == {'Ntubes_Phadkeb': 2}
+    record = ans['Nu_conv_internal']
+    assert 0 < record['p50'] <= record['p90'] <= record['p99'] <= record['max_time']
+    assert record['total_time'] >= record['max_time']
+    assert json.loads(ht.instrumentation.snapshot_json()) == ans
+
+    # Calls are not recorded once it is disabled
+    ht.Nu_conv_internal(Re=1E5, Pr=.7)
+    assert ht.instrumentation.snapshot()['Nu_conv_internal']['calls'] == 2
+    ht.instrumentation.reset()
+    assert ht.instrumentation.snapshot() == {}
+
+
+def test_instrument_environment():
+    code = ('import ht, ht.instrumentation; ht.LMTD(100., 60., 30., 40.2); '
+            'print(ht.instrumentation.snapshot()["LMTD"]["calls"])')
+    env = dict(os.environ, HT_INSTRUMENT='1')
+    out = subprocess.check_output([sys.executable, '-c', code], env=env)
+    assert out.strip() == b'1'
+    # The environment is read without adding os to the namespace of ht
+    import ht.vectorized
+    assert not hasattr(ht, 'os')
+    assert 'os' not in ht.vectorized.__all__
@@ -0,0 +1,178 @@
+# -*- coding: utf-8 -*-
+'''Chemical Engineering Design Library (ChEDL). Utilities for process modeling.
+Copyright (C) 2017 Caleb Bell <Caleb.Andrew.Bell@gmail.com>
+
+Permission is hereby granted, free of charge, to any person obtaining a copy
+of this software and associated documentation files (the "Software"), to deal
+in the Software without restriction, including without limitation the rights
+to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+copies of the Software, and to permit persons to whom the Software is
+furnished to do so, subject to the following conditions:
+
+The above copyright notice and this permission notice shall be included in all
+copies or substantial portions of the Software.
+
+THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+SOFTWARE.'''
+
+
+from __future__ import division
+import inspect
+import types
+import numpy as np
+import ht
+from ht.kernels import array_kernel, verify, derivative_kernel
+from numpy.testing import assert_allclose
+import pytest
+
+modules = [ht.conv_internal, ht.conv_supercritical, ht.conv_free_immersed,
+           ht.boiling_nucleic, ht.boiling_flow, ht.boiling_plate,
+           ht.condensation]
+
+# (1 - exp(-y))/y loses all precision for the tiny y of random inputs
+ill_conditioned = {'Chen_Bennett': dict(m=0.106, x=0.2, D=0.0212, rhol=567., rhog=18.09,
+                   kl=0.086, mul=156E-6, mug=1E-5, Cpl=2730., Hvap=2E5, sigma=0.02,
+                   dPsat=1E5, Te=np.linspace(1, 10, 20))}
+
+
+def test_array_kernel_all():
+    rng = np.random.RandomState(0)
+    translated = []
+    for module in modules:
+        for name in module.__all__:
+            func = getattr(module, name)
+            if not isinstance(func, types.FunctionType):
+                continue
+            kernel = array_kernel(func)
+            if not kernel.translated:
+                assert kernel.reason
+                continue
+            translated.append(name)
+            if name in ill_conditioned:
+                assert verify(func, kernel, ill_conditioned[name]) == 20
+                continue
+            parameters = inspect.signature(func).parameters.values()
+            # Once with only the required arguments, once with the optional ones
+            for optional in (False, True):
+                inputs = dict((p.name, 10**rng.uniform(-2, 5, 50)) for p in parameters
+                              if p.default is inspect.Parameter.empty
+                              or (optional and p.default is None))
+                verify(func, kernel, inputs, rtol=1e-7)
+    assert len(translated) > 90
+    assert 'Nu_conv_internal' not in translated
+
+
+def test_array_kernel_branches():
+    Re = np.array([1E4, 1E5, 1E6])
+    # Flags stay flags
+    for heating in (True, False):
+        for revised in (True, False):
+            Nu = array_kernel(ht.turbulent_Dittus_Boelter)(Re, 1.2, heating, revised)
+            assert_allclose(Nu, [ht.turbulent_Dittus_Boelter(R, 1.2, heating, revised) for R in Re])
+
+    # Optional arguments, given or not
+    kernel = array_kernel(ht.turbulent_Sieder_Tate)
+    assert_allclose(kernel(Re, 1.2), [ht.turbulent_Sieder_Tate(R, 1.2) for R in Re])
+    mu_w = np.array([1E-3, 2E-3, 3E-3])
+    assert_allclose(kernel(Re, 1.2, mu=1.5E-3, mu_w=mu_w),
+                    [ht.turbulent_Sieder_Tate(R, 1.2, 1.5E-3, m) for R, m in zip(Re, mu_w)])
+
+    # Branches on the values become np.where
+    kernel = array_kernel(ht.Akers_Deans_Crosser)
+    assert 'np.where' in kernel.source
+    m = np.array([0.01, 0.117, 1.0])
+    h = kernel(m=m, rhog=60.62, rhol=918.4, kl=0.1589, mul=1.2E-4, Cpl=2200, D=0.00802, x=0.4)
+    assert_allclose(h, [ht.Akers_Deans_Crosser(m=mi, rhog=60.62, rhol=918.4, kl=0.1589,
+                        mul=1.2E-4, Cpl=2200, D=0.00802, x=0.4) for mi in m])
+
+    # A tri-state option mixed with a test of the values
+    kernel = array_kernel(ht.Nu_vertical_cylinder_Eigenson_Morgan)
+    Gr = np.array([1E8, 1E10, 1E11])
+    for turbulent in (None, True, False):
+        assert_allclose(kernel(0.7, Gr, turbulent),
+                        [ht.Nu_vertical_cylinder_Eigenson_Morgan(0.7, G, turbulent) for G in Gr])
+
+    # Calls to other functions use their array implementations
+    kernel = array_kernel(ht.Shah)
+    assert '_turbulent_Dittus_Boelter_kernel' in kernel.source
+    assert_allclose(kernel(m=[1., 1.5], x=0.4, D=.3, rhol=995., mul=1E-3, kl=.6, Cpl=4200., P=1E6, Pc=2.2E7),
+                    [ht.Shah(m=m, x=0.4, D=.3, rhol=995., mul=1E-3, kl=.6, Cpl=4200., P=1E6, Pc=2.2E7) for m in (1., 1.5)])
+
+
+def test_array_kernel_static():
+    R1 = np.array([0.5, 1., 2.])
+    NTU1 = np.array([0.7, 1.5, 3.])
+    # Tests of the number of passes are only translated when it is static
+    assert not array_kernel(ht.temperature_effectiveness_TEMA_E).translated
+    kernel = array_kernel(ht.temperature_effectiveness_TEMA_E, static=('Ntp',))
+    assert kernel.translated
+    for Ntp, optimal in [(1, True), (2, True), (2, False), (3, True), (3, False), (4, True), (6, True)]:
+        assert_allclose(kernel(R1, NTU1, Ntp, optimal),
+                        [ht.temperature_effectiveness_TEMA_E(R, N, Ntp, optimal) for R, N in zip(R1, NTU1)])
+    with pytest.raises(Exception):
+        kernel(R1, NTU1, 5)
+
+    # A branch on the values which falls off the end returns None, which has
+    # no array equivalent
+    def partial(x):
+        if x < 1:
+            return x
+        elif x == 1:
+            return 2.*x
+    kernel = array_kernel(partial)
+    assert not kernel.translated
+    assert 'returns nothing' in kernel.reason
+
+
+def test_array_kernel_fallback():
+    kernel = array_kernel(ht.Nu_conv_internal)
+    assert not kernel.translated
+    assert kernel.source is None
+    assert_allclose(kernel([1E5, 2E5], 0.7), [ht.Nu_conv_internal(1E5, 0.7), ht.Nu_conv_internal(2E5, 0.7)])
+
+    # Options which were not given raise as the function does
+    with pytest.raises(Exception):
+        array_kernel(ht.Rohsenow)(rhol=1000., rhog=1., mul=1E-3, kl=.6, Cpl=4200.,
+                                  Hvap=2E6, sigma=.06)
+
+
+def test_verify():
+    Re = np.array([1E4, 1E5])
+    assert verify(ht.turbulent_Colburn, array_kernel(ht.turbulent_Colburn), {'Re': Re, 'Pr': 1.2}) == 2
+    with pytest.raises(AssertionError):
+        verify(ht.turbulent_Colburn, array_kernel(ht.turbulent_Drexel_McAdams), {'Re': Re, 'Pr': 1.2})
+    assert array_kernel(ht.turbulent_Colburn, samples={'Re': Re, 'Pr': 1.2}).translated
+
+
+def test_derivative_kernel():
+    from ht.derivatives import derivatives
+    # Values are those of the function; derivatives agree with dual numbers
+    cases = [(ht.temperature_effectiveness_TEMA_J, {'Ntp': 2}),
+             (ht.temperature_effectiveness_TEMA_E, {'Ntp': 3, 'optimal': False}),
+             (ht.temperature_effectiveness_TEMA_G, {'Ntp': 1}),
+             (ht.temperature_effectiveness_TEMA_H, {'Ntp': 2, 'optimal': False}),
+             (ht.temperature_effectiveness_plate, {'Np1': 2, 'Np2': 3, 'counterflow': False})]
+    for func, kwargs in cases:
+        dP1 = derivative_kernel(func, 'NTU1')
+        dP1_R1 = derivative_kernel(func, 'R1')
+        for R1, NTU1 in [(0.2, 0.3), (0.5, 1.2), (1.7, 4.)]:
+            P1, dP1_dNTU1 = dP1(R1, NTU1, **kwargs)
+            assert P1 == func(R1, NTU1, **kwargs)
+            value, dP1_dR1_dual, dP1_dNTU1_dual = derivatives(func, R1, NTU1, **kwargs)
+            assert_allclose(dP1_dNTU1, dP1_dNTU1_dual, rtol=1E-11)
+            assert_allclose(dP1_R1(R1, NTU1, **kwargs)[1], dP1_dR1_dual, rtol=1E-11)
+    assert 'def _jvp_temperature_effectiveness_TEMA_J' in derivative_kernel(ht.temperature_effectiveness_TEMA_J, 'NTU1').source
+    assert derivative_kernel(ht.temperature_effectiveness_TEMA_J, 'NTU1') is derivative_kernel(ht.temperature_effectiveness_TEMA_J, 'NTU1')
+
+    def f(x, y):
+        return x*y if x > y else x**2 + sqrt_(y)
+    sqrt_ = np.sqrt
+    with pytest.raises(ValueError):
+        derivative_kernel(f, 'x')
+    with pytest.raises(ValueError):
+        derivative_kernel(ht.temperature_effectiveness_TEMA_J, 'Cr')
@@ -0,0 +1,170 @@
+# -*- coding: utf-8 -*-
+'''Chemical Engineering Design Library (ChEDL). Utilities for process modeling.
+Copyright (C) 2018 Caleb Bell <Caleb.Andrew.Bell@gmail.com>
+
+Permission is hereby granted, free of charge, to any person obtaining a copy
+of this software and associated documentation files (the "Software"), to deal
+in the Software without restriction, including without limitation the rights
+to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+copies of the Software, and to permit persons to whom the Software is
+furnished to do so, subject to the following conditions:
+
+The above copyright notice and this permission notice shall be included in all
+copies or substantial portions of the Software.
+
+THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+SOFTWARE.'''
+
+from __future__ import division
+from ht import *
+import numpy as np
+from numpy.testing import assert_allclose
+import pytest
+
+
+def test_ShellTubeExchanger():
+    HX = ShellTubeExchanger(DShell=0.584, Do=0.019, Di=0.0157, pitch=0.0254,
+                            L=3.66, LSpacing=0.1524, Ntp=2, k_wall=45.)
+    assert HX.N == Ntubes(DBundle=0.584-0.0048, Do=0.019, pitch=0.0254, Ntp=2)
+    assert HX.NBaffles == 23
+    
+    # Shell-side pressure drop is the same as dP_Kern
+    ans = HX.rate(m1=11., m2=15., T1i=370., T2i=300., Cp1=2300., Cp2=4180., 
+                  rho1=995., rho2=995., mu1=0.000803, mu2=8E-4, k1=0.13,
+                  k2=0.6, mu_w1=0.000657)
+    dP = dP_Kern(m=11., rho=995., mu=0.000803, mu_w=0.000657, DShell=0.584,
+                 LSpacing=0.1524, pitch=0.0254, Do=.019, NBaffles=23)
+    assert_allclose(ans['dP1'], dP)
+    
+    # Temperatures are the same as the P-NTU method
+    ans = HX.rate(m1=11., m2=15., T1i=370., T2i=300., Cp1=2300., Cp2=4180., 
+                  rho1=800., rho2=995., mu1=5E-4, mu2=8E-4, k1=0.13, k2=0.6)
+    res = P_NTU_method(m1=11., m2=15., Cp1=2300., Cp2=4180., UA=float(ans['UA']),
+                       T1i=370., T2i=300., subtype='E', Ntp=2)
+    assert_allclose([ans['Q'], ans['T1o'], ans['T2o']], [res['Q'], res['T1o'], res['T2o']])
+    assert_allclose(ans['U'], 593.4372239407176)
+    
+    # Arrays of operating points give the same results as each point
+    m1s = np.array([11., 8., 5.])
+    T1is = np.array([370., 360., 380.])
+    ans = HX.rate(m1=m1s, m2=15., T1i=T1is, T2i=300., Cp1=2300., Cp2=4180., 
+                  rho1=800., rho2=995., mu1=5E-4, mu2=8E-4, k1=0.13, k2=0.6)
+    for i in range(3):
+        ans_i = HX.rate(m1=m1s[i], m2=15., T1i=T1is[i], T2i=300., Cp1=2300.,
+                        Cp2=4180., rho1=800., rho2=995., mu1=5E-4, mu2=8E-4, 
+                        k1=0.13, k2=0.6)
+        for key in ['Q', 'T1o', 'T2o', 'U', 'dP1', 'dP2']:
+            assert_allclose(ans[key][i], ans_i[key])
+
+    with pytest.raises(Exception):
+        ShellTubeExchanger(DShell=0.584, Do=0.019, Di=0.0157, pitch=0.0254,
+                           L=3.66, LSpacing=0.1524, shell='K')
+    # Unsupported numbers of tube passes are caught with the geometry
+    for shell, Ntp in [('G', 4), ('H', 4), ('J', 6), ('E', 5)]:
+        with pytest.raises(Exception):
+            ShellTubeExchanger(DShell=0.584, Do=0.019, Di=0.0157,
+                               pitch=0.0254, L=3.66, LSpacing=0.1524,
+                               Ntp=Ntp, shell=shell)
+
+
+def test_ShellTubeExchanger_shells():
+    conditions = dict(m1=11., m2=15., T1i=370., T2i=300., Cp1=2300.,
+                      Cp2=4180., rho1=800., rho2=995., mu1=5E-4, mu2=8E-4,
+                      k1=0.13, k2=0.6)
+    for shell, Ntp in [('G', 2), ('H', 1), ('J', 4), ('J', 2)]:
+        HX = ShellTubeExchanger(DShell=0.584, Do=0.019, Di=0.0157,
+                                pitch=0.0254, L=3.66, LSpacing=0.1524,
+                                Ntp=Ntp, shell=shell, k_wall=45.)
+        ans = HX.rate(**conditions)
+        res = P_NTU_method(m1=11., m2=15., Cp1=2300., Cp2=4180.,
+                           UA=float(ans['UA']), T1i=370., T2i=300.,
+                           subtype=shell, Ntp=Ntp)
+        assert_allclose([ans['Q'], ans['T1o'], ans['T2o'], ans['P1']],
+                        [res['Q'], res['T1o'], res['T2o'], res['P1']])
+
+
+def test_ShellTubeExchanger_mu_w2():
+    HX = ShellTubeExchanger(DShell=0.584, Do=0.019, Di=0.0157, pitch=0.0254,
+                            L=3.66, LSpacing=0.1524, Ntp=2, k_wall=45.)
+    conditions = dict(m1=11., m2=15., T1i=370., T2i=300., Cp1=2300.,
+                      Cp2=4180., rho1=800., rho2=995., mu1=5E-4, mu2=8E-4,
+                      k1=0.13, k2=0.6)
+    ans = HX.rate(**conditions)
+    ans_w = HX.rate(mu_w2=1E-2, **conditions)
+    factor = (8E-4/1E-2)**0.14
+    assert_allclose(ans_w['h2'], ans['h2']*factor)
+    assert_allclose(ans_w['dP2'], ans['dP2']/factor)
+    assert ans_w['Q'] < ans['Q']
+
+
+def test_design_shell_tube():
+    from ht.hx import HEDH_shells
+    from ht.shell_and_tube import _pareto_front
+    conditions = dict(m1=11., m2=15., T1i=370., T2i=300., Cp1=2300.,
+                      Cp2=4180., rho1=800., rho2=995., mu1=5E-4, mu2=8E-4,
+                      k1=0.13, k2=0.6)
+    space = dict(tubes=[(0.75, 16), (1., 14)], angles=[30, 90],
+                 Ntps=[1, 2, 4], Ls=[2.438, 4.877], DShells=HEDH_shells[:20])
+    Q, dP1_max, dP2_max = 1E6, 2E4, 2E4
+    designs = design_shell_tube(Q=Q, dP1_max=dP1_max, dP2_max=dP2_max,
+                                processes=1, k_wall=45., **dict(conditions, **space))
+    assert designs
+    for design in designs:
+        assert design['Q'] >= Q
+        assert design['dP1'] <= dP1_max and design['dP2'] <= dP2_max
+    areas = [d['A'] for d in designs]
+    powers = [d['power'] for d in designs]
+    assert areas == sorted(areas)
+    # On the front, more area always buys less pumping power
+    assert all(a > b for a, b in zip(powers, powers[1:]))
+
+    # The pruned search finds the same front as rating every geometry
+    from ht.hx import get_tube_TEMA, HEDH_pitches
+    feasible = []
+    for NPS, BWG in space['tubes']:
+        _, _, Do, Di, _ = get_tube_TEMA(NPS=NPS, BWG=BWG)
+        for ratio in HEDH_pitches[NPS]:
+            for angle in space['angles']:
+                for Ntp in space['Ntps']:
+                    for L in space['Ls']:
+                        for DShell in space['DShells']:
+                            HX = ShellTubeExchanger(DShell=DShell, Do=Do, Di=Di,
+                                                    pitch=ratio*Do, L=L,
+                                                    LSpacing=0.4*DShell,
+                                                    Ntp=Ntp, angle=angle, k_wall=45.)
+                            if HX.N < Ntp:
+                                continue
+                            ans = HX.rate(**conditions)
+                            if ans['Q'] >= Q and ans['dP1'] <= dP1_max and ans['dP2'] <= dP2_max:
+                                power = 11.*ans['dP1']/800. + 15.*ans['dP2']/995.
+                                feasible.append({'A': HX.A_o, 'power': float(power)})
+    front = _pareto_front(feasible)
+    assert_allclose(sorted((d['A'], d['power']) for d in front),
+                    [(d['A'], d['power']) for d in designs])
+
+    # Parallel evaluation gives the same designs
+    designs_parallel = design_shell_tube(Q=Q, dP1_max=dP1_max, dP2_max=dP2_max,
+                                         processes=2, k_wall=45., **dict(conditions, **space))
+    assert designs_parallel == designs
+
+    # More duty than the streams can exchange
+    assert design_shell_tube(Q=1E8, dP1_max=dP1_max, dP2_max=dP2_max,
+                             processes=1, **dict(conditions, **space)) == []
+
+    # Invalid arguments raise rather than giving no designs
+    with pytest.raises(Exception):
+        design_shell_tube(Q=Q, dP1_max=dP1_max, dP2_max=dP2_max, processes=1, shell='G',
+                          **dict(conditions, **space))
+    with pytest.raises(TypeError):
+        design_shell_tube(Q=Q, dP1_max=dP1_max, dP2_max=dP2_max, processes=1, k_wal=45.,
+                          **dict(conditions, **space))
+    # The default numbers of tube passes are those the shell supports
+    space.pop('Ntps')
+    designs = design_shell_tube(Q=Q, dP1_max=dP1_max, dP2_max=dP2_max, processes=1,
+                                shell='G', k_wall=45., **dict(conditions, **space))
+    assert designs and set(d['Ntp'] for d in designs) <= set([1, 2])
@@ -105,3 +105,30 @@ def test_check_signatures():
         obj = getattr(ht, name)
         if isinstance(obj, types.FunctionType) and obj not in [ht.get_tube_TEMA, ht.check_tubing_TEMA]:
             check_args_order(obj)
+
+
+def test_array_quantities():
+    Thi = np.array([100., 101., 102.])*u.K
+    dTlms = LMTD(Thi, 60.*u.K, 30.*u.K, 40.2*u.K)
+    assert type(dTlms.magnitude) is np.ndarray
+    assert_pint_allclose(dTlms, [ht.LMTD(T, 60., 30., 40.2) for T in [100., 101., 102.]], {'[temperature]': 1.0})
+
+    # Each argument is converted once as a whole array
+    dTlms = LMTD(Thi=Thi.to(u.degR), Tho=60.*u.K, Tci=30.*u.K, Tco=40.2*u.K)
+    assert_pint_allclose(dTlms, [ht.LMTD(T, 60., 30., 40.2) for T in [100., 101., 102.]], {'[temperature]': 1.0})
+    
+    Res = np.array([1E4, 2E4])*u.dimensionless
+    Nus = Nu_conv_internal(Re=Res, Pr=1.2)
+    assert_pint_allclose(Nus, [ht.Nu_conv_internal(Re=Re, Pr=1.2) for Re in [1E4, 2E4]], {})
+
+
+def test_array_quantities_dict_result():
+    kwargs = dict(mc=1.45*u.kg/u.s, Cph=1860.*u.J/u.kg/u.K,
+                  Cpc=1900*u.J/u.kg/u.K, subtype='crossflow, mixed Cmax',
+                  Tci=15*u.degC, Tco=85*u.degC, Thi=130*u.degC)
+    ans = effectiveness_NTU_method(mh=np.array([5.2, 5.])*u.kg/u.s, **kwargs)
+    assert type(ans) is dict
+    for mh, Tho, UA in zip([5.2, 5.], ans['Tho'], ans['UA']):
+        expect = effectiveness_NTU_method(mh=mh*u.kg/u.s, **kwargs)
+        assert_pint_allclose(Tho, expect['Tho'].magnitude, {'[temperature]': 1.0})
+        assert_pint_allclose(UA, expect['UA'].magnitude, {'[length]': 2.0, '[mass]': 1.0, '[temperature]': -1.0, '[time]': -3.0})
@@ -25,9 +25,157 @@ from numpy.testing import assert_allclose
 import ht
 import ht.vectorized
 import numpy as np
+import pytest
 
 
 def test_LMTD_vect():
     dTlms = [ht.LMTD(T, 60., 30., 40.2) for T in [100, 101]]
     dTlms_vect = ht.vectorized.LMTD([100, 101], 60., 30., 40.2)
     assert_allclose(dTlms, dTlms_vect)
+
+
+def test_temperature_effectiveness_air_cooler_vect():
+    R1s = np.array([0.1, 0.9090909090909091, 2., 0.5])
+    NTU1s = np.array([0.5, 14.958251192851375, 3., 200.])
+    for rows in [1, 2, 5, 25]:
+        P1s = [ht.temperature_effectiveness_air_cooler(R1, NTU1, rows, 1)
+               for R1, NTU1 in zip(R1s, NTU1s)]
+        P1s_vect = ht.vectorized.temperature_effectiveness_air_cooler(R1s, NTU1s, rows, 1)
+        assert_allclose(P1s, P1s_vect, rtol=1E-13)
+
+    # Broadcasting, and many rows
+    P1s_vect = ht.vectorized.temperature_effectiveness_air_cooler(R1s[:, None], NTU1s, 300, 1)
+    assert P1s_vect.shape == (4, 4)
+    assert np.all(np.isfinite(P1s_vect))
+
+    # Cases without an array implementation still work
+    P1s = ht.vectorized.temperature_effectiveness_air_cooler(1.1, [.5, .6], 3, 3)
+    assert_allclose(P1s, [ht.temperature_effectiveness_air_cooler(1.1, NTU1, 3, 3) for NTU1 in [.5, .6]])
+
+
+def test_Ft_aircooler_vect():
+    Ft_many = [[ht.Ft_aircooler(Thi=125., Tho=80., Tci=25., Tco=95., Ntp=i, rows=j)
+                for i in range(1, 6)] for j in range(1, 6)]
+    Ntps, rows = np.meshgrid(range(1, 6), range(1, 6))
+    # Mixed pass and row counts in one call
+    Ft_vect = ht.vectorized.Ft_aircooler(125., 80., 25., 95., Ntps, rows)
+    assert_allclose(Ft_vect, Ft_many, rtol=1E-13)
+
+    Thos = np.linspace(50., 90., 7)
+    Ft_vect = ht.vectorized.Ft_aircooler(Thi=125., Tho=Thos, Tci=25., Tco=95., Ntp=2, rows=4)
+    assert_allclose(Ft_vect, [ht.Ft_aircooler(Thi=125., Tho=Tho, Tci=25., Tco=95., Ntp=2, rows=4)
+                              for Tho in Thos], rtol=1E-13)
+
+
+def test_F_LMTD_Fakheri_vect():
+    # Includes the R = 1 special case
+    Thos, Tcos = [110., 100., 120.], [85., 45., 35.]
+    Fs = [ht.F_LMTD_Fakheri(Thi=130., Tho=Tho, Tci=15., Tco=Tco, shells=2)
+          for Tho, Tco in zip(Thos, Tcos)]
+    Fs_vect = ht.vectorized.F_LMTD_Fakheri(130., Thos, 15., Tcos, 2)
+    assert_allclose(Fs_vect, Fs, rtol=1E-13)
+
+
+def test_LMTD_vect_parallel():
+    dTlms = [ht.LMTD(T, 60., 30., 40.2, counterflow=False) for T in [100, 101]]
+    dTlms_vect = ht.vectorized.LMTD([100, 101], 60., 30., 40.2, counterflow=False)
+    assert_allclose(dTlms, dTlms_vect)
+
+
+def test_plate_vect():
+    arrangements = [(1, 1, True, True), (1, 1, False, True), (1, 2, True, True),
+                    (1, 3, True, True), (1, 3, False, True), (1, 4, False, False),
+                    (2, 2, True, True), (2, 2, True, False), (2, 2, False, True),
+                    (2, 2, False, False), (2, 3, True, True), (2, 3, False, True),
+                    (2, 4, True, True), (2, 4, False, False), (3, 1, True, True),
+                    (4, 2, False, True), (3, 2, True, True)]
+    rng = np.random.RandomState(0)
+    n = 300
+    R1s = 10**rng.uniform(-2, 0.5, n)
+    NTU1s = 10**rng.uniform(-2, 0.5, n)
+    codes = rng.randint(len(arrangements), size=n)
+    Np1, Np2, counterflow, passes_counterflow = [np.array([arrangements[i][j] for i in codes])
+                                                 for j in range(4)]
+    # Mixed arrangements in one batch
+    P1s = ht.vectorized.temperature_effectiveness_plate(R1s, NTU1s, Np1, Np2, counterflow, passes_counterflow)
+    for i in range(n):
+        P1 = ht.temperature_effectiveness_plate(R1s[i], NTU1s[i], *arrangements[codes[i]])
+        assert_allclose(P1s[i], P1, rtol=1E-9)
+
+    # Parallel arrangements have a maximum P1, so compare the P1 obtained
+    # with the NTU1 found rather than the NTU1
+    NTU1s_calc = ht.vectorized.NTU_from_P_plate(P1s, R1s, Np1, Np2, counterflow, passes_counterflow)
+    P1s_calc = ht.vectorized.temperature_effectiveness_plate(R1s, NTU1s_calc, Np1, Np2, counterflow, passes_counterflow)
+    assert_allclose(P1s_calc, P1s, rtol=1E-8)
+
+    # Points with no solution are NaN, without affecting the others; the
+    # scalar functions raise
+    for args in [(10, 1, 1), (0.5, 2, 3, False), (0.5, 1, 1, False)]:
+        NTU1s_calc = ht.vectorized.NTU_from_P_plate([.05, .99], *args)
+        assert_allclose(NTU1s_calc[0], ht.NTU_from_P_plate(.05, *args), rtol=1E-12)
+        assert np.isnan(NTU1s_calc[1])
+        with pytest.raises(ValueError):
+            ht.NTU_from_P_plate(.99, *args)
+    with pytest.raises(Exception):
+        ht.vectorized.temperature_effectiveness_plate(.5, [1., 2.], 3, 3)
+
+
+def test_temperature_effectiveness_shells_vect():
+    R1 = np.linspace(0.1, 3., 40)
+    NTU1 = np.linspace(0.05, 4., 40)[::-1]
+    shells = np.arange(40) % 4 + 1
+    cases = [(ht.temperature_effectiveness_TEMA_E, {'Ntp': 2}),
+             (ht.temperature_effectiveness_TEMA_J, {'Ntp': 1}),
+             (ht.temperature_effectiveness_plate, {'Np1': 2, 'Np2': 3}),
+             (ht.temperature_effectiveness_basic, {'subtype': 'crossflow, mixed 1&2'})]
+    for function, kwargs in cases:
+        for arrangement in ('counterflow', 'parallel', 'split 1'):
+            P1 = ht.vectorized.temperature_effectiveness_shells(R1, NTU1, shells, function,
+                                                                arrangement, **kwargs)
+            expect = [ht.temperature_effectiveness_shells(r, N, n, function, arrangement, **kwargs)
+                      for r, N, n in zip(R1, NTU1, shells)]
+            assert_allclose(P1, expect, rtol=1E-12)
+            # NTU1 is not recoverable where P1 no longer changes with it
+            NTU1_calc = ht.vectorized.NTU_from_P_shells(P1, R1, shells, function, arrangement,
+                                                        **kwargs)
+            P1_calc = ht.vectorized.temperature_effectiveness_shells(R1, NTU1_calc, shells, function,
+                                                                     arrangement, **kwargs)
+            assert_allclose(P1_calc, P1, rtol=1E-11)
+    with pytest.raises(ValueError):
+        ht.vectorized.NTU_from_P_shells([0.3, 0.99], 2., 2, ht.temperature_effectiveness_TEMA_E, Ntp=2)
+
+
+def test_Nu_cylinder_free_convection_vect():
+    from ht.conv_free_immersed import vertical_cylinder_correlations
+    Gr = np.logspace(4, 13, 30)
+    Pr = np.linspace(0.7, 5, 30)
+    # Without L and D every element is in range of the preferred correlation
+    assert_allclose(ht.vectorized.Nu_vertical_cylinder(Pr, Gr),
+                    [ht.Nu_vertical_cylinder(p, g) for p, g in zip(Pr, Gr)])
+    for method in vertical_cylinder_correlations:
+        Nus = ht.vectorized.Nu_vertical_cylinder(Pr, Gr, L=2., D=0.5, Method=method)
+        assert_allclose(Nus, [ht.Nu_vertical_cylinder(p, g, L=2., D=0.5, Method=method)
+                              for p, g in zip(Pr, Gr)])
+
+    # Popiel & Churchill is laminar only; above its transition, and for
+    # elements without a diameter, the correlation preferred without L and D
+    # is used
+    D = np.where(np.arange(30) % 2, 0.5, np.nan)
+    Nus = ht.vectorized.Nu_vertical_cylinder(Pr, Gr, L=2., D=D)
+    Ra = Pr*Gr
+    for i in range(30):
+        if np.isnan(D[i]) or Ra[i] > 1E9:
+            expect = ht.Nu_vertical_cylinder(Pr[i], Gr[i])
+        else:
+            expect = ht.Nu_vertical_cylinder(Pr[i], Gr[i], L=2., D=0.5)
+        assert_allclose(Nus[i], expect)
+
+    assert ht.vectorized.Nu_vertical_cylinder(Pr, Gr, L=2., D=0.5, AvailableMethods=True)[0] == 'Popiel & Churchill'
+    with pytest.raises(Exception):
+        ht.vectorized.Nu_vertical_cylinder(Pr, Gr, Method='BADMETHOD')
+
+    for method in ['Churchill-Chu', 'Kuehn & Goldstein', 'Morgan', None]:
+        assert_allclose(ht.vectorized.Nu_horizontal_cylinder(Pr, Gr, Method=method),
+                        [ht.Nu_horizontal_cylinder(p, g, Method=method) for p, g in zip(Pr, Gr)])
+    with pytest.raises(Exception):
+        ht.vectorized.Nu_horizontal_cylinder(Pr, Gr, Method='BADMETHOD')